@@ -0,0 +1,332 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+from pydantic import BaseModel
+
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO,
+    force=True
+)
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+# the stages of a meme read, in the order they run, storage first
+SERVICES = ("storage_service", "image_service", "meme_service")
+DEFAULT_SIZES = "1KB,64KB,1MB,5MB,20MB"
+_UNITS = {"KB": 1024, "MB": 1024 * 1024, "B": 1}
+
+Stage = tuple[str, Callable[[], Any]]
+
+
+class StageResult(BaseModel):
+    service: str
+    stage: str
+    size: int
+    iterations: int
+    median_ms: float
+    min_ms: float
+    # image bytes through the stage per second, based on the median
+    throughput_mb_s: float
+    # the most memory the stage held at once on top of its input, and that as a multiple of the image size,
+    # 1.33 is one base64 copy of the image, 2.67 two of them, etc.
+    peak_alloc_bytes: int
+    peak_alloc_per_image_byte: float
+
+
+class BenchmarkReport(BaseModel):
+    commit: str | None
+    python: str
+    results: list[StageResult]
+
+
+def parse_sizes(value: str) -> list[int]:
+    """ Parses sizes like 1KB,64KB,20MB, units are powers of 1024 """
+    sizes = []
+    for part in value.split(","):
+        part = part.strip().upper()
+        for unit, multiplier in _UNITS.items():
+            if part.endswith(unit):
+                sizes.append(int(float(part.removesuffix(unit)) * multiplier))
+                break
+        else:
+            sizes.append(int(part))
+
+    return sizes
+
+
+def _render(field, content: Any) -> bytes:
+    """ What FastAPI does with an endpoint's return value: validates it against the response model,
+    dumps it to JSON compatible objects and encodes the body """
+    from fastapi.responses import JSONResponse
+
+    value, errors = field.validate(content, {}, loc=("response",))
+    assert not errors, errors
+    return JSONResponse(field.serialize(value)).body
+
+
+def _response_field(model: type[BaseModel]):
+    from fastapi.utils import create_response_field
+
+    return create_response_field(name=f"Response_{model.__name__}", type_=model, mode="serialization")
+
+
+def storage_service_stages(image: bytes) -> list[Stage]:
+    from internal.routes.dto.data import RetrieveDataResponse
+    from internal.storage_service.storage_service import StorageService
+    from internal.storage_service_client.fake_storage_service_client import FakeStorageServiceClient
+    from models.data import StoredObject
+
+    stored_object = StoredObject(data=image, etag='"etag"')
+
+    class StoredObjectClient(FakeStorageServiceClient):
+        # the fake hashes the data on every read, object storage sends a stored etag instead
+        def retrieve_data(self, key: str, if_none_match: str | None = None) -> StoredObject:
+            return stored_object
+
+    service = StorageService(storage_service_client=StoredObjectClient())
+    data = service.retrieve_data("key")
+    response_field = _response_field(RetrieveDataResponse)
+
+    return [
+        ("retrieve_data", lambda: service.retrieve_data("key")),
+        ("retrieve_data_response", lambda: _render(response_field, RetrieveDataResponse(b64_data=data.b64_data))),
+    ]
+
+
+def image_service_stages(image: bytes) -> list[Stage]:
+    import base64
+
+    import httpx
+
+    from internal.routers.dto.images import GetImageResponse
+    from internal.storage_service_client.storage_service_client import StorageServiceClient
+
+    b64_data = base64.b64encode(image).decode()
+    body = json.dumps({"b64_data": b64_data}).encode()
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=body, headers={"ETag": '"etag"'}))
+    client = StorageServiceClient(
+        storage_service_endpoint="http://storage-service/data",
+        http_client=httpx.Client(transport=transport),
+    )
+    response_field = _response_field(GetImageResponse)
+
+    return [
+        ("storage_client_retrieve_data", lambda: client.retrieve_data("key")),
+        ("get_image_response", lambda: _render(response_field, GetImageResponse(b64_data=b64_data))),
+    ]
+
+
+def meme_service_stages(image: bytes) -> list[Stage]:
+    import base64
+
+    import httpx
+
+    from internal.etag.etag import meme_etag
+    from internal.image_service_client.async_image_service_client import AsyncImageServiceClient
+    from internal.routers.dto.meme import RetrieveMemeResponse
+    from models.meme import Meme
+
+    b64_data = base64.b64encode(image).decode()
+    body = json.dumps({"b64_data": b64_data}).encode()
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=body, headers={"ETag": '"etag"'}))
+    client = AsyncImageServiceClient(
+        image_service_endpoint="http://image-service/images",
+        http_client=httpx.AsyncClient(transport=transport),
+    )
+    loop = asyncio.new_event_loop()
+    meme = Meme(id="meme", b64_data=b64_data, caption="caption")
+    response_field = _response_field(RetrieveMemeResponse)
+
+    return [
+        ("image_client_retrieve_image", lambda: loop.run_until_complete(client.retrieve_image_revision("image"))),
+        ("meme_model", lambda: Meme(id="meme", b64_data=b64_data, caption="caption")),
+        # built from the image etag, so it costs the same for any image size
+        ("meme_etag", lambda: meme_etag('"etag"', meme.caption)),
+        (
+            "retrieve_meme_response",
+            lambda: _render(response_field, RetrieveMemeResponse(b64_data=meme.b64_data, caption=meme.caption)),
+        ),
+    ]
+
+
+def time_stage(run: Callable[[], Any], min_time: float, min_iterations: int) -> list[float]:
+    """ Seconds per call, called until both min_time has passed and min_iterations are done """
+    run()
+    times = []
+    total = 0.0
+    while total < min_time or len(times) < min_iterations:
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        times.append(elapsed)
+        total += elapsed
+
+    return times
+
+
+def peak_allocation(run: Callable[[], Any]) -> int:
+    """ The most memory allocated at once during a call, whatever the stage keeps and whatever it frees again """
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        result = run()
+        _, peak = tracemalloc.get_traced_memory()
+        del result
+    finally:
+        tracemalloc.stop()
+
+    return peak - baseline
+
+
+def run_worker(service: str, sizes: list[int], min_time: float, min_iterations: int) -> list[StageResult]:
+    """ Runs in the service's directory, so its internal and models packages are the ones imported """
+    sys.path.insert(0, os.getcwd())
+    # services log every call at INFO, formatting those lines would be timed along with the stages
+    logging.getLogger().setLevel(logging.WARNING)
+    make_stages = {
+        "storage_service": storage_service_stages,
+        "image_service": image_service_stages,
+        "meme_service": meme_service_stages,
+    }[service]
+
+    results = []
+    for size in sizes:
+        image = os.urandom(size)
+        for stage, run in make_stages(image):
+            times = time_stage(run, min_time, min_iterations)
+            peak = peak_allocation(run)
+            median = statistics.median(times)
+            results.append(StageResult(
+                service=service,
+                stage=stage,
+                size=size,
+                iterations=len(times),
+                median_ms=median * 1000,
+                min_ms=min(times) * 1000,
+                throughput_mb_s=size / median / (1024 * 1024),
+                peak_alloc_bytes=peak,
+                peak_alloc_per_image_byte=peak / size,
+            ))
+
+    return results
+
+
+def run_service(service: str, sizes: str, min_time: float, min_iterations: int) -> list[StageResult]:
+    completed = subprocess.run(
+        [sys.executable, __file__, "--worker", service, "--sizes", sizes,
+         "--min-time", str(min_time), "--min-iterations", str(min_iterations)],
+        cwd=REPO_ROOT / service,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"{service} benchmarks failed:\n{completed.stderr}")
+
+    return [StageResult(**result) for result in json.loads(completed.stdout)]
+
+
+def current_commit() -> str | None:
+    """ The commit benchmarked, with a -dirty suffix if the tree has uncommitted changes """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT, capture_output=True, text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + "-dirty" if dirty != "" else commit
+
+
+def find_regressions(report: BenchmarkReport, baseline: BenchmarkReport, max_slowdown: float) -> list[str]:
+    """ Stages whose median time or peak allocation grew by more than max_slowdown times since the baseline """
+    baseline_results = {(result.service, result.stage, result.size): result for result in baseline.results}
+    regressions = []
+    for result in report.results:
+        before = baseline_results.get((result.service, result.stage, result.size))
+        if before is None:
+            continue
+        name = f"{result.service}.{result.stage} at {result.size} bytes"
+        if result.median_ms > before.median_ms * max_slowdown:
+            regressions.append(f"{name}: {before.median_ms:.3f} ms -> {result.median_ms:.3f} ms")
+        if result.peak_alloc_bytes > before.peak_alloc_bytes * max_slowdown:
+            regressions.append(f"{name}: peak {before.peak_alloc_bytes} -> {result.peak_alloc_bytes} bytes")
+
+    return regressions
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Times the serialization steps of a meme read and measures the memory each one allocates",
+    )
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"image sizes, default - {DEFAULT_SIZES}")
+    parser.add_argument("--services", default=",".join(SERVICES),
+                        help=f"services whose stages to run, default - {','.join(SERVICES)}")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds to time each stage for, default - 0.5")
+    parser.add_argument("--min-iterations", type=int, default=5, help="least calls timed per stage, default - 5")
+    parser.add_argument("--output", default="benchmark_report.json", help="report file, default - benchmark_report.json")
+    parser.add_argument("--baseline", help="earlier report, the run fails if a stage regressed against it")
+    parser.add_argument("--max-slowdown", type=float, default=1.25,
+                        help="how many times slower or bigger a stage may get than in the baseline, default - 1.25")
+    parser.add_argument("--worker", choices=SERVICES, help=argparse.SUPPRESS)
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    sizes = parse_sizes(args.sizes)
+
+    if args.worker is not None:
+        results = run_worker(args.worker, sizes, args.min_time, args.min_iterations)
+        print(json.dumps([result.model_dump() for result in results]))
+        return
+
+    results = []
+    for service in args.services.split(","):
+        logger.info("Benchmarking %s", service)
+        results.extend(run_service(service.strip(), args.sizes, args.min_time, args.min_iterations))
+
+    report = BenchmarkReport(
+        commit=current_commit(),
+        python=sys.version.split()[0],
+        results=results,
+    )
+    Path(args.output).write_text(report.model_dump_json(indent=2))
+
+    for result in results:
+        logger.info(
+            "%-15s %-30s %10s bytes %10.3f ms %9.1f MB/s, peak %5.2fx image",
+            result.service,
+            result.stage,
+            result.size,
+            result.median_ms,
+            result.throughput_mb_s,
+            result.peak_alloc_per_image_byte,
+        )
+    logger.info("Wrote report to %s", args.output)
+
+    if args.baseline is not None:
+        baseline = BenchmarkReport.model_validate_json(Path(args.baseline).read_text())
+        regressions = find_regressions(report, baseline, args.max_slowdown)
+        for regression in regressions:
+            logger.error("Regression: %s", regression)
+        if len(regressions) > 0:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
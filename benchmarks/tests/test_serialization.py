@@ -0,0 +1,64 @@
+import subprocess
+import sys
+
+from serialization import REPO_ROOT, BenchmarkReport, StageResult, find_regressions, parse_sizes, run_service
+
+
+def stage_result(**values) -> StageResult:
+    defaults = dict(
+        service="meme_service",
+        stage="meme_etag",
+        size=1024,
+        iterations=10,
+        median_ms=1.0,
+        min_ms=1.0,
+        throughput_mb_s=1.0,
+        peak_alloc_bytes=1000,
+        peak_alloc_per_image_byte=1.0,
+    )
+    return StageResult(**{**defaults, **values})
+
+
+class TestSerializationBenchmarks:
+    def test_parse_sizes(self):
+        assert parse_sizes("1KB, 64kb,1.5MB,100") == [1024, 64 * 1024, 1536 * 1024, 100]
+
+    def test_find_regressions(self):
+        baseline = BenchmarkReport(commit="a", python="3.11", results=[
+            stage_result(),
+            stage_result(stage="meme_model"),
+        ])
+        report = BenchmarkReport(commit="b", python="3.11", results=[
+            stage_result(median_ms=1.2),
+            stage_result(stage="meme_model", median_ms=2.0, peak_alloc_bytes=3000),
+            # stages the baseline doesn't have are skipped
+            stage_result(stage="new_stage", median_ms=100),
+        ])
+
+        regressions = find_regressions(report, baseline, max_slowdown=1.25)
+        assert len(regressions) == 2
+        assert all(regression.startswith("meme_service.meme_model at 1024 bytes") for regression in regressions)
+
+    def test_run_service(self):
+        results = run_service("storage_service", "1KB,4KB", min_time=0, min_iterations=1)
+
+        assert [(result.stage, result.size) for result in results] == [
+            ("retrieve_data", 1024),
+            ("retrieve_data_response", 1024),
+            ("retrieve_data", 4096),
+            ("retrieve_data_response", 4096),
+        ]
+        # base64 alone is 4/3 of the image
+        assert all(result.peak_alloc_bytes > result.size for result in results)
+
+    def test_worker_logging(self):
+        completed = subprocess.run(
+            [sys.executable, str(REPO_ROOT / "benchmarks" / "serialization.py"), "--worker", "image_service",
+             "--sizes", "1KB", "--min-time", "0", "--min-iterations", "1"],
+            cwd=REPO_ROOT / "image_service",
+            capture_output=True,
+            text=True,
+        )
+        assert completed.returncode == 0, completed.stderr
+        # the services' INFO lines would be timed along with the stages
+        assert " - INFO - " not in completed.stderr
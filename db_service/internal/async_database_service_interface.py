@@ -0,0 +1,50 @@
+from abc import ABC, abstractmethod
+from typing import AsyncIterator
+
+from models.meme import Meme, MemeBulkResult, MemeUpdate
+
+
+class AsyncDatabaseServiceInterface(ABC):
+    @abstractmethod
+    async def create_meme(self, meme: Meme):
+        ...
+
+    @abstractmethod
+    async def retrieve_meme(self, meme_id: str) -> Meme:
+        ...
+
+    @abstractmethod
+    async def retrieve_memes(self, skip: int, limit: int) -> list[Meme]:
+        ...
+
+    @abstractmethod
+    async def retrieve_memes_after(self, after_id: int | None, limit: int) -> tuple[list[Meme], int | None]:
+        ...
+
+    @abstractmethod
+    def stream_memes(self) -> AsyncIterator[Meme]:
+        ...
+
+    @abstractmethod
+    async def retrieve_memes_by_ids(self, meme_ids: list[str]) -> tuple[list[Meme], list[str]]:
+        ...
+
+    @abstractmethod
+    async def create_memes(self, memes: list[Meme]) -> list[MemeBulkResult]:
+        ...
+
+    @abstractmethod
+    async def update_meme(self, meme_id: str, meme: MemeUpdate) -> Meme:
+        ...
+
+    @abstractmethod
+    async def update_memes(self, memes: list[MemeUpdate]) -> list[MemeBulkResult]:
+        ...
+
+    @abstractmethod
+    async def delete_meme(self, meme_id: str) -> Meme:
+        ...
+
+    @abstractmethod
+    async def delete_memes(self, meme_ids: list[str]) -> list[MemeBulkResult]:
+        ...
@@ -0,0 +1,56 @@
+from abc import ABC, abstractmethod
+from typing import AsyncIterator
+
+from models.meme import Meme, MemeUpdate
+
+
+class AsyncMemeRepositoryInterface(ABC):
+    @abstractmethod
+    async def create_meme(self, meme: Meme):
+        ...
+
+    @abstractmethod
+    async def retrieve_meme(self, meme_id: str) -> Meme:
+        ...
+
+    @abstractmethod
+    async def retrieve_memes(self, skip: int, limit: int) -> list[Meme]:
+        ...
+
+    @abstractmethod
+    async def retrieve_memes_after(self, after_id: int | None, limit: int) -> list[Meme]:
+        ...
+
+    @abstractmethod
+    def stream_memes(self, batch_size: int) -> AsyncIterator[Meme]:
+        """ Yields every meme ordered by id, holding at most batch_size of them at a time """
+        ...
+
+    @abstractmethod
+    async def retrieve_memes_by_ids(self, meme_ids: list[str]) -> list[Meme]:
+        ...
+
+    @abstractmethod
+    async def create_memes(self, memes: list[Meme]) -> list[str]:
+        """ Inserts all memes in one transaction, skipping the ones whose meme or image id is taken,
+        returns ids of the created memes """
+        ...
+
+    @abstractmethod
+    async def update_meme(self, meme_id: str, meme: MemeUpdate) -> Meme:
+        ...
+
+    @abstractmethod
+    async def update_memes(self, memes: list[MemeUpdate]) -> list[str]:
+        """ Updates memes by unique_meme_id in one transaction, None fields are left as they are,
+        returns ids of the updated memes """
+        ...
+
+    @abstractmethod
+    async def delete_meme(self, meme_id: str) -> Meme:
+        ...
+
+    @abstractmethod
+    async def delete_memes(self, meme_ids: list[str]) -> list[Meme]:
+        """ Deletes memes in one transaction, returns the deleted ones """
+        ...
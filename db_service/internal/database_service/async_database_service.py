@@ -0,0 +1,219 @@
+import logging
+from typing import AsyncIterator, Awaitable, Callable, TypeVar
+
+from internal.async_database_service_interface import AsyncDatabaseServiceInterface
+from internal.async_meme_repository_interface import AsyncMemeRepositoryInterface
+from internal.database_service.bulk import (
+    BulkChunks,
+    count_results,
+    created_results,
+    deleted_results,
+    updated_results,
+)
+from internal.errors.errors import DatabaseError, MemeDoesNotExistError
+from models.meme import BulkStatus, Meme, MemeBulkResult, MemeUpdate
+
+logger = logging.getLogger(__name__)
+
+Item = TypeVar("Item")
+Result = TypeVar("Result")
+
+
+class AsyncDatabaseService(AsyncDatabaseServiceInterface):
+    meme_repo: AsyncMemeRepositoryInterface
+    bulk_chunk_size: int
+    stream_batch_size: int
+
+    def __init__(
+        self,
+        meme_repository: AsyncMemeRepositoryInterface,
+        bulk_chunk_size: int = 1000,
+        stream_batch_size: int = 1000,
+    ):
+        self.meme_repo = meme_repository
+        self.bulk_chunk_size = bulk_chunk_size
+        self.stream_batch_size = stream_batch_size
+
+    async def create_meme(self, meme: Meme):
+        logger.info('Creating meme: %s', meme)
+
+        try:
+            await self.meme_repo.create_meme(meme)
+        except MemeDoesNotExistError:
+            logger.error("Meme: %s does not exist", meme)
+            raise
+        except DatabaseError as e:
+            logger.error("Failed to create meme: %s, database error: \n%s", meme, e)
+            raise
+
+        logger.info('Created meme: %s', meme)
+
+    async def create_memes(self, memes: list[Meme]) -> list[MemeBulkResult]:
+        logger.info('Creating %s memes', len(memes))
+
+        results = await self._run_in_chunks(
+            BulkChunks(memes, lambda meme: meme.unique_meme_id, self.bulk_chunk_size),
+            self.meme_repo.create_memes,
+            created_results,
+        )
+
+        logger.info('Created %s of %s memes', count_results(results, BulkStatus.CREATED), len(memes))
+
+        return results
+
+    async def retrieve_meme(self, meme_id: str) -> Meme:
+        logger.info('Retrieving meme: %s', meme_id)
+
+        try:
+            meme = await self.meme_repo.retrieve_meme(meme_id)
+        except MemeDoesNotExistError:
+            logger.error("Meme: %s does not exist", meme_id)
+            raise
+        except DatabaseError as e:
+            logger.error("Failed to retrieve meme: %s, database error: \n%s", meme_id, e)
+            raise
+
+        logger.info('Retrieved meme: %s', meme)
+
+        return meme
+
+    async def retrieve_memes(self, skip: int = 0, limit: int = 10) -> list[Meme]:
+        logger.info('Retrieving memes: skip=%r, limit=%r', skip, limit)
+
+        try:
+            memes = await self.meme_repo.retrieve_memes(skip, limit)
+        except DatabaseError as e:
+            logger.error("Failed to retrieve memes at skip=%r, limit=%r, database error: %s", skip, limit, e)
+            raise
+
+        logger.info('Retrieved %s memes at skip=%r, limit=%r', len(memes), skip, limit)
+
+        return memes
+
+    async def retrieve_memes_after(self, after_id: int | None, limit: int) -> tuple[list[Meme], int | None]:
+        """ Returns up to limit memes ordered by id, starting after after_id,
+        and the id to continue from, or None if this is the last page """
+        logger.info('Retrieving memes: after_id=%r, limit=%r', after_id, limit)
+
+        try:
+            # one extra row tells whether there is a next page
+            memes = await self.meme_repo.retrieve_memes_after(after_id, limit + 1)
+        except DatabaseError as e:
+            logger.error("Failed to retrieve memes at after_id=%r, limit=%r, database error: %s", after_id, limit, e)
+            raise
+
+        next_after_id = None
+        if len(memes) > limit:
+            memes = memes[:limit]
+            next_after_id = memes[-1].id
+
+        logger.info(
+            'Retrieved %s memes at after_id=%r, limit=%r, next_after_id=%r',
+            len(memes),
+            after_id,
+            limit,
+            next_after_id
+        )
+
+        return memes, next_after_id
+
+    async def stream_memes(self) -> AsyncIterator[Meme]:
+        logger.info('Streaming memes')
+
+        try:
+            async for meme in self.meme_repo.stream_memes(self.stream_batch_size):
+                yield meme
+        except DatabaseError as e:
+            logger.error("Failed to stream memes, database error: %s", e)
+            raise
+
+    async def retrieve_memes_by_ids(self, meme_ids: list[str]) -> tuple[list[Meme], list[str]]:
+        logger.info('Retrieving %s memes by id', len(meme_ids))
+
+        meme_ids = list(dict.fromkeys(meme_ids))
+        try:
+            memes = await self.meme_repo.retrieve_memes_by_ids(meme_ids)
+        except DatabaseError as e:
+            logger.error("Failed to retrieve memes by id: %s, database error: %s", meme_ids, e)
+            raise
+
+        memes_by_id = {meme.unique_meme_id: meme for meme in memes}
+        found_memes = [memes_by_id[meme_id] for meme_id in meme_ids if meme_id in memes_by_id]
+        missing_ids = [meme_id for meme_id in meme_ids if meme_id not in memes_by_id]
+
+        logger.info('Retrieved %s memes by id, %s missing', len(found_memes), len(missing_ids))
+
+        return found_memes, missing_ids
+
+    async def update_meme(self, meme_id: str, meme: MemeUpdate) -> Meme:
+        logger.info('Updating meme: %s, update: %s', meme_id, meme)
+
+        try:
+            updated_meme = await self.meme_repo.update_meme(meme_id, meme)
+        except MemeDoesNotExistError:
+            logger.error("Meme: %s does not exist", meme_id)
+            raise
+        except DatabaseError as e:
+            logger.error("Failed to update meme: %s, database error: \n%s", meme_id, e)
+            raise
+
+        logger.info('Updated meme: %s', updated_meme)
+
+        return updated_meme
+
+    async def update_memes(self, memes: list[MemeUpdate]) -> list[MemeBulkResult]:
+        logger.info('Updating %s memes', len(memes))
+
+        results = await self._run_in_chunks(
+            BulkChunks(memes, lambda meme: meme.unique_meme_id, self.bulk_chunk_size),
+            self.meme_repo.update_memes,
+            updated_results,
+        )
+
+        logger.info('Updated %s of %s memes', count_results(results, BulkStatus.UPDATED), len(memes))
+
+        return results
+
+    async def delete_meme(self, meme_id: str) -> Meme:
+        logger.info('Deleting meme: %s', meme_id)
+
+        try:
+            meme = await self.meme_repo.delete_meme(meme_id)
+        except MemeDoesNotExistError:
+            logger.error("Meme: %s does not exist", meme_id)
+            raise
+        except DatabaseError as e:
+            logger.error("Failed to delete meme: %s, database error: \n%s", meme_id, e)
+            raise
+
+        logger.info('Deleted meme: %s', meme_id)
+
+        return meme
+
+    async def delete_memes(self, meme_ids: list[str]) -> list[MemeBulkResult]:
+        logger.info('Deleting %s memes', len(meme_ids))
+
+        results = await self._run_in_chunks(
+            BulkChunks(meme_ids, lambda meme_id: meme_id, self.bulk_chunk_size),
+            self.meme_repo.delete_memes,
+            deleted_results,
+        )
+
+        logger.info('Deleted %s of %s memes', count_results(results, BulkStatus.DELETED), len(meme_ids))
+
+        return results
+
+    async def _run_in_chunks(
+        self,
+        bulk_chunks: BulkChunks[Item],
+        run_chunk: Callable[[list[Item]], Awaitable[list[Result]]],
+        chunk_results: Callable[[list[Item], list[Result]], list[MemeBulkResult]],
+    ) -> list[MemeBulkResult]:
+        """ Runs every chunk with run_chunk, chunk_results turns what the repository returned into per-item results """
+        for chunk_positions, chunk in bulk_chunks.chunks():
+            try:
+                bulk_chunks.add_results(chunk_positions, chunk_results(chunk, await run_chunk(chunk)))
+            except DatabaseError as e:
+                bulk_chunks.fail(chunk_positions, e)
+
+        return bulk_chunks.results()
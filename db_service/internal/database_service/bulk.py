@@ -0,0 +1,106 @@
+import logging
+from typing import Callable, Generic, Iterator, TypeVar
+
+from internal.errors.errors import DatabaseError
+from models.meme import BulkStatus, Meme, MemeBulkResult, MemeUpdate
+
+logger = logging.getLogger(__name__)
+
+Item = TypeVar("Item")
+
+
+class BulkChunks(Generic[Item]):
+    """
+    Splits the items of a bulk request into chunks and collects the per-item results, in the order of items.
+    Every chunk runs in its own transaction, a failed chunk fails only its own items. Repeated ids are reported
+    as conflicts and not run. Shared by the sync and the async database service, which only differ in how they
+    run a chunk
+    """
+    def __init__(self, items: list[Item], item_id: Callable[[Item], str], chunk_size: int):
+        self.items = items
+        self.item_id = item_id
+        self.chunk_size = chunk_size
+        self._results: list[MemeBulkResult | None] = [None] * len(items)
+        self._unique_positions: list[int] = []
+
+        seen_ids: set[str] = set()
+        for position, item in enumerate(items):
+            if item_id(item) in seen_ids:
+                self._results[position] = MemeBulkResult(
+                    meme_id=item_id(item),
+                    status=BulkStatus.CONFLICT,
+                    error="Repeats an earlier item of the request",
+                )
+                continue
+            seen_ids.add(item_id(item))
+            self._unique_positions.append(position)
+
+    def chunks(self) -> Iterator[tuple[list[int], list[Item]]]:
+        """ Yields the positions of every chunk and its items, the positions are handed back with its results """
+        for start in range(0, len(self._unique_positions), self.chunk_size):
+            chunk_positions = self._unique_positions[start:start + self.chunk_size]
+            yield chunk_positions, [self.items[position] for position in chunk_positions]
+
+    def add_results(self, chunk_positions: list[int], chunk_results: list[MemeBulkResult]):
+        for position, result in zip(chunk_positions, chunk_results):
+            self._results[position] = result
+
+    def fail(self, chunk_positions: list[int], error: DatabaseError):
+        logger.error("Failed to run a chunk of %s memes, database error: \n%s", len(chunk_positions), error)
+        self.add_results(
+            chunk_positions,
+            [
+                MemeBulkResult(
+                    meme_id=self.item_id(self.items[position]),
+                    status=BulkStatus.FAILED,
+                    error=str(error),
+                )
+                for position in chunk_positions
+            ],
+        )
+
+    def results(self) -> list[MemeBulkResult]:
+        return self._results
+
+
+def created_results(chunk: list[Meme], created_ids: list[str]) -> list[MemeBulkResult]:
+    created = set(created_ids)
+    return [
+        MemeBulkResult(
+            meme_id=meme.unique_meme_id,
+            status=BulkStatus.CREATED if meme.unique_meme_id in created else BulkStatus.CONFLICT,
+        )
+        for meme in chunk
+    ]
+
+
+def updated_results(chunk: list[MemeUpdate], updated_ids: list[str]) -> list[MemeBulkResult]:
+    updated = set(updated_ids)
+    return [
+        MemeBulkResult(
+            meme_id=meme.unique_meme_id,
+            status=BulkStatus.UPDATED if meme.unique_meme_id in updated else BulkStatus.NOT_FOUND,
+        )
+        for meme in chunk
+    ]
+
+
+def deleted_results(chunk: list[str], deleted_memes: list[Meme]) -> list[MemeBulkResult]:
+    deleted = {meme.unique_meme_id: meme for meme in deleted_memes}
+    return [
+        MemeBulkResult(
+            meme_id=meme_id,
+            status=BulkStatus.DELETED,
+            image_id=deleted[meme_id].unique_image_id,
+        )
+        if meme_id in deleted else
+        MemeBulkResult(
+            meme_id=meme_id,
+            status=BulkStatus.NOT_FOUND,
+        )
+        for meme_id in chunk
+    ]
+
+
+def count_results(results: list[MemeBulkResult], status: BulkStatus) -> int:
+    return sum(1 for result in results if result.status == status)
@@ -0,0 +1,50 @@
+from typing import AsyncIterator
+
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+from internal.async_database_service_interface import AsyncDatabaseServiceInterface
+from internal.database_service_interface import DatabaseServiceInterface
+from models.meme import Meme, MemeBulkResult, MemeUpdate
+
+
+class ThreadedDatabaseService(AsyncDatabaseServiceInterface):
+    """ Serves a blocking DatabaseServiceInterface to async callers, every call runs on the threadpool,
+    so a slow query holds a worker thread instead of the event loop """
+    db_service: DatabaseServiceInterface
+
+    def __init__(self, db_service: DatabaseServiceInterface):
+        self.db_service = db_service
+
+    async def create_meme(self, meme: Meme):
+        await run_in_threadpool(self.db_service.create_meme, meme)
+
+    async def retrieve_meme(self, meme_id: str) -> Meme:
+        return await run_in_threadpool(self.db_service.retrieve_meme, meme_id)
+
+    async def retrieve_memes(self, skip: int, limit: int) -> list[Meme]:
+        return await run_in_threadpool(self.db_service.retrieve_memes, skip, limit)
+
+    async def retrieve_memes_after(self, after_id: int | None, limit: int) -> tuple[list[Meme], int | None]:
+        return await run_in_threadpool(self.db_service.retrieve_memes_after, after_id, limit)
+
+    async def stream_memes(self) -> AsyncIterator[Meme]:
+        async for meme in iterate_in_threadpool(self.db_service.stream_memes()):
+            yield meme
+
+    async def retrieve_memes_by_ids(self, meme_ids: list[str]) -> tuple[list[Meme], list[str]]:
+        return await run_in_threadpool(self.db_service.retrieve_memes_by_ids, meme_ids)
+
+    async def create_memes(self, memes: list[Meme]) -> list[MemeBulkResult]:
+        return await run_in_threadpool(self.db_service.create_memes, memes)
+
+    async def update_meme(self, meme_id: str, meme: MemeUpdate) -> Meme:
+        return await run_in_threadpool(self.db_service.update_meme, meme_id, meme)
+
+    async def update_memes(self, memes: list[MemeUpdate]) -> list[MemeBulkResult]:
+        return await run_in_threadpool(self.db_service.update_memes, memes)
+
+    async def delete_meme(self, meme_id: str) -> Meme:
+        return await run_in_threadpool(self.db_service.delete_meme, meme_id)
+
+    async def delete_memes(self, meme_ids: list[str]) -> list[MemeBulkResult]:
+        return await run_in_threadpool(self.db_service.delete_memes, meme_ids)
@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
-from models.meme import Meme, MemeUpdate
+from typing import Iterator
+
+from models.meme import Meme, MemeBulkResult, MemeUpdate
 
 
 class DatabaseServiceInterface(ABC):
@@ -16,9 +18,33 @@ class DatabaseServiceInterface(ABC):
         ...
 
     @abstractmethod
-    def update_meme(self, meme_id: str, meme: MemeUpdate):
+    def retrieve_memes_after(self, after_id: int | None, limit: int) -> tuple[list[Meme], int | None]:
+        ...
+
+    @abstractmethod
+    def stream_memes(self) -> Iterator[Meme]:
+        ...
+
+    @abstractmethod
+    def retrieve_memes_by_ids(self, meme_ids: list[str]) -> tuple[list[Meme], list[str]]:
+        ...
+
+    @abstractmethod
+    def create_memes(self, memes: list[Meme]) -> list[MemeBulkResult]:
+        ...
+
+    @abstractmethod
+    def update_meme(self, meme_id: str, meme: MemeUpdate) -> Meme:
+        ...
+
+    @abstractmethod
+    def update_memes(self, memes: list[MemeUpdate]) -> list[MemeBulkResult]:
         ...
 
     @abstractmethod
     def delete_meme(self, meme_id: str) -> Meme:
         ...
+
+    @abstractmethod
+    def delete_memes(self, meme_ids: list[str]) -> list[MemeBulkResult]:
+        ...
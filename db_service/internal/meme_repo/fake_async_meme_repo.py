@@ -0,0 +1,46 @@
+from typing import AsyncIterator
+
+from internal.async_meme_repository_interface import AsyncMemeRepositoryInterface
+from internal.meme_repo.fake_meme_repo import FakeMemeRepository
+from models.meme import Meme, MemeUpdate
+
+
+class FakeAsyncMemeRepository(AsyncMemeRepositoryInterface):
+    meme_repo: FakeMemeRepository
+
+    def __init__(self):
+        self.meme_repo = FakeMemeRepository()
+
+    async def create_meme(self, meme: Meme):
+        self.meme_repo.create_meme(meme)
+
+    async def create_memes(self, memes: list[Meme]) -> list[str]:
+        return self.meme_repo.create_memes(memes)
+
+    async def retrieve_meme(self, meme_id: str) -> Meme:
+        return self.meme_repo.retrieve_meme(meme_id)
+
+    async def retrieve_memes(self, skip: int, limit: int) -> list[Meme]:
+        return self.meme_repo.retrieve_memes(skip, limit)
+
+    async def retrieve_memes_after(self, after_id: int | None, limit: int) -> list[Meme]:
+        return self.meme_repo.retrieve_memes_after(after_id, limit)
+
+    async def stream_memes(self, batch_size: int) -> AsyncIterator[Meme]:
+        for meme in self.meme_repo.stream_memes(batch_size):
+            yield meme
+
+    async def retrieve_memes_by_ids(self, meme_ids: list[str]) -> list[Meme]:
+        return self.meme_repo.retrieve_memes_by_ids(meme_ids)
+
+    async def update_meme(self, meme_id: str, new_meme: MemeUpdate) -> Meme:
+        return self.meme_repo.update_meme(meme_id, new_meme)
+
+    async def update_memes(self, memes: list[MemeUpdate]) -> list[str]:
+        return self.meme_repo.update_memes(memes)
+
+    async def delete_meme(self, meme_id: str) -> Meme:
+        return self.meme_repo.delete_meme(meme_id)
+
+    async def delete_memes(self, meme_ids: list[str]) -> list[Meme]:
+        return self.meme_repo.delete_memes(meme_ids)
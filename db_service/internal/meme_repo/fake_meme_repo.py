@@ -1,3 +1,5 @@
+from typing import Iterator
+
 from internal.meme_repository_interface import MemeRepositoryInterface
 from internal.errors.errors import MemeDoesNotExistError
 from models.meme import Meme, MemeUpdate
@@ -5,13 +7,32 @@ from models.meme import Meme, MemeUpdate
 
 class FakeMemeRepository(MemeRepositoryInterface):
     fake_db: list[Meme]
+    next_id: int
 
     def __init__(self):
         self.fake_db = []
+        self.next_id = 1
 
     def create_meme(self, meme: Meme):
+        meme.id = self.next_id
+        self.next_id += 1
         self.fake_db.append(meme)
 
+    def create_memes(self, memes: list[Meme]) -> list[str]:
+        taken_meme_ids = {meme.unique_meme_id for meme in self.fake_db}
+        taken_image_ids = {meme.unique_image_id for meme in self.fake_db}
+
+        created_ids = []
+        for meme in memes:
+            if meme.unique_meme_id in taken_meme_ids or meme.unique_image_id in taken_image_ids:
+                continue
+            self.create_meme(meme)
+            taken_meme_ids.add(meme.unique_meme_id)
+            taken_image_ids.add(meme.unique_image_id)
+            created_ids.append(meme.unique_meme_id)
+
+        return created_ids
+
     def retrieve_meme(self, meme_id: str) -> Meme:
         for meme in self.fake_db:
             if meme.unique_meme_id == meme_id:
@@ -33,20 +54,50 @@ class FakeMemeRepository(MemeRepositoryInterface):
 
         return memes
 
-    def update_meme(self, meme_id: str, new_meme: MemeUpdate):
+    def retrieve_memes_after(self, after_id: int | None, limit: int) -> list[Meme]:
+        memes = sorted(self.fake_db, key=lambda meme: meme.id)
+        if after_id is not None:
+            memes = [meme for meme in memes if meme.id > after_id]
+
+        return memes[:limit]
+
+    def stream_memes(self, batch_size: int) -> Iterator[Meme]:
+        yield from sorted(self.fake_db, key=lambda meme: meme.id)
+
+    def retrieve_memes_by_ids(self, meme_ids: list[str]) -> list[Meme]:
+        return [meme for meme in self.fake_db if meme.unique_meme_id in meme_ids]
+
+    def update_meme(self, meme_id: str, new_meme: MemeUpdate) -> Meme:
         for i, meme in enumerate(self.fake_db):
             if meme.unique_meme_id == meme_id:
                 if new_meme.unique_image_id:
                     self.fake_db[i].unique_image_id = new_meme.unique_image_id
                 if new_meme.caption:
                     self.fake_db[i].caption = new_meme.caption
-                return
+                return self.fake_db[i]
         else:
             raise MemeDoesNotExistError(f"Meme does not exist: {meme_id}")
 
+    def update_memes(self, memes: list[MemeUpdate]) -> list[str]:
+        updated_ids = []
+        for meme in memes:
+            try:
+                self.update_meme(meme.unique_meme_id, meme)
+            except MemeDoesNotExistError:
+                continue
+            updated_ids.append(meme.unique_meme_id)
+
+        return updated_ids
+
     def delete_meme(self, meme_id: str) -> Meme:
         for i, meme in enumerate(self.fake_db):
             if meme.unique_meme_id == meme_id:
                 return self.fake_db.pop(i)
         else:
             raise MemeDoesNotExistError(f"Meme does not exist: {meme_id}")
+
+    def delete_memes(self, meme_ids: list[str]) -> list[Meme]:
+        deleted_memes = [meme for meme in self.fake_db if meme.unique_meme_id in meme_ids]
+        self.fake_db = [meme for meme in self.fake_db if meme.unique_meme_id not in meme_ids]
+
+        return deleted_memes
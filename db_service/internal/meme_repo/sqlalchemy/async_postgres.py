@@ -0,0 +1,288 @@
+import logging
+from typing import AsyncIterator
+
+from sqlalchemy import String, any_, bindparam, column, delete, func, select, update, values
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from internal.async_meme_repository_interface import AsyncMemeRepositoryInterface
+from internal.errors.errors import MemeDoesNotExistError, DatabaseError
+from internal.postgres.connection import AsyncPostgresConnection
+from models.meme import Meme, MemeUpdate
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncMemeRepository(AsyncMemeRepositoryInterface):
+    db_connection: AsyncPostgresConnection
+    session_maker: async_sessionmaker
+
+    def __init__(self, db_connection: AsyncPostgresConnection):
+        self.db_connection = db_connection
+        self.session_maker = async_sessionmaker(
+            bind=self.db_connection.engine,
+            autoflush=False,
+            # an expired attribute would be reloaded lazily, which an async session can't do
+            expire_on_commit=False,
+        )
+
+    async def create_meme(self, meme: Meme):
+        logger.info("Creating meme: %s", meme)
+
+        async with self.session_maker() as session:
+            session.add(meme)
+            try:
+                await session.commit()
+            except SQLAlchemyError as e:
+                logger.error("Failed to create meme: %s, database error: %s", meme, e)
+                raise DatabaseError(
+                    f'Failed to create meme: {meme.unique_meme_id}, database error: {e}'
+                )
+
+        logger.info("Successfully created meme: %s", meme)
+
+    async def create_memes(self, memes: list[Meme]) -> list[str]:
+        logger.info("Creating %s memes", len(memes))
+
+        statement = (
+            insert(Meme)
+            .values([
+                {
+                    "unique_meme_id": meme.unique_meme_id,
+                    "unique_image_id": meme.unique_image_id,
+                    "caption": meme.caption,
+                }
+                for meme in memes
+            ])
+            .on_conflict_do_nothing()
+            .returning(Meme.unique_meme_id)
+        )
+        async with self.session_maker() as session:
+            try:
+                created_ids = list(await session.scalars(statement))
+                await session.commit()
+            except SQLAlchemyError as e:
+                logger.error("Failed to create %s memes, database error: %s", len(memes), e)
+                raise DatabaseError(
+                    f'Failed to create {len(memes)} memes, database error: {e}'
+                )
+
+        logger.info("Created %s of %s memes", len(created_ids), len(memes))
+
+        return created_ids
+
+    async def retrieve_meme(self, meme_id: str) -> Meme:
+        logger.info("Retrieving meme: %s", meme_id)
+
+        async with self.session_maker() as session:
+            try:
+                meme = await session.scalar(select(Meme).filter_by(unique_meme_id=meme_id).limit(1))
+            except SQLAlchemyError as e:
+                logger.error("Failed to retrieve meme: %s, database error: %s", meme_id, e)
+                raise DatabaseError(
+                    f'Failed to retrieve meme: {meme_id}, database error: {e}'
+                )
+            if meme is None:
+                logger.error("Meme: %s does not exist in database", meme_id)
+                raise MemeDoesNotExistError(f"Meme does not exist: {meme_id}")
+
+            logger.info("Retrieved meme: %s", meme)
+
+            return meme
+
+    async def retrieve_memes(self, skip: int, limit: int) -> list[Meme]:
+        logger.info("Retrieving memes: skip=%r, limit=%r", skip, limit)
+
+        async with self.session_maker() as session:
+            try:
+                memes = list(await session.scalars(select(Meme).order_by(Meme.id).offset(skip).limit(limit)))
+            except SQLAlchemyError as e:
+                logger.error("Failed to retrieve memes: skip=%r, limit=%r, database error: %s", skip, limit, e)
+                raise DatabaseError(
+                    f'Failed to retrieve memes: {skip=}, {limit=}, database error: {e}'
+                )
+            if len(memes) == 0:
+                logger.warning("No memes found with skip=%r and limit=%r", skip, limit)
+                return []
+
+            logger.info("Retrieved %s memes with skip=%r, limit=%r", len(memes), skip, limit)
+
+            return memes
+
+    async def retrieve_memes_after(self, after_id: int | None, limit: int) -> list[Meme]:
+        logger.info("Retrieving memes: after_id=%r, limit=%r", after_id, limit)
+
+        statement = select(Meme)
+        if after_id is not None:
+            statement = statement.filter(Meme.id > after_id)
+        async with self.session_maker() as session:
+            try:
+                memes = list(await session.scalars(statement.order_by(Meme.id).limit(limit)))
+            except SQLAlchemyError as e:
+                logger.error("Failed to retrieve memes: after_id=%r, limit=%r, database error: %s", after_id, limit, e)
+                raise DatabaseError(
+                    f'Failed to retrieve memes: {after_id=}, {limit=}, database error: {e}'
+                )
+
+            logger.info("Retrieved %s memes with after_id=%r, limit=%r", len(memes), after_id, limit)
+
+            return memes
+
+    async def stream_memes(self, batch_size: int) -> AsyncIterator[Meme]:
+        logger.info("Streaming memes: batch_size=%r", batch_size)
+
+        # stream_scalars reads from a server-side cursor batch_size rows at a time,
+        # the session stays open until the caller stops iterating
+        statement = select(Meme).order_by(Meme.id).execution_options(yield_per=batch_size)
+        async with self.session_maker() as session:
+            streamed = 0
+            try:
+                async for meme in await session.stream_scalars(statement):
+                    yield meme
+                    streamed += 1
+            except SQLAlchemyError as e:
+                logger.error("Failed to stream memes after %s memes, database error: %s", streamed, e)
+                raise DatabaseError(
+                    f'Failed to stream memes after {streamed} memes, database error: {e}'
+                )
+
+        logger.info("Streamed %s memes", streamed)
+
+    async def retrieve_memes_by_ids(self, meme_ids: list[str]) -> list[Meme]:
+        logger.info("Retrieving %s memes by id", len(meme_ids))
+
+        meme_ids_param = bindparam("meme_ids", meme_ids, type_=ARRAY(String))
+        statement = select(Meme).filter(Meme.unique_meme_id == any_(meme_ids_param))
+        async with self.session_maker() as session:
+            try:
+                memes = list(await session.scalars(statement))
+            except SQLAlchemyError as e:
+                logger.error("Failed to retrieve memes by id: %s, database error: %s", meme_ids, e)
+                raise DatabaseError(
+                    f'Failed to retrieve memes by id, database error: {e}'
+                )
+
+            logger.info("Retrieved %s of %s memes by id", len(memes), len(meme_ids))
+
+            return memes
+
+    async def update_meme(self, meme_id: str, meme: MemeUpdate) -> Meme:
+        logger.info("Updating meme: %s, update: %s", meme_id, meme)
+
+        values = {}
+        if meme.unique_meme_id is not None:
+            values["unique_meme_id"] = meme.unique_meme_id
+        if meme.unique_image_id is not None:
+            values["unique_image_id"] = meme.unique_image_id
+        if meme.caption is not None:
+            values["caption"] = meme.caption
+        if len(values) == 0:
+            return await self.retrieve_meme(meme_id)
+
+        statement = (
+            update(Meme)
+            .where(Meme.unique_meme_id == meme_id)
+            .values(**values)
+            .returning(Meme)
+            .execution_options(synchronize_session=False)
+        )
+        async with self.session_maker() as session:
+            try:
+                updated_meme = (await session.scalars(statement)).one_or_none()
+                await session.commit()
+            except SQLAlchemyError as e:
+                logger.error("Failed to update meme: %s, database error: %s", meme_id, e)
+                raise DatabaseError(
+                    f'Failed to update meme: {meme_id}, database error: {e}'
+                )
+            if updated_meme is None:
+                logger.error("Meme: %s does not exist in database", meme_id)
+                raise MemeDoesNotExistError(f"Meme does not exist: {meme_id}")
+
+            logger.info("Updated meme: %s", meme_id)
+
+            return updated_meme
+
+    async def update_memes(self, memes: list[MemeUpdate]) -> list[str]:
+        logger.info("Updating %s memes", len(memes))
+
+        updates = values(
+            column("meme_id", String),
+            column("image_id", String),
+            column("caption", String),
+            name="updates",
+        ).data([(meme.unique_meme_id, meme.unique_image_id, meme.caption) for meme in memes])
+        statement = (
+            update(Meme)
+            .where(Meme.unique_meme_id == updates.c.meme_id)
+            .values(
+                unique_image_id=func.coalesce(updates.c.image_id, Meme.unique_image_id),
+                caption=func.coalesce(updates.c.caption, Meme.caption),
+            )
+            .returning(Meme.unique_meme_id)
+            .execution_options(synchronize_session=False)
+        )
+        async with self.session_maker() as session:
+            try:
+                updated_ids = list(await session.scalars(statement))
+                await session.commit()
+            except SQLAlchemyError as e:
+                logger.error("Failed to update %s memes, database error: %s", len(memes), e)
+                raise DatabaseError(
+                    f'Failed to update {len(memes)} memes, database error: {e}'
+                )
+
+        logger.info("Updated %s of %s memes", len(updated_ids), len(memes))
+
+        return updated_ids
+
+    async def delete_meme(self, meme_id: str) -> Meme:
+        logger.info("Deleting meme: %s", meme_id)
+
+        statement = (
+            delete(Meme)
+            .where(Meme.unique_meme_id == meme_id)
+            .returning(Meme)
+            .execution_options(synchronize_session=False)
+        )
+        async with self.session_maker() as session:
+            try:
+                meme = (await session.scalars(statement)).one_or_none()
+                await session.commit()
+            except SQLAlchemyError as e:
+                logger.error("Failed to delete meme: %s, database error: %s", meme_id, e)
+                raise DatabaseError(
+                    f'Failed to delete meme: {meme_id}, database error: {e}'
+                )
+            if meme is None:
+                logger.error("Meme: %s does not exist in database", meme_id)
+                raise MemeDoesNotExistError(f"Meme does not exist: {meme_id}")
+
+            logger.info("Deleted meme: %s", meme_id)
+
+            return meme
+
+    async def delete_memes(self, meme_ids: list[str]) -> list[Meme]:
+        logger.info("Deleting %s memes", len(meme_ids))
+
+        meme_ids_param = bindparam("meme_ids", meme_ids, type_=ARRAY(String))
+        statement = (
+            delete(Meme)
+            .where(Meme.unique_meme_id == any_(meme_ids_param))
+            .returning(Meme)
+            .execution_options(synchronize_session=False)
+        )
+        async with self.session_maker() as session:
+            try:
+                memes = list(await session.scalars(statement))
+                await session.commit()
+            except SQLAlchemyError as e:
+                logger.error("Failed to delete %s memes, database error: %s", len(meme_ids), e)
+                raise DatabaseError(
+                    f'Failed to delete {len(meme_ids)} memes, database error: {e}'
+                )
+
+        logger.info("Deleted %s of %s memes", len(memes), len(meme_ids))
+
+        return memes
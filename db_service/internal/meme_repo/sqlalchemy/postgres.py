@@ -1,12 +1,15 @@
 import logging
+from typing import Iterator
 
+from sqlalchemy import String, any_, bindparam, column, delete, func, update, values
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.orm import sessionmaker
 
 from internal.errors.errors import MemeDoesNotExistError, DatabaseError
 from internal.meme_repository_interface import MemeRepositoryInterface
 from internal.postgres.connection import PostgresConnection
-from models.meme import Meme
+from models.meme import Meme, MemeUpdate
 
 logger = logging.getLogger(__name__)
 
@@ -25,110 +28,280 @@ class MemeRepository(MemeRepositoryInterface):
         )
 
     def create_meme(self, meme: Meme):
-        logger.info(f"Creating meme: {meme}")
+        logger.info("Creating meme: %s", meme)
 
         with self.session_maker() as session:
             try:
                 session.add(meme)
             except IntegrityError as e:
-                logger.error(f"Failed to create meme: {meme}, database Integrity Error: {e}")
+                logger.error("Failed to create meme: %s, database Integrity Error: %s", meme, e)
                 raise DatabaseError(
                     f'Failed to create meme: {meme.id}, integrity error: {e}'
                 )
             except SQLAlchemyError as e:
-                logger.error(f"Failed to create meme: {meme}, database error: {e}")
+                logger.error("Failed to create meme: %s, database error: %s", meme, e)
                 raise DatabaseError(
                     f'Failed to create meme: {meme.id}, database error: {e}'
                 )
             else:
-                logger.info(f"Successfully created meme: {meme}")
+                logger.info("Successfully created meme: %s", meme)
                 session.commit()
 
+    def create_memes(self, memes: list[Meme]) -> list[str]:
+        logger.info("Creating %s memes", len(memes))
+
+        # one multi-row INSERT, rows that hit a unique id are skipped instead of failing the whole statement
+        statement = (
+            insert(Meme)
+            .values([
+                {
+                    "unique_meme_id": meme.unique_meme_id,
+                    "unique_image_id": meme.unique_image_id,
+                    "caption": meme.caption,
+                }
+                for meme in memes
+            ])
+            .on_conflict_do_nothing()
+            .returning(Meme.unique_meme_id)
+        )
+        with self.session_maker() as session:
+            try:
+                created_ids = list(session.scalars(statement))
+                session.commit()
+            except SQLAlchemyError as e:
+                logger.error("Failed to create %s memes, database error: %s", len(memes), e)
+                raise DatabaseError(
+                    f'Failed to create {len(memes)} memes, database error: {e}'
+                )
+
+        logger.info("Created %s of %s memes", len(created_ids), len(memes))
+
+        return created_ids
+
     def retrieve_meme(self, meme_id: str) -> Meme:
-        logger.info(f"Retrieving meme: {meme_id}")
+        logger.info("Retrieving meme: %s", meme_id)
 
         with self.session_maker() as session:
             try:
                 meme = session.query(Meme).filter_by(unique_meme_id=meme_id).first()
             except SQLAlchemyError as e:
-                logger.error(f"Failed to retrieve meme: {meme_id}, database error: {e}")
+                logger.error("Failed to retrieve meme: %s, database error: %s", meme_id, e)
                 raise DatabaseError(
                     f'Failed to retrieve meme: {meme_id}, database error: {e}'
                 )
             if meme is None:
-                logger.error(f"Meme: {meme_id} does not exist in database")
+                logger.error("Meme: %s does not exist in database", meme_id)
                 raise MemeDoesNotExistError(f"Meme does not exist: {meme_id}")
 
-            logger.info(f"Retrieved meme: {meme}")
+            logger.info("Retrieved meme: %s", meme)
 
             return meme
 
     def retrieve_memes(self, skip: int, limit: int) -> list[Meme]:
-        logger.info(f"Retrieving memes: {skip=}, {limit=}")
+        logger.info("Retrieving memes: skip=%r, limit=%r", skip, limit)
 
         with self.session_maker() as session:
             try:
-                memes = session.query(Meme).offset(skip).limit(limit).all()
+                memes = session.query(Meme).order_by(Meme.id).offset(skip).limit(limit).all()
             except SQLAlchemyError as e:
-                logger.error(f"Failed to retrieve memes: {skip=}, {limit=}, database error: {e}")
+                logger.error("Failed to retrieve memes: skip=%r, limit=%r, database error: %s", skip, limit, e)
                 raise DatabaseError(
                     f'Failed to retrieve memes: {skip=}, {limit=}, database error: {e}'
                 )
             if len(memes) == 0:
-                logger.warning(f"No memes found with {skip=} and {limit=}")
+                logger.warning("No memes found with skip=%r and limit=%r", skip, limit)
                 return []
 
-            logger.info(f"Retrieved {len(memes)} memes with {skip=}, {limit=}: {memes}")
+            logger.info("Retrieved %s memes with skip=%r, limit=%r", len(memes), skip, limit)
+
+            return memes
+
+    def retrieve_memes_after(self, after_id: int | None, limit: int) -> list[Meme]:
+        logger.info("Retrieving memes: after_id=%r, limit=%r", after_id, limit)
+
+        # a range scan over the primary key index, so every page costs the same
+        with self.session_maker() as session:
+            query = session.query(Meme)
+            if after_id is not None:
+                query = query.filter(Meme.id > after_id)
+            try:
+                memes = query.order_by(Meme.id).limit(limit).all()
+            except SQLAlchemyError as e:
+                logger.error("Failed to retrieve memes: after_id=%r, limit=%r, database error: %s", after_id, limit, e)
+                raise DatabaseError(
+                    f'Failed to retrieve memes: {after_id=}, {limit=}, database error: {e}'
+                )
+
+            logger.info("Retrieved %s memes with after_id=%r, limit=%r", len(memes), after_id, limit)
+
+            return memes
+
+    def stream_memes(self, batch_size: int) -> Iterator[Meme]:
+        logger.info("Streaming memes: batch_size=%r", batch_size)
+
+        # yield_per runs the query on a server-side cursor and fetches batch_size rows at a time,
+        # the session stays open until the caller stops iterating
+        with self.session_maker() as session:
+            query = session.query(Meme).order_by(Meme.id).yield_per(batch_size)
+            streamed = 0
+            try:
+                for meme in query:
+                    yield meme
+                    streamed += 1
+            except SQLAlchemyError as e:
+                logger.error("Failed to stream memes after %s memes, database error: %s", streamed, e)
+                raise DatabaseError(
+                    f'Failed to stream memes after {streamed} memes, database error: {e}'
+                )
+
+        logger.info("Streamed %s memes", streamed)
+
+    def retrieve_memes_by_ids(self, meme_ids: list[str]) -> list[Meme]:
+        logger.info("Retrieving %s memes by id", len(meme_ids))
+
+        # a single array parameter keeps the statement the same for any number of ids
+        meme_ids_param = bindparam("meme_ids", meme_ids, type_=ARRAY(String))
+        with self.session_maker() as session:
+            try:
+                memes = session.query(Meme).filter(Meme.unique_meme_id == any_(meme_ids_param)).all()
+            except SQLAlchemyError as e:
+                logger.error("Failed to retrieve memes by id: %s, database error: %s", meme_ids, e)
+                raise DatabaseError(
+                    f'Failed to retrieve memes by id, database error: {e}'
+                )
+
+            logger.info("Retrieved %s of %s memes by id", len(memes), len(meme_ids))
 
             return memes
 
-    def update_meme(self, meme_id: str, meme: Meme):
-        logger.info(f"Updating meme: {meme_id}, update: {meme}")
+    def update_meme(self, meme_id: str, meme: MemeUpdate) -> Meme:
+        logger.info("Updating meme: %s, update: %s", meme_id, meme)
 
+        values = {}
+        if meme.unique_meme_id is not None:
+            logger.info("Updating meme: %s, new id: %s", meme_id, meme.unique_meme_id)
+            values["unique_meme_id"] = meme.unique_meme_id
+        if meme.unique_image_id is not None:
+            logger.info("Updating meme: %s, new image id: %s", meme_id, meme.unique_image_id)
+            values["unique_image_id"] = meme.unique_image_id
+        if meme.caption is not None:
+            logger.info("Updating meme: %s, new caption: %s", meme_id, meme.caption)
+            values["caption"] = meme.caption
+        if len(values) == 0:
+            return self.retrieve_meme(meme_id)
+
+        # a single statement both finds and updates the row, no rows back means there was nothing to update
+        statement = (
+            update(Meme)
+            .where(Meme.unique_meme_id == meme_id)
+            .values(**values)
+            .returning(Meme)
+            .execution_options(synchronize_session=False)
+        )
         with self.session_maker() as session:
             try:
-                meme_to_update = session.query(Meme).filter_by(unique_meme_id=meme_id).first()
+                updated_meme = session.scalars(statement).one_or_none()
             except SQLAlchemyError as e:
-                logger.error(f"Failed to update meme: {meme_id}, database error: {e}")
+                logger.error("Failed to update meme: %s, database error: %s", meme_id, e)
                 raise DatabaseError(
                     f'Failed to update meme: {meme_id}, database error: {e}'
                 )
-            if meme_to_update is None:
-                logger.error(f"Meme: {meme_id} does not exist in database")
+            if updated_meme is None:
+                logger.error("Meme: %s does not exist in database", meme_id)
                 raise MemeDoesNotExistError(f"Meme does not exist: {meme_id}")
 
-            if meme.unique_meme_id is not None:
-                logger.info(f"Updating meme: {meme_id}, new id: {meme.unique_meme_id}")
-                meme_to_update.unique_meme_id = meme.unique_meme_id
-            if meme.unique_image_id is not None:
-                logger.info(f"Updating meme: {meme_id}, new image id: {meme.unique_image_id}")
-                meme_to_update.unique_image_id = meme.unique_image_id
-            if meme.caption is not None:
-                logger.info(f"Updating meme: {meme_id}, new caption: {meme.caption}")
-                meme_to_update.caption = meme.caption
-
+            # keeps the returned row readable after commit expires the session's objects
+            session.expunge(updated_meme)
             session.commit()
 
-            logger.info(f"Updated meme: {meme_id}")
+            logger.info("Updated meme: %s", meme_id)
+
+            return updated_meme
+
+    def update_memes(self, memes: list[MemeUpdate]) -> list[str]:
+        logger.info("Updating %s memes", len(memes))
+
+        # the new values are joined in as a VALUES list, so every row is updated by the same statement
+        updates = values(
+            column("meme_id", String),
+            column("image_id", String),
+            column("caption", String),
+            name="updates",
+        ).data([(meme.unique_meme_id, meme.unique_image_id, meme.caption) for meme in memes])
+        statement = (
+            update(Meme)
+            .where(Meme.unique_meme_id == updates.c.meme_id)
+            .values(
+                unique_image_id=func.coalesce(updates.c.image_id, Meme.unique_image_id),
+                caption=func.coalesce(updates.c.caption, Meme.caption),
+            )
+            .returning(Meme.unique_meme_id)
+            .execution_options(synchronize_session=False)
+        )
+        with self.session_maker() as session:
+            try:
+                updated_ids = list(session.scalars(statement))
+                session.commit()
+            except SQLAlchemyError as e:
+                logger.error("Failed to update %s memes, database error: %s", len(memes), e)
+                raise DatabaseError(
+                    f'Failed to update {len(memes)} memes, database error: {e}'
+                )
+
+        logger.info("Updated %s of %s memes", len(updated_ids), len(memes))
+
+        return updated_ids
 
     def delete_meme(self, meme_id: str) -> Meme:
-        logger.info(f"Deleting meme: {meme_id}")
+        logger.info("Deleting meme: %s", meme_id)
 
+        statement = (
+            delete(Meme)
+            .where(Meme.unique_meme_id == meme_id)
+            .returning(Meme)
+            .execution_options(synchronize_session=False)
+        )
         with self.session_maker() as session:
             try:
-                meme = session.query(Meme).filter_by(unique_meme_id=meme_id).first()
+                meme = session.scalars(statement).one_or_none()
             except SQLAlchemyError as e:
-                logger.error(f"Failed to delete meme: {meme_id}, database error: {e}")
+                logger.error("Failed to delete meme: %s, database error: %s", meme_id, e)
                 raise DatabaseError(
                     f'Failed to delete meme: {meme_id}, database error: {e}'
                 )
             if meme is None:
-                logger.error(f"Meme: {meme_id} does not exist in database")
+                logger.error("Meme: %s does not exist in database", meme_id)
                 raise MemeDoesNotExistError(f"Meme does not exist: {meme_id}")
 
-            session.delete(meme)
+            session.expunge(meme)
             session.commit()
 
-            logger.info(f"Deleted meme: {meme_id}")
+            logger.info("Deleted meme: %s", meme_id)
 
             return meme
+
+    def delete_memes(self, meme_ids: list[str]) -> list[Meme]:
+        logger.info("Deleting %s memes", len(meme_ids))
+
+        meme_ids_param = bindparam("meme_ids", meme_ids, type_=ARRAY(String))
+        statement = (
+            delete(Meme)
+            .where(Meme.unique_meme_id == any_(meme_ids_param))
+            .returning(Meme)
+            .execution_options(synchronize_session=False)
+        )
+        with self.session_maker() as session:
+            try:
+                memes = list(session.scalars(statement))
+            except SQLAlchemyError as e:
+                logger.error("Failed to delete %s memes, database error: %s", len(meme_ids), e)
+                raise DatabaseError(
+                    f'Failed to delete {len(meme_ids)} memes, database error: {e}'
+                )
+
+            session.expunge_all()
+            session.commit()
+
+        logger.info("Deleted %s of %s memes", len(memes), len(meme_ids))
+
+        return memes
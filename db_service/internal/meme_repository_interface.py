@@ -1,4 +1,6 @@
 from abc import ABC, abstractmethod
+from typing import Iterator
+
 from models.meme import Meme, MemeUpdate
 
 
@@ -16,9 +18,39 @@ class MemeRepositoryInterface(ABC):
         ...
 
     @abstractmethod
-    def update_meme(self, meme_id: str, meme: MemeUpdate):
+    def retrieve_memes_after(self, after_id: int | None, limit: int) -> list[Meme]:
+        ...
+
+    @abstractmethod
+    def stream_memes(self, batch_size: int) -> Iterator[Meme]:
+        """ Yields every meme ordered by id, holding at most batch_size of them at a time """
+        ...
+
+    @abstractmethod
+    def retrieve_memes_by_ids(self, meme_ids: list[str]) -> list[Meme]:
+        ...
+
+    @abstractmethod
+    def create_memes(self, memes: list[Meme]) -> list[str]:
+        """ Inserts all memes in one transaction, skipping the ones whose meme or image id is taken,
+        returns ids of the created memes """
+        ...
+
+    @abstractmethod
+    def update_meme(self, meme_id: str, meme: MemeUpdate) -> Meme:
+        ...
+
+    @abstractmethod
+    def update_memes(self, memes: list[MemeUpdate]) -> list[str]:
+        """ Updates memes by unique_meme_id in one transaction, None fields are left as they are,
+        returns ids of the updated memes """
         ...
 
     @abstractmethod
     def delete_meme(self, meme_id: str) -> Meme:
         ...
+
+    @abstractmethod
+    def delete_memes(self, meme_ids: list[str]) -> list[Meme]:
+        """ Deletes memes in one transaction, returns the deleted ones """
+        ...
@@ -0,0 +1,138 @@
+import time
+from typing import Callable
+
+from prometheus_client import Gauge, Histogram
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+from pydantic import BaseModel
+from sqlalchemy import Engine, event
+
+# 256B to 64MB, payloads range from captions to whole images
+SIZE_BUCKETS = [2 ** power for power in range(8, 27, 2)]
+
+REQUEST_DURATION = Histogram(
+    "http_server_request_duration_seconds",
+    "Time to handle a request, including sending the response body",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_server_requests_in_flight",
+    "Requests being handled",
+    ["method"],
+)
+REQUEST_SIZE = Histogram(
+    "http_server_request_size_bytes",
+    "Size of request bodies",
+    ["method", "route"],
+    buckets=SIZE_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    "http_server_response_size_bytes",
+    "Size of response bodies",
+    ["method", "route", "status"],
+    buckets=SIZE_BUCKETS,
+)
+
+
+class MetricsMiddleware:
+    """ Records latency, in-flight count and body sizes of every request, labelled by route template,
+    so a path with ids in it doesn't make a time series per id """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        request_size = 0
+        response_size = 0
+        status = 500
+
+        async def counting_receive():
+            nonlocal request_size
+            message = await receive()
+            if message["type"] == "http.request":
+                request_size += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            nonlocal status, response_size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
+
+        in_flight = REQUESTS_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            duration = time.perf_counter() - start
+            in_flight.dec()
+            # the router puts the matched route in the scope, requests that matched none share one label
+            route = scope.get("route")
+            route_path = route.path if route is not None else "unmatched"
+            REQUEST_DURATION.labels(method, route_path, str(status)).observe(duration)
+            REQUEST_SIZE.labels(method, route_path).observe(request_size)
+            RESPONSE_SIZE.labels(method, route_path, str(status)).observe(response_size)
+
+
+class StatsCollector(Collector):
+    """ Exposes the numeric fields of stats() models as gauges, read at scrape time.
+    Every source is one value of the label, e.g. a cache name """
+    def __init__(self, prefix: str, label: str, sources: dict[str, Callable[[], BaseModel]]):
+        self.prefix = prefix
+        self.label = label
+        self.sources = sources
+
+    def collect(self):
+        families: dict[str, GaugeMetricFamily] = {}
+        for source, stats in self.sources.items():
+            for field, value in stats().model_dump().items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                if field not in families:
+                    families[field] = GaugeMetricFamily(
+                        f"{self.prefix}_{field}",
+                        f"{field} of the {self.prefix} stats",
+                        labels=[self.label],
+                    )
+                families[field].add_metric([source], value)
+
+        yield from families.values()
+
+
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Time to execute a statement, for server-side cursors until the first rows arrive",
+    ["statement", "outcome"],
+)
+
+
+def instrument_engine(engine: Engine):
+    """ Times every statement the engine runs, labelled by its verb, e.g. SELECT """
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        _observe_query(conn, statement, "ok")
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        if context.connection is not None and context.statement is not None:
+            _observe_query(context.connection, context.statement, "error")
+
+
+def _observe_query(conn, statement: str, outcome: str):
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    verb = statement.lstrip().split(maxsplit=1)[0].upper() if statement.strip() else "UNKNOWN"
+    DB_QUERY_DURATION.labels(verb, outcome).observe(duration)
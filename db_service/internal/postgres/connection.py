@@ -1,11 +1,176 @@
-from sqlalchemy import create_engine, Engine
+import os
+import threading
+import time
+
+from pydantic import BaseModel
+from sqlalchemy import create_engine, event, make_url, Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
+from sqlalchemy.pool import Pool
+
+
+class PostgresSettings(BaseModel):
+    pool_size: int = 10
+    max_overflow: int = 5
+    # seconds, connections older than this are replaced on checkout, -1 keeps them forever
+    pool_recycle: int = 1800
+    # checks a connection with a round trip on checkout, so connections dropped by a failover aren't handed out
+    pool_pre_ping: bool = True
+    # seconds to wait for a free connection before failing the request
+    pool_timeout: float = 10.0
+    # milliseconds, 0 disables the limit
+    statement_timeout: int = 30000
+    lock_timeout: int = 5000
+
+    @classmethod
+    def from_env(cls, prefix: str) -> "PostgresSettings":
+        """ Reads settings from <PREFIX>_POOL_SIZE, <PREFIX>_STATEMENT_TIMEOUT, etc., falling back to defaults """
+        values = {}
+        for field in cls.model_fields:
+            value = os.getenv(f"{prefix}_{field.upper()}")
+            if value is not None:
+                values[field] = value
+        return cls(**values)
+
+
+class PoolStats(BaseModel):
+    pool_size: int
+    max_overflow: int
+    checked_out: int
+    idle: int
+    overflow: int
+    checkouts: int
+    checkout_timeouts: int
+    checkout_wait_seconds: float
+    max_checkout_wait_seconds: float
+
+
+class _CheckoutTimer:
+    """
+    Measures how long checkouts wait for a connection, including opening a new one. The wait is timed around the
+    engine's connect(), which sessions call for every transaction, and checkouts are counted by the pool's
+    checkout event, so no pool internals are overridden
+    """
+    def __init__(self, engine: Engine):
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.checkout_wait_seconds = 0.0
+        self.max_checkout_wait_seconds = 0.0
+        self._lock = threading.Lock()
+
+        event.listen(engine.pool, "checkout", self._on_checkout)
+        connect = engine.connect
+
+        def timed_connect():
+            start = time.perf_counter()
+            try:
+                return connect()
+            except PoolTimeoutError:
+                with self._lock:
+                    self.checkout_timeouts += 1
+                raise
+            finally:
+                self._observe_wait(time.perf_counter() - start)
+
+        engine.connect = timed_connect
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+
+    def _observe_wait(self, waited: float):
+        with self._lock:
+            self.checkout_wait_seconds += waited
+            self.max_checkout_wait_seconds = max(self.max_checkout_wait_seconds, waited)
+
+
+def _pool_options(settings: PostgresSettings) -> dict:
+    return dict(
+        pool_size=settings.pool_size,
+        max_overflow=settings.max_overflow,
+        pool_recycle=settings.pool_recycle,
+        pool_pre_ping=settings.pool_pre_ping,
+        pool_timeout=settings.pool_timeout,
+    )
+
+
+def _session_settings(settings: PostgresSettings) -> dict[str, str]:
+    # timeouts are set once per connection, instead of a SET before every statement
+    session_settings = {}
+    if settings.statement_timeout > 0:
+        session_settings["statement_timeout"] = str(settings.statement_timeout)
+    if settings.lock_timeout > 0:
+        session_settings["lock_timeout"] = str(settings.lock_timeout)
+    return session_settings
+
+
+def _pool_stats(pool: Pool, timer: _CheckoutTimer, settings: PostgresSettings) -> PoolStats:
+    return PoolStats(
+        pool_size=pool.size(),
+        max_overflow=settings.max_overflow,
+        checked_out=pool.checkedout(),
+        idle=pool.checkedin(),
+        overflow=max(pool.overflow(), 0),
+        checkouts=timer.checkouts,
+        checkout_timeouts=timer.checkout_timeouts,
+        checkout_wait_seconds=timer.checkout_wait_seconds,
+        max_checkout_wait_seconds=timer.max_checkout_wait_seconds,
+    )
 
 
 class PostgresConnection:
     engine: Engine
+    settings: PostgresSettings
+
+    def __init__(
+            self,
+            db_url: str,
+            settings: PostgresSettings | None = None,
+    ):
+        self.settings = settings if settings is not None else PostgresSettings()
+
+        options = " ".join(f"-c {name}={value}" for name, value in _session_settings(self.settings).items())
+        self.engine = create_engine(
+            db_url,
+            connect_args={"options": options} if options != "" else {},
+            **_pool_options(self.settings),
+        )
+        self._checkout_timer = _CheckoutTimer(self.engine)
+
+    def stats(self) -> PoolStats:
+        return _pool_stats(self.engine.pool, self._checkout_timer, self.settings)
+
+    def close(self):
+        self.engine.dispose()
+
+
+class AsyncPostgresConnection:
+    """ The same pool over asyncpg, queries wait on the event loop instead of blocking a thread """
+    engine: AsyncEngine
+    settings: PostgresSettings
 
     def __init__(
             self,
             db_url: str,
+            settings: PostgresSettings | None = None,
     ):
-        self.engine = create_engine(db_url)
+        self.settings = settings if settings is not None else PostgresSettings()
+
+        url = make_url(db_url).set(drivername="postgresql+asyncpg")
+        # asyncpg takes libpq's sslmode values under the name ssl
+        if "sslmode" in url.query:
+            url = url.difference_update_query(["sslmode"]).update_query_dict({"ssl": url.query["sslmode"]})
+
+        self.engine = create_async_engine(
+            url,
+            connect_args={"server_settings": _session_settings(self.settings)},
+            **_pool_options(self.settings),
+        )
+        # async sessions and connections check out through the sync engine underneath
+        self._checkout_timer = _CheckoutTimer(self.engine.sync_engine)
+
+    def stats(self) -> PoolStats:
+        return _pool_stats(self.engine.pool, self._checkout_timer, self.settings)
+
+    async def close(self):
+        await self.engine.dispose()
@@ -0,0 +1,15 @@
+import base64
+
+
+def encode_cursor(last_id: int) -> str:
+    """ Cursors are opaque to clients, they only carry the private id of the last meme on a page """
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """ Raises ValueError for malformed cursors """
+    padding = "=" * (-len(cursor) % 4)
+    try:
+        return int(base64.urlsafe_b64decode(cursor + padding).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError(f"Malformed cursor: {cursor}")
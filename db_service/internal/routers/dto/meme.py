@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 
-from models.meme import Meme
+from models.meme import BulkStatus, Meme, MemeUpdate
 
 
 class CreateMemeRequest(BaseModel):
@@ -30,6 +30,16 @@ class RetrieveMemeResponse(BaseModel):
     caption: str | None = None
 
 
+class RetrieveMemesPageResponse(BaseModel):
+    memes: list[RetrieveMemeResponse]
+    next_cursor: str | None = None
+
+
+class RetrieveMemesByIdsResponse(BaseModel):
+    memes: list[RetrieveMemeResponse]
+    missing_ids: list[str]
+
+
 class UpdateMemeRequest(BaseModel):
     meme_id: str | None = None
     image_id: str | None = None
@@ -42,6 +52,42 @@ class UpdateMemeRequest(BaseModel):
             caption=self.caption,
         )
 
+
+class BulkCreateMemesRequest(BaseModel):
+    memes: list[CreateMemeRequest]
+
+
+class BulkUpdateMemeRequest(BaseModel):
+    meme_id: str
+    image_id: str | None = None
+    caption: str | None = None
+
+    def to_model(self):
+        return MemeUpdate(
+            unique_meme_id=self.meme_id,
+            unique_image_id=self.image_id,
+            caption=self.caption,
+        )
+
+
+class BulkUpdateMemesRequest(BaseModel):
+    memes: list[BulkUpdateMemeRequest]
+
+
+class BulkDeleteMemesRequest(BaseModel):
+    meme_ids: list[str]
+
+
+class BulkMemeResult(BaseModel):
+    meme_id: str
+    status: BulkStatus
+    image_id: str | None = None
+    error: str | None = None
+
+
+class BulkMemesResponse(BaseModel):
+    results: list[BulkMemeResult]
+
 # class UpdateMemeResponse(BaseModel):
 #     pass
 
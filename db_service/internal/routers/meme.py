@@ -1,54 +1,223 @@
 import logging
+from typing import AsyncIterator
 
-from fastapi import APIRouter, status, HTTPException
+from fastapi import APIRouter, status, HTTPException, Query
+from fastapi.responses import StreamingResponse
 
-from internal.database_service_interface import DatabaseServiceInterface
+from internal.async_database_service_interface import AsyncDatabaseServiceInterface
 from internal.errors.errors import MemeDoesNotExistError, ServiceError
-from internal.routers.dto.meme import CreateMemeRequest, RetrieveMemeResponse, UpdateMemeRequest
+from internal.routers.cursor import decode_cursor, encode_cursor
+from internal.routers.dto.meme import (CreateMemeRequest, RetrieveMemeResponse, RetrieveMemesByIdsResponse,
+                                      RetrieveMemesPageResponse, UpdateMemeRequest, BulkCreateMemesRequest,
+                                      BulkUpdateMemesRequest, BulkDeleteMemesRequest, BulkMemeResult,
+                                      BulkMemesResponse)
+from models.meme import Meme, MemeBulkResult
 
 logger = logging.getLogger(__name__)
 
 
-def get_router(db_service: DatabaseServiceInterface):
+MAX_MEMES_BY_IDS = 100
+MAX_MEMES_PAGE_SIZE = 1000
+MAX_BULK_MEMES = 10000
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _check_bulk_size(size: int):
+    if size > MAX_BULK_MEMES:
+        logger.error("Can not run a bulk operation on %s memes, limit is %s", size, MAX_BULK_MEMES)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Can't process more than {MAX_BULK_MEMES} memes at once"
+        )
+
+
+def _bulk_response(results: list[MemeBulkResult]) -> BulkMemesResponse:
+    return BulkMemesResponse(
+        results=[
+            BulkMemeResult(
+                meme_id=result.meme_id,
+                status=result.status,
+                image_id=result.image_id,
+                error=result.error,
+            )
+            for result in results
+        ],
+    )
+
+
+def _export_line(meme: Meme) -> str:
+    return RetrieveMemeResponse(
+        meme_id=meme.unique_meme_id,
+        image_id=meme.unique_image_id,
+        caption=meme.caption,
+    ).model_dump_json() + "\n"
+
+
+def get_router(db_service: AsyncDatabaseServiceInterface):
     router = APIRouter(
         prefix="/memes"
     )
 
     @router.post("/", status_code=status.HTTP_201_CREATED)
     async def create_meme(request: CreateMemeRequest):
-        logger.info(f"Creating meme {request}")
+        logger.info("Creating meme %s", request)
         # TODO: handle "meme already exists"
         try:
-            db_service.create_meme(request.to_model())
+            await db_service.create_meme(request.to_model())
         except ServiceError as e:
-            logger.error(f"Could not create meme for request: {request}, error: {e}")
+            logger.error("Could not create meme for request: %s, error: %s", request, e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=str(e)
             )
 
-        logger.info(f"Meme: {request} created successfully")
+        logger.info("Meme: %s created successfully", request)
+
+    # results are reported per item, so the response is 200 even if some of the items failed
+    @router.post("/bulk", response_model=BulkMemesResponse)
+    async def create_memes(request: BulkCreateMemesRequest) -> BulkMemesResponse:
+        logger.info("Creating %s memes", len(request.memes))
+        _check_bulk_size(len(request.memes))
+
+        try:
+            results = await db_service.create_memes([meme.to_model() for meme in request.memes])
+        except ServiceError as e:
+            logger.error("Could not create %s memes, error: %s", len(request.memes), e)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=str(e)
+            )
+
+        return _bulk_response(results)
+
+    @router.patch("/bulk", response_model=BulkMemesResponse)
+    async def update_memes(request: BulkUpdateMemesRequest) -> BulkMemesResponse:
+        logger.info("Updating %s memes", len(request.memes))
+        _check_bulk_size(len(request.memes))
+
+        try:
+            results = await db_service.update_memes([meme.to_model() for meme in request.memes])
+        except ServiceError as e:
+            logger.error("Could not update %s memes, error: %s", len(request.memes), e)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=str(e)
+            )
+
+        return _bulk_response(results)
+
+    # must be registered before /{meme_id}, otherwise "bulk" is taken for a meme id
+    @router.delete("/bulk", response_model=BulkMemesResponse)
+    async def delete_memes(request: BulkDeleteMemesRequest) -> BulkMemesResponse:
+        logger.info("Deleting %s memes", len(request.meme_ids))
+        _check_bulk_size(len(request.meme_ids))
+
+        try:
+            results = await db_service.delete_memes(request.meme_ids)
+        except ServiceError as e:
+            logger.error("Could not delete %s memes, error: %s", len(request.meme_ids), e)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=str(e)
+            )
+
+        return _bulk_response(results)
+
+    # must be registered before /{meme_id}, otherwise "export" is taken for a meme id
+    @router.get(
+        "/export",
+        response_class=StreamingResponse,
+        responses={status.HTTP_200_OK: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+    )
+    async def export_memes() -> StreamingResponse:
+        """ Every meme ordered by id, one json object per line, read from the database as it is sent """
+        logger.info("Exporting memes")
+
+        memes = db_service.stream_memes()
+        try:
+            # the first row is read here, so a failing database is reported with a status code
+            first_meme = await anext(memes, None)
+        except ServiceError as e:
+            logger.error("Could not export memes, error: %s", e)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=str(e)
+            )
+
+        async def export_lines() -> AsyncIterator[str]:
+            if first_meme is None:
+                return
+
+            exported = 0
+            # a failure past this point aborts the response, so a client never mistakes it for a complete export
+            yield _export_line(first_meme)
+            exported += 1
+            async for meme in memes:
+                yield _export_line(meme)
+                exported += 1
+
+            logger.info("Exported %s memes", exported)
+
+        return StreamingResponse(
+            export_lines(),
+            media_type=NDJSON_MEDIA_TYPE,
+        )
+
+    # must be registered before /{meme_id}, otherwise "by-ids" is taken for a meme id
+    @router.get("/by-ids", response_model=RetrieveMemesByIdsResponse)
+    async def retrieve_memes_by_ids(meme_ids: list[str] = Query()) -> RetrieveMemesByIdsResponse:
+        logger.info("Retrieving %s memes by id", len(meme_ids))
+
+        if len(meme_ids) > MAX_MEMES_BY_IDS:
+            logger.error("Can not retrieve %s memes by id, limit is %s", len(meme_ids), MAX_MEMES_BY_IDS)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Can't retrieve more than {MAX_MEMES_BY_IDS} memes at once"
+            )
+
+        try:
+            memes, missing_ids = await db_service.retrieve_memes_by_ids(meme_ids)
+        except ServiceError as e:
+            logger.error("Could not retrieve memes by id: %s, error: %s", meme_ids, e)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=str(e)
+            )
+
+        logger.info("Retrieved %s memes by id, %s missing", len(memes), len(missing_ids))
+
+        return RetrieveMemesByIdsResponse(
+            memes=[
+                RetrieveMemeResponse(
+                    meme_id=meme.unique_meme_id,
+                    image_id=meme.unique_image_id,
+                    caption=meme.caption
+                )
+                for meme in memes
+            ],
+            missing_ids=missing_ids,
+        )
 
     @router.get("/{meme_id}", response_model=RetrieveMemeResponse)
     async def retrieve_meme(meme_id: str) -> RetrieveMemeResponse:
-        logger.info(f"Retrieving meme: {meme_id}")
+        logger.info("Retrieving meme: %s", meme_id)
 
         try:
-            meme = db_service.retrieve_meme(meme_id)
+            meme = await db_service.retrieve_meme(meme_id)
         except MemeDoesNotExistError:
-            logger.error(f"Could not retrieve meme: {meme_id}, meme does not exist")
+            logger.error("Could not retrieve meme: %s, meme does not exist", meme_id)
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
             )
         except ServiceError as e:
-            logger.error(f"Could not retrieve meme: {meme_id}, error: {e}")
+            logger.error("Could not retrieve meme: %s, error: %s", meme_id, e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=str(e),
             )
 
-        logger.info(f"Retrieved meme: {meme_id}")
-        logger.debug(f"Retrieved meme: {meme}")
+        logger.info("Retrieved meme: %s", meme_id)
+        logger.debug("Retrieved meme: %s", meme)
 
         return RetrieveMemeResponse(
             meme_id=meme_id,
@@ -56,34 +225,43 @@ def get_router(db_service: DatabaseServiceInterface):
             caption=meme.caption
         )
 
-    @router.get("/", response_model=list[RetrieveMemeResponse])
-    async def retrieve_memes(skip: int = 0, limit: int = 3) -> list[RetrieveMemeResponse]:
-        logger.info(f"Retrieving memes at {skip=}, {limit=}")
+    @router.get("/", response_model=list[RetrieveMemeResponse] | RetrieveMemesPageResponse)
+    async def retrieve_memes(
+        skip: int = 0,
+        limit: int = 3,
+        after: str | None = None,
+    ) -> list[RetrieveMemeResponse] | RetrieveMemesPageResponse:
+        """ Offset pagination by default. Passing after (an empty string for the first page, next_cursor after that)
+        switches to cursor pagination, which costs the same for every page and is stable under inserts """
+        if after is not None:
+            return await retrieve_memes_page(after, limit)
+
+        logger.info("Retrieving memes at skip=%r, limit=%r", skip, limit)
 
         if skip < 0:
-            logger.error(f"Can not retrieve memes at {skip=}, {limit=}, negative skip value")
+            logger.error("Can not retrieve memes at skip=%r, limit=%r, negative skip value", skip, limit)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Skip parameter cannot be negative"
             )
         if limit < 0:
-            logger.error(f"Can not retrieve memes at {skip=}, {limit=}, negative limit value")
+            logger.error("Can not retrieve memes at skip=%r, limit=%r, negative limit value", skip, limit)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Limit parameter cannot be negative"
             )
 
         try:
-            memes = db_service.retrieve_memes(skip, limit)
+            memes = await db_service.retrieve_memes(skip, limit)
         except ServiceError as e:
-            logger.error(f"Could not retrieve memes at {skip=}, {limit=}. Error: {e}")
+            logger.error("Could not retrieve memes at skip=%r, limit=%r. Error: %s", skip, limit, e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=str(e)
             )
 
         if len(memes) == 0:
-            logger.error(f"Found no memes at {skip=}, {limit=}")
+            logger.error("Found no memes at skip=%r, limit=%r", skip, limit)
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND
             )
@@ -97,57 +275,107 @@ def get_router(db_service: DatabaseServiceInterface):
             )
             response.append(r)
 
-        logger.info(f"Retrieved {len(response)} memes")
-        logger.debug(f"Memes retrieved:\n{response}")
+        logger.info("Retrieved %s memes", len(response))
+        logger.debug("Memes retrieved:\n%s", response)
 
         return response
 
-    @router.put("/{meme_id}")
-    async def update_meme(meme_id: str, request: UpdateMemeRequest):
-        logger.info(f"Updating meme: {meme_id}, update request: {request}")
+    async def retrieve_memes_page(after: str, limit: int) -> RetrieveMemesPageResponse:
+        logger.info("Retrieving memes page at after=%r, limit=%r", after, limit)
+
+        if limit < 1 or limit > MAX_MEMES_PAGE_SIZE:
+            logger.error("Can not retrieve memes page at after=%r, limit=%r, limit out of range", after, limit)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Limit parameter must be between 1 and {MAX_MEMES_PAGE_SIZE}"
+            )
+
+        after_id = None
+        if after != "":
+            try:
+                after_id = decode_cursor(after)
+            except ValueError as e:
+                logger.error("Can not retrieve memes page at after=%r, limit=%r, error: %s", after, limit, e)
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Malformed cursor"
+                )
+
+        try:
+            memes, next_after_id = await db_service.retrieve_memes_after(after_id, limit)
+        except ServiceError as e:
+            logger.error("Could not retrieve memes page at after=%r, limit=%r. Error: %s", after, limit, e)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=str(e)
+            )
+
+        logger.info("Retrieved %s memes page at after=%r, limit=%r", len(memes), after, limit)
+
+        return RetrieveMemesPageResponse(
+            memes=[
+                RetrieveMemeResponse(
+                    meme_id=meme.unique_meme_id,
+                    image_id=meme.unique_image_id,
+                    caption=meme.caption
+                )
+                for meme in memes
+            ],
+            next_cursor=encode_cursor(next_after_id) if next_after_id is not None else None,
+        )
+
+    @router.put("/{meme_id}", response_model=RetrieveMemeResponse)
+    async def update_meme(meme_id: str, request: UpdateMemeRequest) -> RetrieveMemeResponse:
+        logger.info("Updating meme: %s, update request: %s", meme_id, request)
 
         if request.image_id is None and request.caption is None:
-            logger.error(f"Can not update meme: {meme_id}, no new data was provided")
+            logger.error("Can not update meme: %s, no new data was provided", meme_id)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="No data given for an update operation"
             )
 
         try:
-            db_service.update_meme(meme_id, request.to_model(meme_id))
+            meme = await db_service.update_meme(meme_id, request.to_model(meme_id))
         except MemeDoesNotExistError:
-            logger.error(f"Could not update meme: {meme_id}, meme does not exist")
+            logger.error("Could not update meme: %s, meme does not exist", meme_id)
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
             )
         except ServiceError as e:
-            logger.error(f"Could not update meme: {meme_id}, error: {e}")
+            logger.error("Could not update meme: %s, error: %s", meme_id, e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=str(e)
             )
 
-        logger.info(f"Update meme: {meme_id}")
+        logger.info("Update meme: %s", meme_id)
+
+        return RetrieveMemeResponse(
+            meme_id=meme.unique_meme_id,
+            image_id=meme.unique_image_id,
+            caption=meme.caption
+        )
 
     @router.delete("/{meme_id}", response_model=RetrieveMemeResponse)
     async def delete_meme(meme_id: str) -> RetrieveMemeResponse:
-        logger.info(f"Deleting meme: {meme_id}")
+        logger.info("Deleting meme: %s", meme_id)
 
         try:
-            meme = db_service.delete_meme(meme_id)
+            meme = await db_service.delete_meme(meme_id)
         except MemeDoesNotExistError:
-            logger.error(f"Could not delete meme: {meme_id}, meme does not exist")
+            logger.error("Could not delete meme: %s, meme does not exist", meme_id)
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
             )
         except ServiceError as e:
-            logger.error(f"Could not delete meme: {meme_id}, error: {e}")
+            logger.error("Could not delete meme: %s, error: %s", meme_id, e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=str(e)
             )
 
-        logger.info(f"Deleted meme: {meme_id}")
+        logger.info("Deleted meme: %s", meme_id)
 
         return RetrieveMemeResponse(
             meme_id=meme_id,
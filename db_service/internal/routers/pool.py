@@ -0,0 +1,16 @@
+from fastapi import APIRouter
+
+from internal.postgres.connection import AsyncPostgresConnection, PoolStats, PostgresConnection
+
+
+def get_router(db_connection: PostgresConnection | AsyncPostgresConnection):
+    router = APIRouter(
+        prefix="/pool"
+    )
+
+    @router.get("/stats", response_model=PoolStats)
+    async def retrieve_pool_stats() -> PoolStats:
+        """ Live connection pool usage, checkout waits growing under load mean the pool is too small """
+        return db_connection.stats()
+
+    return router
@@ -0,0 +1,23 @@
+import json
+import threading
+
+from internal.span_exporter_interface import SpanExporterInterface
+
+
+class FileSpanExporter(SpanExporterInterface):
+    """ Appends every batch as one line of OTLP JSON, the format the OpenTelemetry collector's
+    otlpjsonfile receiver reads, so the file can be shipped to any tracing backend later """
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def export(self, request: dict):
+        line = json.dumps(request, separators=(",", ":"))
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
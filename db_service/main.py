@@ -1,22 +1,30 @@
 import logging
 import os
 import shutil
+from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
 from fastapi import FastAPI
+from prometheus_client import REGISTRY
 
+from internal.async_database_service_interface import AsyncDatabaseServiceInterface
+from internal.database_service.async_database_service import AsyncDatabaseService
 from internal.database_service.database_service import DatabaseService
-from internal.database_service_interface import DatabaseServiceInterface
+from internal.database_service.threaded_database_service import ThreadedDatabaseService
+from internal.logging_setup.logging_setup import LogSamplingMiddleware, configure_logging
+from internal.meme_repo.fake_async_meme_repo import FakeAsyncMemeRepository
+from internal.meme_repo.sqlalchemy.async_postgres import AsyncMemeRepository
 from internal.meme_repo.sqlalchemy.postgres import MemeRepository
-from internal.meme_repository_interface import MemeRepositoryInterface
-from internal.postgres.connection import PostgresConnection
+from internal.metrics.metrics import MetricsMiddleware, StatsCollector, instrument_engine
+from internal.postgres.connection import AsyncPostgresConnection, PostgresConnection, PostgresSettings
+from internal.routers import metrics, pool
 from internal.routers.meme import get_router
+from internal.span_exporter_interface import SpanExporterInterface
+from internal.tracing.file_span_exporter import FileSpanExporter
+from internal.tracing.otlp_span_exporter import OTLPSpanExporter
+from internal.tracing.tracing import TracingMiddleware, configure_tracing, shutdown_tracing, trace_engine
 
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO,
-    force=True
-)
+log_listener = configure_logging()
 logger = logging.getLogger(__name__)
 
 if not os.path.isfile("./.env") and os.path.isfile("./.env.example"):
@@ -29,29 +37,107 @@ load_dotenv(
 )
 logger.info("Loaded environment variables from .env file")
 
-app = FastAPI()
+log_level = os.getenv('LOG_LEVEL', 'INFO')
+logging.getLogger().setLevel(log_level)
+# share of requests whose INFO lines are logged, warnings and errors are always logged
+log_sample_rate = float(os.getenv('LOG_SAMPLE_RATE', '1.0'))
+
+# tracing is off unless an exporter is chosen, only TRACE_SAMPLE_RATE of the traces started here are recorded,
+# traces continued from an upstream traceparent follow the upstream's decision
+trace_exporter = os.getenv('TRACE_EXPORTER', 'none')
+span_exporter: SpanExporterInterface | None = None
+if trace_exporter == "file":
+    span_exporter = FileSpanExporter(os.getenv('TRACE_FILE', './traces.jsonl'))
+elif trace_exporter == "otlp":
+    span_exporter = OTLPSpanExporter(os.getenv('TRACE_OTLP_ENDPOINT', 'http://localhost:4318'))
+if span_exporter is not None:
+    configure_tracing("db_service", span_exporter, float(os.getenv('TRACE_SAMPLE_RATE', '0.01')))
+    logger.info("Exporting traces to %s", trace_exporter)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    yield
+    if isinstance(db_connection, AsyncPostgresConnection):
+        await db_connection.close()
+        logger.info("Closed database connections")
+    elif db_connection is not None:
+        db_connection.close()
+        logger.info("Closed database connections")
+    shutdown_tracing()
+    log_listener.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(LogSamplingMiddleware, sample_rate=log_sample_rate)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
 logger.info("Initialized FastAPI app")
 
-assert "DB_URL" in os.environ, "DB_URL is not set"
-db_url = os.environ["DB_URL"]
-db_connection = PostgresConnection(
-    db_url=db_url,
-)
-logger.info("Database connection established")
+db_backend = os.getenv("DB_BACKEND", "postgres")
+assert db_backend in ("postgres", "memory"), f"Unknown DB_BACKEND: {db_backend}"
+db_driver = os.getenv("DB_DRIVER", "psycopg2")
+assert db_driver in ("psycopg2", "asyncpg"), f"Unknown DB_DRIVER: {db_driver}"
+db_settings = PostgresSettings.from_env("DB")
+bulk_chunk_size = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+stream_batch_size = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
 
-# TODO: implement
-meme_repository: MemeRepositoryInterface = MemeRepository(
-    db_connection=db_connection,
-)
-logger.info("Database repository initialized")
+db_connection: PostgresConnection | AsyncPostgresConnection | None = None
+db_service: AsyncDatabaseServiceInterface
+if db_backend == "memory":
+    # memes are lost on restart, for local runs and load tests
+    db_service = AsyncDatabaseService(
+        meme_repository=FakeAsyncMemeRepository(),
+        bulk_chunk_size=bulk_chunk_size,
+        stream_batch_size=stream_batch_size,
+    )
+elif db_driver == "asyncpg":
+    assert "DB_URL" in os.environ, "DB_URL is not set"
+    db_connection = AsyncPostgresConnection(
+        db_url=os.environ["DB_URL"],
+        settings=db_settings,
+    )
+    db_service = AsyncDatabaseService(
+        meme_repository=AsyncMemeRepository(
+            db_connection=db_connection,
+        ),
+        bulk_chunk_size=bulk_chunk_size,
+        stream_batch_size=stream_batch_size,
+    )
+else:
+    assert "DB_URL" in os.environ, "DB_URL is not set"
+    db_connection = PostgresConnection(
+        db_url=os.environ["DB_URL"],
+        settings=db_settings,
+    )
+    # the blocking service runs on the threadpool, so it doesn't stall the event loop
+    db_service = ThreadedDatabaseService(
+        DatabaseService(
+            meme_repository=MemeRepository(
+                db_connection=db_connection,
+            ),
+            bulk_chunk_size=bulk_chunk_size,
+            stream_batch_size=stream_batch_size,
+        ),
+    )
 
-db_service: DatabaseServiceInterface = DatabaseService(
-    meme_repository=meme_repository,
-)
-logger.info("Database service initialized")
+if db_connection is not None:
+    logger.info("Database service initialized, driver: %s, pool settings: %s", db_driver, db_settings)
+
+    # the async engine runs its statements on a sync engine underneath, events are only raised there
+    sync_engine = db_connection.engine.sync_engine if db_driver == "asyncpg" else db_connection.engine
+    instrument_engine(sync_engine)
+    if span_exporter is not None:
+        trace_engine(sync_engine)
+    REGISTRY.register(StatsCollector("db_pool", "driver", {db_driver: db_connection.stats}))
+else:
+    logger.info("Database service initialized, backend: %s", db_backend)
 
 router = get_router(db_service)
 logger.info("Database router initialized")
 
 app.include_router(router)
+if db_connection is not None:
+    app.include_router(pool.get_router(db_connection))
+app.include_router(metrics.get_router())
 logger.info("Database router included, starting up..")
@@ -1,3 +1,5 @@
+from enum import Enum
+
 from sqlalchemy import Column, Integer, String
 from sqlalchemy.orm import DeclarativeBase
 
@@ -33,3 +35,20 @@ class MemeUpdate(BaseModel):
     unique_meme_id: str | None
     unique_image_id: str | None
     caption: str | None
+
+
+class BulkStatus(str, Enum):
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+    NOT_FOUND = "not_found"
+    # the meme or image id is already taken, or repeats an earlier item of the same request
+    CONFLICT = "conflict"
+    FAILED = "failed"
+
+
+class MemeBulkResult(BaseModel):
+    meme_id: str
+    status: BulkStatus
+    image_id: str | None = None
+    error: str | None = None
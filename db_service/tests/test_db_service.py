@@ -1,4 +1,5 @@
 import base64
+import json
 import random
 import uuid
 
@@ -9,26 +10,41 @@ from fastapi import status, APIRouter
 from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import HTTPException
 
-from internal.database_service_interface import DatabaseServiceInterface
+from internal.async_database_service_interface import AsyncDatabaseServiceInterface
+from internal.database_service.async_database_service import AsyncDatabaseService
 from internal.database_service.database_service import DatabaseService
-from internal.meme_repository_interface import MemeRepositoryInterface
+from internal.database_service.threaded_database_service import ThreadedDatabaseService
+from internal.meme_repo.fake_async_meme_repo import FakeAsyncMemeRepository
 from internal.meme_repo.fake_meme_repo import FakeMemeRepository
+from internal.metrics.metrics import StatsCollector, instrument_engine
+from internal.postgres.connection import PoolStats, PostgresConnection, PostgresSettings
+from internal.routers import pool
 from internal.routers.meme import get_router
-from internal.routers.dto.meme import CreateMemeRequest, UpdateMemeRequest
-
-
-@pytest.fixture(scope="function")
-def meme_repository() -> MemeRepositoryInterface:
-    meme_repo = FakeMemeRepository()
-
-    yield meme_repo
-
-
-@pytest.fixture(scope='function')
-def database_service(meme_repository) -> DatabaseServiceInterface:
-    service: DatabaseServiceInterface = DatabaseService(
-        meme_repository=meme_repository,
-    )
+from internal.tracing.file_span_exporter import FileSpanExporter
+from internal.tracing.tracing import configure_tracing, shutdown_tracing, span, trace_engine
+from internal.routers.dto.meme import (CreateMemeRequest, UpdateMemeRequest, BulkCreateMemesRequest,
+                                      BulkUpdateMemesRequest, BulkUpdateMemeRequest, BulkDeleteMemesRequest)
+from internal.errors.errors import DatabaseError
+from models.meme import BulkStatus, Meme
+from prometheus_client import REGISTRY, CollectorRegistry
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
+
+
+# every route is tested against the threaded sync service and the async one
+@pytest.fixture(scope='function', params=["sync", "async"])
+def database_service(request) -> AsyncDatabaseServiceInterface:
+    service: AsyncDatabaseServiceInterface
+    if request.param == "async":
+        service = AsyncDatabaseService(
+            meme_repository=FakeAsyncMemeRepository(),
+        )
+    else:
+        service = ThreadedDatabaseService(
+            DatabaseService(
+                meme_repository=FakeMemeRepository(),
+            ),
+        )
 
     yield service
 
@@ -181,6 +197,11 @@ class TestDatabaseService:
             json=jsonable_encoder(update_meme2_request)
         )
         assert update_meme2_response.status_code == status.HTTP_200_OK
+        assert update_meme2_response.json() == {
+            "meme_id": meme2_request.meme_id,
+            "image_id": meme2_request.image_id,
+            "caption": meme2_updated_caption,
+        }
 
         retrieve_meme2_response = client.get(
             self.ROUTE_PREFIX + f"/{meme2_request.meme_id}"
@@ -244,3 +265,243 @@ class TestDatabaseService:
         assert retrieve_meme1_response.json()["meme_id"] == meme1_request.meme_id
         assert retrieve_meme1_response.json()["image_id"] == meme1_request.image_id
         assert retrieve_meme1_response.json()["caption"] == meme1_request.caption
+
+    def test_retrieve_memes_by_ids(self, client, create_meme_request_factory):
+        meme_requests = [create_meme_request_factory.get() for _ in range(3)]
+
+        self.create_memes(
+            client,
+            meme_requests
+        )
+
+        requested_ids = [meme_requests[2].meme_id, "very-fake-id", meme_requests[0].meme_id]
+        response = client.get(
+            self.ROUTE_PREFIX + "/by-ids",
+            params={"meme_ids": requested_ids},
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        response_json = response.json()
+        assert [meme["meme_id"] for meme in response_json["memes"]] == [
+            meme_requests[2].meme_id,
+            meme_requests[0].meme_id,
+        ]
+        assert response_json["memes"][0]["image_id"] == meme_requests[2].image_id
+        assert response_json["memes"][0]["caption"] == meme_requests[2].caption
+        assert response_json["missing_ids"] == ["very-fake-id"]
+
+        with pytest.raises(HTTPException):
+            too_many_ids_response = client.get(
+                self.ROUTE_PREFIX + "/by-ids",
+                params={"meme_ids": [str(uuid.uuid4()) for _ in range(101)]},
+            )
+            assert too_many_ids_response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_retrieve_memes_cursor_paginated(self, client, create_meme_request_factory):
+        meme_requests = [create_meme_request_factory.get() for _ in range(7)]
+
+        self.create_memes(
+            client,
+            meme_requests
+        )
+
+        retrieved_meme_ids: list[str] = []
+        after = ""
+        pages = 0
+        while after is not None:
+            response = client.get(
+                self.ROUTE_PREFIX + "/",
+                params={"after": after, "limit": 3},
+            )
+            assert response.status_code == status.HTTP_200_OK
+            retrieved_meme_ids.extend(meme["meme_id"] for meme in response.json()["memes"])
+            after = response.json()["next_cursor"]
+            pages += 1
+
+        assert retrieved_meme_ids == [request.meme_id for request in meme_requests]
+        assert pages == 3
+
+        # a full last page has no cursor either
+        response = client.get(
+            self.ROUTE_PREFIX + "/",
+            params={"after": "", "limit": 7},
+        )
+        assert len(response.json()["memes"]) == 7
+        assert response.json()["next_cursor"] is None
+
+        with pytest.raises(HTTPException):
+            client.get(
+                self.ROUTE_PREFIX + "/",
+                params={"after": "not a cursor", "limit": 3},
+            )
+
+    def test_bulk_memes(self, client, create_meme_request_factory):
+        meme_requests = [create_meme_request_factory.get() for _ in range(3)]
+        self.create_memes(client, meme_requests[:1])
+
+        conflicting_request = create_meme_request_factory.get()
+        conflicting_request.image_id = meme_requests[1].image_id
+        response = client.post(
+            self.ROUTE_PREFIX + "/bulk",
+            json=jsonable_encoder(BulkCreateMemesRequest(
+                memes=meme_requests + [conflicting_request, meme_requests[2]],
+            )),
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert [result["status"] for result in response.json()["results"]] == [
+            "conflict", "created", "created", "conflict", "conflict",
+        ]
+        assert client.get(
+            self.ROUTE_PREFIX + f"/{meme_requests[2].meme_id}"
+        ).json()["caption"] == meme_requests[2].caption
+
+        response = client.patch(
+            self.ROUTE_PREFIX + "/bulk",
+            json=jsonable_encoder(BulkUpdateMemesRequest(
+                memes=[
+                    BulkUpdateMemeRequest(meme_id=meme_requests[1].meme_id, caption="updated"),
+                    BulkUpdateMemeRequest(meme_id="missing", caption="updated"),
+                ],
+            )),
+        )
+        assert [result["status"] for result in response.json()["results"]] == ["updated", "not_found"]
+        updated_meme = client.get(self.ROUTE_PREFIX + f"/{meme_requests[1].meme_id}").json()
+        assert updated_meme["caption"] == "updated"
+        assert updated_meme["image_id"] == meme_requests[1].image_id
+
+        response = client.request(
+            "DELETE",
+            self.ROUTE_PREFIX + "/bulk",
+            json=jsonable_encoder(BulkDeleteMemesRequest(
+                meme_ids=[meme_requests[0].meme_id, "missing"],
+            )),
+        )
+        assert response.json()["results"] == [
+            {"meme_id": meme_requests[0].meme_id, "status": "deleted",
+             "image_id": meme_requests[0].image_id, "error": None},
+            {"meme_id": "missing", "status": "not_found", "image_id": None, "error": None},
+        ]
+        with pytest.raises(HTTPException):
+            client.get(self.ROUTE_PREFIX + f"/{meme_requests[0].meme_id}")
+
+    def test_bulk_memes_chunked(self, create_meme_request_factory):
+        class FailingMemeRepository(FakeMemeRepository):
+            chunk_sizes: list[int]
+
+            def __init__(self):
+                super().__init__()
+                self.chunk_sizes = []
+
+            def create_memes(self, memes: list[Meme]) -> list[str]:
+                self.chunk_sizes.append(len(memes))
+                if len(self.chunk_sizes) == 2:
+                    raise DatabaseError("connection lost")
+                return super().create_memes(memes)
+
+        meme_repository = FailingMemeRepository()
+        service = DatabaseService(meme_repository=meme_repository, bulk_chunk_size=2)
+
+        memes = [create_meme_request_factory.get().to_model() for _ in range(5)]
+        results = service.create_memes(memes)
+        assert meme_repository.chunk_sizes == [2, 2, 1]
+        assert [result.status for result in results] == [
+            BulkStatus.CREATED, BulkStatus.CREATED, BulkStatus.FAILED, BulkStatus.FAILED, BulkStatus.CREATED,
+        ]
+        assert results[2].error == "connection lost"
+
+    def test_export_memes(self, client, create_meme_request_factory):
+        response = client.get(
+            self.ROUTE_PREFIX + "/export",
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.content == b""
+
+        meme_requests = [create_meme_request_factory.get() for _ in range(3)]
+        self.create_memes(client, meme_requests)
+
+        response = client.get(
+            self.ROUTE_PREFIX + "/export",
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["Content-Type"] == "application/x-ndjson"
+        assert [json.loads(line) for line in response.text.splitlines()] == [
+            {"meme_id": request.meme_id, "image_id": request.image_id, "caption": request.caption}
+            for request in meme_requests
+        ]
+
+
+class TestPostgresConnection:
+    def test_pool_stats(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("DB_POOL_SIZE", "1")
+        monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+        monkeypatch.setenv("DB_POOL_TIMEOUT", "0.05")
+        # sqlite doesn't take postgres session options
+        monkeypatch.setenv("DB_STATEMENT_TIMEOUT", "0")
+        monkeypatch.setenv("DB_LOCK_TIMEOUT", "0")
+        settings = PostgresSettings.from_env("DB")
+        assert settings.pool_size == 1 and settings.pool_pre_ping
+
+        db_connection = PostgresConnection(f"sqlite:///{tmp_path / 'pool.db'}", settings)
+        router = APIRouter()
+        router.include_router(pool.get_router(db_connection))
+        client = TestClient(router)
+
+        with db_connection.engine.connect():
+            stats = PoolStats(**client.get("/pool/stats").json())
+            assert stats.checked_out == 1
+            assert stats.checkouts == 1
+
+            with pytest.raises(PoolTimeoutError):
+                db_connection.engine.connect()
+
+        stats = db_connection.stats()
+        assert stats.checked_out == 0
+        assert stats.idle == 1
+        assert stats.checkouts == 1
+        assert stats.checkout_timeouts == 1
+        assert stats.max_checkout_wait_seconds >= 0.05
+        assert stats.checkout_wait_seconds >= stats.max_checkout_wait_seconds
+
+    def test_query_metrics(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("DB_STATEMENT_TIMEOUT", "0")
+        monkeypatch.setenv("DB_LOCK_TIMEOUT", "0")
+        db_connection = PostgresConnection(f"sqlite:///{tmp_path / 'metrics.db'}", PostgresSettings.from_env("DB"))
+        instrument_engine(db_connection.engine)
+
+        labels = {"statement": "SELECT", "outcome": "ok"}
+        before = REGISTRY.get_sample_value("db_query_duration_seconds_count", labels) or 0
+        with db_connection.engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            with pytest.raises(DBAPIError):
+                connection.execute(text("SELECT * FROM missing_table"))
+        assert REGISTRY.get_sample_value("db_query_duration_seconds_count", labels) == before + 1
+        assert REGISTRY.get_sample_value("db_query_duration_seconds_count", {"statement": "SELECT", "outcome": "error"}) >= 1
+
+        registry = CollectorRegistry()
+        registry.register(StatsCollector("db_pool", "driver", {"psycopg2": db_connection.stats}))
+        assert registry.get_sample_value("db_pool_checkouts", {"driver": "psycopg2"}) == 1
+        assert registry.get_sample_value("db_pool_idle", {"driver": "psycopg2"}) == 1
+
+    def test_statement_spans(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("DB_STATEMENT_TIMEOUT", "0")
+        monkeypatch.setenv("DB_LOCK_TIMEOUT", "0")
+        db_connection = PostgresConnection(f"sqlite:///{tmp_path / 'traces.db'}", PostgresSettings.from_env("DB"))
+        trace_engine(db_connection.engine)
+
+        configure_tracing("db_service", FileSpanExporter(str(tmp_path / "traces.jsonl")), sample_rate=1.0)
+        try:
+            with span("request") as request_span, db_connection.engine.connect() as connection:
+                connection.execute(text("SELECT :value"), {"value": "secret"})
+                with pytest.raises(DBAPIError):
+                    connection.execute(text("SELECT * FROM missing_table"))
+        finally:
+            shutdown_tracing()
+
+        lines = (tmp_path / "traces.jsonl").read_text().splitlines()
+        spans = [span for line in lines for span in json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]]
+        statement_spans = [span for span in spans if span["parentSpanId"] == request_span.span_id]
+        assert [span["name"] for span in statement_spans] == ["SELECT", "SELECT"]
+        assert all(span["traceId"] == request_span.trace_id for span in statement_spans)
+        # the statement is recorded, its parameters never are
+        assert "secret" not in json.dumps(spans)
+        assert [span["status"]["code"] for span in statement_spans] == [1, 2]
@@ -21,3 +21,12 @@ class KeyDoesNotExistError(StorageServiceError):
 class ImageDoesNotExistError(ImageServiceError):
     """ Raised when an image does not exist in image service """
     pass
+
+
+class NotModifiedError(ServiceError):
+    """ Raised when the stored data still matches the etag the caller has """
+    etag: str | None
+
+    def __init__(self, etag: str | None):
+        super().__init__(f"Not modified, etag: {etag}")
+        self.etag = etag
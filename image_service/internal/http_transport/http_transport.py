@@ -0,0 +1,229 @@
+import os
+import threading
+import time
+from collections import deque
+
+import httpx
+from pydantic import BaseModel
+
+from internal.metrics.metrics import CLIENT_REQUEST_DURATION
+from internal.tracing.tracing import TRACEPARENT_HEADER, Span, SpanKind, start_span
+
+
+class HTTPTransportSettings(BaseModel):
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 5.0
+    connect_timeout: float = 5.0
+    read_timeout: float = 30.0
+    pool_timeout: float = 5.0
+
+    @classmethod
+    def from_env(cls, prefix: str) -> "HTTPTransportSettings":
+        """ Reads settings from <PREFIX>_MAX_CONNECTIONS, <PREFIX>_KEEPALIVE_EXPIRY, etc., falling back to defaults """
+        values = {}
+        for field in cls.model_fields:
+            value = os.getenv(f"{prefix}_{field.upper()}")
+            if value is not None:
+                values[field] = value
+        return cls(**values)
+
+
+class HTTPTransportStats(BaseModel):
+    max_connections: int
+    open_connections: int
+    idle_connections: int
+    pending_requests: int
+    total_requests: int
+
+
+class _RequestConnection:
+    """ What one request does with a pool connection, as told by the trace events httpcore reports for it.
+    A request that doesn't connect reuses an idle connection, closing its response hands the connection back """
+    def __init__(self, owner: "HTTPTransport"):
+        self.owner = owner
+        self.started = time.monotonic()
+        self.connected = False
+        self.held = False
+        # set from the headers once the response is in, the pool closes connections that asked for it
+        self.keep_alive = True
+
+    def on_event(self, event: str):
+        if event == "connection.connect_tcp.complete":
+            self.connected = True
+            self.owner.connection_opened(self.started)
+        elif event.endswith(".send_request_headers.started") and not self.held:
+            self.held = True
+            if not self.connected:
+                self.owner.connection_reused()
+        elif event.endswith(".response_closed.complete") and self.held:
+            self.held = False
+            self.owner.connection_released(self.keep_alive)
+        elif event.endswith(".failed") and self.held:
+            # a connection that failed mid-request is dropped, a retry picks up another one
+            self.held = False
+            self.connected = False
+            self.owner.connection_closed()
+
+    def trace(self, event: str, info: dict):
+        self.on_event(event)
+
+    def set_response(self, request: httpx.Request, response: httpx.Response):
+        self.keep_alive = "close" not in (
+            request.headers.get("Connection", "").lower(),
+            response.headers.get("Connection", "").lower(),
+        )
+
+
+class _CountingTransport(httpx.HTTPTransport):
+    def __init__(self, owner: "HTTPTransport", **kwargs):
+        super().__init__(**kwargs)
+        self.owner = owner
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self.owner.request_started()
+        connection = _RequestConnection(self.owner)
+        request.extensions = {**request.extensions, "trace": connection.trace}
+        client_span = self.owner.start_span(request)
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = super().handle_request(request)
+            connection.set_response(request, response)
+            status = str(response.status_code)
+            return response
+        finally:
+            self.owner.request_finished()
+            self.owner.observe(request, status, time.perf_counter() - start)
+            self.owner.end_span(client_span, status)
+
+
+class HTTPTransport:
+    """ Pooled keep-alive connections to a single downstream service """
+    settings: HTTPTransportSettings
+    pending_requests: int
+    total_requests: int
+
+    def __init__(self, settings: HTTPTransportSettings, target: str = "downstream"):
+        self.settings = settings
+        # names the downstream service in client metrics
+        self.target = target
+        self.pending_requests = 0
+        self.total_requests = 0
+        self.open_connections = 0
+        # when each idle connection was handed back to the pool, oldest first
+        self._idle_since: deque[float] = deque()
+        # the sync client sends from thread pool workers
+        self._lock = threading.Lock()
+        self._client: httpx.Client | None = None
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.settings.max_connections,
+            max_keepalive_connections=self.settings.max_keepalive_connections,
+            keepalive_expiry=self.settings.keepalive_expiry,
+        )
+
+    def _timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(
+            connect=self.settings.connect_timeout,
+            read=self.settings.read_timeout,
+            write=self.settings.read_timeout,
+            pool=self.settings.pool_timeout,
+        )
+
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            self._client = httpx.Client(
+                transport=_CountingTransport(self, limits=self._limits()),
+                timeout=self._timeout(),
+            )
+        return self._client
+
+    def request_started(self):
+        with self._lock:
+            self.pending_requests += 1
+            self.total_requests += 1
+
+    def request_finished(self):
+        with self._lock:
+            self.pending_requests -= 1
+
+    def connection_opened(self, request_started: float):
+        with self._lock:
+            self.open_connections += 1
+            # the pool only connects when none of its idle connections is usable, so the ones that were idle
+            # before the request came in were closed by the server. Later ones may have been handed back since
+            while len(self._idle_since) > 0 and self._idle_since[0] < request_started:
+                self._idle_since.popleft()
+                self.open_connections -= 1
+
+    def connection_reused(self):
+        with self._lock:
+            self._expire_idle()
+            if len(self._idle_since) > 0:
+                self._idle_since.pop()
+
+    def connection_released(self, keep_alive: bool):
+        with self._lock:
+            if not keep_alive:
+                self.open_connections -= 1
+                return
+            self._idle_since.append(time.monotonic())
+            # the pool keeps at most max_keepalive_connections idle and closes the rest
+            while len(self._idle_since) > self.settings.max_keepalive_connections:
+                self._idle_since.popleft()
+                self.open_connections -= 1
+
+    def connection_closed(self):
+        with self._lock:
+            self.open_connections -= 1
+
+    def _expire_idle(self):
+        """ The pool closes connections idle for longer than keepalive_expiry, they are counted as closed """
+        now = time.monotonic()
+        while len(self._idle_since) > 0 and now - self._idle_since[0] > self.settings.keepalive_expiry:
+            self._idle_since.popleft()
+            self.open_connections -= 1
+
+    def observe(self, request: httpx.Request, status: str, duration: float):
+        CLIENT_REQUEST_DURATION.labels(self.target, request.method, status).observe(duration)
+
+    def start_span(self, request: httpx.Request) -> Span | None:
+        """ Starts the client span of a request and passes the trace on to the downstream service """
+        client_span = start_span(
+            f"{request.method} {self.target}",
+            SpanKind.CLIENT,
+            attributes={
+                "http.request.method": request.method,
+                "server.address": request.url.host,
+                "url.path": request.url.path,
+            },
+        )
+        if client_span is not None:
+            request.headers[TRACEPARENT_HEADER] = client_span.traceparent()
+        return client_span
+
+    @staticmethod
+    def end_span(client_span: Span | None, status: str):
+        if client_span is None:
+            return
+        if status == "error":
+            client_span.record_error("request failed")
+        else:
+            client_span.set_attribute("http.response.status_code", int(status))
+            if int(status) >= 500:
+                client_span.record_error(f"HTTP {status}")
+        client_span.end()
+
+    def stats(self) -> HTTPTransportStats:
+        """ Connections are counted from the requests' trace events, not read from the pool """
+        with self._lock:
+            self._expire_idle()
+            return HTTPTransportStats(
+                max_connections=self.settings.max_connections,
+                open_connections=self.open_connections,
+                idle_connections=len(self._idle_since),
+                pending_requests=self.pending_requests,
+                total_requests=self.total_requests,
+            )
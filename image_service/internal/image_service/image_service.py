@@ -1,9 +1,13 @@
+import contextvars
 import logging
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import BinaryIO, Iterator
 
 from internal.image_service_interface import ImageServiceInterface
 from internal.storage_service_client_interface import StorageServiceClientInterface
 from internal.errors.errors import KeyDoesNotExistError, ImageDoesNotExistError, StorageServiceError, ServiceError
-from models.image import Image
+from models.image import Image, ImageStream
 
 
 logger = logging.getLogger(__name__)
@@ -11,64 +15,139 @@ logger = logging.getLogger(__name__)
 
 class ImageService(ImageServiceInterface):
     storage_service_client: StorageServiceClientInterface
+    batch_concurrency: int
 
-    def __init__(self, storage_service_client: StorageServiceClientInterface):
+    def __init__(self, storage_service_client: StorageServiceClientInterface, batch_concurrency: int = 10):
         self.storage_service_client = storage_service_client
+        self.batch_concurrency = batch_concurrency
 
     def create_image(self, image: Image):
-        logger.info(f'Creating image with id: {image.image_id}')
+        logger.info('Creating image with id: %s', image.image_id)
 
         self.storage_service_client.create_data(
             key=image.image_id,
             b64_data=image.b64_data,
         )
 
-        logger.info(f'Created image with id: {image.image_id}')
+        logger.info('Created image with id: %s', image.image_id)
 
-    def retrieve_image(self, image_id: str) -> Image:
-        logger.info(f'Retrieving image with id: {image_id}')
+    def upload_image(self, image_id: str, data: BinaryIO, length: int):
+        logger.info('Uploading image with id: %s, length: %s', image_id, length)
 
         try:
-            image_b64_data = self.storage_service_client.retrieve_data(
+            self.storage_service_client.upload_data(
                 key=image_id,
+                data=data,
+                length=length,
+            )
+        except StorageServiceError as e:
+            logger.error("Couldn't upload image with id: %s, storage service error: %s", image_id, e)
+            raise
+
+        logger.info('Uploaded image with id: %s', image_id)
+
+    def retrieve_image(self, image_id: str, if_none_match: str | None = None) -> Image:
+        logger.info('Retrieving image with id: %s', image_id)
+
+        try:
+            stored_data = self.storage_service_client.retrieve_data(
+                key=image_id,
+                if_none_match=if_none_match,
             )
         except KeyDoesNotExistError as e:
-            logger.error(f'Image with id: {image_id} does not exist')
+            logger.error('Image with id: %s does not exist', image_id)
             raise ImageDoesNotExistError(e)
         except StorageServiceError as e:
-            logger.error(f"Couldn't retrieve image with id: {image_id}, storage service error: {e}")
+            logger.error("Couldn't retrieve image with id: %s, storage service error: %s", image_id, e)
             raise
 
-        logger.info(f'Retrieved image with id: {image_id}')
+        logger.info('Retrieved image with id: %s', image_id)
 
         return Image(
             image_id=image_id,
-            b64_data=image_b64_data,
+            b64_data=stored_data.b64_data,
+            etag=stored_data.etag,
         )
 
+    def retrieve_images(self, image_ids: list[str]) -> Iterator[tuple[str, Image | None]]:
+        """ Yields (image_id, image) pairs in request order, image is None for missing ids.
+        At most batch_concurrency images are being fetched or waiting to be consumed at a time.
+        Each fetch runs in a copy of the caller's context, so its storage request joins the caller's trace """
+        logger.info('Retrieving %s images', len(image_ids))
+
+        def retrieve_image(image_id: str) -> Image | None:
+            try:
+                return self.retrieve_image(image_id)
+            except ImageDoesNotExistError:
+                return None
+
+        with ThreadPoolExecutor(max_workers=self.batch_concurrency) as executor:
+            def submit(image_id: str) -> Future:
+                return executor.submit(contextvars.copy_context().run, retrieve_image, image_id)
+
+            pending: deque[tuple[str, Future]] = deque()
+            remaining_ids = iter(image_ids)
+            try:
+                for image_id in remaining_ids:
+                    pending.append((image_id, submit(image_id)))
+                    if len(pending) >= self.batch_concurrency:
+                        break
+
+                while pending:
+                    image_id, future = pending.popleft()
+                    image = future.result()
+                    next_image_id = next(remaining_ids, None)
+                    if next_image_id is not None:
+                        pending.append((next_image_id, submit(next_image_id)))
+                    yield image_id, image
+            finally:
+                for _, future in pending:
+                    future.cancel()
+
+        logger.info('Retrieved %s images', len(image_ids))
+
+    def open_image(self, image_id: str, if_none_match: str | None = None) -> ImageStream:
+        logger.info('Opening image stream with id: %s', image_id)
+
+        try:
+            image_stream = self.storage_service_client.open_data(
+                key=image_id,
+                if_none_match=if_none_match,
+            )
+        except KeyDoesNotExistError as e:
+            logger.error('Image with id: %s does not exist', image_id)
+            raise ImageDoesNotExistError(e)
+        except StorageServiceError as e:
+            logger.error("Couldn't open image stream with id: %s, storage service error: %s", image_id, e)
+            raise
+
+        logger.info('Opened image stream with id: %s', image_id)
+
+        return image_stream
+
     def update_image(self, image: Image):
-        logger.info(f'Updating image with id: {image.image_id}')
+        logger.info('Updating image with id: %s', image.image_id)
 
         try:
             self.create_image(image)
         except ServiceError as e:
-            logger.error(f"Couldn't update image with id: {image.image_id}, service error: {e}")
+            logger.error("Couldn't update image with id: %s, service error: %s", image.image_id, e)
             raise
 
-        logger.info(f"Updated image with id: {image.image_id}")
+        logger.info("Updated image with id: %s", image.image_id)
 
     def delete_image(self, image_id: str):
-        logger.info(f'Deleting image with id: {image_id}')
+        logger.info('Deleting image with id: %s', image_id)
 
         try:
             self.storage_service_client.delete_data(
                 key=image_id,
             )
         except KeyDoesNotExistError as e:
-            logger.error(f"Failed to delete image with id: {image_id}. Image does not exist")
+            logger.error("Failed to delete image with id: %s. Image does not exist", image_id)
             raise ImageDoesNotExistError(e)
         except StorageServiceError as e:
-            logger.error(f"Couldn't delete image with id: {image_id}, storage service error: {e}")
+            logger.error("Couldn't delete image with id: %s, storage service error: %s", image_id, e)
             raise
 
-        logger.info(f"Deleted image with id: {image_id}")
+        logger.info("Deleted image with id: %s", image_id)
@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
-from models.image import Image
+from typing import BinaryIO, Iterator
+
+from models.image import Image, ImageStream
 
 
 class ImageServiceInterface(ABC):
@@ -8,7 +10,21 @@ class ImageServiceInterface(ABC):
         ...
 
     @abstractmethod
-    def retrieve_image(self, image_id: str) -> Image:
+    def upload_image(self, image_id: str, data: BinaryIO, length: int):
+        ...
+
+    @abstractmethod
+    def retrieve_image(self, image_id: str, if_none_match: str | None = None) -> Image:
+        """ Raises NotModifiedError if if_none_match matches the stored image """
+        ...
+
+    @abstractmethod
+    def retrieve_images(self, image_ids: list[str]) -> Iterator[tuple[str, Image | None]]:
+        ...
+
+    @abstractmethod
+    def open_image(self, image_id: str, if_none_match: str | None = None) -> ImageStream:
+        """ Raises NotModifiedError if if_none_match matches the stored image """
         ...
 
     @abstractmethod
@@ -0,0 +1,59 @@
+import logging
+import queue
+import random
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# whether INFO and lower records of the current request are written, set per request by LogSamplingMiddleware
+_request_sampled: ContextVar[bool] = ContextVar("request_sampled", default=True)
+
+
+class RequestSamplingFilter(logging.Filter):
+    """ Drops INFO and lower records of requests that weren't sampled, warnings and errors are always kept """
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.INFO or _request_sampled.get()
+
+
+class LogSamplingMiddleware:
+    """ Keeps the INFO lines of sample_rate of the requests, all lines of a request are kept or dropped together """
+    def __init__(self, app, sample_rate: float = 1.0):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = _request_sampled.set(self.sample_rate >= 1.0 or random.random() < self.sample_rate)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_sampled.reset(token)
+
+
+def configure_logging(level: int | str = logging.INFO) -> QueueListener:
+    """ Sends every record through a queue, a listener thread writes them out,
+    so a slow stderr never blocks the event loop. Stop the returned listener on shutdown to flush the queue """
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    # the message is still merged with its args on the calling thread,
+    # so a record never reads objects that changed after it was logged
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(RequestSamplingFilter())
+
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+        handler.close()
+    root_logger.addHandler(queue_handler)
+    root_logger.setLevel(level)
+
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+
+    return listener
@@ -1,13 +1,22 @@
 from pydantic import BaseModel
 
 from models.image import Image
+from models.redacted import RedactedModel
 
 
-class CreateImageRequest(BaseModel):
+class CreateImageRequest(RedactedModel):
     b64_data: str
+    # lets callers pick the id up front, e.g. to write image and metadata concurrently.
+    # It must be fresh (a uuid4), like PUT /{image_id}/raw a create under a taken id overwrites that image
+    image_id: str | None = None
 
     def to_model(self) -> Image:
+        if self.image_id is None:
+            return Image(
+                b64_data=self.b64_data
+            )
         return Image(
+            image_id=self.image_id,
             b64_data=self.b64_data
         )
 
@@ -20,11 +29,27 @@ class CreateImageResponse(BaseModel):
 #     pass
 
 
-class GetImageResponse(BaseModel):
+class GetImageResponse(RedactedModel):
     b64_data: str
 
 
-class UpdateImageRequest(BaseModel):
+class BatchGetImagesRequest(BaseModel):
+    image_ids: list[str]
+
+
+class BatchImage(RedactedModel):
+    image_id: str
+    b64_data: str
+    # lets callers revalidate the image later with a conditional GET
+    etag: str | None = None
+
+
+class BatchGetImagesResponse(BaseModel):
+    images: list[BatchImage]
+    missing_ids: list[str]
+
+
+class UpdateImageRequest(RedactedModel):
     b64_data: str
 
     def to_model(self, image_id: str) -> Image:
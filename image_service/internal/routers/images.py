@@ -1,11 +1,20 @@
-from fastapi import APIRouter, status, HTTPException
+from tempfile import SpooledTemporaryFile
+
+from fastapi import APIRouter, status, Header, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 
 from internal.routers.dto.images import (CreateImageRequest, CreateImageResponse,
-                                GetImageResponse,
+                                GetImageResponse, BatchGetImagesRequest, BatchGetImagesResponse, BatchImage,
                                 UpdateImageRequest)
 from internal.image_service_interface import ImageServiceInterface
-from internal.errors.errors import ImageDoesNotExistError, ImageServiceError
-from models.image import Image
+from internal.errors.errors import ImageDoesNotExistError, ImageServiceError, NotModifiedError, ServiceError
+from models.image import Image, ImageStream
+
+
+MAX_BATCH_GET_IMAGES = 1000
+# uploads bigger than this are buffered on disk instead of in memory
+UPLOAD_SPOOL_MAX_SIZE = 1024 * 1024
 
 
 def get_router(image_service: ImageServiceInterface) -> APIRouter:
@@ -20,7 +29,7 @@ def get_router(image_service: ImageServiceInterface) -> APIRouter:
 
         try:
             image_service.create_image(image)
-        except ImageServiceError as e:
+        except ServiceError as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=str(e)
@@ -30,10 +39,20 @@ def get_router(image_service: ImageServiceInterface) -> APIRouter:
             image_id=image.image_id,
         )
 
-    @router.get("/{image_id}")
-    async def retrieve_image(image_id: str) -> GetImageResponse:
+    @router.get("/{image_id}", responses={status.HTTP_304_NOT_MODIFIED: {"description": "Not Modified"}})
+    async def retrieve_image(
+        image_id: str,
+        response: Response,
+        if_none_match: str | None = Header(default=None),
+    ) -> GetImageResponse:
         try:
-            image: Image = image_service.retrieve_image(image_id)
+            image: Image = image_service.retrieve_image(image_id, if_none_match)
+        except NotModifiedError as e:
+            # storage answers the condition, the image is not downloaded on a match
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED,
+                headers={"ETag": e.etag} if e.etag is not None else {},
+            )
         except ImageDoesNotExistError:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -44,15 +63,109 @@ def get_router(image_service: ImageServiceInterface) -> APIRouter:
                 detail=str(e),
             )
 
+        if image.etag is not None:
+            response.headers["ETag"] = image.etag
+
         return GetImageResponse(
             b64_data=image.b64_data,
         )
 
+    # creates the image or overwrites an existing one
+    @router.put(
+        "/{image_id}/raw",
+        openapi_extra={"requestBody": {"content": {"application/octet-stream": {}}, "required": True}},
+    )
+    async def upload_raw_image(image_id: str, request: Request):
+        with SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MAX_SIZE) as data:
+            length = 0
+            async for chunk in request.stream():
+                data.write(chunk)
+                length += len(chunk)
+            data.seek(0)
+
+            try:
+                await run_in_threadpool(image_service.upload_image, image_id, data, length)
+            except ServiceError as e:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=str(e),
+                )
+
+    @router.get(
+        "/{image_id}/raw",
+        response_class=StreamingResponse,
+        responses={
+            status.HTTP_200_OK: {"content": {"application/octet-stream": {}}},
+            status.HTTP_304_NOT_MODIFIED: {"description": "Not Modified"},
+        },
+    )
+    async def retrieve_raw_image(image_id: str, if_none_match: str | None = Header(default=None)) -> Response:
+        try:
+            # opening the stream waits for storage service to answer, that must not block the event loop
+            image_stream: ImageStream = await run_in_threadpool(image_service.open_image, image_id, if_none_match)
+        except NotModifiedError as e:
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED,
+                headers={"ETag": e.etag} if e.etag is not None else {},
+            )
+        except ImageDoesNotExistError:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+            )
+        except ImageServiceError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=str(e),
+            )
+
+        headers = {}
+        if image_stream.content_length is not None:
+            headers["Content-Length"] = str(image_stream.content_length)
+        if image_stream.etag is not None:
+            headers["ETag"] = image_stream.etag
+
+        return StreamingResponse(
+            image_stream.chunks,
+            media_type=image_stream.content_type,
+            headers=headers,
+        )
+
+    @router.post("/batch-get")
+    async def retrieve_images(request: BatchGetImagesRequest) -> BatchGetImagesResponse:
+        if len(request.image_ids) > MAX_BATCH_GET_IMAGES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Can't retrieve more than {MAX_BATCH_GET_IMAGES} images at once",
+            )
+
+        def retrieve_batch() -> BatchGetImagesResponse:
+            response = BatchGetImagesResponse(images=[], missing_ids=[])
+            for image_id, image in image_service.retrieve_images(request.image_ids):
+                if image is None:
+                    response.missing_ids.append(image_id)
+                    continue
+                response.images.append(BatchImage(
+                    image_id=image_id,
+                    b64_data=image.b64_data,
+                    etag=image.etag,
+                ))
+            return response
+
+        # the whole batch is fetched before the status is sent, a storage failure partway through
+        # is reported as an error instead of a body cut off in the middle
+        try:
+            return await run_in_threadpool(retrieve_batch)
+        except ServiceError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=str(e),
+            )
+
     # right now it's effectively the same as CREATE operation (overwrites existing data)
     # having a dedicated update handler will come in handy if image service functionality ever expands
     @router.put("/{image_id}")
     async def update_image(image_id: str, image_data: UpdateImageRequest):
-        image_service.create_image(image_data.to_model(image_id))
+        image_service.update_image(image_data.to_model(image_id))
 
     @router.delete("/{image_id}")
     async def delete_image(image_id: str):
@@ -0,0 +1,12 @@
+from abc import ABC, abstractmethod
+
+
+class SpanExporterInterface(ABC):
+    @abstractmethod
+    def export(self, request: dict):
+        """ Sends one OTLP ExportTraceServiceRequest, in the protobuf JSON encoding """
+        ...
+
+    @abstractmethod
+    def close(self):
+        ...
@@ -1,5 +1,10 @@
+import base64
+import hashlib
+from typing import BinaryIO
+
 from internal.storage_service_client_interface import StorageServiceClientInterface
-from internal.errors.errors import KeyDoesNotExistError
+from internal.errors.errors import KeyDoesNotExistError, NotModifiedError
+from models.image import ImageStream, StoredData
 
 
 class FakeStorageServiceClient(StorageServiceClientInterface):
@@ -11,15 +16,38 @@ class FakeStorageServiceClient(StorageServiceClientInterface):
     def create_data(self, key: str, b64_data: str):
         self.fake_storage[key] = b64_data
 
-    def retrieve_data(self, key: str) -> str:
+    def upload_data(self, key: str, data: BinaryIO, length: int):
+        self.fake_storage[key] = base64.b64encode(data.read(length)).decode()
+
+    def retrieve_data(self, key: str, if_none_match: str | None = None) -> StoredData:
         data = self.fake_storage.get(key)
         if data is None:
             raise KeyDoesNotExistError(f"Key {key} does not exist")
 
-        return data
+        etag = f'"{hashlib.md5(data.encode()).hexdigest()}"'
+        if if_none_match == etag:
+            raise NotModifiedError(etag)
+
+        return StoredData(
+            b64_data=data,
+            etag=etag,
+        )
+
+    def open_data(self, key: str, if_none_match: str | None = None) -> ImageStream:
+        stored_data = self.retrieve_data(key, if_none_match)
+        data = base64.b64decode(stored_data.b64_data)
+        return ImageStream(
+            content_type="application/octet-stream",
+            content_length=len(data),
+            etag=stored_data.etag,
+            chunks=iter([data]),
+        )
 
     def delete_data(self, key: str):
         if key not in self.fake_storage.keys():
             raise KeyDoesNotExistError(f"Key {key} does not exist")
 
         del self.fake_storage[key]
+
+    def close(self):
+        pass
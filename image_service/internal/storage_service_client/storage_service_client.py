@@ -1,39 +1,49 @@
-import requests
+import httpx
 import logging
+from typing import BinaryIO, Iterator
 
 from internal.storage_service_client_interface import StorageServiceClientInterface
-from internal.errors.errors import StorageServiceError, KeyDoesNotExistError
+from internal.errors.errors import StorageServiceError, KeyDoesNotExistError, NotModifiedError
+from models.image import ImageStream, StoredData
 
 
 logger = logging.getLogger(__name__)
 
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
 
 class StorageServiceClient(StorageServiceClientInterface):
     storage_service_endpoint: str
+    http_client: httpx.Client
 
-    def __init__(self, storage_service_endpoint: str):
+    def __init__(self, storage_service_endpoint: str, http_client: httpx.Client | None = None):
         self.storage_service_endpoint = storage_service_endpoint
+        self.http_client = http_client if http_client is not None else httpx.Client()
+
+    def close(self):
+        self.http_client.close()
 
     def create_data(self, key: str, b64_data: str):
-        logger.info(f'Creating data with key: {key}')
+        logger.info('Creating data with key: %s', key)
 
         try:
-            create_data_response = requests.post(
+            create_data_response = self.http_client.post(
                 self.storage_service_endpoint + "/",
                 json={
                     "key": key,
                     "b64_data": b64_data,
                 },
             )
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Request to storage service: {self.storage_service_endpoint} failed. Error: {e}")
+        except httpx.RequestError as e:
+            logger.error("Request to storage service: %s failed. Error: %s", self.storage_service_endpoint, e)
             raise StorageServiceError(f"Couldn't make the request: {e}")
 
         if create_data_response.status_code != 201:
             logger.error(
-                f"Failed to create data with key: {key}, "
-                f"code: {create_data_response.status_code}, "
-                f"message: {create_data_response.text}"
+                "Failed to create data with key: %s, code: %s, message: %s",
+                key,
+                create_data_response.status_code,
+                create_data_response.text
             )
             raise StorageServiceError(
                 f"Storage service error. "
@@ -41,19 +51,60 @@ class StorageServiceClient(StorageServiceClientInterface):
                 f"Message: {create_data_response.text}"
             )
 
-        logger.info(f"Created data with key: {key}")
+        logger.info("Created data with key: %s", key)
+
+    def upload_data(self, key: str, data: BinaryIO, length: int):
+        logger.info('Uploading data with key: %s, length: %s', key, length)
 
-    def retrieve_data(self, key: str) -> str:
-        logger.info(f'Retrieving data with key: {key}')
+        def chunks() -> Iterator[bytes]:
+            while chunk := data.read(UPLOAD_CHUNK_SIZE):
+                yield chunk
 
         try:
-            retrieve_data_response = requests.get(
+            upload_data_response = self.http_client.put(
+                self.storage_service_endpoint + f"/{key}/raw",
+                content=chunks(),
+                headers={
+                    "Content-Type": "application/octet-stream",
+                    "Content-Length": str(length),
+                },
+            )
+        except httpx.RequestError as e:
+            logger.error("Request to storage service: %s failed. Error: %s", self.storage_service_endpoint, e)
+            raise StorageServiceError(f"Couldn't make the request: {e}")
+
+        if upload_data_response.status_code != 200:
+            logger.error(
+                "Failed to upload data with key: %s, code: %s, message: %s",
+                key,
+                upload_data_response.status_code,
+                upload_data_response.text
+            )
+            raise StorageServiceError(
+                f"Storage service error. "
+                f"Code: {upload_data_response.status_code} "
+                f"Message: {upload_data_response.text}"
+            )
+
+        logger.info("Uploaded data with key: %s", key)
+
+    def retrieve_data(self, key: str, if_none_match: str | None = None) -> StoredData:
+        logger.info('Retrieving data with key: %s', key)
+
+        headers = {"If-None-Match": if_none_match} if if_none_match is not None else {}
+        try:
+            retrieve_data_response = self.http_client.get(
                 self.storage_service_endpoint + f"/{key}",
+                headers=headers,
             )
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Request to storage service: {self.storage_service_endpoint} failed. Error: {e}")
+        except httpx.RequestError as e:
+            logger.error("Request to storage service: %s failed. Error: %s", self.storage_service_endpoint, e)
             raise StorageServiceError(f"Couldn't make the request: {e}")
 
+        if retrieve_data_response.status_code == 304:
+            logger.info("Data with key: %s not modified", key)
+            raise NotModifiedError(retrieve_data_response.headers.get("ETag"))
+
         if retrieve_data_response.status_code == 404:
             raise KeyDoesNotExistError(
                 f"Storage service error. "
@@ -63,9 +114,10 @@ class StorageServiceClient(StorageServiceClientInterface):
 
         if retrieve_data_response.status_code != 200:
             logger.error(
-                f"Failed to create data with key: {key}, "
-                f"code: {retrieve_data_response.status_code}, "
-                f"message: {retrieve_data_response.text}"
+                "Failed to create data with key: %s, code: %s, message: %s",
+                key,
+                retrieve_data_response.status_code,
+                retrieve_data_response.text
             )
             raise StorageServiceError(
                 f"Storage service error. "
@@ -75,23 +127,88 @@ class StorageServiceClient(StorageServiceClientInterface):
 
         b64_data = retrieve_data_response.json()["b64_data"]
 
-        logger.info(f"Retrieved data with key: {key}")
+        logger.info("Retrieved data with key: %s", key)
+
+        return StoredData(
+            b64_data=b64_data,
+            etag=retrieve_data_response.headers.get("ETag"),
+        )
+
+    def open_data(self, key: str, if_none_match: str | None = None) -> ImageStream:
+        logger.info('Opening data stream with key: %s', key)
+
+        headers = {"If-None-Match": if_none_match} if if_none_match is not None else {}
+        request = self.http_client.build_request(
+            "GET",
+            self.storage_service_endpoint + f"/{key}/raw",
+            headers=headers,
+        )
+        try:
+            open_data_response = self.http_client.send(request, stream=True)
+        except httpx.RequestError as e:
+            logger.error("Request to storage service: %s failed. Error: %s", self.storage_service_endpoint, e)
+            raise StorageServiceError(f"Couldn't make the request: {e}")
+
+        if open_data_response.status_code != 200:
+            open_data_response.read()
+            open_data_response.close()
+
+        if open_data_response.status_code == 304:
+            logger.info("Data with key: %s not modified", key)
+            raise NotModifiedError(open_data_response.headers.get("ETag"))
+
+        if open_data_response.status_code == 404:
+            raise KeyDoesNotExistError(
+                f"Storage service error. "
+                f"Code: {open_data_response.status_code} "
+                f"Message: {open_data_response.text}"
+            )
+
+        if open_data_response.status_code != 200:
+            logger.error(
+                "Failed to open data stream with key: %s, code: %s, message: %s",
+                key,
+                open_data_response.status_code,
+                open_data_response.text
+            )
+            raise StorageServiceError(
+                f"Storage service error. "
+                f"Code: {open_data_response.status_code} "
+                f"Message: {open_data_response.text}"
+            )
 
-        return b64_data
+        def stream() -> Iterator[bytes]:
+            try:
+                yield from open_data_response.iter_bytes()
+            except httpx.RequestError as e:
+                logger.error("Data stream with key: %s was interrupted. Error: %s", key, e)
+                raise StorageServiceError(f"Data stream was interrupted: {e}")
+            finally:
+                open_data_response.close()
+
+        # chunked responses don't carry a length
+        content_length = open_data_response.headers.get("Content-Length")
+
+        return ImageStream(
+            content_type=open_data_response.headers.get("Content-Type", "application/octet-stream"),
+            content_length=int(content_length) if content_length is not None else None,
+            etag=open_data_response.headers.get("ETag"),
+            chunks=stream(),
+        )
 
     def delete_data(self, key: str):
-        logger.info(f'Deleting data with key: {key}')
+        logger.info('Deleting data with key: %s', key)
 
         try:
-            delete_data_response = requests.delete(
+            delete_data_response = self.http_client.delete(
                 self.storage_service_endpoint + f"/{key}",
             )
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Request to storage service: {self.storage_service_endpoint} failed. Error: {e}")
+        except httpx.RequestError as e:
+            logger.error("Request to storage service: %s failed. Error: %s", self.storage_service_endpoint, e)
             raise StorageServiceError(f"Couldn't make the request: {e}")
 
         if delete_data_response.status_code == 404:
-            logger.error(f"Failed to delete data with key: {key}")
+            logger.error("Failed to delete data with key: %s", key)
             raise KeyDoesNotExistError(
                 f"Storage service error. "
                 f"Code: {delete_data_response.status_code} "
@@ -100,9 +217,10 @@ class StorageServiceClient(StorageServiceClientInterface):
 
         if delete_data_response.status_code != 200:
             logger.error(
-                f"Failed to create data with key: {key}, "
-                f"code: {delete_data_response.status_code}, "
-                f"message: {delete_data_response.text}"
+                "Failed to create data with key: %s, code: %s, message: %s",
+                key,
+                delete_data_response.status_code,
+                delete_data_response.text
             )
             raise StorageServiceError(
                 f"Storage service error. "
@@ -110,4 +228,4 @@ class StorageServiceClient(StorageServiceClientInterface):
                 f"Message: {delete_data_response.text}"
             )
 
-        logger.info(f"Deleted data with key: {key}")
+        logger.info("Deleted data with key: %s", key)
@@ -1,4 +1,7 @@
 from abc import ABC, abstractmethod
+from typing import BinaryIO
+
+from models.image import ImageStream, StoredData
 
 
 class StorageServiceClientInterface(ABC):
@@ -7,9 +10,23 @@ class StorageServiceClientInterface(ABC):
         ...
 
     @abstractmethod
-    def retrieve_data(self, key: str) -> str:
+    def upload_data(self, key: str, data: BinaryIO, length: int):
+        ...
+
+    @abstractmethod
+    def retrieve_data(self, key: str, if_none_match: str | None = None) -> StoredData:
+        """ Raises NotModifiedError if if_none_match matches the stored data """
+        ...
+
+    @abstractmethod
+    def open_data(self, key: str, if_none_match: str | None = None) -> ImageStream:
+        """ Raises NotModifiedError if if_none_match matches the stored data """
         ...
 
     @abstractmethod
     def delete_data(self, key: str):
         ...
+
+    @abstractmethod
+    def close(self):
+        ...
@@ -0,0 +1,285 @@
+import logging
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, Iterator
+
+from internal.span_exporter_interface import SpanExporterInterface
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT_HEADER = "traceparent"
+_TRACEPARENT_PATTERN = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class SpanKind(IntEnum):
+    # values of the OTLP SpanKind enum
+    INTERNAL = 1
+    SERVER = 2
+    CLIENT = 3
+
+
+class Span:
+    __slots__ = ("name", "kind", "trace_id", "span_id", "parent_span_id", "sampled",
+                 "start_time", "end_time", "attributes", "error")
+
+    def __init__(
+            self,
+            name: str,
+            kind: SpanKind,
+            trace_id: str,
+            parent_span_id: str | None,
+            sampled: bool,
+            attributes: dict[str, Any] | None = None,
+    ):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_span_id = parent_span_id
+        self.sampled = sampled
+        self.start_time = time.time_ns()
+        self.end_time: int | None = None
+        self.attributes = attributes if attributes is not None else {}
+        self.error: str | None = None
+
+    def set_attribute(self, key: str, value: Any):
+        if self.sampled:
+            self.attributes[key] = value
+
+    def record_error(self, error: BaseException | str):
+        self.error = str(error) if str(error) != "" else type(error).__name__
+
+    def traceparent(self) -> str:
+        """ The W3C traceparent header value that makes this span the parent of the next hop """
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def end(self):
+        if self.end_time is not None:
+            return
+        self.end_time = time.time_ns()
+        if self.sampled and _tracer is not None:
+            _tracer.enqueue(self)
+
+
+def parse_traceparent(value: str | None) -> tuple[str, str, bool] | None:
+    """ Returns trace id, parent span id and the sampled flag, or None if the header is missing or malformed """
+    if value is None:
+        return None
+    match = _TRACEPARENT_PATTERN.match(value.strip().lower())
+    if match is None:
+        return None
+    trace_id, parent_span_id, flags = match.groups()
+    if trace_id == "0" * 32 or parent_span_id == "0" * 16:
+        return None
+    return trace_id, parent_span_id, int(flags, 16) & 1 == 1
+
+
+class Tracer:
+    """ Collects ended spans and exports them in batches from a background thread,
+    so exporting never holds up a request. Spans that don't fit in the queue are dropped """
+    def __init__(
+            self,
+            service_name: str,
+            exporter: SpanExporterInterface,
+            sample_rate: float,
+            max_queue_size: int = 10000,
+            batch_size: int = 512,
+            flush_interval: float = 5.0,
+    ):
+        self.service_name = service_name
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped_spans = 0
+        self._queue: queue.Queue[Span | None] = queue.Queue(maxsize=max_queue_size)
+        self._worker = threading.Thread(target=self._export_loop, name="span-exporter", daemon=True)
+        self._worker.start()
+
+    def should_sample(self) -> bool:
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def enqueue(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped_spans += 1
+
+    def shutdown(self):
+        """ Exports the spans still in the queue and closes the exporter """
+        self._queue.put(None)
+        self._worker.join()
+        self.exporter.close()
+
+    def _export_loop(self):
+        stopped = False
+        while not stopped:
+            batch: list[Span] = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    span = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if span is None:
+                    stopped = True
+                    break
+                batch.append(span)
+
+            if len(batch) > 0:
+                try:
+                    self.exporter.export(encode_spans(self.service_name, batch))
+                except Exception as e:
+                    logger.error("Failed to export %s spans, error: %s", len(batch), e)
+
+
+_tracer: Tracer | None = None
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def configure_tracing(service_name: str, exporter: SpanExporterInterface, sample_rate: float) -> Tracer:
+    global _tracer
+    _tracer = Tracer(service_name, exporter, sample_rate)
+    return _tracer
+
+
+def shutdown_tracing():
+    global _tracer
+    if _tracer is not None:
+        _tracer.shutdown()
+        _tracer = None
+
+
+def start_span(
+        name: str,
+        kind: SpanKind = SpanKind.INTERNAL,
+        traceparent: str | None = None,
+        attributes: dict[str, Any] | None = None,
+) -> Span | None:
+    """ Starts a child of the current span, or of traceparent if given.
+    Without a parent, this is where the trace is sampled or not. None if tracing is off.
+    The span isn't made current, end() it when done """
+    if _tracer is None:
+        return None
+
+    remote_parent = parse_traceparent(traceparent)
+    parent = _current_span.get()
+    if remote_parent is not None:
+        trace_id, parent_span_id, sampled = remote_parent
+    elif parent is not None:
+        trace_id, parent_span_id, sampled = parent.trace_id, parent.span_id, parent.sampled
+    else:
+        trace_id, parent_span_id, sampled = f"{random.getrandbits(128):032x}", None, _tracer.should_sample()
+
+    # unsampled spans are still created, so the decision is passed on to the next hop
+    return Span(name, kind, trace_id, parent_span_id, sampled, attributes if sampled else None)
+
+
+@contextmanager
+def span(
+        name: str,
+        kind: SpanKind = SpanKind.INTERNAL,
+        traceparent: str | None = None,
+        attributes: dict[str, Any] | None = None,
+) -> Iterator[Span | None]:
+    """ A span that is current while the block runs, ended with an error if the block raises """
+    current = start_span(name, kind, traceparent, attributes)
+    if current is None:
+        yield None
+        return
+
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.record_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end()
+
+
+def _encode_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def encode_spans(service_name: str, spans: list[Span]) -> dict:
+    """ An OTLP ExportTraceServiceRequest in the protobuf JSON encoding """
+    return {
+        "resourceSpans": [{
+            "resource": {
+                "attributes": [{"key": "service.name", "value": {"stringValue": service_name}}],
+            },
+            "scopeSpans": [{
+                "scope": {"name": service_name},
+                "spans": [
+                    {
+                        "traceId": item.trace_id,
+                        "spanId": item.span_id,
+                        "parentSpanId": item.parent_span_id or "",
+                        "name": item.name,
+                        "kind": int(item.kind),
+                        "startTimeUnixNano": str(item.start_time),
+                        "endTimeUnixNano": str(item.end_time),
+                        "attributes": [
+                            {"key": key, "value": _encode_value(value)} for key, value in item.attributes.items()
+                        ],
+                        # OTLP status codes, 1 - ok, 2 - error
+                        "status": {"code": 2, "message": item.error} if item.error is not None else {"code": 1},
+                    }
+                    for item in spans
+                ],
+            }],
+        }],
+    }
+
+
+class TracingMiddleware:
+    """ Continues the caller's trace from the traceparent header, or starts one, with a server span per request """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or _tracer is None:
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        method = scope["method"]
+        status = 500
+
+        async def status_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        with span(method, SpanKind.SERVER, traceparent, {"http.request.method": method, "url.path": scope["path"]}) \
+                as server_span:
+            await self.app(scope, receive, status_send)
+
+            # the route template is known only after routing, ids in the path would make every name unique
+            route = scope.get("route")
+            if route is not None:
+                server_span.name = f"{method} {route.path}"
+                server_span.set_attribute("http.route", route.path)
+            server_span.set_attribute("http.response.status_code", status)
+            if status >= 500:
+                server_span.record_error(f"HTTP {status}")
@@ -1,20 +1,25 @@
 import logging
 import os
 import shutil
+from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
 from fastapi import FastAPI
+from prometheus_client import REGISTRY
 
+from internal.http_transport.http_transport import HTTPTransport, HTTPTransportSettings
 from internal.image_service.image_service import ImageService
-from internal.routers import images
+from internal.logging_setup.logging_setup import LogSamplingMiddleware, configure_logging
+from internal.metrics.metrics import MetricsMiddleware, StatsCollector
+from internal.routers import images, metrics
+from internal.span_exporter_interface import SpanExporterInterface
 from internal.storage_service_client.storage_service_client import StorageServiceClient
 from internal.storage_service_client_interface import StorageServiceClientInterface
+from internal.tracing.file_span_exporter import FileSpanExporter
+from internal.tracing.otlp_span_exporter import OTLPSpanExporter
+from internal.tracing.tracing import TracingMiddleware, configure_tracing, shutdown_tracing
 
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO,
-    force=True
-)
+log_listener = configure_logging()
 logger = logging.getLogger(__name__)
 
 if not os.path.isfile("./.env") and os.path.isfile("./.env.example"):
@@ -28,20 +33,54 @@ load_dotenv(
 logger.info("Loaded environment variables from .env file")
 
 log_level = os.getenv('LOG_LEVEL', 'INFO')
-logger.setLevel(log_level)
+logging.getLogger().setLevel(log_level)
+# share of requests whose INFO lines are logged, warnings and errors are always logged
+log_sample_rate = float(os.getenv('LOG_SAMPLE_RATE', '1.0'))
+
+# tracing is off unless an exporter is chosen, only TRACE_SAMPLE_RATE of the traces started here are recorded,
+# traces continued from an upstream traceparent follow the upstream's decision
+trace_exporter = os.getenv('TRACE_EXPORTER', 'none')
+span_exporter: SpanExporterInterface | None = None
+if trace_exporter == "file":
+    span_exporter = FileSpanExporter(os.getenv('TRACE_FILE', './traces.jsonl'))
+elif trace_exporter == "otlp":
+    span_exporter = OTLPSpanExporter(os.getenv('TRACE_OTLP_ENDPOINT', 'http://localhost:4318'))
+if span_exporter is not None:
+    configure_tracing("image_service", span_exporter, float(os.getenv('TRACE_SAMPLE_RATE', '0.01')))
+    logger.info("Exporting traces to %s", trace_exporter)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    yield
+    storage_service_client.close()
+    logger.info("Closed storage service client")
+    shutdown_tracing()
+    log_listener.stop()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(LogSamplingMiddleware, sample_rate=log_sample_rate)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
 logger.info("Successfully initialized FastAPI app")
 
 storage_service_endpoint: str = os.getenv("S3_ENDPOINT")
 assert storage_service_endpoint is not None, "S3_ENDPOINT environment variable must be set"
+storage_service_transport = HTTPTransport(
+    settings=HTTPTransportSettings.from_env("S3"),
+    target="storage_service",
+)
 storage_service_client: StorageServiceClientInterface = StorageServiceClient(
     storage_service_endpoint=storage_service_endpoint,
+    http_client=storage_service_transport.client(),
 )
 logger.info("Successfully initialized S3 client")
 
+image_batch_concurrency = int(os.getenv("IMAGE_BATCH_CONCURRENCY", "10"))
 service = ImageService(
     storage_service_client=storage_service_client,
+    batch_concurrency=image_batch_concurrency,
 )
 logger.info("Successfully initialized image service")
 
@@ -49,5 +88,10 @@ image_router = images.get_router(
     image_service=service,
 )
 
+REGISTRY.register(StatsCollector("http_client_pool", "target", {
+    "storage_service": storage_service_transport.stats,
+}))
+
 app.include_router(image_router)
+app.include_router(metrics.get_router())
 logger.info("Successfully included image service router, starting up..")
@@ -1,9 +1,28 @@
 import uuid
+from typing import Iterator
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
+from models.redacted import RedactedModel
 
-class Image(BaseModel):
+
+class Image(RedactedModel):
     image_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     b64_data: str
+    etag: str | None = None
+
+
+class StoredData(RedactedModel):
+    b64_data: str
+    etag: str | None = None
+
+
+
+class ImageStream(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
 
+    content_type: str
+    # None when the upstream response was chunked
+    content_length: int | None = None
+    etag: str | None = None
+    chunks: Iterator[bytes]
@@ -1,6 +1,9 @@
 import base64
+import io
+import json
 import random
 
+import httpx
 import pytest
 
 from fastapi.testclient import TestClient
@@ -13,6 +16,11 @@ from internal.routers import images
 from internal.image_service_interface import ImageServiceInterface
 from internal.image_service.image_service import ImageService
 from internal.storage_service_client.fake_storage_service_client import FakeStorageServiceClient
+from internal.storage_service_client.storage_service_client import StorageServiceClient
+from internal.errors.errors import KeyDoesNotExistError, NotModifiedError, StorageServiceError
+from internal.http_transport.http_transport import HTTPTransport, HTTPTransportSettings
+from internal.tracing.file_span_exporter import FileSpanExporter
+from internal.tracing.tracing import configure_tracing, shutdown_tracing, span
 
 
 @pytest.fixture(scope="function")
@@ -163,3 +171,205 @@ class TestImageService:
         )
         assert retrieve_image2_response.status_code == status.HTTP_200_OK
         assert retrieve_image2_response.json()["b64_data"] == image2_request.b64_data
+
+    def test_batch_get_images(self, client, create_image_request_factory):
+        image_requests = [create_image_request_factory.get() for _ in range(15)]
+        image_ids = self.create_images(client, image_requests)
+
+        requested_ids = image_ids[:7] + ["missing-1"] + image_ids[7:] + ["missing-2"]
+        response = client.post(
+            self.ROUTE_PREFIX + "/batch-get",
+            json={"image_ids": requested_ids},
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        response_json = response.json()
+        assert [image["image_id"] for image in response_json["images"]] == image_ids
+        assert [image["b64_data"] for image in response_json["images"]] == [r.b64_data for r in image_requests]
+        assert response_json["missing_ids"] == ["missing-1", "missing-2"]
+        assert response_json["images"][0]["etag"] == client.get(self.ROUTE_PREFIX + f"/{image_ids[0]}").headers["ETag"]
+
+        empty_response = client.post(
+            self.ROUTE_PREFIX + "/batch-get",
+            json={"image_ids": []},
+        )
+        assert empty_response.status_code == status.HTTP_200_OK
+        assert empty_response.json() == {"images": [], "missing_ids": []}
+
+    def test_batch_get_images_storage_failure(self, create_image_request_factory):
+        class FailingStorageServiceClient(FakeStorageServiceClient):
+            failing_keys: set[str] = set()
+
+            def retrieve_data(self, key: str, if_none_match: str | None = None):
+                if key in self.failing_keys:
+                    raise StorageServiceError("storage is down")
+                return super().retrieve_data(key, if_none_match)
+
+        storage_client = FailingStorageServiceClient()
+        with TestClient(images.get_router(ImageService(storage_service_client=storage_client))) as client:
+            image_ids = self.create_images(client, [create_image_request_factory.get() for _ in range(15)])
+            storage_client.failing_keys = {image_ids[9]}
+
+            # an image failing partway through fails the whole request, no partial body is sent
+            with pytest.raises(HTTPException) as e:
+                client.post(
+                    self.ROUTE_PREFIX + "/batch-get",
+                    json={"image_ids": image_ids},
+                )
+            assert e.value.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+
+    def test_create_image_with_id(self, client, create_image_request_factory):
+        image_request = create_image_request_factory.get()
+        image_request.image_id = "chosen-by-caller"
+
+        image_id, = self.create_images(client, [image_request])
+        assert image_id == "chosen-by-caller"
+
+        response = client.get(
+            self.ROUTE_PREFIX + f"/{image_id}",
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["b64_data"] == image_request.b64_data
+
+    def test_retrieve_raw_image(self, client, create_image_request_factory):
+        image_request = create_image_request_factory.get()
+        image_id, = self.create_images(client, [image_request])
+
+        response = client.get(
+            self.ROUTE_PREFIX + f"/{image_id}/raw",
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.content == base64.b64decode(image_request.b64_data)
+        assert response.headers["Content-Length"] == str(len(response.content))
+
+        with pytest.raises(HTTPException):
+            client.get(
+                self.ROUTE_PREFIX + "/missing/raw",
+            )
+
+    def test_storage_service_client_open_data(self):
+        png_data = b"\x89PNG\r\n\x1a\n" + bytes(range(256))
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path == "/data/chunked/raw":
+                return httpx.Response(200, content=iter([png_data]), headers={"Content-Type": "image/png"})
+            if request.url.path != "/data/present/raw":
+                return httpx.Response(404)
+            return httpx.Response(200, content=png_data, headers={"Content-Type": "image/png"})
+
+        storage_client = StorageServiceClient(
+            storage_service_endpoint="http://storage/data",
+            http_client=httpx.Client(transport=httpx.MockTransport(handler)),
+        )
+
+        image_stream = storage_client.open_data("present")
+        assert image_stream.content_type == "image/png"
+        assert image_stream.content_length == len(png_data)
+        assert b"".join(image_stream.chunks) == png_data
+
+        image_stream = storage_client.open_data("chunked")
+        assert image_stream.content_length is None
+        assert b"".join(image_stream.chunks) == png_data
+
+        with pytest.raises(KeyDoesNotExistError):
+            storage_client.open_data("missing")
+
+    def test_upload_raw_image(self, client, create_image_request_factory):
+        image_data = bytes(range(256)) * 8
+
+        def chunks():
+            for i in range(0, len(image_data), 100):
+                yield image_data[i:i + 100]
+
+        response = client.put(
+            self.ROUTE_PREFIX + "/uploaded/raw",
+            content=chunks(),
+            headers={"Content-Type": "application/octet-stream"},
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        response = client.get(
+            self.ROUTE_PREFIX + "/uploaded",
+        )
+        assert base64.b64decode(response.json()["b64_data"]) == image_data
+
+        uploaded_bodies: list[bytes] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            uploaded_bodies.append(request.read())
+            assert request.headers["Content-Length"] == str(len(image_data))
+            return httpx.Response(200)
+
+        storage_client = StorageServiceClient(
+            storage_service_endpoint="http://storage/data",
+            http_client=httpx.Client(transport=httpx.MockTransport(handler)),
+        )
+        storage_client.upload_data("uploaded", io.BytesIO(image_data), len(image_data))
+        assert uploaded_bodies == [image_data]
+
+    def test_conditional_image_retrieval(self, client, create_image_request_factory):
+        image_request = create_image_request_factory.get()
+        image_id, = self.create_images(client, [image_request])
+
+        response = client.get(
+            self.ROUTE_PREFIX + f"/{image_id}",
+        )
+        etag = response.headers["ETag"]
+
+        for route in (f"/{image_id}", f"/{image_id}/raw"):
+            response = client.get(
+                self.ROUTE_PREFIX + route,
+                headers={"If-None-Match": etag},
+            )
+            assert response.status_code == status.HTTP_304_NOT_MODIFIED
+            assert response.headers["ETag"] == etag
+            assert response.content == b""
+
+            response = client.get(
+                self.ROUTE_PREFIX + route,
+                headers={"If-None-Match": '"stale"'},
+            )
+            assert response.status_code == status.HTTP_200_OK
+            assert response.headers["ETag"] == etag
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            assert request.headers["If-None-Match"] == etag
+            return httpx.Response(304, headers={"ETag": etag})
+
+        storage_client = StorageServiceClient(
+            storage_service_endpoint="http://storage/data",
+            http_client=httpx.Client(transport=httpx.MockTransport(handler)),
+        )
+        with pytest.raises(NotModifiedError) as e:
+            storage_client.retrieve_data(image_id, if_none_match=etag)
+        assert e.value.etag == etag
+
+    def test_retrieve_images_tracing(self, tmp_path, b64_string_factory):
+        configure_tracing("image_service", FileSpanExporter(str(tmp_path / "traces.jsonl")), sample_rate=1.0)
+        transport = HTTPTransport(HTTPTransportSettings(), target="storage_service")
+        b64_data = b64_string_factory.get()
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            # stands in for the pooled transport, which starts the client span in the thread sending the request
+            transport.end_span(transport.start_span(request), "200")
+            return httpx.Response(200, json={"b64_data": b64_data}, headers={"ETag": '"etag"'})
+
+        storage_client = StorageServiceClient(
+            storage_service_endpoint="http://storage/data",
+            http_client=httpx.Client(transport=httpx.MockTransport(handler)),
+        )
+        service = ImageService(storage_service_client=storage_client, batch_concurrency=2)
+        try:
+            with span("batch-get") as batch_span:
+                images = list(service.retrieve_images(["a", "b", "c"]))
+        finally:
+            shutdown_tracing()
+        assert [image.b64_data for _, image in images] == [b64_data] * 3
+
+        lines = (tmp_path / "traces.jsonl").read_text().splitlines()
+        spans = [item for line in lines for item in json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]]
+        storage_spans = [item for item in spans if item["name"] == "GET storage_service"]
+        assert len(storage_spans) == 3
+        # storage requests made on the batch's worker threads are children of the batch, not new traces
+        assert {item["traceId"] for item in storage_spans} == {batch_span.trace_id}
+        assert {item["parentSpanId"] for item in storage_spans} == {batch_span.span_id}
@@ -0,0 +1,172 @@
+import argparse
+import asyncio
+import logging
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from report import LoadTestReport, summarize
+from services import REPO_ROOT, start_services, stop_services
+from workload import DEFAULT_MIX, Recorder, Workload, parse_mix, run_closed_loop, run_open_loop
+
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO,
+    force=True
+)
+logger = logging.getLogger(__name__)
+# one line per request would drown the summary
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Boots the four services and drives a mixed meme workload through the meme service",
+    )
+    parser.add_argument("--duration", type=float, default=30, help="seconds to measure for, default - 30")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=16,
+        help="requests in flight at once, the number of workers without --rate, default - 16",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        help="requests per second to start on a fixed schedule, latency then includes time spent queued "
+             "behind --concurrency, by default every worker sends its next request as soon as it gets an answer",
+    )
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=DEFAULT_MIX,
+        help=f"operation weights, operations: create, read, read_image, list, update, delete, default - {DEFAULT_MIX}",
+    )
+    parser.add_argument("--image-size", type=int, default=64 * 1024, help="bytes per meme image, default - 65536")
+    parser.add_argument("--preload", type=int, default=100, help="memes created before measuring, default - 100")
+    parser.add_argument("--output", default="load_test_report.json", help="report file, default - load_test_report.json")
+    parser.add_argument(
+        "--target",
+        help="meme service URL to test a running deployment, e.g. http://127.0.0.1:8080, nothing is started then",
+    )
+    parser.add_argument(
+        "--storage-backend",
+        choices=["memory", "filesystem", "minio"],
+        default="memory",
+        help="minio reads S3_* from the environment or storage_service/.env, default - memory",
+    )
+    parser.add_argument(
+        "--db-backend",
+        choices=["memory", "postgres"],
+        default="memory",
+        help="postgres reads DB_URL from the environment or db_service/.env, default - memory",
+    )
+    parser.add_argument("--db-driver", choices=["psycopg2", "asyncpg"], default="psycopg2",
+                        help="postgres driver, default - psycopg2")
+    parser.add_argument("--base-port", type=int, default=18080,
+                        help="meme service port, db, image and storage services get the next three, default - 18080")
+    parser.add_argument("--data-dir", default="./load_test_data",
+                        help="service logs and filesystem storage, default - ./load_test_data")
+    parser.add_argument("--log-level", default="WARNING", help="services' LOG_LEVEL, default - WARNING")
+    parser.add_argument("--startup-timeout", type=float, default=30, help="seconds per service to start, default - 30")
+
+    return parser.parse_args()
+
+
+def current_commit() -> str | None:
+    """ The commit the services run from, with a -dirty suffix if the tree has uncommitted changes """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT, capture_output=True, text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + "-dirty" if dirty != "" else commit
+
+
+async def run(args: argparse.Namespace, meme_service_url: str) -> LoadTestReport:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        workload = Workload(
+            client=client,
+            memes_endpoint=f"{meme_service_url.rstrip('/')}/memes",
+            mix=args.mix,
+            image_size=args.image_size,
+            recorder=recorder,
+        )
+        await workload.preload(args.preload, args.concurrency)
+
+        started_at = datetime.now(timezone.utc).isoformat()
+        start = time.perf_counter()
+        if args.rate is not None:
+            await run_open_loop(workload, args.rate, args.concurrency, args.duration)
+        else:
+            await run_closed_loop(workload, args.concurrency, args.duration)
+        duration = time.perf_counter() - start
+
+    all_latencies = [latency for latencies in recorder.latencies.values() for latency in latencies]
+    all_statuses: dict[str, int] = {}
+    for statuses in recorder.statuses.values():
+        for status, count in statuses.items():
+            all_statuses[status] = all_statuses.get(status, 0) + count
+
+    return LoadTestReport(
+        commit=current_commit(),
+        started_at=started_at,
+        duration_seconds=duration,
+        config={key: value for key, value in vars(args).items() if key != "output"},
+        total=summarize(all_latencies, all_statuses, duration),
+        operations={
+            operation: summarize(recorder.latencies[operation], recorder.statuses[operation], duration)
+            for operation in sorted(recorder.latencies)
+        },
+    )
+
+
+def main():
+    args = parse_args()
+
+    services = []
+    if args.target is None:
+        services = start_services(
+            base_port=args.base_port,
+            storage_backend=args.storage_backend,
+            db_backend=args.db_backend,
+            db_driver=args.db_driver,
+            log_level=args.log_level,
+            data_dir=Path(args.data_dir).resolve(),
+            startup_timeout=args.startup_timeout,
+        )
+    meme_service_url = args.target if args.target is not None else services[-1].url
+
+    try:
+        report = asyncio.run(run(args, meme_service_url))
+    finally:
+        stop_services(services)
+
+    Path(args.output).write_text(report.model_dump_json(indent=2))
+
+    for operation, operation_report in {**report.operations, "total": report.total}.items():
+        logger.info(
+            "%-10s %8.1f req/s, p50 %7.1f ms, p95 %7.1f ms, p99 %7.1f ms, errors %s/%s",
+            operation,
+            operation_report.throughput,
+            operation_report.latency_ms.p50,
+            operation_report.latency_ms.p95,
+            operation_report.latency_ms.p99,
+            operation_report.errors,
+            operation_report.requests,
+        )
+    logger.info("Wrote report to %s", args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import math
+from typing import Any
+
+from pydantic import BaseModel
+
+
+class LatencySummary(BaseModel):
+    p50: float
+    p95: float
+    p99: float
+    max: float
+    mean: float
+
+
+class OperationReport(BaseModel):
+    requests: int
+    errors: int
+    # requests per second over the whole run
+    throughput: float
+    latency_ms: LatencySummary
+    # response status codes, or the exception name of requests that got no response
+    statuses: dict[str, int]
+
+
+class LoadTestReport(BaseModel):
+    commit: str | None
+    started_at: str
+    duration_seconds: float
+    config: dict[str, Any]
+    total: OperationReport
+    operations: dict[str, OperationReport]
+
+
+def is_error(status: str) -> bool:
+    return not status.isdigit() or int(status) >= 400
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """ Nearest-rank percentile, always one of the measured values """
+    if len(sorted_values) == 0:
+        return 0.0
+    rank = max(math.ceil(q / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: list[float], statuses: dict[str, int], duration: float) -> OperationReport:
+    """ Latencies are in seconds, the report is in milliseconds """
+    sorted_latencies = sorted(latency * 1000 for latency in latencies)
+    return OperationReport(
+        requests=len(sorted_latencies),
+        errors=sum(count for status, count in statuses.items() if is_error(status)),
+        throughput=len(sorted_latencies) / duration if duration > 0 else 0.0,
+        latency_ms=LatencySummary(
+            p50=percentile(sorted_latencies, 50),
+            p95=percentile(sorted_latencies, 95),
+            p99=percentile(sorted_latencies, 99),
+            max=sorted_latencies[-1] if len(sorted_latencies) > 0 else 0.0,
+            mean=sum(sorted_latencies) / len(sorted_latencies) if len(sorted_latencies) > 0 else 0.0,
+        ),
+        statuses=dict(sorted(statuses.items())),
+    )
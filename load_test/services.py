@@ -0,0 +1,127 @@
+import logging
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+# start order, every service only calls the ones started before it
+SERVICES = ("storage_service", "db_service", "image_service", "meme_service")
+# offsets from the base port, the same layout as the default ports 8080-8083
+PORT_OFFSETS = {"meme_service": 0, "db_service": 1, "image_service": 2, "storage_service": 3}
+
+
+class ServiceProcess:
+    """ One service run by uvicorn in a child process, its output goes to a log file """
+    def __init__(self, name: str, port: int, env: dict[str, str], log_path: Path):
+        self.name = name
+        self.port = port
+        self.env = env
+        self.log_path = log_path
+        self.process: subprocess.Popen | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self):
+        log_file = open(self.log_path, "wb")
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(self.port),
+             "--no-access-log"],
+            cwd=REPO_ROOT / self.name,
+            env=self.env,
+            stdout=log_file,
+            stderr=subprocess.STDOUT,
+        )
+        log_file.close()
+
+    def wait_ready(self, timeout: float):
+        """ Every service serves /metrics, it answering means the app finished starting up """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"{self.name} exited with code {self.process.returncode}, see {self.log_path}")
+            try:
+                if httpx.get(f"{self.url}/metrics", timeout=1).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError(f"{self.name} didn't start in {timeout} seconds, see {self.log_path}")
+
+    def stop(self):
+        if self.process is None or self.process.poll() is not None:
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+def service_env(name: str, ports: dict[str, int], storage_backend: str, db_backend: str, db_driver: str,
+                log_level: str, data_dir: Path) -> dict[str, str]:
+    """ The environment overrides whatever the service's .env file sets, connection settings are inherited,
+    so e.g. S3_* or DB_URL exported in the shell pick the real backends """
+    env = dict(os.environ)
+    env["LOG_LEVEL"] = log_level
+    if name == "storage_service":
+        env["STORAGE_BACKEND"] = storage_backend
+        env["STORAGE_PATH"] = str(data_dir / "storage")
+    elif name == "db_service":
+        env["DB_BACKEND"] = db_backend
+        env["DB_DRIVER"] = db_driver
+    elif name == "image_service":
+        env["S3_ENDPOINT"] = f"http://127.0.0.1:{ports['storage_service']}/data"
+    elif name == "meme_service":
+        env["IMAGE_SERVICE_ENDPOINT"] = f"http://127.0.0.1:{ports['image_service']}/images"
+        env["DB_SERVICE_ENDPOINT"] = f"http://127.0.0.1:{ports['db_service']}/memes"
+
+    return env
+
+
+def start_services(
+        base_port: int,
+        storage_backend: str,
+        db_backend: str,
+        db_driver: str,
+        log_level: str,
+        data_dir: Path,
+        startup_timeout: float,
+) -> list[ServiceProcess]:
+    """ Starts the services one by one, each after the ones it calls are ready.
+    On failure the ones already started are stopped """
+    ports = {name: base_port + offset for name, offset in PORT_OFFSETS.items()}
+    data_dir.mkdir(parents=True, exist_ok=True)
+
+    services: list[ServiceProcess] = []
+    try:
+        for name in SERVICES:
+            service = ServiceProcess(
+                name=name,
+                port=ports[name],
+                env=service_env(name, ports, storage_backend, db_backend, db_driver, log_level, data_dir),
+                log_path=data_dir / f"{name}.log",
+            )
+            services.append(service)
+            service.start()
+            service.wait_ready(startup_timeout)
+            logger.info("Started %s at %s", name, service.url)
+    except BaseException:
+        stop_services(services)
+        raise
+
+    return services
+
+
+def stop_services(services: list[ServiceProcess]):
+    # callers first, so nothing is left waiting on a service that is already gone
+    for service in reversed(services):
+        service.stop()
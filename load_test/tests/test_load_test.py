@@ -0,0 +1,88 @@
+import asyncio
+import itertools
+import json
+
+import httpx
+import pytest
+
+from report import percentile, summarize
+from workload import MemePool, Recorder, Workload, parse_mix, run_closed_loop
+
+
+class TestLoadTest:
+    def test_parse_mix(self):
+        assert parse_mix("create=1, read=5") == {"create": 1.0, "read": 5.0}
+        with pytest.raises(ValueError):
+            parse_mix("create=1,upload=2")
+        with pytest.raises(ValueError):
+            parse_mix("create=0")
+
+    def test_summarize(self):
+        values = [float(i) for i in range(1, 101)]
+        assert percentile(values, 50) == 50
+        assert percentile(values, 99) == 99
+        assert percentile([], 99) == 0
+
+        report = summarize([i / 1000 for i in range(1, 101)], {"200": 97, "404": 2, "ReadTimeout": 1}, duration=2)
+        assert report.requests == 100
+        assert report.errors == 3
+        assert report.throughput == 50
+        assert report.latency_ms.p95 == pytest.approx(95)
+        assert report.latency_ms.max == pytest.approx(100)
+
+    def test_meme_pool(self):
+        pool = MemePool()
+        for meme_id in ("a", "b", "c"):
+            pool.add(meme_id)
+
+        in_use = [pool.acquire() for _ in range(100)]
+        assert set(in_use) == {"a", "b", "c"}
+        # every id is in use, nothing can be deleted
+        assert pool.take() is None
+
+        for meme_id in in_use:
+            pool.release(meme_id)
+        assert sorted(pool.take() for _ in range(3)) == ["a", "b", "c"]
+        assert len(pool) == 0
+        assert pool.acquire() is None
+
+    def test_workload(self):
+        memes = {}
+        meme_ids = itertools.count()
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            meme_id = request.url.path.removeprefix("/memes/").removesuffix("/image")
+            if request.method == "POST":
+                meme_id = f"meme{next(meme_ids)}"
+                memes[meme_id] = request.content
+                return httpx.Response(201, json={"meme_id": meme_id})
+            if request.method == "GET" and meme_id == "":
+                return httpx.Response(200, json={"memes": [], "next_cursor": None})
+            if meme_id not in memes:
+                return httpx.Response(404)
+            if request.method == "DELETE":
+                del memes[meme_id]
+            if request.method == "PUT":
+                assert "caption" in json.loads(request.content)
+            return httpx.Response(200)
+
+        async def run() -> Recorder:
+            recorder = Recorder()
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                workload = Workload(
+                    client=client,
+                    memes_endpoint="http://meme-service/memes",
+                    mix=parse_mix("create=1,read=1,read_image=1,list=1,update=1,delete=1"),
+                    image_size=1024,
+                    recorder=recorder,
+                )
+                await workload.preload(10, concurrency=4)
+                await run_closed_loop(workload, concurrency=4, duration=0.2)
+            return recorder
+
+        recorder = asyncio.run(run())
+
+        assert set(recorder.statuses) == {"create", "read", "read_image", "list", "update", "delete"}
+        # deletes never race the other requests, so no meme is missing when it's asked for
+        assert all("404" not in statuses for statuses in recorder.statuses.values())
+        assert all(len(image) == 1024 for image in memes.values())
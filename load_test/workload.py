@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import random
+import time
+from collections import Counter, defaultdict
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+OPERATIONS = ("create", "read", "read_image", "list", "update", "delete")
+DEFAULT_MIX = "create=2,read=10,read_image=4,list=2,update=1,delete=1"
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    """ Parses operation weights like create=1,read=5 """
+    mix = {}
+    for part in value.split(","):
+        operation, _, weight = part.partition("=")
+        operation = operation.strip()
+        if operation not in OPERATIONS:
+            raise ValueError(f"Unknown operation: {operation}, expected one of {', '.join(OPERATIONS)}")
+        mix[operation] = float(weight)
+    if sum(mix.values()) <= 0:
+        raise ValueError("Operation weights must add up to more than 0")
+
+    return mix
+
+
+class Recorder:
+    """ Latencies and response statuses per operation """
+    latencies: dict[str, list[float]]
+    statuses: dict[str, Counter]
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    def record(self, operation: str, status: str, latency: float):
+        self.latencies[operation].append(latency)
+        self.statuses[operation][status] += 1
+
+
+class MemePool:
+    """ Ids of the memes created so far. Requests mark the id they use, deletes only take unused ids,
+    so a read never races a delete of its meme and fails for reasons the service isn't to blame for """
+    def __init__(self):
+        self._ids: list[str] = []
+        self._positions: dict[str, int] = {}
+        self._in_use: Counter = Counter()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, meme_id: str):
+        self._positions[meme_id] = len(self._ids)
+        self._ids.append(meme_id)
+
+    def acquire(self) -> str | None:
+        if len(self._ids) == 0:
+            return None
+        meme_id = random.choice(self._ids)
+        self._in_use[meme_id] += 1
+        return meme_id
+
+    def release(self, meme_id: str):
+        self._in_use[meme_id] -= 1
+        if self._in_use[meme_id] == 0:
+            del self._in_use[meme_id]
+
+    def take(self, attempts: int = 8) -> str | None:
+        """ Removes an id nothing uses, None if a few random tries all hit ids in use """
+        for _ in range(min(attempts, len(self._ids))):
+            meme_id = random.choice(self._ids)
+            if meme_id not in self._in_use:
+                self._remove(meme_id)
+                return meme_id
+        return None
+
+    def _remove(self, meme_id: str):
+        # swap with the last id, so removal doesn't shift the list
+        position = self._positions.pop(meme_id)
+        last_id = self._ids.pop()
+        if last_id != meme_id:
+            self._ids[position] = last_id
+            self._positions[last_id] = position
+
+
+class Workload:
+    """ Mixed meme requests against the meme service, each recorded under its operation name """
+    def __init__(
+            self,
+            client: httpx.AsyncClient,
+            memes_endpoint: str,
+            mix: dict[str, float],
+            image_size: int,
+            recorder: Recorder,
+    ):
+        self.client = client
+        self.memes_endpoint = memes_endpoint.rstrip("/")
+        self.operations = list(mix.keys())
+        self.weights = list(mix.values())
+        self.image = random.randbytes(image_size)
+        self.recorder = recorder
+        self.pool = MemePool()
+
+    async def preload(self, count: int, concurrency: int):
+        """ Creates memes for reads to hit before the measured run, these requests aren't recorded """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def create() -> str:
+            async with semaphore:
+                return await self._create()
+
+        statuses = Counter(await asyncio.gather(*(create() for _ in range(count))))
+        logger.info("Preloaded %s memes, statuses: %s", len(self.pool), dict(statuses))
+
+    async def run_one(self, scheduled_start: float | None = None):
+        """ Runs a random operation, its latency counts from scheduled_start if given """
+        start = scheduled_start if scheduled_start is not None else time.perf_counter()
+        operation = random.choices(self.operations, self.weights)[0]
+
+        if operation == "create" or len(self.pool) == 0:
+            operation, status = "create", await self._create()
+        elif operation == "delete":
+            meme_id = self.pool.take()
+            if meme_id is None:
+                operation, status = "create", await self._create()
+            else:
+                status = await self._request("DELETE", f"{self.memes_endpoint}/{meme_id}")
+        elif operation == "list":
+            status = await self._request("GET", f"{self.memes_endpoint}/", params={"after": "", "limit": 10})
+        else:
+            meme_id = self.pool.acquire()
+            try:
+                status = await self._run_on_meme(operation, meme_id)
+            finally:
+                self.pool.release(meme_id)
+
+        self.recorder.record(operation, status, time.perf_counter() - start)
+
+    async def _run_on_meme(self, operation: str, meme_id: str) -> str:
+        if operation == "read":
+            return await self._request("GET", f"{self.memes_endpoint}/{meme_id}")
+        if operation == "read_image":
+            return await self._request("GET", f"{self.memes_endpoint}/{meme_id}/image")
+        return await self._request(
+            "PUT",
+            f"{self.memes_endpoint}/{meme_id}",
+            json={"caption": f"updated at {time.time()}"},
+        )
+
+    async def _create(self) -> str:
+        try:
+            response = await self.client.post(
+                f"{self.memes_endpoint}/",
+                params={"caption": "load test"},
+                content=self.image,
+                headers={"Content-Type": "application/octet-stream"},
+            )
+        except httpx.HTTPError as e:
+            return type(e).__name__
+        if response.status_code == 201:
+            self.pool.add(response.json()["meme_id"])
+        return str(response.status_code)
+
+    async def _request(self, method: str, url: str, **kwargs) -> str:
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            return type(e).__name__
+        return str(response.status_code)
+
+
+async def run_closed_loop(workload: Workload, concurrency: int, duration: float):
+    """ A fixed number of workers, each sending its next request as soon as the last one is answered """
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            await workload.run_one()
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def run_open_loop(workload: Workload, rate: float, max_in_flight: int, duration: float):
+    """ Requests start on a fixed schedule whether earlier ones are answered or not, and their latency counts from
+    the scheduled start, so a stalling service shows up in the tail latencies instead of lowering the request rate """
+    semaphore = asyncio.Semaphore(max_in_flight)
+    tasks: set[asyncio.Task] = set()
+
+    async def run(scheduled_start: float):
+        async with semaphore:
+            await workload.run_one(scheduled_start)
+
+    start = time.perf_counter()
+    for i in range(int(rate * duration)):
+        scheduled_start = start + i / rate
+        delay = scheduled_start - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        task = asyncio.create_task(run(scheduled_start))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    await asyncio.gather(*tasks)
@@ -0,0 +1,128 @@
+import argparse
+import asyncio
+import logging
+import os
+import shutil
+import sys
+from contextlib import nullcontext
+
+from dotenv import load_dotenv
+
+from internal.db_service_client.async_db_service_client import AsyncDatabaseServiceClient
+from internal.http_transport.http_transport import HTTPTransport, HTTPTransportSettings
+from internal.image_service_client.async_image_service_client import AsyncImageServiceClient
+from internal.meme_backup.backup_archive import read_backup
+from internal.meme_backup.meme_exporter import MemeExporter
+from internal.meme_import.checkpoint import ImportCheckpoint
+from internal.meme_import.http_meme_import_target import HTTPMemeImportTarget
+from internal.meme_import.meme_importer import MemeImporter
+
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO,
+    # the backup itself may be written to stdout
+    stream=sys.stderr,
+    force=True
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Exports every meme with its image to a single tar archive, or restores one",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="write a backup")
+    export_parser.add_argument("backup", help="backup file to write, - for stdout")
+    export_parser.add_argument("--gzip", action="store_true", help="compress the backup")
+    export_parser.add_argument("--concurrency", type=int, default=16,
+                               help="max images fetched ahead of the one being written, default - 16")
+
+    restore_parser = commands.add_parser("restore", help="load a backup")
+    restore_parser.add_argument("backup", help="backup file to read, - for stdin")
+    restore_parser.add_argument("--checkpoint", help="file to record restored memes in, default - <backup>.checkpoint")
+    restore_parser.add_argument("--concurrency", type=int, default=32, help="max images uploaded at once, default - 32")
+    restore_parser.add_argument("--batch-size", type=int, default=500,
+                                help="memes stored per database request, default - 500")
+
+    return parser.parse_args()
+
+
+async def export_backup(args: argparse.Namespace, image_service_client, database_service_client):
+    exporter = MemeExporter(
+        db_service_client=database_service_client,
+        image_service_client=image_service_client,
+        concurrency=args.concurrency,
+    )
+    with nullcontext(sys.stdout.buffer) if args.backup == "-" else open(args.backup, "wb") as backup:
+        manifest = await exporter.export(backup, compress=args.gzip)
+
+    logger.info("Exported %s memes, %s bytes of images", manifest.memes, manifest.total_bytes)
+    if len(manifest.skipped_meme_ids) > 0:
+        # the backup is still usable, but it is not complete
+        logger.error("Memes left out because their image is missing: %s", ", ".join(manifest.skipped_meme_ids))
+        sys.exit(1)
+
+
+async def restore_backup(args: argparse.Namespace, image_service_client, database_service_client):
+    if args.checkpoint is not None:
+        checkpoint_path = args.checkpoint
+    else:
+        checkpoint_path = "restore.checkpoint" if args.backup == "-" else args.backup + ".checkpoint"
+    checkpoint = ImportCheckpoint(checkpoint_path)
+    logger.info("Resuming from %s, %s memes already restored", checkpoint_path, len(checkpoint.completed))
+
+    importer = MemeImporter(
+        target=HTTPMemeImportTarget(
+            image_service_client=image_service_client,
+            db_service_client=database_service_client,
+        ),
+        checkpoint=checkpoint,
+        concurrency=args.concurrency,
+        batch_size=args.batch_size,
+    )
+    try:
+        with nullcontext(sys.stdin.buffer) if args.backup == "-" else open(args.backup, "rb") as backup:
+            report = await importer.run(read_backup(backup))
+    finally:
+        checkpoint.close()
+
+    logger.info("Restored: %s, skipped: %s, failed: %s", report.imported, report.skipped, report.failed)
+
+
+async def main():
+    args = parse_args()
+
+    if not os.path.isfile("./.env") and os.path.isfile("./.env.example"):
+        shutil.copyfile("./.env.example", "./.env")
+        logger.warning("Created .env file with default values from .env.example")
+
+    load_dotenv(
+        dotenv_path="./.env",
+        override=False,
+    )
+
+    assert "IMAGE_SERVICE_ENDPOINT" in os.environ, "IMAGE_SERVICE_ENDPOINT environment variable must be set"
+    assert "DB_SERVICE_ENDPOINT" in os.environ, "DB_SERVICE_ENDPOINT environment variable must be set"
+
+    image_service_client = AsyncImageServiceClient(
+        image_service_endpoint=os.environ["IMAGE_SERVICE_ENDPOINT"],
+        http_client=HTTPTransport(settings=HTTPTransportSettings.from_env("IMAGE_SERVICE")).async_client(),
+    )
+    database_service_client = AsyncDatabaseServiceClient(
+        db_service_endpoint=os.environ["DB_SERVICE_ENDPOINT"],
+        http_client=HTTPTransport(settings=HTTPTransportSettings.from_env("DB_SERVICE")).async_client(),
+    )
+    try:
+        if args.command == "export":
+            await export_backup(args, image_service_client, database_service_client)
+        else:
+            await restore_backup(args, image_service_client, database_service_client)
+    finally:
+        await image_service_client.close()
+        await database_service_client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
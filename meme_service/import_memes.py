@@ -0,0 +1,125 @@
+import argparse
+import asyncio
+import logging
+import os
+import shutil
+
+from dotenv import load_dotenv
+
+from internal.db_service_client.async_db_service_client import AsyncDatabaseServiceClient
+from internal.db_service_client.db_service_client import DatabaseServiceClient
+from internal.http_transport.http_transport import HTTPTransport, HTTPTransportSettings
+from internal.image_service_client.async_image_service_client import AsyncImageServiceClient
+from internal.image_service_client.image_service_client import ImageServiceClient
+from internal.meme_import.archive import read_archive, read_captions
+from internal.meme_import.checkpoint import ImportCheckpoint
+from internal.meme_import.http_meme_import_target import HTTPMemeImportTarget
+from internal.meme_import.meme_importer import MemeImporter
+from internal.meme_import.meme_service_import_target import MemeServiceImportTarget
+from internal.meme_import_target_interface import MemeImportTargetInterface
+from internal.meme_service.meme_service import MemeServiceV1
+
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO,
+    force=True
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Imports a directory or a tarball of images as memes",
+    )
+    parser.add_argument("archive", help="directory or tarball (.tar, .tar.gz, ...) with the images")
+    parser.add_argument("--captions", help="CSV file with filename and caption columns")
+    parser.add_argument("--checkpoint", help="file to record imported images in, default - <archive>.checkpoint")
+    parser.add_argument("--concurrency", type=int, default=32, help="max images uploaded at once, default - 32")
+    parser.add_argument("--batch-size", type=int, default=500, help="memes stored per database request, default - 500")
+    parser.add_argument(
+        "--target",
+        choices=["http", "in-process"],
+        default="http",
+        help="http - upload straight to image and database services, batching database inserts; "
+             "in-process - the same uploads and batched inserts through the sync clients of MemeServiceV1 running in this "
+             "process, default - http",
+    )
+
+    return parser.parse_args()
+
+
+def create_target(target: str) -> MemeImportTargetInterface:
+    assert "IMAGE_SERVICE_ENDPOINT" in os.environ, "IMAGE_SERVICE_ENDPOINT environment variable must be set"
+    assert "DB_SERVICE_ENDPOINT" in os.environ, "DB_SERVICE_ENDPOINT environment variable must be set"
+
+    image_service_transport = HTTPTransport(
+        settings=HTTPTransportSettings.from_env("IMAGE_SERVICE"),
+    )
+    database_service_transport = HTTPTransport(
+        settings=HTTPTransportSettings.from_env("DB_SERVICE"),
+    )
+
+    if target == "in-process":
+        db_service_client = DatabaseServiceClient(
+            db_service_endpoint=os.environ["DB_SERVICE_ENDPOINT"],
+            http_client=database_service_transport.client(),
+        )
+        meme_service = MemeServiceV1(
+            db_service_client=db_service_client,
+            image_service_client=ImageServiceClient(
+                image_service_endpoint=os.environ["IMAGE_SERVICE_ENDPOINT"],
+                http_client=image_service_transport.client(),
+            ),
+        )
+        return MemeServiceImportTarget(meme_service)
+
+    return HTTPMemeImportTarget(
+        image_service_client=AsyncImageServiceClient(
+            image_service_endpoint=os.environ["IMAGE_SERVICE_ENDPOINT"],
+            http_client=image_service_transport.async_client(),
+        ),
+        db_service_client=AsyncDatabaseServiceClient(
+            db_service_endpoint=os.environ["DB_SERVICE_ENDPOINT"],
+            http_client=database_service_transport.async_client(),
+        ),
+    )
+
+
+async def main():
+    args = parse_args()
+
+    if not os.path.isfile("./.env") and os.path.isfile("./.env.example"):
+        shutil.copyfile("./.env.example", "./.env")
+        logger.warning("Created .env file with default values from .env.example")
+
+    load_dotenv(
+        dotenv_path="./.env",
+        override=False,
+    )
+
+    captions = read_captions(args.captions) if args.captions is not None else {}
+    logger.info("Loaded %s captions", len(captions))
+
+    checkpoint_path = args.checkpoint if args.checkpoint is not None else args.archive.rstrip("/") + ".checkpoint"
+    checkpoint = ImportCheckpoint(checkpoint_path)
+    logger.info("Resuming from %s, %s images already imported", checkpoint_path, len(checkpoint.completed))
+
+    target = create_target(args.target)
+    importer = MemeImporter(
+        target=target,
+        checkpoint=checkpoint,
+        captions=captions,
+        concurrency=args.concurrency,
+        batch_size=args.batch_size,
+    )
+    try:
+        report = await importer.run(read_archive(args.archive))
+    finally:
+        await target.close()
+        checkpoint.close()
+
+    logger.info("Imported: %s, skipped: %s, failed: %s", report.imported, report.skipped, report.failed)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,47 @@
+from abc import ABC, abstractmethod
+from typing import AsyncIterator
+
+from models.meme import DBMeme, DBMemeBulkResult, DBMemePage
+
+
+class AsyncDatabaseServiceClientInterface(ABC):
+    @abstractmethod
+    async def create_meme(self, meme: DBMeme):
+        ...
+
+    @abstractmethod
+    async def create_memes(self, memes: list[DBMeme]) -> list[DBMemeBulkResult]:
+        ...
+
+    @abstractmethod
+    async def retrieve_meme(self, meme_id: str) -> DBMeme:
+        ...
+
+    @abstractmethod
+    async def retrieve_memes(self, skip: int, limit: int) -> list[DBMeme]:
+        ...
+
+    @abstractmethod
+    async def retrieve_memes_page(self, after: str, limit: int) -> DBMemePage:
+        ...
+
+    @abstractmethod
+    def export_memes(self) -> AsyncIterator[DBMeme]:
+        """ Yields every meme ordered by database id, raises DBServiceError if the export is cut short """
+        ...
+
+    @abstractmethod
+    async def retrieve_memes_by_ids(self, meme_ids: list[str]) -> list[DBMeme]:
+        ...
+
+    @abstractmethod
+    async def update_meme(self, meme_id: str, caption: str) -> DBMeme:
+        ...
+
+    @abstractmethod
+    async def delete_meme(self, meme_id: str) -> DBMeme:
+        ...
+
+    @abstractmethod
+    async def close(self):
+        ...
@@ -0,0 +1,44 @@
+from abc import ABC, abstractmethod
+
+from models.image import ImageRevision, ImageStream, ImageUpload
+
+
+class AsyncImageServiceClientInterface(ABC):
+    @abstractmethod
+    async def create_image(self, b64_data: str, image_id: str | None = None) -> str:
+        ...
+
+    @abstractmethod
+    async def upload_image(self, image_id: str, image: ImageUpload):
+        ...
+
+    @abstractmethod
+    async def retrieve_image(self, image_id: str) -> str:
+        ...
+
+    @abstractmethod
+    async def retrieve_image_revision(self, image_id: str, if_none_match: str | None = None) -> ImageRevision:
+        """ Raises ImageNotModifiedError if if_none_match matches the stored image """
+        ...
+
+    @abstractmethod
+    async def retrieve_images(self, image_ids: list[str]) -> dict[str, ImageRevision]:
+        """ Missing images are left out """
+        ...
+
+    @abstractmethod
+    async def open_image(self, image_id: str, if_none_match: str | None = None) -> ImageStream:
+        """ Raises ImageNotModifiedError if if_none_match matches the stored image """
+        ...
+
+    @abstractmethod
+    async def update_image(self, image_id: str, b64_data: str):
+        ...
+
+    @abstractmethod
+    async def delete_image(self, image_id: str):
+        ...
+
+    @abstractmethod
+    async def close(self):
+        ...
@@ -0,0 +1,46 @@
+from abc import ABC, abstractmethod
+from models.image import ImageStream
+from models.meme import Meme, MemePage, MemeStream, MemeUpload
+
+
+class AsyncMemeServiceInterface(ABC):
+    @abstractmethod
+    async def create_meme(self, meme: Meme):
+        ...
+
+    @abstractmethod
+    async def create_meme_from_upload(self, meme: MemeUpload):
+        ...
+
+    @abstractmethod
+    async def retrieve_meme(self, meme_id: str, if_none_match: str | None = None) -> Meme:
+        """ Raises MemeNotModifiedError if if_none_match matches the meme """
+        ...
+
+    @abstractmethod
+    async def retrieve_memes(self, skip: int, limit: int) -> list[Meme]:
+        ...
+
+    @abstractmethod
+    async def retrieve_memes_page(self, after: str, limit: int) -> MemePage:
+        ...
+
+    @abstractmethod
+    async def stream_memes(self, skip: int, limit: int, after: str | None = None) -> MemeStream:
+        ...
+
+    @abstractmethod
+    async def open_meme_image(self, meme_id: str, if_none_match: str | None = None) -> ImageStream:
+        ...
+
+    @abstractmethod
+    async def update_meme(self, meme_id: str, meme: Meme):
+        ...
+
+    @abstractmethod
+    async def update_meme_from_upload(self, meme_id: str, meme: MemeUpload):
+        ...
+
+    @abstractmethod
+    async def delete_meme(self, meme_id: str):
+        ...
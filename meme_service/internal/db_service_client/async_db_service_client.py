@@ -0,0 +1,338 @@
+import httpx
+import logging
+from typing import AsyncIterator
+
+from fastapi.encoders import jsonable_encoder
+
+from internal.async_db_service_client_interface import AsyncDatabaseServiceClientInterface
+from internal.errors.errors import DBServiceError, InvalidCursorError, MemeNotFoundError
+from internal.db_service_client.dto.meme import (CreateMemeRequest, RetrieveMemeResponse, RetrieveMemesByIdsResponse,
+                                                 RetrieveMemesPageResponse, UpdateMemeRequest, BulkCreateMemesRequest,
+                                                 BulkMemesResponse)
+from models.meme import DBMeme, DBMemeBulkResult, DBMemePage
+
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDatabaseServiceClient(AsyncDatabaseServiceClientInterface):
+    db_service_endpoint: str
+    http_client: httpx.AsyncClient
+
+    def __init__(self, db_service_endpoint: str, http_client: httpx.AsyncClient | None = None):
+        self.db_service_endpoint = db_service_endpoint
+        self.http_client = http_client if http_client is not None else httpx.AsyncClient()
+
+    async def close(self):
+        await self.http_client.aclose()
+
+    async def create_meme(self, meme: DBMeme):
+        request_body = CreateMemeRequest(
+            meme_id=meme.id,
+            image_id=meme.image_id,
+            caption=meme.caption,
+        )
+        try:
+            create_meme_response = await self.http_client.post(
+                self.db_service_endpoint + "/",
+                json=jsonable_encoder(request_body),
+            )
+        except httpx.RequestError as e:
+            raise DBServiceError(f"Couldn't make the request: {e}")
+
+        if create_meme_response.status_code != 201:
+            raise DBServiceError(
+                f"{create_meme_response.status_code}: {create_meme_response.text}"
+            )
+
+    async def create_memes(self, memes: list[DBMeme]) -> list[DBMemeBulkResult]:
+        logger.info("Creating %s memes", len(memes))
+
+        request_body = BulkCreateMemesRequest(
+            memes=[
+                CreateMemeRequest(
+                    meme_id=meme.id,
+                    image_id=meme.image_id,
+                    caption=meme.caption,
+                )
+                for meme in memes
+            ],
+        )
+        try:
+            create_memes_response = await self.http_client.post(
+                self.db_service_endpoint + "/bulk",
+                json=jsonable_encoder(request_body),
+            )
+        except httpx.RequestError as e:
+            raise DBServiceError(f"Couldn't make the request: {e}")
+
+        if create_memes_response.status_code != 200:
+            raise DBServiceError(
+                f"{create_memes_response.status_code}: {create_memes_response.text}"
+            )
+
+        try:
+            response = BulkMemesResponse.model_validate_json(create_memes_response.content)
+        except ValueError as e:
+            raise DBServiceError(f"Malformed bulk response: {e}")
+
+        results = [
+            DBMemeBulkResult(
+                meme_id=result.meme_id,
+                status=result.status,
+                error=result.error,
+            )
+            for result in response.results
+        ]
+
+        logger.info("Created %s of %s memes", sum(1 for result in results if result.status == 'created'), len(memes))
+
+        return results
+
+    async def retrieve_meme(self, meme_id: str) -> DBMeme:
+        logger.info("Retrieving meme: %s", meme_id)
+
+        try:
+            retrieve_meme_response = await self.http_client.get(
+                self.db_service_endpoint + f"/{meme_id}",
+            )
+        except httpx.RequestError as e:
+            raise DBServiceError(f"Couldn't make the request: {e}")
+
+        if retrieve_meme_response.status_code == 404:
+            raise MemeNotFoundError()
+
+        if retrieve_meme_response.status_code != 200:
+            raise DBServiceError(
+                f"{retrieve_meme_response.status_code}: {retrieve_meme_response.text}"
+            )
+
+        response_json = retrieve_meme_response.json()
+        meme = DBMeme(
+            id=meme_id,
+            image_id=response_json["image_id"],
+            caption=response_json["caption"],
+        )
+
+        logger.info("Retrieved meme: %s", meme)
+
+        return meme
+
+    async def retrieve_memes(self, skip: int, limit: int) -> list[DBMeme]:
+        logger.info("Retrieving memes: skip=%r, limit=%r", skip, limit)
+
+        params = {
+            "skip": skip,
+            "limit": limit,
+        }
+        try:
+            retrieve_memes_response = await self.http_client.get(
+                self.db_service_endpoint + "/",
+                params=params,
+            )
+        except httpx.RequestError as e:
+            raise DBServiceError(f"Couldn't make the request: {e}")
+
+        if retrieve_memes_response.status_code == 404:
+            return []
+
+        if retrieve_memes_response.status_code != 200:
+            raise DBServiceError(
+                f"{retrieve_memes_response.status_code}: {retrieve_memes_response.text}"
+            )
+
+        db_memes: list[DBMeme] = []
+        response_json = retrieve_memes_response.json()
+        for meme in response_json:
+            db_memes.append(
+                DBMeme(
+                    id=meme["meme_id"],
+                    image_id=meme["image_id"],
+                    caption=meme["caption"],
+                )
+            )
+
+        logger.info("Retrieved %s memes for skip=%r, limit=%r", len(db_memes), skip, limit)
+
+        return db_memes
+
+    async def retrieve_memes_page(self, after: str, limit: int) -> DBMemePage:
+        """ after is an empty string for the first page and the previous page's next_cursor after that """
+        logger.info("Retrieving memes page: after=%r, limit=%r", after, limit)
+
+        params = {
+            "after": after,
+            "limit": limit,
+        }
+        try:
+            retrieve_memes_response = await self.http_client.get(
+                self.db_service_endpoint + "/",
+                params=params,
+            )
+        except httpx.RequestError as e:
+            raise DBServiceError(f"Couldn't make the request: {e}")
+
+        if retrieve_memes_response.status_code == 400:
+            raise InvalidCursorError(
+                f"{retrieve_memes_response.status_code}: {retrieve_memes_response.text}"
+            )
+
+        if retrieve_memes_response.status_code != 200:
+            raise DBServiceError(
+                f"{retrieve_memes_response.status_code}: {retrieve_memes_response.text}"
+            )
+
+        response = RetrieveMemesPageResponse.model_validate(retrieve_memes_response.json())
+        db_memes = [
+            DBMeme(
+                id=meme.meme_id,
+                image_id=meme.image_id,
+                caption=meme.caption,
+            )
+            for meme in response.memes
+        ]
+
+        logger.info(
+            "Retrieved %s memes for after=%r, limit=%r, next cursor: %s",
+            len(db_memes),
+            after,
+            limit,
+            response.next_cursor
+        )
+
+        return DBMemePage(
+            memes=db_memes,
+            next_cursor=response.next_cursor,
+        )
+
+    async def export_memes(self) -> AsyncIterator[DBMeme]:
+        logger.info("Exporting memes")
+
+        exported = 0
+        try:
+            async with self.http_client.stream(
+                "GET",
+                self.db_service_endpoint + "/export",
+                # the export is read as fast as it is consumed, there is no deadline for the whole of it
+                timeout=httpx.Timeout(self.http_client.timeout.connect, read=None),
+            ) as export_response:
+                if export_response.status_code != 200:
+                    await export_response.aread()
+                    raise DBServiceError(
+                        f"{export_response.status_code}: {export_response.text}"
+                    )
+
+                async for line in export_response.aiter_lines():
+                    if line == "":
+                        continue
+                    try:
+                        response = RetrieveMemeResponse.model_validate_json(line)
+                    except ValueError as e:
+                        raise DBServiceError(f"Malformed export line: {e}")
+
+                    yield DBMeme(
+                        id=response.meme_id,
+                        image_id=response.image_id,
+                        caption=response.caption,
+                    )
+                    exported += 1
+        except httpx.HTTPError as e:
+            raise DBServiceError(f"Export was interrupted after {exported} memes: {e}")
+
+        logger.info("Exported %s memes", exported)
+
+    async def retrieve_memes_by_ids(self, meme_ids: list[str]) -> list[DBMeme]:
+        logger.info("Retrieving %s memes by id", len(meme_ids))
+
+        try:
+            retrieve_memes_response = await self.http_client.get(
+                self.db_service_endpoint + "/by-ids",
+                params={"meme_ids": meme_ids},
+            )
+        except httpx.RequestError as e:
+            raise DBServiceError(f"Couldn't make the request: {e}")
+
+        if retrieve_memes_response.status_code != 200:
+            raise DBServiceError(
+                f"{retrieve_memes_response.status_code}: {retrieve_memes_response.text}"
+            )
+
+        response = RetrieveMemesByIdsResponse.model_validate(retrieve_memes_response.json())
+        db_memes = [
+            DBMeme(
+                id=meme.meme_id,
+                image_id=meme.image_id,
+                caption=meme.caption,
+            )
+            for meme in response.memes
+        ]
+
+        logger.info("Retrieved %s memes by id, missing: %s", len(db_memes), response.missing_ids)
+
+        return db_memes
+
+    async def update_meme(self, meme_id: str, caption: str) -> DBMeme:
+        logger.info("Updating meme: %s, new caption: %s", meme_id, caption)
+
+        request_body = UpdateMemeRequest(
+            caption=caption,
+        )
+        try:
+            update_meme_response = await self.http_client.put(
+                self.db_service_endpoint + f"/{meme_id}",
+                json=jsonable_encoder(request_body),
+            )
+        except httpx.RequestError as e:
+            raise DBServiceError(f"Couldn't make the request: {e}")
+
+        if update_meme_response.status_code == 404:
+            raise MemeNotFoundError()
+
+        if update_meme_response.status_code != 200:
+            raise DBServiceError(
+                f"{update_meme_response.status_code}: {update_meme_response.text}"
+            )
+
+        try:
+            response = RetrieveMemeResponse.model_validate_json(update_meme_response.content)
+        except ValueError as e:
+            raise DBServiceError(f"Malformed update response: {e}")
+
+        updated_meme = DBMeme(
+            id=response.meme_id,
+            image_id=response.image_id,
+            caption=response.caption,
+        )
+
+        logger.info("Successfully updated meme: %s", updated_meme)
+
+        return updated_meme
+
+    async def delete_meme(self, meme_id: str) -> DBMeme:
+        logger.info("Deleting meme: %s", meme_id)
+
+        try:
+            delete_meme_response = await self.http_client.delete(
+                self.db_service_endpoint + f"/{meme_id}",
+            )
+        except httpx.RequestError as e:
+            raise DBServiceError(f"Couldn't make the request: {e}")
+
+        if delete_meme_response.status_code == 404:
+            raise MemeNotFoundError()
+
+        if delete_meme_response.status_code != 200:
+            raise DBServiceError(
+                f"{delete_meme_response.status_code}: {delete_meme_response.text}"
+            )
+
+        response_json = delete_meme_response.json()
+        deleted_meme = DBMeme(
+            id=response_json["meme_id"],
+            image_id=response_json["image_id"],
+            caption=response_json["caption"],
+        )
+
+        logger.info("Successfully deleted meme: %s", meme_id)
+
+        return deleted_meme
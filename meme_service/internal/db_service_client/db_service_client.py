@@ -1,12 +1,14 @@
-import requests
+import httpx
 import logging
 
 from fastapi.encoders import jsonable_encoder
 
 from internal.db_service_client_interface import DatabaseServiceClientInterface
-from internal.errors.errors import DBServiceError, MemeNotFoundError
-from internal.db_service_client.dto.meme import CreateMemeRequest
-from models.meme import DBMeme
+from internal.errors.errors import DBServiceError, InvalidCursorError, MemeNotFoundError
+from internal.db_service_client.dto.meme import (CreateMemeRequest, RetrieveMemeResponse, RetrieveMemesByIdsResponse,
+                                                 RetrieveMemesPageResponse, UpdateMemeRequest, BulkCreateMemesRequest,
+                                                 BulkMemesResponse)
+from models.meme import DBMeme, DBMemeBulkResult, DBMemePage
 
 
 logger = logging.getLogger(__name__)
@@ -14,9 +16,14 @@ logger = logging.getLogger(__name__)
 
 class DatabaseServiceClient(DatabaseServiceClientInterface):
     db_service_endpoint: str
+    http_client: httpx.Client
 
-    def __init__(self, db_service_endpoint):
+    def __init__(self, db_service_endpoint: str, http_client: httpx.Client | None = None):
         self.db_service_endpoint = db_service_endpoint
+        self.http_client = http_client if http_client is not None else httpx.Client()
+
+    def close(self):
+        self.http_client.close()
 
     def create_meme(self, meme: DBMeme):
         request_body = CreateMemeRequest(
@@ -25,11 +32,11 @@ class DatabaseServiceClient(DatabaseServiceClientInterface):
             caption=meme.caption,
         )
         try:
-            create_meme_response = requests.post(
+            create_meme_response = self.http_client.post(
                 self.db_service_endpoint + "/",
                 json=jsonable_encoder(request_body),
             )
-        except requests.exceptions.RequestException as e:
+        except httpx.RequestError as e:
             raise DBServiceError(f"Couldn't make the request: {e}")
 
         if create_meme_response.status_code != 201:
@@ -37,14 +44,58 @@ class DatabaseServiceClient(DatabaseServiceClientInterface):
                 f"{create_meme_response.status_code}: {create_meme_response.text}"
             )
 
+    def create_memes(self, memes: list[DBMeme]) -> list[DBMemeBulkResult]:
+        logger.info("Creating %s memes", len(memes))
+
+        request_body = BulkCreateMemesRequest(
+            memes=[
+                CreateMemeRequest(
+                    meme_id=meme.id,
+                    image_id=meme.image_id,
+                    caption=meme.caption,
+                )
+                for meme in memes
+            ],
+        )
+        try:
+            create_memes_response = self.http_client.post(
+                self.db_service_endpoint + "/bulk",
+                json=jsonable_encoder(request_body),
+            )
+        except httpx.RequestError as e:
+            raise DBServiceError(f"Couldn't make the request: {e}")
+
+        if create_memes_response.status_code != 200:
+            raise DBServiceError(
+                f"{create_memes_response.status_code}: {create_memes_response.text}"
+            )
+
+        try:
+            response = BulkMemesResponse.model_validate_json(create_memes_response.content)
+        except ValueError as e:
+            raise DBServiceError(f"Malformed bulk response: {e}")
+
+        results = [
+            DBMemeBulkResult(
+                meme_id=result.meme_id,
+                status=result.status,
+                error=result.error,
+            )
+            for result in response.results
+        ]
+
+        logger.info("Created %s of %s memes", sum(1 for result in results if result.status == 'created'), len(memes))
+
+        return results
+
     def retrieve_meme(self, meme_id: str) -> DBMeme:
-        logger.info(f"Retrieving meme: {meme_id}")
+        logger.info("Retrieving meme: %s", meme_id)
 
         try:
-            retrieve_meme_response = requests.get(
+            retrieve_meme_response = self.http_client.get(
                 self.db_service_endpoint + f"/{meme_id}",
             )
-        except requests.exceptions.RequestException as e:
+        except httpx.RequestError as e:
             raise DBServiceError(f"Couldn't make the request: {e}")
 
         if retrieve_meme_response.status_code == 404:
@@ -62,23 +113,23 @@ class DatabaseServiceClient(DatabaseServiceClientInterface):
             caption=response_json["caption"],
         )
 
-        logger.info(f"Retrieved meme: {meme}")
+        logger.info("Retrieved meme: %s", meme)
 
         return meme
 
     def retrieve_memes(self, skip: int, limit: int) -> list[DBMeme]:
-        logger.info(f"Retrieving memes: {skip=}, {limit=}")
+        logger.info("Retrieving memes: skip=%r, limit=%r", skip, limit)
 
         params = {
             "skip": skip,
             "limit": limit,
         }
         try:
-            retrieve_memes_response = requests.get(
+            retrieve_memes_response = self.http_client.get(
                 self.db_service_endpoint + "/",
                 params=params,
             )
-        except requests.exceptions.RequestException as e:
+        except httpx.RequestError as e:
             raise DBServiceError(f"Couldn't make the request: {e}")
 
         if retrieve_memes_response.status_code == 404:
@@ -100,19 +151,101 @@ class DatabaseServiceClient(DatabaseServiceClientInterface):
                 )
             )
 
-        logger.info(f"Retrieved {len(db_memes)} memes for {skip=}, {limit=}: {db_memes}")
+        logger.info("Retrieved %s memes for skip=%r, limit=%r", len(db_memes), skip, limit)
 
         return db_memes
 
-    def update_meme(self, meme_id: str, meme: DBMeme):
-        logger.info(f"Updating meme: {meme_id}, update: {meme}")
+    def retrieve_memes_page(self, after: str, limit: int) -> DBMemePage:
+        """ after is an empty string for the first page and the previous page's next_cursor after that """
+        logger.info("Retrieving memes page: after=%r, limit=%r", after, limit)
 
+        params = {
+            "after": after,
+            "limit": limit,
+        }
         try:
-            update_meme_response = requests.put(
+            retrieve_memes_response = self.http_client.get(
+                self.db_service_endpoint + "/",
+                params=params,
+            )
+        except httpx.RequestError as e:
+            raise DBServiceError(f"Couldn't make the request: {e}")
+
+        if retrieve_memes_response.status_code == 400:
+            raise InvalidCursorError(
+                f"{retrieve_memes_response.status_code}: {retrieve_memes_response.text}"
+            )
+
+        if retrieve_memes_response.status_code != 200:
+            raise DBServiceError(
+                f"{retrieve_memes_response.status_code}: {retrieve_memes_response.text}"
+            )
+
+        response = RetrieveMemesPageResponse.model_validate(retrieve_memes_response.json())
+        db_memes = [
+            DBMeme(
+                id=meme.meme_id,
+                image_id=meme.image_id,
+                caption=meme.caption,
+            )
+            for meme in response.memes
+        ]
+
+        logger.info(
+            "Retrieved %s memes for after=%r, limit=%r, next cursor: %s",
+            len(db_memes),
+            after,
+            limit,
+            response.next_cursor
+        )
+
+        return DBMemePage(
+            memes=db_memes,
+            next_cursor=response.next_cursor,
+        )
+
+    def retrieve_memes_by_ids(self, meme_ids: list[str]) -> list[DBMeme]:
+        logger.info("Retrieving %s memes by id", len(meme_ids))
+
+        try:
+            retrieve_memes_response = self.http_client.get(
+                self.db_service_endpoint + "/by-ids",
+                params={"meme_ids": meme_ids},
+            )
+        except httpx.RequestError as e:
+            raise DBServiceError(f"Couldn't make the request: {e}")
+
+        if retrieve_memes_response.status_code != 200:
+            raise DBServiceError(
+                f"{retrieve_memes_response.status_code}: {retrieve_memes_response.text}"
+            )
+
+        response = RetrieveMemesByIdsResponse.model_validate(retrieve_memes_response.json())
+        db_memes = [
+            DBMeme(
+                id=meme.meme_id,
+                image_id=meme.image_id,
+                caption=meme.caption,
+            )
+            for meme in response.memes
+        ]
+
+        logger.info("Retrieved %s memes by id, missing: %s", len(db_memes), response.missing_ids)
+
+        return db_memes
+
+    def update_meme(self, meme_id: str, caption: str) -> DBMeme:
+        logger.info("Updating meme: %s, new caption: %s", meme_id, caption)
+
+        request_body = UpdateMemeRequest(
+            caption=caption,
+        )
+        try:
+            update_meme_response = self.http_client.put(
                 self.db_service_endpoint + f"/{meme_id}",
-                json=jsonable_encoder(meme),
+                json=jsonable_encoder(request_body),
             )
-        except requests.exceptions.RequestException as e:
+        except httpx.RequestError as e:
             raise DBServiceError(f"Couldn't make the request: {e}")
 
         if update_meme_response.status_code == 404:
@@ -123,16 +256,29 @@ class DatabaseServiceClient(DatabaseServiceClientInterface):
                 f"{update_meme_response.status_code}: {update_meme_response.text}"
             )
 
-        logger.info(f"Successfully updated meme: {meme_id}")
+        try:
+            response = RetrieveMemeResponse.model_validate_json(update_meme_response.content)
+        except ValueError as e:
+            raise DBServiceError(f"Malformed update response: {e}")
+
+        updated_meme = DBMeme(
+            id=response.meme_id,
+            image_id=response.image_id,
+            caption=response.caption,
+        )
+
+        logger.info("Successfully updated meme: %s", updated_meme)
+
+        return updated_meme
 
     def delete_meme(self, meme_id: str) -> DBMeme:
-        logger.info(f"Deleting meme: {meme_id}")
+        logger.info("Deleting meme: %s", meme_id)
 
         try:
-            delete_meme_response = requests.delete(
+            delete_meme_response = self.http_client.delete(
                 self.db_service_endpoint + f"/{meme_id}",
             )
-        except requests.exceptions.RequestException as e:
+        except httpx.RequestError as e:
             raise DBServiceError(f"Couldn't make the request: {e}")
 
         if delete_meme_response.status_code == 404:
@@ -149,6 +295,6 @@ class DatabaseServiceClient(DatabaseServiceClientInterface):
             caption=delete_meme_response.json()["caption"],
         )
 
-        logger.info(f"Successfully deleted meme: {meme_id}")
+        logger.info("Successfully deleted meme: %s", meme_id)
 
         return deleted_meme
@@ -7,8 +7,36 @@ class CreateMemeRequest(BaseModel):
     caption: str | None
 
 
+class BulkCreateMemesRequest(BaseModel):
+    memes: list[CreateMemeRequest]
+
+
+class BulkMemeResult(BaseModel):
+    meme_id: str
+    status: str
+    image_id: str | None = None
+    error: str | None = None
+
+
+class BulkMemesResponse(BaseModel):
+    results: list[BulkMemeResult]
+
+
+class UpdateMemeRequest(BaseModel):
+    caption: str
+
+
 class RetrieveMemeResponse(BaseModel):
     meme_id: str
     image_id: str
     caption: str | None
 
+
+class RetrieveMemesByIdsResponse(BaseModel):
+    memes: list[RetrieveMemeResponse]
+    missing_ids: list[str]
+
+
+class RetrieveMemesPageResponse(BaseModel):
+    memes: list[RetrieveMemeResponse]
+    next_cursor: str | None
@@ -0,0 +1,73 @@
+from typing import AsyncIterator
+
+from internal.async_db_service_client_interface import AsyncDatabaseServiceClientInterface
+from internal.errors.errors import MemeNotFoundError
+from models.meme import DBMeme, DBMemeBulkResult, DBMemePage
+
+
+class FakeAsyncDatabaseServiceClient(AsyncDatabaseServiceClientInterface):
+    fake_db: list[DBMeme]
+
+    def __init__(self):
+        self.fake_db = []
+
+    async def create_meme(self, meme: DBMeme):
+        self.fake_db.append(meme)
+
+    async def create_memes(self, memes: list[DBMeme]) -> list[DBMemeBulkResult]:
+        results = []
+        for meme in memes:
+            if any(stored_meme.id == meme.id or stored_meme.image_id == meme.image_id for stored_meme in self.fake_db):
+                results.append(DBMemeBulkResult(meme_id=meme.id, status="conflict"))
+                continue
+            self.fake_db.append(meme)
+            results.append(DBMemeBulkResult(meme_id=meme.id, status="created"))
+
+        return results
+
+    async def retrieve_meme(self, meme_id: str) -> DBMeme:
+        for meme in self.fake_db:
+            if meme.id == meme_id:
+                return meme
+        raise MemeNotFoundError()
+
+    async def retrieve_memes(self, skip: int, limit: int) -> list[DBMeme]:
+        memes = self.fake_db[skip: skip + limit]
+        return memes
+
+    async def retrieve_memes_page(self, after: str, limit: int) -> DBMemePage:
+        # the fake cursor is the id of the last meme on the previous page
+        start = 0
+        if after != "":
+            start = [meme.id for meme in self.fake_db].index(after) + 1
+
+        memes = self.fake_db[start: start + limit]
+        next_cursor = memes[-1].id if start + limit < len(self.fake_db) else None
+        return DBMemePage(
+            memes=memes,
+            next_cursor=next_cursor,
+        )
+
+    async def export_memes(self) -> AsyncIterator[DBMeme]:
+        for meme in list(self.fake_db):
+            yield meme
+
+    async def retrieve_memes_by_ids(self, meme_ids: list[str]) -> list[DBMeme]:
+        return [meme for meme in self.fake_db if meme.id in meme_ids]
+
+    async def update_meme(self, meme_id: str, caption: str) -> DBMeme:
+        for i, meme in enumerate(self.fake_db):
+            if meme.id == meme_id:
+                self.fake_db[i].caption = caption
+                return self.fake_db[i].model_copy()
+        raise MemeNotFoundError()
+
+    async def delete_meme(self, meme_id: str) -> DBMeme:
+        for i, meme in enumerate(self.fake_db):
+            if meme.id == meme_id:
+                deleted_meme = self.fake_db.pop(i)
+                return deleted_meme
+        raise MemeNotFoundError()
+
+    async def close(self):
+        pass
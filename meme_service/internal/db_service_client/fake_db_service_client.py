@@ -1,6 +1,6 @@
 from internal.db_service_client_interface import DatabaseServiceClientInterface
 from internal.errors.errors import MemeNotFoundError
-from models.meme import DBMeme
+from models.meme import DBMeme, DBMemeBulkResult, DBMemePage
 
 
 class FakeDatabaseServiceClient(DatabaseServiceClientInterface):
@@ -12,6 +12,17 @@ class FakeDatabaseServiceClient(DatabaseServiceClientInterface):
     def create_meme(self, meme: DBMeme):
         self.fake_db.append(meme)
 
+    def create_memes(self, memes: list[DBMeme]) -> list[DBMemeBulkResult]:
+        results = []
+        for meme in memes:
+            if any(stored_meme.id == meme.id or stored_meme.image_id == meme.image_id for stored_meme in self.fake_db):
+                results.append(DBMemeBulkResult(meme_id=meme.id, status="conflict"))
+                continue
+            self.fake_db.append(meme)
+            results.append(DBMemeBulkResult(meme_id=meme.id, status="created"))
+
+        return results
+
     def retrieve_meme(self, meme_id: str) -> DBMeme:
         for meme in self.fake_db:
             if meme.id == meme_id:
@@ -22,13 +33,28 @@ class FakeDatabaseServiceClient(DatabaseServiceClientInterface):
         memes = self.fake_db[skip: skip + limit]
         return memes
 
-    def update_meme(self, meme_id: str, new_meme: DBMeme):
+    def retrieve_memes_page(self, after: str, limit: int) -> DBMemePage:
+        # the fake cursor is the id of the last meme on the previous page
+        start = 0
+        if after != "":
+            start = [meme.id for meme in self.fake_db].index(after) + 1
+
+        memes = self.fake_db[start: start + limit]
+        next_cursor = memes[-1].id if start + limit < len(self.fake_db) else None
+        return DBMemePage(
+            memes=memes,
+            next_cursor=next_cursor,
+        )
+
+    def retrieve_memes_by_ids(self, meme_ids: list[str]) -> list[DBMeme]:
+        return [meme for meme in self.fake_db if meme.id in meme_ids]
+
+    def update_meme(self, meme_id: str, caption: str) -> DBMeme:
         for i, meme in enumerate(self.fake_db):
             if meme.id == meme_id:
-                if new_meme.image_id:
-                    self.fake_db[i].image_id = new_meme.image_id
-                if new_meme.caption:
-                    self.fake_db[i].caption = new_meme.caption
+                self.fake_db[i].caption = caption
+                return self.fake_db[i].model_copy()
+        raise MemeNotFoundError()
 
     def delete_meme(self, meme_id: str) -> DBMeme:
         for i, meme in enumerate(self.fake_db):
@@ -36,3 +62,6 @@ class FakeDatabaseServiceClient(DatabaseServiceClientInterface):
                 deleted_meme = self.fake_db.pop(i)
                 return deleted_meme
         raise MemeNotFoundError()
+
+    def close(self):
+        pass
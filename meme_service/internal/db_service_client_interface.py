@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from models.meme import DBMeme
+from models.meme import DBMeme, DBMemeBulkResult, DBMemePage
 
 
 class DatabaseServiceClientInterface(ABC):
@@ -7,6 +7,10 @@ class DatabaseServiceClientInterface(ABC):
     def create_meme(self, meme: DBMeme):
         ...
 
+    @abstractmethod
+    def create_memes(self, memes: list[DBMeme]) -> list[DBMemeBulkResult]:
+        ...
+
     @abstractmethod
     def retrieve_meme(self, meme_id: str) -> DBMeme:
         ...
@@ -16,9 +20,21 @@ class DatabaseServiceClientInterface(ABC):
         ...
 
     @abstractmethod
-    def update_meme(self, meme_id: str, meme: DBMeme):
+    def retrieve_memes_page(self, after: str, limit: int) -> DBMemePage:
+        ...
+
+    @abstractmethod
+    def retrieve_memes_by_ids(self, meme_ids: list[str]) -> list[DBMeme]:
+        ...
+
+    @abstractmethod
+    def update_meme(self, meme_id: str, caption: str) -> DBMeme:
         ...
 
     @abstractmethod
     def delete_meme(self, meme_id: str) -> DBMeme:
         ...
+
+    @abstractmethod
+    def close(self):
+        ...
@@ -23,6 +23,34 @@ class MemeNotFoundError(DBServiceError):
     pass
 
 
+class InvalidCursorError(DBServiceError):
+    """ Raised when database service rejects a pagination cursor or page size """
+    pass
+
+
 class ImageNotFoundError(ImageServiceError):
     """ Raised when a meme image is not found in image service"""
     pass
+
+
+class ImageNotModifiedError(ImageServiceError):
+    """ Raised when image service confirms the image still matches the etag the caller has """
+    etag: str | None
+
+    def __init__(self, etag: str | None):
+        super().__init__(f"Not modified, etag: {etag}")
+        self.etag = etag
+
+
+class MemeNotModifiedError(MemeServiceError):
+    """ Raised when the meme still matches the etag the caller has """
+    etag: str | None
+
+    def __init__(self, etag: str | None):
+        super().__init__(f"Not modified, etag: {etag}")
+        self.etag = etag
+
+
+class BackupError(MemeServiceError):
+    """ Raised when a backup archive is malformed, truncated or does not match its checksums """
+    pass
@@ -0,0 +1,45 @@
+import hashlib
+import json
+
+
+def _opaque_tag(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """ If-None-Match uses the weak comparison, so W/ prefixes are ignored """
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    return _opaque_tag(etag) in {_opaque_tag(tag) for tag in if_none_match.split(",")}
+
+
+def _caption_digest(caption: str | None) -> str:
+    return hashlib.sha256(json.dumps(caption).encode()).hexdigest()[:16]
+
+
+def meme_etag(image_etag: str, caption: str | None) -> str:
+    """ Built from the etag storage recorded when the image was written, so the image itself is never hashed """
+    image_tag = _opaque_tag(image_etag).strip('"')
+    return f'"{image_tag}:{_caption_digest(caption)}"'
+
+
+def image_if_none_match(if_none_match: str | None, caption: str | None) -> str | None:
+    """ The image etags of the meme etags in if_none_match that were made for this caption,
+    ready to be sent to image service. None when none of them can match """
+    if if_none_match is None:
+        return None
+    if if_none_match.strip() == "*":
+        return "*"
+
+    caption_digest = _caption_digest(caption)
+    image_etags: list[str] = []
+    for tag in if_none_match.split(","):
+        image_tag, _, tag_caption_digest = _opaque_tag(tag).strip('"').rpartition(":")
+        if image_tag and tag_caption_digest == caption_digest:
+            image_etags.append(f'"{image_tag}"')
+
+    return ", ".join(image_etags) if image_etags else None
@@ -0,0 +1,113 @@
+import threading
+import time
+from collections import OrderedDict
+
+from internal.image_cache_interface import ImageCacheInterface
+from models.cache import CacheStats, CachedImage
+
+
+class LRUImageCache(ImageCacheInterface):
+    """
+    Keeps the most recently used images until their total size reaches max_bytes,
+    entries with an etag become stale after revalidate_after seconds and are
+    checked with a conditional request instead of being downloaded again
+    """
+    max_bytes: int
+    revalidate_after: float | None
+    used_bytes: int
+    hits: int
+    misses: int
+    evictions: int
+    invalidations: int
+
+    def __init__(self, max_bytes: int, revalidate_after: float | None = None):
+        self.max_bytes = max_bytes
+        self.revalidate_after = revalidate_after
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._images: OrderedDict[str, tuple[CachedImage, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, image_id: str) -> CachedImage | None:
+        with self._lock:
+            entry = self._images.get(image_id)
+            if entry is None or self._is_stale(entry):
+                self.misses += 1
+                return None
+
+            self._images.move_to_end(image_id)
+            self.hits += 1
+            return entry[0]
+
+    def get_stale(self, image_id: str) -> CachedImage | None:
+        with self._lock:
+            entry = self._images.get(image_id)
+            if entry is None or not self._is_stale(entry):
+                return None
+
+            return entry[0]
+
+    def version(self) -> int:
+        """ Changes on every invalidation, pass it to put() to drop data fetched before an invalidation """
+        return self.invalidations
+
+    def put(self, image_id: str, b64_data: str, version: int | None = None, etag: str | None = None):
+        # base64 is ascii, so the string length is its size in bytes
+        size = len(b64_data)
+        with self._lock:
+            if version is not None and version != self.invalidations:
+                return
+
+            self._remove(image_id)
+            if size > self.max_bytes:
+                return
+
+            while self.used_bytes + size > self.max_bytes:
+                _, (evicted, _) = self._images.popitem(last=False)
+                self.used_bytes -= len(evicted.b64_data)
+                self.evictions += 1
+
+            self._images[image_id] = (CachedImage(b64_data=b64_data, etag=etag), time.monotonic())
+            self.used_bytes += size
+
+    def refresh(self, image_id: str):
+        """ Marks an entry as fresh after image service confirmed it is not modified """
+        with self._lock:
+            entry = self._images.get(image_id)
+            if entry is None:
+                return
+
+            self._images[image_id] = (entry[0], time.monotonic())
+            self._images.move_to_end(image_id)
+
+    def invalidate(self, image_id: str):
+        with self._lock:
+            self.invalidations += 1
+            self._remove(image_id)
+
+    def _is_stale(self, entry: tuple[CachedImage, float]) -> bool:
+        cached_image, stored_at = entry
+        # without an etag there is nothing to revalidate with, so the entry is kept until evicted
+        if self.revalidate_after is None or cached_image.etag is None:
+            return False
+
+        return time.monotonic() - stored_at > self.revalidate_after
+
+    def _remove(self, image_id: str):
+        entry = self._images.pop(image_id, None)
+        if entry is not None:
+            self.used_bytes -= len(entry[0].b64_data)
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self.hits,
+                misses=self.misses,
+                evictions=self.evictions,
+                entries=len(self._images),
+                used_bytes=self.used_bytes,
+                max_bytes=self.max_bytes,
+            )
@@ -0,0 +1,35 @@
+from abc import ABC, abstractmethod
+
+from models.cache import CacheStats, CachedImage
+
+
+class ImageCacheInterface(ABC):
+    @abstractmethod
+    def get(self, image_id: str) -> CachedImage | None:
+        """ Returns only entries that don't need to be revalidated """
+        ...
+
+    @abstractmethod
+    def get_stale(self, image_id: str) -> CachedImage | None:
+        """ Returns an entry that needs to be revalidated with its etag """
+        ...
+
+    @abstractmethod
+    def version(self) -> int:
+        ...
+
+    @abstractmethod
+    def put(self, image_id: str, b64_data: str, version: int | None = None, etag: str | None = None):
+        ...
+
+    @abstractmethod
+    def refresh(self, image_id: str):
+        ...
+
+    @abstractmethod
+    def invalidate(self, image_id: str):
+        ...
+
+    @abstractmethod
+    def stats(self) -> CacheStats:
+        ...
@@ -0,0 +1,213 @@
+from typing import AsyncIterator
+
+import httpx
+
+from fastapi.encoders import jsonable_encoder
+
+from internal.async_image_service_client_interface import AsyncImageServiceClientInterface
+from internal.image_service_client.dto.image import (CreateImageRequest, UpdateImageRequest,
+                                                    BatchGetImagesRequest, BatchGetImagesResponse)
+from internal.errors.errors import ImageNotFoundError, ImageNotModifiedError, ImageServiceError
+from models.image import ImageRevision, ImageStream, ImageUpload
+
+
+class AsyncImageServiceClient(AsyncImageServiceClientInterface):
+    image_service_endpoint: str
+    http_client: httpx.AsyncClient
+
+    def __init__(self, image_service_endpoint: str, http_client: httpx.AsyncClient | None = None):
+        self.image_service_endpoint = image_service_endpoint
+        self.http_client = http_client if http_client is not None else httpx.AsyncClient()
+
+    async def close(self):
+        await self.http_client.aclose()
+
+    async def create_image(self, b64_data: str, image_id: str | None = None) -> str:
+        request_body = CreateImageRequest(
+            b64_data=b64_data,
+            image_id=image_id,
+        )
+        try:
+            create_image_response = await self.http_client.post(
+                self.image_service_endpoint + "/",
+                json=jsonable_encoder(request_body)
+            )
+        except httpx.RequestError as e:
+            raise ImageServiceError(f"Couldn't make the request: {e}")
+
+        if create_image_response.status_code != 201:
+            raise ImageServiceError(
+                f"{create_image_response.status_code}: {create_image_response.text}"
+            )
+
+        image_id: str = create_image_response.json().get('image_id')
+
+        return image_id
+
+    async def upload_image(self, image_id: str, image: ImageUpload):
+        headers = {"Content-Type": "application/octet-stream"}
+        if image.content_length is not None:
+            headers["Content-Length"] = str(image.content_length)
+
+        try:
+            upload_image_response = await self.http_client.put(
+                self.image_service_endpoint + f"/{image_id}/raw",
+                content=image.chunks,
+                headers=headers,
+            )
+        except httpx.RequestError as e:
+            raise ImageServiceError(f"Couldn't make the request: {e}")
+
+        if upload_image_response.status_code != 200:
+            raise ImageServiceError(
+                f"{upload_image_response.status_code}: {upload_image_response.text}"
+            )
+
+    async def retrieve_image(self, image_id: str) -> str:
+        image_revision = await self.retrieve_image_revision(image_id)
+
+        return image_revision.b64_data
+
+    async def retrieve_image_revision(self, image_id: str, if_none_match: str | None = None) -> ImageRevision:
+        headers = {"If-None-Match": if_none_match} if if_none_match is not None else {}
+        try:
+            retrieve_image_response = await self.http_client.get(
+                self.image_service_endpoint + f"/{image_id}",
+                headers=headers,
+            )
+        except httpx.RequestError as e:
+            raise ImageServiceError(f"Couldn't make the request: {e}")
+
+        if retrieve_image_response.status_code == 304:
+            raise ImageNotModifiedError(retrieve_image_response.headers.get("ETag"))
+
+        if retrieve_image_response.status_code == 404:
+            raise ImageNotFoundError(
+                f"{retrieve_image_response.status_code}: {retrieve_image_response.text}"
+            )
+
+        if retrieve_image_response.status_code != 200:
+            raise ImageServiceError(
+                f"{retrieve_image_response.status_code}: {retrieve_image_response.text}"
+            )
+
+        image_b64_data: str = retrieve_image_response.json().get('b64_data')
+
+        return ImageRevision(
+            b64_data=image_b64_data,
+            etag=retrieve_image_response.headers.get("ETag"),
+        )
+
+    async def retrieve_images(self, image_ids: list[str]) -> dict[str, ImageRevision]:
+        request_body = BatchGetImagesRequest(
+            image_ids=image_ids,
+        )
+        try:
+            retrieve_images_response = await self.http_client.post(
+                self.image_service_endpoint + "/batch-get",
+                json=jsonable_encoder(request_body)
+            )
+        except httpx.RequestError as e:
+            raise ImageServiceError(f"Couldn't make the request: {e}")
+
+        if retrieve_images_response.status_code != 200:
+            raise ImageServiceError(
+                f"{retrieve_images_response.status_code}: {retrieve_images_response.text}"
+            )
+
+        try:
+            response = BatchGetImagesResponse.model_validate_json(retrieve_images_response.content)
+        except ValueError as e:
+            raise ImageServiceError(f"Malformed batch response: {e}")
+
+        return {
+            image.image_id: ImageRevision(b64_data=image.b64_data, etag=image.etag)
+            for image in response.images
+        }
+
+    async def open_image(self, image_id: str, if_none_match: str | None = None) -> ImageStream:
+        request = self.http_client.build_request(
+            "GET",
+            self.image_service_endpoint + f"/{image_id}/raw",
+            headers={"If-None-Match": if_none_match} if if_none_match is not None else {},
+        )
+        try:
+            open_image_response = await self.http_client.send(request, stream=True)
+        except httpx.RequestError as e:
+            raise ImageServiceError(f"Couldn't make the request: {e}")
+
+        if open_image_response.status_code != 200:
+            await open_image_response.aread()
+            await open_image_response.aclose()
+
+        if open_image_response.status_code == 304:
+            raise ImageNotModifiedError(open_image_response.headers.get("ETag"))
+
+        if open_image_response.status_code == 404:
+            raise ImageNotFoundError(
+                f"{open_image_response.status_code}: {open_image_response.text}"
+            )
+
+        if open_image_response.status_code != 200:
+            raise ImageServiceError(
+                f"{open_image_response.status_code}: {open_image_response.text}"
+            )
+
+        async def stream() -> AsyncIterator[bytes]:
+            try:
+                async for chunk in open_image_response.aiter_bytes():
+                    yield chunk
+            except httpx.RequestError as e:
+                raise ImageServiceError(f"Image stream was interrupted: {e}")
+            finally:
+                await open_image_response.aclose()
+
+        # chunked responses don't carry a length
+        content_length = open_image_response.headers.get("Content-Length")
+
+        return ImageStream(
+            content_type=open_image_response.headers.get("Content-Type", "application/octet-stream"),
+            content_length=int(content_length) if content_length is not None else None,
+            etag=open_image_response.headers.get("ETag"),
+            chunks=stream(),
+        )
+
+    async def update_image(self, image_id: str, b64_data: str):
+        request_body = UpdateImageRequest(
+            b64_data=b64_data,
+        )
+        try:
+            update_image_response = await self.http_client.put(
+                self.image_service_endpoint + f"/{image_id}",
+                json=jsonable_encoder(request_body)
+            )
+        except httpx.RequestError as e:
+            raise ImageServiceError(f"Couldn't make the request: {e}")
+
+        if update_image_response.status_code == 404:
+            raise ImageNotFoundError(
+                f"{update_image_response.status_code}: {update_image_response.text}"
+            )
+
+        if update_image_response.status_code != 200:
+            raise ImageServiceError(
+                f"{update_image_response.status_code}: {update_image_response.text}"
+            )
+
+    async def delete_image(self, image_id: str):
+        try:
+            delete_image_response = await self.http_client.delete(
+                self.image_service_endpoint + f"/{image_id}",
+            )
+        except httpx.RequestError as e:
+            raise ImageServiceError(f"Couldn't make the request: {e}")
+
+        if delete_image_response.status_code == 404:
+            raise ImageNotFoundError(
+                f"{delete_image_response.status_code}: {delete_image_response.text}"
+            )
+
+        if delete_image_response.status_code != 200:
+            raise ImageServiceError(
+                f"{delete_image_response.status_code}: {delete_image_response.text}"
+            )
@@ -1,18 +1,36 @@
 from pydantic import BaseModel
 
+from models.redacted import RedactedModel
 
-class CreateImageRequest(BaseModel):
+
+class CreateImageRequest(RedactedModel):
     b64_data: str
+    image_id: str | None = None
 
 
 class CreateImageResponse(BaseModel):
     image_id: str
 
 
-class RetrieveImageRequest(BaseModel):
+class RetrieveImageRequest(RedactedModel):
     image_id: str
     b64_data: str
 
 
-class UpdateImageRequest(BaseModel):
+class BatchGetImagesRequest(BaseModel):
+    image_ids: list[str]
+
+
+class BatchImage(RedactedModel):
+    image_id: str
+    b64_data: str
+    etag: str | None = None
+
+
+class BatchGetImagesResponse(BaseModel):
+    images: list[BatchImage]
+    missing_ids: list[str]
+
+
+class UpdateImageRequest(RedactedModel):
     b64_data: str
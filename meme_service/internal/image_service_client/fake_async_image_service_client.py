@@ -0,0 +1,81 @@
+import base64
+import hashlib
+import uuid
+from typing import AsyncIterator
+
+from internal.async_image_service_client_interface import AsyncImageServiceClientInterface
+from internal.errors.errors import ImageNotFoundError, ImageNotModifiedError
+from models.image import ImageRevision, ImageStream, ImageUpload
+
+
+class FakeAsyncImageServiceClient(AsyncImageServiceClientInterface):
+    fake_storage: dict[str, str | None]
+
+    def __init__(self):
+        self.fake_storage = {}
+
+    async def create_image(self, b64_data: str, image_id: str | None = None) -> str:
+        if image_id is None:
+            image_id = str(uuid.uuid4())
+        self.fake_storage[image_id] = b64_data
+        return image_id
+
+    async def upload_image(self, image_id: str, image: ImageUpload):
+        data = b"".join([chunk async for chunk in image.chunks])
+        self.fake_storage[image_id] = base64.b64encode(data).decode()
+
+    async def retrieve_image(self, image_id: str) -> str:
+        if image_id not in self.fake_storage.keys():
+            raise ImageNotFoundError()
+
+        return self.fake_storage[image_id]
+
+    async def retrieve_image_revision(self, image_id: str, if_none_match: str | None = None) -> ImageRevision:
+        image_revision = self._image_revision(await self.retrieve_image(image_id))
+        if if_none_match == image_revision.etag:
+            raise ImageNotModifiedError(image_revision.etag)
+
+        return image_revision
+
+    async def retrieve_images(self, image_ids: list[str]) -> dict[str, ImageRevision]:
+        return {
+            image_id: self._image_revision(self.fake_storage[image_id])
+            for image_id in image_ids
+            if image_id in self.fake_storage.keys()
+        }
+
+    async def open_image(self, image_id: str, if_none_match: str | None = None) -> ImageStream:
+        image_revision = await self.retrieve_image_revision(image_id, if_none_match)
+        data = base64.b64decode(image_revision.b64_data)
+
+        async def stream() -> AsyncIterator[bytes]:
+            yield data
+
+        return ImageStream(
+            content_type="application/octet-stream",
+            content_length=len(data),
+            etag=image_revision.etag,
+            chunks=stream(),
+        )
+
+    async def update_image(self, image_id: str, b64_data: str):
+        if image_id not in self.fake_storage.keys():
+            raise ImageNotFoundError()
+
+        self.fake_storage[image_id] = b64_data
+
+    async def delete_image(self, image_id: str):
+        if image_id not in self.fake_storage.keys():
+            raise ImageNotFoundError()
+
+        del self.fake_storage[image_id]
+
+    @staticmethod
+    def _image_revision(b64_data: str) -> ImageRevision:
+        return ImageRevision(
+            b64_data=b64_data,
+            etag=f'"{hashlib.md5(b64_data.encode()).hexdigest()}"',
+        )
+
+    async def close(self):
+        pass
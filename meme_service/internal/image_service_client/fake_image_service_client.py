@@ -10,8 +10,9 @@ class FakeImageServiceClient(ImageServiceClientInterface):
     def __init__(self):
         self.fake_storage = {}
 
-    def create_image(self, b64_data: str) -> str:
-        image_id = str(uuid.uuid4())
+    def create_image(self, b64_data: str, image_id: str | None = None) -> str:
+        if image_id is None:
+            image_id = str(uuid.uuid4())
         self.fake_storage[image_id] = b64_data
         return image_id
 
@@ -19,6 +20,13 @@ class FakeImageServiceClient(ImageServiceClientInterface):
         b64_data = self.fake_storage[image_id]
         return b64_data
 
+    def retrieve_images(self, image_ids: list[str]) -> dict[str, str]:
+        return {
+            image_id: self.fake_storage[image_id]
+            for image_id in image_ids
+            if image_id in self.fake_storage.keys()
+        }
+
     def update_image(self, image_id: str, b64_data: str):
         if image_id not in self.fake_storage.keys():
             raise ImageNotFoundError()
@@ -30,3 +38,6 @@ class FakeImageServiceClient(ImageServiceClientInterface):
             raise ImageNotFoundError()
 
         del self.fake_storage[image_id]
+
+    def close(self):
+        pass
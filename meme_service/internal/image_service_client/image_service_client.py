@@ -1,28 +1,35 @@
-import requests
+import httpx
 
 from fastapi.encoders import jsonable_encoder
 
 from internal.image_service_client_interface import ImageServiceClientInterface
-from internal.image_service_client.dto.image import CreateImageRequest, UpdateImageRequest
+from internal.image_service_client.dto.image import (CreateImageRequest, UpdateImageRequest,
+                                                    BatchGetImagesRequest, BatchGetImagesResponse)
 from internal.errors.errors import ImageNotFoundError, ImageServiceError
 
 
 class ImageServiceClient(ImageServiceClientInterface):
     image_service_endpoint: str
+    http_client: httpx.Client
 
-    def __init__(self, image_service_endpoint: str):
+    def __init__(self, image_service_endpoint: str, http_client: httpx.Client | None = None):
         self.image_service_endpoint = image_service_endpoint
+        self.http_client = http_client if http_client is not None else httpx.Client()
 
-    def create_image(self, b64_data: str) -> str:
+    def close(self):
+        self.http_client.close()
+
+    def create_image(self, b64_data: str, image_id: str | None = None) -> str:
         request_body = CreateImageRequest(
             b64_data=b64_data,
+            image_id=image_id,
         )
         try:
-            create_image_response = requests.post(
+            create_image_response = self.http_client.post(
                 self.image_service_endpoint + "/",
                 json=jsonable_encoder(request_body)
             )
-        except requests.exceptions.RequestException as e:
+        except httpx.RequestError as e:
             raise ImageServiceError(f"Couldn't make the request: {e}")
 
         if create_image_response.status_code != 201:
@@ -36,10 +43,10 @@ class ImageServiceClient(ImageServiceClientInterface):
 
     def retrieve_image(self, image_id: str) -> str:
         try:
-            retrieve_image_response = requests.get(
+            retrieve_image_response = self.http_client.get(
                 self.image_service_endpoint + f"/{image_id}",
             )
-        except requests.exceptions.RequestException as e:
+        except httpx.RequestError as e:
             raise ImageServiceError(f"Couldn't make the request: {e}")
 
         if retrieve_image_response.status_code == 404:
@@ -56,16 +63,40 @@ class ImageServiceClient(ImageServiceClientInterface):
 
         return image_b64_data
 
+    def retrieve_images(self, image_ids: list[str]) -> dict[str, str]:
+        request_body = BatchGetImagesRequest(
+            image_ids=image_ids,
+        )
+        try:
+            retrieve_images_response = self.http_client.post(
+                self.image_service_endpoint + "/batch-get",
+                json=jsonable_encoder(request_body)
+            )
+        except httpx.RequestError as e:
+            raise ImageServiceError(f"Couldn't make the request: {e}")
+
+        if retrieve_images_response.status_code != 200:
+            raise ImageServiceError(
+                f"{retrieve_images_response.status_code}: {retrieve_images_response.text}"
+            )
+
+        try:
+            response = BatchGetImagesResponse.model_validate_json(retrieve_images_response.content)
+        except ValueError as e:
+            raise ImageServiceError(f"Malformed batch response: {e}")
+
+        return {image.image_id: image.b64_data for image in response.images}
+
     def update_image(self, image_id: str, b64_data: str):
         request_body = UpdateImageRequest(
             b64_data=b64_data,
         )
         try:
-            update_image_response = requests.put(
+            update_image_response = self.http_client.put(
                 self.image_service_endpoint + f"/{image_id}",
                 json=jsonable_encoder(request_body)
             )
-        except requests.exceptions.RequestException as e:
+        except httpx.RequestError as e:
             raise ImageServiceError(f"Couldn't make the request: {e}")
 
         if update_image_response.status_code == 404:
@@ -80,10 +111,10 @@ class ImageServiceClient(ImageServiceClientInterface):
 
     def delete_image(self, image_id: str):
         try:
-            delete_image_response = requests.delete(
+            delete_image_response = self.http_client.delete(
                 self.image_service_endpoint + f"/{image_id}",
             )
-        except requests.exceptions.RequestException as e:
+        except httpx.RequestError as e:
             raise ImageServiceError(f"Couldn't make the request: {e}")
 
         if delete_image_response.status_code == 404:
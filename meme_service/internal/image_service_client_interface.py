@@ -3,13 +3,17 @@ from abc import ABC, abstractmethod
 
 class ImageServiceClientInterface(ABC):
     @abstractmethod
-    def create_image(self, b64_data: str) -> str:
+    def create_image(self, b64_data: str, image_id: str | None = None) -> str:
         ...
 
     @abstractmethod
     def retrieve_image(self, image_id: str) -> str:
         ...
 
+    @abstractmethod
+    def retrieve_images(self, image_ids: list[str]) -> dict[str, str]:
+        ...
+
     @abstractmethod
     def update_image(self, image_id: str, b64_data: str):
         ...
@@ -17,3 +21,7 @@ class ImageServiceClientInterface(ABC):
     @abstractmethod
     def delete_image(self, image_id: str) -> bool:
         ...
+
+    @abstractmethod
+    def close(self):
+        ...
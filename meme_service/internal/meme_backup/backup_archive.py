@@ -0,0 +1,58 @@
+import hashlib
+import tarfile
+from typing import BinaryIO, Iterator
+
+from pydantic import ValidationError
+
+from internal.errors.errors import BackupError
+from internal.meme_backup.meme_exporter import MANIFEST_NAME, image_name
+from models.meme import DBMeme
+from models.meme_backup import BACKUP_FORMAT_VERSION, BackupManifest, BackupRecord
+from models.meme_import import ArchiveImage
+
+
+def read_backup(backup: BinaryIO) -> Iterator[ArchiveImage]:
+    """ Yields the memes of a backup one at a time as it is read, checking every image against its record.
+    Raises BackupError on a corrupted image, and after the last meme if the manifest is missing or doesn't match """
+    record: BackupRecord | None = None
+    manifest: BackupManifest | None = None
+    memes = 0
+    try:
+        with tarfile.open(fileobj=backup, mode="r|*") as tar:
+            for member in tar:
+                data = tar.extractfile(member).read()
+
+                if member.name == MANIFEST_NAME:
+                    manifest = BackupManifest.model_validate_json(data)
+                elif member.name.startswith("memes/"):
+                    if record is not None:
+                        raise BackupError(f"Meme {record.meme_id} has no image")
+                    record = BackupRecord.model_validate_json(data)
+                elif member.name.startswith("images/"):
+                    if record is None or member.name != image_name(record.image_id):
+                        raise BackupError(f"Image {member.name} has no meme record before it")
+                    if len(data) != record.size or hashlib.sha256(data).hexdigest() != record.sha256:
+                        raise BackupError(f"Image {record.image_id} of meme {record.meme_id} doesn't match its checksum")
+
+                    yield ArchiveImage(
+                        name=record.meme_id,
+                        data=data,
+                        meme=DBMeme(
+                            id=record.meme_id,
+                            image_id=record.image_id,
+                            caption=record.caption,
+                        ),
+                    )
+                    memes += 1
+                    record = None
+                else:
+                    raise BackupError(f"Unexpected entry: {member.name}")
+    except (tarfile.TarError, EOFError, ValidationError) as e:
+        raise BackupError(f"Malformed backup after {memes} memes: {e}")
+
+    if manifest is None:
+        raise BackupError(f"Backup is truncated after {memes} memes, it has no manifest")
+    if manifest.format_version != BACKUP_FORMAT_VERSION:
+        raise BackupError(f"Unsupported backup format version: {manifest.format_version}")
+    if manifest.memes != memes:
+        raise BackupError(f"Backup has {memes} memes, its manifest lists {manifest.memes}")
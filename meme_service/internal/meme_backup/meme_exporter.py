@@ -0,0 +1,118 @@
+import asyncio
+import datetime
+import hashlib
+import io
+import logging
+import tarfile
+from collections import deque
+from typing import BinaryIO
+
+from internal.async_db_service_client_interface import AsyncDatabaseServiceClientInterface
+from internal.async_image_service_client_interface import AsyncImageServiceClientInterface
+from internal.errors.errors import ImageNotFoundError
+from models.meme import DBMeme
+from models.meme_backup import BackupManifest, BackupRecord
+
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+
+
+def record_name(meme_id: str) -> str:
+    return f"memes/{meme_id}.json"
+
+
+def image_name(image_id: str) -> str:
+    return f"images/{image_id}"
+
+
+class MemeExporter:
+    """
+    Writes every meme to a tar stream as its record, with the image checksum, followed by the image bytes,
+    and a manifest at the very end, listing memes left out because their image is missing. Memes are read from the database export as they are written,
+    images are fetched up to concurrency at a time ahead of the one being written
+    """
+    db_service_client: AsyncDatabaseServiceClientInterface
+    image_service_client: AsyncImageServiceClientInterface
+    concurrency: int
+
+    def __init__(
+        self,
+        db_service_client: AsyncDatabaseServiceClientInterface,
+        image_service_client: AsyncImageServiceClientInterface,
+        concurrency: int = 16,
+    ):
+        self.db_service_client = db_service_client
+        self.image_service_client = image_service_client
+        self.concurrency = concurrency
+
+    async def export(self, output: BinaryIO, compress: bool = False) -> BackupManifest:
+        manifest = BackupManifest(
+            created_at=datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            memes=0,
+            total_bytes=0,
+        )
+        tar = tarfile.open(fileobj=output, mode="w|gz" if compress else "w|")
+        window: deque[asyncio.Task[bytes | None]] = deque()
+        window_memes: deque[DBMeme] = deque()
+
+        async def write_next():
+            db_meme, data = window_memes.popleft(), await window.popleft()
+            if data is None:
+                manifest.skipped_meme_ids.append(db_meme.id)
+                return
+            record = await asyncio.to_thread(self._write_meme, tar, db_meme, data)
+            manifest.memes += 1
+            manifest.total_bytes += record.size
+
+        try:
+            async for db_meme in self.db_service_client.export_memes():
+                if len(window) >= self.concurrency:
+                    await write_next()
+                window.append(asyncio.create_task(self._fetch_image(db_meme)))
+                window_memes.append(db_meme)
+
+            while len(window) > 0:
+                await write_next()
+
+            await asyncio.to_thread(self._add_file, tar, MANIFEST_NAME, manifest.model_dump_json().encode())
+        finally:
+            for task in window:
+                task.cancel()
+            # an export cut short still ends as a valid tar, its missing manifest tells it apart from a complete one
+            await asyncio.to_thread(tar.close)
+
+        logger.info("Exported %s memes, %s bytes of images", manifest.memes, manifest.total_bytes)
+        if len(manifest.skipped_meme_ids) > 0:
+            logger.error("Left out %s memes with missing images", len(manifest.skipped_meme_ids))
+
+        return manifest
+
+    async def _fetch_image(self, db_meme: DBMeme) -> bytes | None:
+        try:
+            image_stream = await self.image_service_client.open_image(db_meme.image_id)
+        except ImageNotFoundError:
+            logger.error("Image not found: %s, meme %s is left out of the export", db_meme.image_id, db_meme.id)
+            return None
+
+        return b"".join([chunk async for chunk in image_stream.chunks])
+
+    def _write_meme(self, tar: tarfile.TarFile, db_meme: DBMeme, data: bytes) -> BackupRecord:
+        record = BackupRecord(
+            meme_id=db_meme.id,
+            image_id=db_meme.image_id,
+            caption=db_meme.caption,
+            size=len(data),
+            sha256=hashlib.sha256(data).hexdigest(),
+        )
+        self._add_file(tar, record_name(record.meme_id), record.model_dump_json().encode())
+        self._add_file(tar, image_name(record.image_id), data)
+
+        return record
+
+    @staticmethod
+    def _add_file(tar: tarfile.TarFile, name: str, data: bytes):
+        member = tarfile.TarInfo(name)
+        member.size = len(data)
+        tar.addfile(member, io.BytesIO(data))
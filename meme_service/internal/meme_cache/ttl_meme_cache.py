@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import OrderedDict
+
+from internal.errors.errors import MemeNotFoundError
+from internal.meme_cache_interface import MemeCacheInterface
+from models.cache import MemeCacheStats
+from models.meme import DBMeme
+
+
+class TTLMemeCache(MemeCacheInterface):
+    """ Keeps database records for ttl seconds and ids that were not found for negative_ttl seconds.
+    Holds at most max_entries records, the least recently used ones are evicted first """
+    ttl: float
+    negative_ttl: float
+    max_entries: int
+    hits: int
+    negative_hits: int
+    misses: int
+    evictions: int
+    invalidations: int
+
+    def __init__(self, ttl: float, negative_ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # meme id -> (expiry time, record or None for a missing meme)
+        self._memes: OrderedDict[str, tuple[float, DBMeme | None]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, meme_id: str) -> DBMeme | None:
+        with self._lock:
+            entry = self._memes.get(meme_id)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, db_meme = entry
+            if expires_at <= time.monotonic():
+                del self._memes[meme_id]
+                self.misses += 1
+                return None
+
+            self._memes.move_to_end(meme_id)
+            if db_meme is None:
+                self.negative_hits += 1
+                raise MemeNotFoundError(f"Meme not found: {meme_id}")
+
+            self.hits += 1
+            # callers are free to modify the record they got
+            return db_meme.model_copy()
+
+    def version(self) -> int:
+        """ Changes on every invalidation, pass it to put() to drop records fetched before an invalidation """
+        return self.invalidations
+
+    def put(self, db_meme: DBMeme, version: int | None = None):
+        self._put(db_meme.id, db_meme.model_copy(), self.ttl, version)
+
+    def put_missing(self, meme_id: str, version: int | None = None):
+        self._put(meme_id, None, self.negative_ttl, version)
+
+    def _put(self, meme_id: str, db_meme: DBMeme | None, ttl: float, version: int | None):
+        with self._lock:
+            if version is not None and version != self.invalidations:
+                return
+            if ttl <= 0 or self.max_entries <= 0:
+                return
+
+            self._memes.pop(meme_id, None)
+            while len(self._memes) >= self.max_entries:
+                self._memes.popitem(last=False)
+                self.evictions += 1
+
+            self._memes[meme_id] = (time.monotonic() + ttl, db_meme)
+
+    def invalidate(self, meme_id: str):
+        with self._lock:
+            self.invalidations += 1
+            self._memes.pop(meme_id, None)
+
+    def stats(self) -> MemeCacheStats:
+        with self._lock:
+            return MemeCacheStats(
+                hits=self.hits,
+                negative_hits=self.negative_hits,
+                misses=self.misses,
+                evictions=self.evictions,
+                entries=len(self._memes),
+                max_entries=self.max_entries,
+            )
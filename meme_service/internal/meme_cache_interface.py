@@ -0,0 +1,31 @@
+from abc import ABC, abstractmethod
+
+from models.cache import MemeCacheStats
+from models.meme import DBMeme
+
+
+class MemeCacheInterface(ABC):
+    @abstractmethod
+    def get(self, meme_id: str) -> DBMeme | None:
+        """ Raises MemeNotFoundError if the meme is cached as missing """
+        ...
+
+    @abstractmethod
+    def version(self) -> int:
+        ...
+
+    @abstractmethod
+    def put(self, db_meme: DBMeme, version: int | None = None):
+        ...
+
+    @abstractmethod
+    def put_missing(self, meme_id: str, version: int | None = None):
+        ...
+
+    @abstractmethod
+    def invalidate(self, meme_id: str):
+        ...
+
+    @abstractmethod
+    def stats(self) -> MemeCacheStats:
+        ...
@@ -0,0 +1,57 @@
+import csv
+import os
+import tarfile
+from typing import Iterator
+
+from models.meme_import import ArchiveImage
+
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp"}
+
+
+def _is_image(name: str) -> bool:
+    return os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+
+
+def read_archive(path: str) -> Iterator[ArchiveImage]:
+    """ Yields images of a directory or a tarball one at a time in a stable order,
+    tarballs (compressed or not) are read as a stream, without seeking or listing them first """
+    if os.path.isdir(path):
+        yield from _read_directory(path)
+        return
+
+    with tarfile.open(path, mode="r|*") as tar:
+        for member in tar:
+            if not member.isfile() or not _is_image(member.name):
+                continue
+
+            image_file = tar.extractfile(member)
+            yield ArchiveImage(
+                name=member.name,
+                data=image_file.read(),
+            )
+
+
+def _read_directory(path: str) -> Iterator[ArchiveImage]:
+    for root, directories, files in os.walk(path):
+        directories.sort()
+        for file_name in sorted(files):
+            if not _is_image(file_name):
+                continue
+
+            file_path = os.path.join(root, file_name)
+            with open(file_path, "rb") as image_file:
+                yield ArchiveImage(
+                    name=os.path.relpath(file_path, path).replace(os.sep, "/"),
+                    data=image_file.read(),
+                )
+
+
+def read_captions(path: str) -> dict[str, str]:
+    """ Reads a CSV with filename and caption columns, filename is either the path inside the archive or the base name """
+    with open(path, newline="", encoding="utf-8") as captions_file:
+        return {
+            row["filename"]: row["caption"]
+            for row in csv.DictReader(captions_file)
+            if row.get("caption")
+        }
@@ -0,0 +1,60 @@
+import os
+import uuid
+
+
+class ImportCheckpoint:
+    """ The run id of the import on the first line, then names of imported images,
+    appended and synced to a file after every stored batch """
+    path: str
+    # made on the first run and kept by resumed ones, ids of imported memes are derived from it
+    run_id: str
+    completed: set[str]
+
+    def __init__(self, path: str):
+        self.path = path
+        self.completed = set()
+        run_id = None
+        cut_short = False
+        if os.path.isfile(path):
+            with open(path, encoding="utf-8") as checkpoint_file:
+                header = checkpoint_file.readline()
+                if header.endswith("\n"):
+                    run_id = header[:-1]
+                    try:
+                        uuid.UUID(run_id)
+                    except ValueError:
+                        raise ValueError(f"{path} is not an import checkpoint, its first line is not a run id")
+                    for line in checkpoint_file:
+                        # a line cut short by an interruption has no trailing newline and is not counted
+                        cut_short = not line.endswith("\n")
+                        if not cut_short:
+                            self.completed.add(line[:-1])
+
+        if run_id is None:
+            # a new import, or one interrupted before its run id was written
+            self.run_id = str(uuid.uuid4())
+            self._file = open(path, "w", encoding="utf-8")
+            self._write(f"{self.run_id}\n")
+        else:
+            self.run_id = run_id
+            self._file = open(path, "a", encoding="utf-8")
+            if cut_short:
+                self._file.write("\n")
+
+    def is_completed(self, name: str) -> bool:
+        return name in self.completed
+
+    def record(self, names: list[str]):
+        if len(names) == 0:
+            return
+
+        self._write("".join(f"{name}\n" for name in names))
+        self.completed.update(names)
+
+    def _write(self, text: str):
+        self._file.write(text)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,54 @@
+from typing import AsyncIterator
+
+from internal.async_db_service_client_interface import AsyncDatabaseServiceClientInterface
+from internal.async_image_service_client_interface import AsyncImageServiceClientInterface
+from internal.meme_import_target_interface import MemeImportTargetInterface
+from models.image import ImageUpload
+from models.meme import DBMeme
+
+
+class HTTPMemeImportTarget(MemeImportTargetInterface):
+    """ Uploads raw images to image service and inserts memes through database service bulk API """
+    image_service_client: AsyncImageServiceClientInterface
+    db_service_client: AsyncDatabaseServiceClientInterface
+
+    def __init__(
+        self,
+        image_service_client: AsyncImageServiceClientInterface,
+        db_service_client: AsyncDatabaseServiceClientInterface,
+    ):
+        self.image_service_client = image_service_client
+        self.db_service_client = db_service_client
+
+    async def upload_image(self, meme: DBMeme, data: bytes):
+        async def chunks() -> AsyncIterator[bytes]:
+            yield data
+
+        await self.image_service_client.upload_image(
+            meme.image_id,
+            ImageUpload(
+                chunks=chunks(),
+                content_length=len(data),
+            ),
+        )
+
+    async def create_memes(self, memes: list[DBMeme]) -> list[str]:
+        results = await self.db_service_client.create_memes(memes)
+        stored_ids = [result.meme_id for result in results if result.status == "created"]
+
+        # a conflicting record is only ours if an interrupted run stored it, it points to the image uploaded for it then
+        conflicting_ids = [result.meme_id for result in results if result.status == "conflict"]
+        if conflicting_ids:
+            image_ids = {meme.id: meme.image_id for meme in memes}
+            stored_memes = await self.db_service_client.retrieve_memes_by_ids(conflicting_ids)
+            stored_ids.extend(
+                stored_meme.id
+                for stored_meme in stored_memes
+                if image_ids.get(stored_meme.id) == stored_meme.image_id
+            )
+
+        return stored_ids
+
+    async def close(self):
+        await self.image_service_client.close()
+        await self.db_service_client.close()
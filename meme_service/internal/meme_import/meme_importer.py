@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import posixpath
+import uuid
+from typing import Iterator
+
+from internal.errors.errors import ServiceError
+from internal.meme_import.checkpoint import ImportCheckpoint
+from internal.meme_import_target_interface import MemeImportTargetInterface
+from models.meme import DBMeme
+from models.meme_import import ArchiveImage, ImportReport
+
+
+logger = logging.getLogger(__name__)
+
+# meme and image ids are derived from the checkpoint run id and the image name, so an image imported again by
+# a resumed run maps to the same records, while other imports with the same image names never do
+IMPORT_NAMESPACE = uuid.UUID("6f1c3b5e-3d2a-4c1e-9b7a-2f4d8e0a9c61")
+
+
+class MemeImporter:
+    """
+    Uploads up to concurrency images at a time and stores their memes in batches of batch_size,
+    the next batch is stored while uploads go on. Memes are recorded in the checkpoint only
+    after they are stored, an image uploaded again after an interruption overwrites itself
+    """
+    target: MemeImportTargetInterface
+    checkpoint: ImportCheckpoint
+    captions: dict[str, str]
+    concurrency: int
+    batch_size: int
+
+    def __init__(
+        self,
+        target: MemeImportTargetInterface,
+        checkpoint: ImportCheckpoint,
+        captions: dict[str, str] | None = None,
+        concurrency: int = 32,
+        batch_size: int = 500,
+    ):
+        self.target = target
+        self.checkpoint = checkpoint
+        self.captions = captions if captions is not None else {}
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+
+    async def run(self, images: Iterator[ArchiveImage]) -> ImportReport:
+        report = ImportReport()
+        uploads: set[asyncio.Task[tuple[str, DBMeme] | None]] = set()
+        uploaded: list[tuple[str, DBMeme]] = []
+        store_task: asyncio.Task | None = None
+
+        async def collect(return_when: str):
+            nonlocal uploads
+            done, uploads = await asyncio.wait(uploads, return_when=return_when)
+            for task in done:
+                result = task.result()
+                if result is None:
+                    report.failed += 1
+                else:
+                    uploaded.append(result)
+
+        async def store_ready(final: bool = False):
+            nonlocal store_task, uploaded
+            while len(uploaded) >= self.batch_size or (final and len(uploaded) > 0):
+                batch, uploaded = uploaded[:self.batch_size], uploaded[self.batch_size:]
+                # one batch is stored at a time, so a slow database slows uploads down instead of piling them up
+                if store_task is not None:
+                    await store_task
+                store_task = asyncio.create_task(self._store(batch, report))
+
+        try:
+            while True:
+                # reading and decompressing the archive is blocking file io
+                image = await asyncio.to_thread(next, images, None)
+                if image is None:
+                    break
+                if self.checkpoint.is_completed(image.name):
+                    report.skipped += 1
+                    continue
+
+                if len(uploads) >= self.concurrency:
+                    await collect(asyncio.FIRST_COMPLETED)
+                    await store_ready()
+                uploads.add(asyncio.create_task(self._upload(image)))
+
+            if len(uploads) > 0:
+                await collect(asyncio.ALL_COMPLETED)
+            await store_ready(final=True)
+            if store_task is not None:
+                await store_task
+        finally:
+            for task in uploads:
+                task.cancel()
+            if store_task is not None and not store_task.done():
+                store_task.cancel()
+
+        logger.info("Import finished: %s", report)
+
+        return report
+
+    def _db_meme(self, image: ArchiveImage) -> DBMeme:
+        if image.meme is not None:
+            return image.meme
+
+        caption = self.captions.get(image.name)
+        if caption is None:
+            caption = self.captions.get(posixpath.basename(image.name))
+
+        return DBMeme(
+            id=str(uuid.uuid5(IMPORT_NAMESPACE, f"meme:{self.checkpoint.run_id}:{image.name}")),
+            image_id=str(uuid.uuid5(IMPORT_NAMESPACE, f"image:{self.checkpoint.run_id}:{image.name}")),
+            caption=caption,
+        )
+
+    async def _upload(self, image: ArchiveImage) -> tuple[str, DBMeme] | None:
+        db_meme = self._db_meme(image)
+        try:
+            await self.target.upload_image(db_meme, image.data)
+        except ServiceError as e:
+            logger.error("Failed to upload image %s, error: %s", image.name, e)
+            return None
+
+        return image.name, db_meme
+
+    async def _store(self, batch: list[tuple[str, DBMeme]], report: ImportReport):
+        try:
+            stored_ids = set(await self.target.create_memes([db_meme for _, db_meme in batch]))
+        except ServiceError as e:
+            logger.error("Failed to store a batch of %s memes, error: %s", len(batch), e)
+            report.failed += len(batch)
+            return
+
+        stored_names = [name for name, db_meme in batch if db_meme.id in stored_ids]
+        self.checkpoint.record(stored_names)
+        report.imported += len(stored_names)
+        report.failed += len(batch) - len(stored_names)
+
+        logger.info("Stored %s of %s memes, %s", len(stored_names), len(batch), report)
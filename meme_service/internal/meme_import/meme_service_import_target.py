@@ -0,0 +1,48 @@
+import asyncio
+import base64
+
+from internal.meme_import_target_interface import MemeImportTargetInterface
+from internal.meme_service.meme_service import MemeServiceV1
+from models.meme import DBMeme
+
+
+class MemeServiceImportTarget(MemeImportTargetInterface):
+    """
+    Imports through the clients of an in-process meme service, in worker threads. Images are stored under the
+    ids the importer chose for them and records are inserted in batches, like HTTPMemeImportTarget does
+    """
+    meme_service: MemeServiceV1
+
+    def __init__(self, meme_service: MemeServiceV1):
+        self.meme_service = meme_service
+
+    async def upload_image(self, meme: DBMeme, data: bytes):
+        await asyncio.to_thread(
+            self.meme_service.image_service_client.create_image,
+            base64.b64encode(data).decode(),
+            meme.image_id,
+        )
+
+    async def create_memes(self, memes: list[DBMeme]) -> list[str]:
+        return await asyncio.to_thread(self._create_memes, memes)
+
+    def _create_memes(self, memes: list[DBMeme]) -> list[str]:
+        db_service_client = self.meme_service.db_service_client
+        results = db_service_client.create_memes(memes)
+        stored_ids = [result.meme_id for result in results if result.status == "created"]
+
+        # a conflicting record is only ours if an interrupted run stored it, it points to the image uploaded for it then
+        conflicting_ids = [result.meme_id for result in results if result.status == "conflict"]
+        if conflicting_ids:
+            image_ids = {meme.id: meme.image_id for meme in memes}
+            stored_memes = db_service_client.retrieve_memes_by_ids(conflicting_ids)
+            stored_ids.extend(
+                stored_meme.id
+                for stored_meme in stored_memes
+                if image_ids.get(stored_meme.id) == stored_meme.image_id
+            )
+
+        return stored_ids
+
+    async def close(self):
+        pass
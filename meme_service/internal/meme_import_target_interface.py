@@ -0,0 +1,20 @@
+from abc import ABC, abstractmethod
+
+from models.meme import DBMeme
+
+
+class MemeImportTargetInterface(ABC):
+    @abstractmethod
+    async def upload_image(self, meme: DBMeme, data: bytes):
+        """ Uploads the image of the meme, the importer runs at most its concurrency of these at a time """
+        ...
+
+    @abstractmethod
+    async def create_memes(self, memes: list[DBMeme]) -> list[str]:
+        """ Returns ids of the memes that are stored after the call, including ones an interrupted run of the same
+        import stored. Records of the same ids that don't match the memes are not counted """
+        ...
+
+    @abstractmethod
+    async def close(self):
+        ...
@@ -0,0 +1,568 @@
+import asyncio
+import itertools
+import logging
+import uuid
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable
+
+from internal.async_meme_service_interface import AsyncMemeServiceInterface
+from internal.async_db_service_client_interface import AsyncDatabaseServiceClientInterface
+from internal.async_image_service_client_interface import AsyncImageServiceClientInterface
+from internal.errors.errors import (DBServiceError, ImageServiceError, MemeNotFoundError, ImageNotFoundError,
+                                   ImageNotModifiedError, MemeNotModifiedError)
+from internal.etag.etag import etag_matches, image_if_none_match, meme_etag
+from internal.image_cache_interface import ImageCacheInterface
+from internal.meme_cache_interface import MemeCacheInterface
+from models.cache import CachedImage
+from models.image import ImageRevision, ImageStream
+from models.meme import DBMeme, DBMemePage, Meme, MemePage, MemeStream, MemeUpload
+
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncMemeServiceV1(AsyncMemeServiceInterface):
+    db_service_client: AsyncDatabaseServiceClientInterface
+    image_service_client: AsyncImageServiceClientInterface
+    image_fetch_concurrency: int
+    image_batch_size: int
+    parallel_create: bool
+    image_cache: ImageCacheInterface | None
+    meme_cache: MemeCacheInterface | None
+
+    def __init__(
+        self,
+        db_service_client: AsyncDatabaseServiceClientInterface,
+        image_service_client: AsyncImageServiceClientInterface,
+        image_fetch_concurrency: int = 10,
+        image_batch_size: int = 50,
+        parallel_create: bool = False,
+        image_cache: ImageCacheInterface | None = None,
+        meme_cache: MemeCacheInterface | None = None,
+    ):
+        self.db_service_client = db_service_client
+        self.image_service_client = image_service_client
+        self.image_fetch_concurrency = image_fetch_concurrency
+        self.image_batch_size = image_batch_size
+        self.parallel_create = parallel_create
+        self.image_cache = image_cache
+        self.meme_cache = meme_cache
+
+    async def create_meme(self, meme: Meme):
+        logger.info("Creating meme: %s", meme)
+
+        async def create_image(image_id: str):
+            await self.image_service_client.create_image(
+                meme.b64_data,
+                image_id,
+            )
+
+        await self._create_meme(meme.id, meme.caption, create_image)
+
+        logger.info("Created meme: %s", meme)
+
+    async def create_meme_from_upload(self, meme: MemeUpload):
+        logger.info("Creating meme from upload: %s, caption: %s", meme.id, meme.caption)
+
+        async def create_image(image_id: str):
+            await self.image_service_client.upload_image(
+                image_id,
+                meme.image,
+            )
+
+        await self._create_meme(meme.id, meme.caption, create_image)
+
+        logger.info("Created meme from upload: %s", meme.id)
+
+    async def _create_meme(self, meme_id: str, caption: str | None, create_image: Callable[[str], Awaitable[None]]):
+        """ The image id is chosen here, so the image and the database record can be written in any order """
+        db_meme = DBMeme(
+            id=meme_id,
+            image_id=str(uuid.uuid4()),
+            caption=caption,
+        )
+
+        if self.parallel_create:
+            await self._create_meme_parallel(db_meme, create_image)
+            self._cache_db_meme(db_meme)
+            return
+
+        try:
+            await create_image(db_meme.image_id)
+        except ImageServiceError as e:
+            logger.error("Failed to create image for %s, error: %s", db_meme, e)
+            raise
+
+        try:
+            await self.db_service_client.create_meme(
+                db_meme
+            )
+        except DBServiceError as e:
+            logger.error("Failed to create database record for %s, error: %s", db_meme, e)
+            raise
+
+        self._cache_db_meme(db_meme)
+
+    async def _create_meme_parallel(self, db_meme: DBMeme, create_image: Callable[[str], Awaitable[None]]):
+        """ Uploads the image and inserts the database record concurrently.
+        If only one of them succeeds, it is undone before the error is raised """
+        image_result, db_result = await asyncio.gather(
+            create_image(db_meme.image_id),
+            self.db_service_client.create_meme(
+                db_meme
+            ),
+            return_exceptions=True,
+        )
+        image_error = image_result if isinstance(image_result, Exception) else None
+        db_error = db_result if isinstance(db_result, Exception) else None
+
+        if image_error is not None and db_error is None:
+            logger.error("Failed to create image for %s, error: %s, removing database record", db_meme, image_error)
+            # the record was visible to readers for a moment
+            if self.meme_cache is not None:
+                self.meme_cache.invalidate(db_meme.id)
+            try:
+                await self.db_service_client.delete_meme(db_meme.id)
+            except DBServiceError as e:
+                logger.error("Failed to remove orphan database record for %s, error: %s", db_meme, e)
+            raise image_error
+
+        if db_error is not None and image_error is None:
+            logger.error("Failed to create database record for %s, error: %s, removing image", db_meme, db_error)
+            try:
+                await self.image_service_client.delete_image(db_meme.image_id)
+            except ImageServiceError as e:
+                logger.error("Failed to remove orphan image for %s, error: %s", db_meme, e)
+            raise db_error
+
+        if image_error is not None:
+            logger.error(
+                "Failed to create both image and database record for %s, image error: %s, database error: %s",
+                db_meme,
+                image_error,
+                db_error
+            )
+            raise image_error
+
+    async def retrieve_meme(self, meme_id: str, if_none_match: str | None = None) -> Meme:
+        """ The condition is evaluated against the image etag, a matching image is not downloaded """
+        logger.info("Retrieving meme: %s", meme_id)
+
+        try:
+            db_meme: DBMeme = await self._retrieve_db_meme(
+                meme_id
+            )
+        except MemeNotFoundError:
+            logger.error("Meme not found: %s", meme_id)
+            raise
+        except DBServiceError as e:
+            logger.error("Failed to retrieve database record for %s meme id, error: %s", meme_id, e)
+            raise
+
+        try:
+            image_revision = await self._retrieve_image(
+                db_meme.image_id,
+                image_if_none_match(if_none_match, db_meme.caption),
+            )
+        except ImageNotModifiedError as e:
+            logger.info("Meme: %s not modified", meme_id)
+            raise MemeNotModifiedError(meme_etag(e.etag, db_meme.caption) if e.etag is not None else None)
+        except ImageNotFoundError:
+            logger.error("Image not found: %s, even though there is a database record for it!", db_meme.image_id)
+            raise
+        except ImageServiceError as e:
+            logger.error("Failed to retrieve image for %s, error: %s", db_meme, e)
+            raise
+
+        meme = Meme(
+            id=db_meme.id,
+            b64_data=image_revision.b64_data,
+            caption=db_meme.caption,
+            etag=meme_etag(image_revision.etag, db_meme.caption) if image_revision.etag is not None else None,
+        )
+
+        logger.info("Successfully retrieved meme: %s", meme)
+
+        return meme
+
+    async def open_meme_image(self, meme_id: str, if_none_match: str | None = None) -> ImageStream:
+        """ Streams the image bytes straight from the image service, they are never base64 encoded or cached here """
+        logger.info("Opening image stream for meme: %s", meme_id)
+
+        try:
+            db_meme: DBMeme = await self._retrieve_db_meme(
+                meme_id
+            )
+        except MemeNotFoundError:
+            logger.error("Meme not found: %s", meme_id)
+            raise
+        except DBServiceError as e:
+            logger.error("Failed to retrieve database record for %s meme id, error: %s", meme_id, e)
+            raise
+
+        try:
+            image_stream = await self.image_service_client.open_image(
+                db_meme.image_id,
+                if_none_match,
+            )
+        except ImageNotModifiedError:
+            logger.info("Image for meme %s not modified", meme_id)
+            raise
+        except ImageNotFoundError:
+            logger.error("Image not found: %s, even though there is a database record for it!", db_meme.image_id)
+            raise
+        except ImageServiceError as e:
+            logger.error("Failed to open image stream for %s, error: %s", db_meme, e)
+            raise
+
+        logger.info(
+            "Opened image stream for meme: %s, content type: %s, content length: %s",
+            meme_id,
+            image_stream.content_type,
+            image_stream.content_length
+        )
+
+        return image_stream
+
+    async def retrieve_memes(self, skip: int, limit: int) -> list[Meme]:
+        logger.info("Retrieving memes: skip=%r, limit=%r", skip, limit)
+
+        cache_version = self.meme_cache.version() if self.meme_cache is not None else None
+        try:
+            db_memes = await self.db_service_client.retrieve_memes(
+                skip,
+                limit,
+            )
+        except DBServiceError as e:
+            logger.error("Failed to retrieve database records for memes. skip=%r limit=%r, error: %s", skip, limit, e)
+            raise
+
+        if self.meme_cache is not None:
+            for db_meme in db_memes:
+                self.meme_cache.put(db_meme, cache_version)
+
+        logger.info("Successfully retrieved db meme records: %s", db_memes)
+
+        memes: list[Meme] = []
+        meme_images = await self._retrieve_images(db_memes)
+        for db_meme, meme_image in zip(db_memes, meme_images):
+            memes.append(
+                Meme(
+                    id=db_meme.id,
+                    b64_data=meme_image,
+                    caption=db_meme.caption,
+                )
+            )
+
+        logger.info("Retrieved %s meme images for skip=%r, limit=%r", len(memes), skip, limit)
+
+        return memes
+
+    async def retrieve_memes_page(self, after: str, limit: int) -> MemePage:
+        logger.info("Retrieving memes page: after=%r, limit=%r", after, limit)
+
+        cache_version = self.meme_cache.version() if self.meme_cache is not None else None
+        try:
+            db_meme_page = await self.db_service_client.retrieve_memes_page(
+                after,
+                limit,
+            )
+        except DBServiceError as e:
+            logger.error(
+                "Failed to retrieve database records for memes page. after=%r limit=%r, error: %s",
+                after,
+                limit,
+                e
+            )
+            raise
+
+        if self.meme_cache is not None:
+            for db_meme in db_meme_page.memes:
+                self.meme_cache.put(db_meme, cache_version)
+
+        meme_images = await self._retrieve_images(db_meme_page.memes)
+        memes = [
+            Meme(
+                id=db_meme.id,
+                b64_data=meme_image,
+                caption=db_meme.caption,
+            )
+            for db_meme, meme_image in zip(db_meme_page.memes, meme_images)
+        ]
+
+        logger.info(
+            "Retrieved %s memes for after=%r, limit=%r, next cursor: %s",
+            len(memes),
+            after,
+            limit,
+            db_meme_page.next_cursor
+        )
+
+        return MemePage(
+            memes=memes,
+            next_cursor=db_meme_page.next_cursor,
+        )
+
+    async def stream_memes(self, skip: int, limit: int, after: str | None = None) -> MemeStream:
+        """ Fetches the database page right away, so its errors are raised here.
+        Memes are yielded one by one as their images arrive, only a bounded window of images is held at a time """
+        logger.info("Streaming memes: skip=%r, limit=%r, after=%r", skip, limit, after)
+
+        cache_version = self.meme_cache.version() if self.meme_cache is not None else None
+        try:
+            if after is None:
+                db_meme_page = DBMemePage(
+                    memes=await self.db_service_client.retrieve_memes(skip, limit),
+                )
+            else:
+                db_meme_page = await self.db_service_client.retrieve_memes_page(after, limit)
+        except DBServiceError as e:
+            logger.error(
+                "Failed to retrieve database records for memes. skip=%r limit=%r after=%r, error: %s",
+                skip,
+                limit,
+                after,
+                e
+            )
+            raise
+
+        if self.meme_cache is not None:
+            for db_meme in db_meme_page.memes:
+                self.meme_cache.put(db_meme, cache_version)
+
+        async def stream() -> AsyncIterator[Meme]:
+            streamed = 0
+            async for db_meme, b64_data in self._stream_images(db_meme_page.memes):
+                yield Meme(
+                    id=db_meme.id,
+                    b64_data=b64_data,
+                    caption=db_meme.caption,
+                )
+                streamed += 1
+
+            logger.info("Streamed %s memes for skip=%r, limit=%r, after=%r", streamed, skip, limit, after)
+
+        return MemeStream(
+            memes=stream(),
+            next_cursor=db_meme_page.next_cursor,
+        )
+
+    async def _retrieve_db_meme(self, meme_id: str) -> DBMeme:
+        if self.meme_cache is None:
+            return await self.db_service_client.retrieve_meme(meme_id)
+
+        db_meme = self.meme_cache.get(meme_id)
+        if db_meme is not None:
+            return db_meme
+
+        cache_version = self.meme_cache.version()
+        try:
+            db_meme = await self.db_service_client.retrieve_meme(meme_id)
+        except MemeNotFoundError:
+            self.meme_cache.put_missing(meme_id, cache_version)
+            raise
+        self.meme_cache.put(db_meme, cache_version)
+
+        return db_meme
+
+    def _cache_db_meme(self, db_meme: DBMeme):
+        """ Replaces the cached record after a write, lookups that started before it are not written back """
+        if self.meme_cache is None:
+            return
+
+        self.meme_cache.invalidate(db_meme.id)
+        self.meme_cache.put(db_meme)
+
+    async def _retrieve_image(self, image_id: str, if_none_match: str | None = None) -> ImageRevision:
+        """ Raises ImageNotModifiedError if if_none_match matches the current image """
+        if self.image_cache is None:
+            return await self.image_service_client.retrieve_image_revision(image_id, if_none_match)
+
+        cached_image = self.image_cache.get(image_id)
+        if cached_image is None:
+            cache_version = self.image_cache.version()
+            stale_image = self.image_cache.get_stale(image_id)
+            if stale_image is None:
+                # a matching image is not sent, so there is nothing to cache then
+                image_revision = await self.image_service_client.retrieve_image_revision(image_id, if_none_match)
+                self.image_cache.put(image_id, image_revision.b64_data, cache_version, image_revision.etag)
+                return image_revision
+
+            try:
+                image_revision = await self.image_service_client.retrieve_image_revision(image_id, stale_image.etag)
+            except ImageNotModifiedError:
+                self.image_cache.refresh(image_id)
+                cached_image = stale_image
+            else:
+                self.image_cache.put(image_id, image_revision.b64_data, cache_version, image_revision.etag)
+                cached_image = CachedImage(b64_data=image_revision.b64_data, etag=image_revision.etag)
+
+        if cached_image.etag is not None and etag_matches(if_none_match, cached_image.etag):
+            raise ImageNotModifiedError(cached_image.etag)
+
+        return ImageRevision(
+            b64_data=cached_image.b64_data,
+            etag=cached_image.etag,
+        )
+
+    async def _retrieve_images(self, db_memes: list[DBMeme]) -> list[str]:
+        return [b64_data async for _, b64_data in self._stream_images(db_memes)]
+
+    async def _stream_images(self, db_memes: list[DBMeme]) -> AsyncIterator[tuple[DBMeme, str]]:
+        """ Yields (db_meme, image) pairs in db_memes order. Images are fetched in batches of image_batch_size,
+        at most image_fetch_concurrency batches are being fetched or waiting to be consumed at a time.
+        Cached images are not fetched, the first failure in db_memes order is raised """
+        cache_version = self.image_cache.version() if self.image_cache is not None else None
+
+        async def retrieve_batch(batch: list[DBMeme]) -> dict[str, str]:
+            images: dict[str, str] = {}
+            missed_image_ids: list[str] = []
+            for db_meme in batch:
+                cached_image = self.image_cache.get(db_meme.image_id) if self.image_cache is not None else None
+                if cached_image is None:
+                    missed_image_ids.append(db_meme.image_id)
+                else:
+                    images[db_meme.image_id] = cached_image.b64_data
+
+            if missed_image_ids:
+                fetched_images = await self.image_service_client.retrieve_images(missed_image_ids)
+                for image_id, image_revision in fetched_images.items():
+                    images[image_id] = image_revision.b64_data
+                    if self.image_cache is not None:
+                        self.image_cache.put(image_id, image_revision.b64_data, cache_version, image_revision.etag)
+
+            return images
+
+        batches = (db_memes[i:i + self.image_batch_size] for i in range(0, len(db_memes), self.image_batch_size))
+        pending: deque[tuple[list[DBMeme], asyncio.Task]] = deque(
+            (batch, asyncio.create_task(retrieve_batch(batch)))
+            for batch in itertools.islice(batches, self.image_fetch_concurrency)
+        )
+        try:
+            while pending:
+                batch, task = pending.popleft()
+                try:
+                    images = await task
+                except ImageServiceError as e:
+                    logger.error("Failed to retrieve images %s, error: %s", [db_meme.image_id for db_meme in batch], e)
+                    raise
+
+                next_batch = next(batches, None)
+                if next_batch is not None:
+                    pending.append((next_batch, asyncio.create_task(retrieve_batch(next_batch))))
+
+                for db_meme in batch:
+                    if db_meme.image_id not in images:
+                        logger.error(
+                            "Image not found: %s, even though there is a database record for it!",
+                            db_meme.image_id
+                        )
+                        raise ImageNotFoundError(f"Image not found: {db_meme.image_id}")
+                    yield db_meme, images[db_meme.image_id]
+        finally:
+            for _, task in pending:
+                task.cancel()
+            await asyncio.gather(*(task for _, task in pending), return_exceptions=True)
+
+    async def update_meme(self, meme_id: str, meme: Meme):
+        logger.info("Updating meme: %s, update: %s", meme_id, meme)
+
+        async def update_image(image_id: str):
+            await self.image_service_client.update_image(
+                image_id,
+                meme.b64_data,
+            )
+
+        await self._update_meme(meme_id, meme.caption, update_image if meme.b64_data != "" else None)
+
+        logger.info("Successfully updated meme: %s", meme_id)
+
+    async def update_meme_from_upload(self, meme_id: str, meme: MemeUpload):
+        logger.info("Updating meme from upload: %s, caption: %s", meme_id, meme.caption)
+
+        async def update_image(image_id: str):
+            await self.image_service_client.upload_image(
+                image_id,
+                meme.image,
+            )
+
+        await self._update_meme(meme_id, meme.caption, update_image if meme.image is not None else None)
+
+        logger.info("Successfully updated meme from upload: %s", meme_id)
+
+    async def _update_meme(
+        self,
+        meme_id: str,
+        caption: str | None,
+        update_image: Callable[[str], Awaitable[None]] | None,
+    ):
+        if caption:
+            logger.info("Updating caption for %s: %s", meme_id, caption)
+
+            # database service returns the updated record, so it is not fetched beforehand
+            try:
+                db_meme = await self.db_service_client.update_meme(
+                    meme_id,
+                    caption,
+                )
+            except DBServiceError as e:
+                logger.error("Failed to update database record for %s, error: %s", meme_id, e)
+                if self.meme_cache is not None:
+                    self.meme_cache.invalidate(meme_id)
+                raise
+
+            self._cache_db_meme(db_meme)
+
+            logger.info("Successfully updated caption for %s", meme_id)
+        else:
+            try:
+                db_meme = await self._retrieve_db_meme(
+                    meme_id
+                )
+            except DBServiceError as e:
+                logger.error("Failed to retrieve database record for %s, error: %s", meme_id, e)
+                raise
+
+            logger.info("Successfully retrieved database record for %s: %s", meme_id, db_meme)
+
+        if update_image is not None:
+            logger.info("Updating image for %s", meme_id)
+
+            try:
+                await update_image(db_meme.image_id)
+            except ImageServiceError as e:
+                logger.error("Failed to update image for %s, error: %s", db_meme, e)
+                raise
+            finally:
+                # the image may have changed even if the request failed midway
+                if self.image_cache is not None:
+                    self.image_cache.invalidate(db_meme.image_id)
+
+            logger.info("Successfully updated image for %s", meme_id)
+
+    async def delete_meme(self, meme_id: str):
+        logger.info("Deleting meme: %s", meme_id)
+
+        try:
+            deleted_db_meme = await self.db_service_client.delete_meme(
+                meme_id
+            )
+        except DBServiceError as e:
+            logger.error("Failed to delete database record for %s, error: %s", meme_id, e)
+            raise
+        finally:
+            if self.meme_cache is not None:
+                self.meme_cache.invalidate(meme_id)
+
+        if self.image_cache is not None:
+            self.image_cache.invalidate(deleted_db_meme.image_id)
+
+        try:
+            await self.image_service_client.delete_image(
+                deleted_db_meme.image_id
+            )
+        except ImageServiceError as e:
+            logger.error("Failed to delete image for %s, error: %s", deleted_db_meme, e)
+            raise
+
+        logger.info("Successfully deleted meme: %s", meme_id)
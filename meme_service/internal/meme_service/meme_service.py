@@ -1,10 +1,12 @@
+import contextvars
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 from internal.meme_service_interface import MemeServiceInterface
 from internal.db_service_client_interface import DatabaseServiceClientInterface
 from internal.image_service_client_interface import ImageServiceClientInterface
 from internal.errors.errors import DBServiceError, ImageServiceError, MemeNotFoundError, ImageNotFoundError
-from models.meme import DBMeme, Meme
+from models.meme import DBMeme, Meme, MemePage
 
 
 logger = logging.getLogger(__name__)
@@ -13,24 +15,30 @@ logger = logging.getLogger(__name__)
 class MemeServiceV1(MemeServiceInterface):
     db_service_client: DatabaseServiceClientInterface
     image_service_client: ImageServiceClientInterface
+    image_fetch_concurrency: int
+    image_batch_size: int
 
     def __init__(
         self,
         db_service_client: DatabaseServiceClientInterface,
         image_service_client: ImageServiceClientInterface,
+        image_fetch_concurrency: int = 10,
+        image_batch_size: int = 50,
     ):
         self.db_service_client = db_service_client
         self.image_service_client = image_service_client
+        self.image_fetch_concurrency = image_fetch_concurrency
+        self.image_batch_size = image_batch_size
 
     def create_meme(self, meme: Meme):
-        logger.info(f"Creating meme: {meme}")
+        logger.info("Creating meme: %s", meme)
 
         try:
             image_id: str = self.image_service_client.create_image(
                 meme.b64_data
             )
         except ImageServiceError as e:
-            logger.error(f"Failed to create image for {meme}, error: {e}")
+            logger.error("Failed to create image for %s, error: %s", meme, e)
             raise
 
         try:
@@ -42,23 +50,23 @@ class MemeServiceV1(MemeServiceInterface):
                 )
             )
         except DBServiceError as e:
-            logger.error(f"Failed to create database record for {meme}, error: {e}")
+            logger.error("Failed to create database record for %s, error: %s", meme, e)
             raise
 
-        logger.info(f"Created meme: {meme}")
+        logger.info("Created meme: %s", meme)
 
     def retrieve_meme(self, meme_id: str):
-        logger.info(f"Retrieving meme: {meme_id}")
+        logger.info("Retrieving meme: %s", meme_id)
 
         try:
             db_meme: DBMeme = self.db_service_client.retrieve_meme(
                 meme_id
             )
         except MemeNotFoundError:
-            logger.error(f"Meme not found: {meme_id}")
+            logger.error("Meme not found: %s", meme_id)
             raise
         except DBServiceError as e:
-            logger.error(f"Failed to retrieve database record for {meme_id} meme id, error: {e}")
+            logger.error("Failed to retrieve database record for %s meme id, error: %s", meme_id, e)
             raise
 
         try:
@@ -66,10 +74,10 @@ class MemeServiceV1(MemeServiceInterface):
                 db_meme.image_id
             )
         except ImageNotFoundError:
-            logger.error(f"Image not found: {db_meme.image_id}, even though there is a database record for it!")
+            logger.error("Image not found: %s, even though there is a database record for it!", db_meme.image_id)
             raise
         except ImageServiceError as e:
-            logger.error(f"Failed to retrieve image for {db_meme}, error: {e}")
+            logger.error("Failed to retrieve image for %s, error: %s", db_meme, e)
             raise
 
         meme = Meme(
@@ -78,12 +86,12 @@ class MemeServiceV1(MemeServiceInterface):
             caption=db_meme.caption,
         )
 
-        logger.info(f"Successfully retrieved meme: {meme}")
+        logger.info("Successfully retrieved meme: %s", meme)
 
         return meme
 
     def retrieve_memes(self, skip: int, limit: int) -> list[Meme]:
-        logger.info(f"Retrieving memes: {skip=}, {limit=}")
+        logger.info("Retrieving memes: skip=%r, limit=%r", skip, limit)
 
         try:
             db_memes = self.db_service_client.retrieve_memes(
@@ -91,20 +99,14 @@ class MemeServiceV1(MemeServiceInterface):
                 limit,
             )
         except DBServiceError as e:
-            logger.error(f"Failed to retrieve database records for memes. {skip=} {limit=}, error: {e}")
+            logger.error("Failed to retrieve database records for memes. skip=%r limit=%r, error: %s", skip, limit, e)
             raise
 
-        logger.info(f"Successfully retrieved db meme records: {db_memes}")
+        logger.info("Successfully retrieved db meme records: %s", db_memes)
 
         memes: list[Meme] = []
-        for db_meme in db_memes:
-            try:
-                meme_image = self.image_service_client.retrieve_image(
-                    db_meme.image_id
-                )
-            except ImageServiceError as e:
-                logger.error(f"Failed to retrieve image for {db_meme}, error: {e}")
-                raise
+        meme_images = self._retrieve_images(db_memes)
+        for db_meme, meme_image in zip(db_memes, meme_images):
             memes.append(
                 Meme(
                     id=db_meme.id,
@@ -113,40 +115,114 @@ class MemeServiceV1(MemeServiceInterface):
                 )
             )
 
-        logger.info(f"Retrieved {len(memes)} meme images for {skip=}, {limit=}. Completed memes: {memes}")
+        logger.info("Retrieved %s meme images for skip=%r, limit=%r", len(memes), skip, limit)
 
         return memes
 
-    def update_meme(self, meme_id: str, meme: Meme):
-        logger.info(f"Updating meme: {meme_id}, update: {meme}")
+    def retrieve_memes_page(self, after: str, limit: int) -> MemePage:
+        logger.info("Retrieving memes page: after=%r, limit=%r", after, limit)
 
         try:
-            db_meme = self.db_service_client.retrieve_meme(
-                meme_id
+            db_meme_page = self.db_service_client.retrieve_memes_page(
+                after,
+                limit,
             )
         except DBServiceError as e:
-            logger.error(f"Failed to retrieve database record for {meme}, error: {e}")
+            logger.error(
+                "Failed to retrieve database records for memes page. after=%r limit=%r, error: %s",
+                after,
+                limit,
+                e
+            )
             raise
 
-        logger.info(f"Successfully retrieved database record for {meme_id}: {db_meme}")
+        meme_images = self._retrieve_images(db_meme_page.memes)
+        memes = [
+            Meme(
+                id=db_meme.id,
+                b64_data=meme_image,
+                caption=db_meme.caption,
+            )
+            for db_meme, meme_image in zip(db_meme_page.memes, meme_images)
+        ]
+
+        logger.info(
+            "Retrieved %s memes for after=%r, limit=%r, next cursor: %s",
+            len(memes),
+            after,
+            limit,
+            db_meme_page.next_cursor
+        )
+
+        return MemePage(
+            memes=memes,
+            next_cursor=db_meme_page.next_cursor,
+        )
+
+    def _retrieve_images(self, db_memes: list[DBMeme]) -> list[str]:
+        """ Fetches images in batches of image_batch_size on a thread pool of image_fetch_concurrency workers.
+        Results keep the order of db_memes, the first failure in that order is raised.
+        Each batch runs in a copy of the caller's context, keeping its trace and log sampling """
+        if len(db_memes) == 0:
+            return []
+
+        batches = [
+            [db_meme.image_id for db_meme in db_memes[i:i + self.image_batch_size]]
+            for i in range(0, len(db_memes), self.image_batch_size)
+        ]
+        with ThreadPoolExecutor(max_workers=min(self.image_fetch_concurrency, len(batches))) as executor:
+            futures = [
+                executor.submit(contextvars.copy_context().run, self.image_service_client.retrieve_images, batch)
+                for batch in batches
+            ]
+            images: dict[str, str] = {}
+            for batch, future in zip(batches, futures):
+                try:
+                    images.update(future.result())
+                except ImageServiceError as e:
+                    logger.error("Failed to retrieve images %s, error: %s", batch, e)
+                    executor.shutdown(cancel_futures=True)
+                    raise
+
+        meme_images: list[str] = []
+        for db_meme in db_memes:
+            if db_meme.image_id not in images:
+                logger.error("Image not found: %s, even though there is a database record for it!", db_meme.image_id)
+                raise ImageNotFoundError(f"Image not found: {db_meme.image_id}")
+            meme_images.append(images[db_meme.image_id])
+
+        return meme_images
+
+    def update_meme(self, meme_id: str, meme: Meme):
+        logger.info("Updating meme: %s, update: %s", meme_id, meme)
 
         if meme.caption:
-            logger.info(f"Updating caption for {meme_id}: {db_meme.caption} -> {meme.caption}")
+            logger.info("Updating caption for %s: %s", meme_id, meme.caption)
 
-            db_meme.caption = meme.caption
+            # database service returns the updated record, so it is not fetched beforehand
             try:
-                self.db_service_client.update_meme(
+                db_meme = self.db_service_client.update_meme(
                     meme_id,
-                    db_meme
+                    meme.caption,
+                )
+            except DBServiceError as e:
+                logger.error("Failed to update database record for %s, error: %s", meme, e)
+                raise
+
+            logger.info("Successfully updated caption for %s", meme_id)
+        else:
+            try:
+                db_meme = self.db_service_client.retrieve_meme(
+                    meme_id
                 )
             except DBServiceError as e:
-                logger.error(f"Failed to update database record for {meme}, error: {e}")
+                logger.error("Failed to retrieve database record for %s, error: %s", meme, e)
                 raise
 
-            logger.info(f"Successfully updated caption for {meme_id}")
+            logger.info("Successfully retrieved database record for %s: %s", meme_id, db_meme)
 
         if meme.b64_data != "":
-            logger.info(f"Updating b64 data for {meme_id}")
+            logger.info("Updating b64 data for %s", meme_id)
 
             try:
                 self.image_service_client.update_image(
@@ -154,22 +230,22 @@ class MemeServiceV1(MemeServiceInterface):
                     meme.b64_data,
                 )
             except ImageServiceError as e:
-                logger.error(f"Failed to update image for {db_meme}, error: {e}")
+                logger.error("Failed to update image for %s, error: %s", db_meme, e)
                 raise
 
-            logger.info(f"Successfully updated b64 data for {meme_id}")
+            logger.info("Successfully updated b64 data for %s", meme_id)
 
-        logger.info(f"Successfully updated meme: {meme_id}")
+        logger.info("Successfully updated meme: %s", meme_id)
 
     def delete_meme(self, meme_id: str):
-        logger.info(f"Deleting meme: {meme_id}")
+        logger.info("Deleting meme: %s", meme_id)
 
         try:
             deleted_db_meme = self.db_service_client.delete_meme(
                 meme_id
             )
         except DBServiceError as e:
-            logger.error(f"Failed to delete database record for {meme_id}, error: {e}")
+            logger.error("Failed to delete database record for %s, error: %s", meme_id, e)
             raise
 
         try:
@@ -177,7 +253,7 @@ class MemeServiceV1(MemeServiceInterface):
                 deleted_db_meme.image_id
             )
         except ImageServiceError as e:
-            logger.error(f"Failed to delete image for {deleted_db_meme}, error: {e}")
+            logger.error("Failed to delete image for %s, error: %s", deleted_db_meme, e)
             raise
 
-        logger.info(f"Successfully deleted meme: {meme_id}")
+        logger.info("Successfully deleted meme: %s", meme_id)
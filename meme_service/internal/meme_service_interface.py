@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from models.meme import Meme
+from models.meme import Meme, MemePage
 
 
 class MemeServiceInterface(ABC):
@@ -15,6 +15,10 @@ class MemeServiceInterface(ABC):
     def retrieve_memes(self, skip: int, limit: int) -> list[Meme]:
         ...
 
+    @abstractmethod
+    def retrieve_memes_page(self, after: str, limit: int) -> MemePage:
+        ...
+
     @abstractmethod
     def update_meme(self, meme_id: str, meme: Meme):
         ...
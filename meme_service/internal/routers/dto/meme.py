@@ -1,9 +1,10 @@
 from pydantic import BaseModel
 
 from models.meme import Meme
+from models.redacted import RedactedModel
 
 
-class CreateMemeRequest(BaseModel):
+class CreateMemeRequest(RedactedModel):
     b64_data: str
     caption: str | None = None
 
@@ -18,12 +19,17 @@ class CreateMemeResponse(BaseModel):
     meme_id: str
 
 
-class RetrieveMemeResponse(BaseModel):
+class RetrieveMemeResponse(RedactedModel):
     b64_data: str
     caption: str | None = None
 
 
-class UpdateMemeRequest(BaseModel):
+class RetrieveMemesPageResponse(BaseModel):
+    memes: list[RetrieveMemeResponse]
+    next_cursor: str | None = None
+
+
+class UpdateMemeRequest(RedactedModel):
     b64_data: str | None = None
     caption: str | None = None
 
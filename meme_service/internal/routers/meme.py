@@ -1,46 +1,173 @@
 import logging
+from typing import AsyncIterator, TypeVar
 
-from fastapi import status, APIRouter, HTTPException
+from fastapi import status, APIRouter, Header, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from starlette.datastructures import UploadFile
 
-from internal.errors.errors import MemeNotFoundError, ServiceError
-from internal.routers.dto.meme import RetrieveMemeResponse, CreateMemeRequest, UpdateMemeRequest, CreateMemeResponse
-from internal.meme_service_interface import MemeServiceInterface
+from internal.errors.errors import (ImageNotFoundError, ImageNotModifiedError, InvalidCursorError, MemeNotFoundError,
+                                   MemeNotModifiedError, ServiceError)
+from internal.routers.dto.meme import (RetrieveMemeResponse, RetrieveMemesPageResponse, CreateMemeRequest,
+                                      UpdateMemeRequest, CreateMemeResponse)
+from internal.async_meme_service_interface import AsyncMemeServiceInterface
+from models.image import ImageUpload
+from models.meme import MemeUpload
 
 
 logger = logging.getLogger(__name__)
 
+UPLOAD_CHUNK_SIZE = 64 * 1024
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
 
-def get_router(meme_service: MemeServiceInterface) -> APIRouter:
+RequestModel = TypeVar("RequestModel", bound=BaseModel)
+
+
+def _upload_request_body(json_model: type[BaseModel], image_required: bool) -> dict:
+    multipart_schema = {
+        "type": "object",
+        "properties": {
+            "image": {"type": "string", "format": "binary"},
+            "caption": {"type": "string"},
+        },
+    }
+    if image_required:
+        multipart_schema["required"] = ["image"]
+
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": json_model.model_json_schema()},
+                "multipart/form-data": {"schema": multipart_schema},
+                "application/octet-stream": {"schema": {"type": "string", "format": "binary"}},
+            },
+        },
+    }
+
+
+def _parse_json(model: type[RequestModel], body: bytes) -> RequestModel:
+    try:
+        return model.model_validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False), body=body)
+
+
+async def _read_upload_file(upload_file: UploadFile) -> AsyncIterator[bytes]:
+    while chunk := await upload_file.read(UPLOAD_CHUNK_SIZE):
+        yield chunk
+
+
+async def _parse_upload(request: Request, caption: str | None) -> MemeUpload | None:
+    """ Returns None for JSON bodies. The image is not read here, it is streamed to the image service later.
+    Multipart files are spooled to disk by the form parser, raw bodies are streamed straight from the socket """
+    content_type = request.headers.get("Content-Type", "").split(";")[0].strip().lower()
+
+    if content_type == "application/octet-stream":
+        content_length = request.headers.get("Content-Length")
+        return MemeUpload(
+            image=ImageUpload(
+                chunks=request.stream(),
+                content_length=int(content_length) if content_length is not None else None,
+            ),
+            caption=caption,
+        )
+
+    if content_type == "multipart/form-data":
+        form = await request.form(max_files=1)
+        image = form.get("image")
+        form_caption = form.get("caption")
+        if form_caption is not None and not isinstance(form_caption, str):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Caption must be a text field"
+            )
+        if image is not None and not isinstance(image, UploadFile):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Image must be a file"
+            )
+
+        return MemeUpload(
+            image=ImageUpload(
+                chunks=_read_upload_file(image),
+                content_length=image.size,
+            ) if image is not None else None,
+            caption=form_caption if form_caption is not None else caption,
+        )
+
+    return None
+
+
+def get_router(meme_service: AsyncMemeServiceInterface) -> APIRouter:
     router = APIRouter(
         prefix="/memes",
         tags=["memes"],
     )
 
-    @router.post("/", status_code=status.HTTP_201_CREATED, response_model=CreateMemeResponse)
-    async def create_meme(request: CreateMemeRequest):
-        logger.info(f"Creating meme: {request}")
-
-        meme = request.to_model()
+    @router.post(
+        "/",
+        status_code=status.HTTP_201_CREATED,
+        response_model=CreateMemeResponse,
+        openapi_extra=_upload_request_body(CreateMemeRequest, image_required=True),
+    )
+    async def create_meme(request: Request, caption: str | None = None):
+        """ Accepts a JSON body with base64 image data, a multipart form with an "image" file and a "caption" field,
+        or the raw image as an application/octet-stream body with the caption in the query """
         try:
-            meme_service.create_meme(meme)
+            meme_upload = await _parse_upload(request, caption)
+            if meme_upload is None:
+                create_request = _parse_json(CreateMemeRequest, await request.body())
+                logger.info("Creating meme: %s", create_request)
+
+                meme = create_request.to_model()
+                meme_id = meme.id
+                await meme_service.create_meme(meme)
+            else:
+                if meme_upload.image is None:
+                    raise HTTPException(
+                        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                        detail="No image given for a create operation"
+                    )
+                logger.info("Creating meme from upload: %s", meme_upload.id)
+
+                meme_id = meme_upload.id
+                await meme_service.create_meme_from_upload(meme_upload)
         except ServiceError as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=str(e)
             )
+        finally:
+            await request.close()
 
-        logger.info(f"Successfully created meme: {meme}")
+        logger.info("Successfully created meme: %s", meme_id)
 
         return CreateMemeResponse(
-            meme_id=meme.id
+            meme_id=meme_id
         )
 
-    @router.get("/{meme_id}", response_model=RetrieveMemeResponse)
-    async def retrieve_meme(meme_id: str) -> RetrieveMemeResponse:
-        logger.info(f"Retrieving meme with id: {meme_id}")
+    @router.get(
+        "/{meme_id}",
+        response_model=RetrieveMemeResponse,
+        responses={status.HTTP_304_NOT_MODIFIED: {"description": "Not Modified"}},
+    )
+    async def retrieve_meme(
+        meme_id: str,
+        response: Response,
+        if_none_match: str | None = Header(default=None),
+    ) -> RetrieveMemeResponse:
+        logger.info("Retrieving meme with id: %s", meme_id)
 
         try:
-            meme = meme_service.retrieve_meme(meme_id)
+            meme = await meme_service.retrieve_meme(meme_id, if_none_match)
+        except MemeNotModifiedError as e:
+            # the condition is evaluated by storage service, the image is not downloaded on a match
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED,
+                headers={"ETag": e.etag} if e.etag is not None else {},
+            )
         except MemeNotFoundError:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -51,19 +178,82 @@ def get_router(meme_service: MemeServiceInterface) -> APIRouter:
                 detail=str(e)
             )
 
-        logger.info(f"Successfully retrieved meme: {meme} for meme id: {meme_id}")
+        logger.info("Successfully retrieved meme: %s for meme id: %s", meme, meme_id)
+
+        if meme.etag is not None:
+            response.headers["ETag"] = meme.etag
 
         return RetrieveMemeResponse(
             b64_data=meme.b64_data,
             caption=meme.caption
         )
 
-    @router.get("/", response_model=list[RetrieveMemeResponse])
-    async def retrieve_memes(skip: int = 0, limit: int = 3) -> list[RetrieveMemeResponse]:
-        logger.info(f"Retrieving memes at {skip=}, {limit=}")
+    @router.get(
+        "/{meme_id}/image",
+        response_class=StreamingResponse,
+        responses={
+            status.HTTP_200_OK: {"content": {"application/octet-stream": {}}},
+            status.HTTP_304_NOT_MODIFIED: {"description": "Not Modified"},
+        },
+    )
+    async def retrieve_meme_image(meme_id: str, if_none_match: str | None = Header(default=None)) -> Response:
+        logger.info("Retrieving image for meme with id: %s", meme_id)
 
         try:
-            memes = meme_service.retrieve_memes(skip, limit)
+            image_stream = await meme_service.open_meme_image(meme_id, if_none_match)
+        except ImageNotModifiedError as e:
+            # the condition is evaluated by storage service, the image is not downloaded on a match
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED,
+                headers={"ETag": e.etag} if e.etag is not None else {},
+            )
+        except (MemeNotFoundError, ImageNotFoundError):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+            )
+        except ServiceError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=str(e)
+            )
+
+        headers = {}
+        if image_stream.content_length is not None:
+            headers["Content-Length"] = str(image_stream.content_length)
+        if image_stream.etag is not None:
+            headers["ETag"] = image_stream.etag
+
+        return StreamingResponse(
+            image_stream.chunks,
+            media_type=image_stream.content_type,
+            headers=headers,
+        )
+
+    @router.get(
+        "/",
+        response_model=list[RetrieveMemeResponse] | RetrieveMemesPageResponse,
+        responses={status.HTTP_200_OK: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+    )
+    async def retrieve_memes(
+        skip: int = 0,
+        limit: int = 3,
+        after: str | None = None,
+        accept: str | None = Header(default=None),
+    ) -> list[RetrieveMemeResponse] | RetrieveMemesPageResponse | StreamingResponse:
+        """ Offset pagination by default. Passing after (an empty string for the first page, next_cursor after that)
+        switches to cursor pagination, which costs the same for every page.
+        With Accept: application/x-ndjson memes are streamed one per line as their images arrive,
+        the cursor of the next page is then sent in the Next-Cursor header """
+        if accept is not None and NDJSON_MEDIA_TYPE in accept:
+            return await stream_memes(skip, limit, after)
+
+        if after is not None:
+            return await retrieve_memes_page(after, limit)
+
+        logger.info("Retrieving memes at skip=%r, limit=%r", skip, limit)
+
+        try:
+            memes = await meme_service.retrieve_memes(skip, limit)
         except ServiceError as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -78,19 +268,109 @@ def get_router(meme_service: MemeServiceInterface) -> APIRouter:
             )
             response.append(r)
 
-        logger.info(f"Successfully retrieved {len(response)} memes for {skip=}, {limit=}: {response}")
+        logger.info("Successfully retrieved %s memes for skip=%r, limit=%r", len(response), skip, limit)
         return response
 
-    @router.put("/{meme_id}")
-    async def update_meme(meme_id: str, request: UpdateMemeRequest):
-        logger.info(f"Updating meme with id: {meme_id}, update request: {request}")
-        if request.b64_data is None and request.caption is None:
+    async def stream_memes(skip: int, limit: int, after: str | None) -> StreamingResponse:
+        logger.info("Streaming memes at skip=%r, limit=%r, after=%r", skip, limit, after)
+
+        try:
+            meme_stream = await meme_service.stream_memes(skip, limit, after)
+        except InvalidCursorError as e:
             raise HTTPException(
-                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                detail="No new data given for an update operation"
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        except ServiceError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=str(e)
+            )
+
+        # errors past this point can only cut the stream short, the status is already sent
+        async def stream_lines() -> AsyncIterator[str]:
+            try:
+                async for meme in meme_stream.memes:
+                    yield RetrieveMemeResponse(
+                        b64_data=meme.b64_data,
+                        caption=meme.caption
+                    ).model_dump_json() + "\n"
+            except ServiceError as e:
+                logger.error(
+                    "Meme stream at skip=%r, limit=%r, after=%r was interrupted, error: %s",
+                    skip,
+                    limit,
+                    after,
+                    e
+                )
+                raise
+
+        headers = {}
+        if meme_stream.next_cursor is not None:
+            headers["Next-Cursor"] = meme_stream.next_cursor
+
+        return StreamingResponse(
+            stream_lines(),
+            media_type=NDJSON_MEDIA_TYPE,
+            headers=headers,
+        )
+
+    async def retrieve_memes_page(after: str, limit: int) -> RetrieveMemesPageResponse:
+        logger.info("Retrieving memes page at after=%r, limit=%r", after, limit)
+
+        try:
+            meme_page = await meme_service.retrieve_memes_page(after, limit)
+        except InvalidCursorError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        except ServiceError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=str(e)
             )
+
+        logger.info("Successfully retrieved %s memes for after=%r, limit=%r", len(meme_page.memes), after, limit)
+
+        return RetrieveMemesPageResponse(
+            memes=[
+                RetrieveMemeResponse(
+                    b64_data=meme.b64_data,
+                    caption=meme.caption
+                )
+                for meme in meme_page.memes
+            ],
+            next_cursor=meme_page.next_cursor,
+        )
+
+    @router.put(
+        "/{meme_id}",
+        openapi_extra=_upload_request_body(UpdateMemeRequest, image_required=False),
+    )
+    async def update_meme(meme_id: str, request: Request, caption: str | None = None):
+        """ Accepts the same bodies as meme creation, every field is optional """
         try:
-            meme_service.update_meme(meme_id, request.to_model(meme_id))
+            meme_upload = await _parse_upload(request, caption)
+            if meme_upload is None:
+                update_request = _parse_json(UpdateMemeRequest, await request.body())
+                logger.info("Updating meme with id: %s, update request: %s", meme_id, update_request)
+                if update_request.b64_data is None and update_request.caption is None:
+                    raise HTTPException(
+                        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                        detail="No new data given for an update operation"
+                    )
+
+                await meme_service.update_meme(meme_id, update_request.to_model(meme_id))
+            else:
+                logger.info("Updating meme with id: %s from upload, caption: %s", meme_id, meme_upload.caption)
+                if meme_upload.image is None and meme_upload.caption is None:
+                    raise HTTPException(
+                        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                        detail="No new data given for an update operation"
+                    )
+
+                await meme_service.update_meme_from_upload(meme_id, meme_upload)
         except MemeNotFoundError:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -100,13 +380,16 @@ def get_router(meme_service: MemeServiceInterface) -> APIRouter:
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=str(e)
             )
-        logger.info(f"Successfully updated meme with id: {meme_id}")
+        finally:
+            await request.close()
+
+        logger.info("Successfully updated meme with id: %s", meme_id)
 
     @router.delete("/{meme_id}")
     async def delete_meme(meme_id: str):
-        logger.info(f"Deleting meme with id: {meme_id}")
+        logger.info("Deleting meme with id: %s", meme_id)
         try:
-            meme_service.delete_meme(meme_id)
+            await meme_service.delete_meme(meme_id)
         except MemeNotFoundError:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -116,6 +399,6 @@ def get_router(meme_service: MemeServiceInterface) -> APIRouter:
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=str(e)
             )
-        logger.info(f"Successfully deleted meme with id: {meme_id}")
+        logger.info("Successfully deleted meme with id: %s", meme_id)
 
     return router
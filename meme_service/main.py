@@ -1,23 +1,32 @@
 import logging
 import os
 import shutil
+from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
 from fastapi import FastAPI
+from prometheus_client import REGISTRY
 
-from internal.db_service_client.db_service_client import DatabaseServiceClient
-from internal.db_service_client_interface import DatabaseServiceClientInterface
-from internal.image_service_client.image_service_client import ImageServiceClient
-from internal.image_service_client_interface import ImageServiceClientInterface
-from internal.meme_service.meme_service import MemeServiceV1
-from internal.meme_service_interface import MemeServiceInterface
-from internal.routers import meme
-
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO,
-    force=True
-)
+from internal.async_db_service_client_interface import AsyncDatabaseServiceClientInterface
+from internal.async_image_service_client_interface import AsyncImageServiceClientInterface
+from internal.async_meme_service_interface import AsyncMemeServiceInterface
+from internal.db_service_client.async_db_service_client import AsyncDatabaseServiceClient
+from internal.http_transport.http_transport import HTTPTransport, HTTPTransportSettings
+from internal.image_cache.lru_image_cache import LRUImageCache
+from internal.image_cache_interface import ImageCacheInterface
+from internal.logging_setup.logging_setup import LogSamplingMiddleware, configure_logging
+from internal.meme_cache.ttl_meme_cache import TTLMemeCache
+from internal.meme_cache_interface import MemeCacheInterface
+from internal.image_service_client.async_image_service_client import AsyncImageServiceClient
+from internal.meme_service.async_meme_service import AsyncMemeServiceV1
+from internal.metrics.metrics import MetricsMiddleware, StatsCollector
+from internal.routers import meme, metrics
+from internal.span_exporter_interface import SpanExporterInterface
+from internal.tracing.file_span_exporter import FileSpanExporter
+from internal.tracing.otlp_span_exporter import OTLPSpanExporter
+from internal.tracing.tracing import TracingMiddleware, configure_tracing, shutdown_tracing
+
+log_listener = configure_logging()
 logger = logging.getLogger(__name__)
 
 if not os.path.isfile("./.env") and os.path.isfile("./.env.example"):
@@ -31,35 +40,123 @@ load_dotenv(
 logger.info("Loaded environment variables from .env file")
 
 log_level = os.getenv('LOG_LEVEL', 'INFO')
-logger.setLevel(log_level)
+logging.getLogger().setLevel(log_level)
+# share of requests whose INFO lines are logged, warnings and errors are always logged
+log_sample_rate = float(os.getenv('LOG_SAMPLE_RATE', '1.0'))
+
+# tracing is off unless an exporter is chosen, only TRACE_SAMPLE_RATE of the traces started here are recorded,
+# traces continued from an upstream traceparent follow the upstream's decision
+trace_exporter = os.getenv('TRACE_EXPORTER', 'none')
+span_exporter: SpanExporterInterface | None = None
+if trace_exporter == "file":
+    span_exporter = FileSpanExporter(os.getenv('TRACE_FILE', './traces.jsonl'))
+elif trace_exporter == "otlp":
+    span_exporter = OTLPSpanExporter(os.getenv('TRACE_OTLP_ENDPOINT', 'http://localhost:4318'))
+if span_exporter is not None:
+    configure_tracing("meme_service", span_exporter, float(os.getenv('TRACE_SAMPLE_RATE', '0.01')))
+    logger.info("Exporting traces to %s", trace_exporter)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    yield
+    await image_service_client.close()
+    await database_service_client.close()
+    logger.info("Closed service clients")
+    shutdown_tracing()
+    log_listener.stop()
 
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(LogSamplingMiddleware, sample_rate=log_sample_rate)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
 logger.info("Successfully initialized FastAPI app")
 
 assert "IMAGE_SERVICE_ENDPOINT" in os.environ, "IMAGE_SERVICE_ENDPOINT environment variable must be set"
 
 image_service_endpoint = os.environ["IMAGE_SERVICE_ENDPOINT"]
-image_service_client: ImageServiceClientInterface = ImageServiceClient(
+image_service_transport = HTTPTransport(
+    settings=HTTPTransportSettings.from_env("IMAGE_SERVICE"),
+    target="image_service",
+)
+image_service_client: AsyncImageServiceClientInterface = AsyncImageServiceClient(
     image_service_endpoint=image_service_endpoint,
+    http_client=image_service_transport.async_client(),
 )
 logger.info("Successfully initialized image service client")
 
 assert "DB_SERVICE_ENDPOINT" in os.environ, "DB_SERVICE_ENDPOINT environment variable must be set"
 
 database_service_endpoint = os.environ["DB_SERVICE_ENDPOINT"]
-database_service_client: DatabaseServiceClientInterface = DatabaseServiceClient(
+database_service_transport = HTTPTransport(
+    settings=HTTPTransportSettings.from_env("DB_SERVICE"),
+    target="db_service",
+)
+database_service_client: AsyncDatabaseServiceClientInterface = AsyncDatabaseServiceClient(
     db_service_endpoint=database_service_endpoint,
+    http_client=database_service_transport.async_client(),
 )
 logger.info("Successfully initialized database service client")
 
-service: MemeServiceInterface = MemeServiceV1(
+image_cache: ImageCacheInterface | None = None
+image_cache_max_bytes = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+image_cache_revalidate_after = float(os.getenv("IMAGE_CACHE_REVALIDATE_AFTER", "60"))
+if image_cache_max_bytes > 0:
+    image_cache = LRUImageCache(
+        max_bytes=image_cache_max_bytes,
+        revalidate_after=image_cache_revalidate_after if image_cache_revalidate_after > 0 else None,
+    )
+    logger.info(
+        "Successfully initialized image cache, max size: %s bytes, revalidated after: %s seconds",
+        image_cache_max_bytes,
+        image_cache_revalidate_after
+    )
+
+meme_cache: MemeCacheInterface | None = None
+meme_cache_ttl = float(os.getenv("MEME_CACHE_TTL", "30"))
+meme_cache_negative_ttl = float(os.getenv("MEME_CACHE_NEGATIVE_TTL", "5"))
+meme_cache_max_entries = int(os.getenv("MEME_CACHE_MAX_ENTRIES", "100000"))
+if meme_cache_ttl > 0 and meme_cache_max_entries > 0:
+    meme_cache = TTLMemeCache(
+        ttl=meme_cache_ttl,
+        negative_ttl=meme_cache_negative_ttl,
+        max_entries=meme_cache_max_entries,
+    )
+    logger.info(
+        "Successfully initialized meme cache, ttl: %ss, negative ttl: %ss, max entries: %s",
+        meme_cache_ttl,
+        meme_cache_negative_ttl,
+        meme_cache_max_entries
+    )
+
+image_fetch_concurrency = int(os.getenv("IMAGE_FETCH_CONCURRENCY", "10"))
+image_batch_size = int(os.getenv("IMAGE_BATCH_SIZE", "50"))
+parallel_create = os.getenv("PARALLEL_CREATE", "false").lower() == "true"
+service: AsyncMemeServiceInterface = AsyncMemeServiceV1(
     image_service_client=image_service_client,
     db_service_client=database_service_client,
+    image_fetch_concurrency=image_fetch_concurrency,
+    image_batch_size=image_batch_size,
+    parallel_create=parallel_create,
+    image_cache=image_cache,
+    meme_cache=meme_cache,
 )
 logger.info("Successfully initialized Meme Service")
 
+REGISTRY.register(StatsCollector("http_client_pool", "target", {
+    "image_service": image_service_transport.stats,
+    "db_service": database_service_transport.stats,
+}))
+cache_stats = {}
+if image_cache is not None:
+    cache_stats["image"] = image_cache.stats
+if meme_cache is not None:
+    cache_stats["meme"] = meme_cache.stats
+REGISTRY.register(StatsCollector("cache", "cache", cache_stats))
+
 meme_router = meme.get_router(service)
 
 app.include_router(meme_router)
+app.include_router(metrics.get_router())
 logger.info("Successfully included meme service API router, starting up..")
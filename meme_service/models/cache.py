@@ -0,0 +1,26 @@
+from pydantic import BaseModel
+
+from models.redacted import RedactedModel
+
+
+class CachedImage(RedactedModel):
+    b64_data: str
+    etag: str | None = None
+
+
+class CacheStats(BaseModel):
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    used_bytes: int
+    max_bytes: int
+
+
+class MemeCacheStats(BaseModel):
+    hits: int
+    negative_hits: int
+    misses: int
+    evictions: int
+    entries: int
+    max_entries: int
@@ -0,0 +1,27 @@
+from typing import AsyncIterator
+
+from pydantic import BaseModel, ConfigDict
+
+from models.redacted import RedactedModel
+
+
+class ImageStream(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    content_type: str
+    # None when the upstream response was chunked
+    content_length: int | None = None
+    etag: str | None = None
+    chunks: AsyncIterator[bytes]
+
+
+class ImageRevision(RedactedModel):
+    b64_data: str
+    etag: str | None = None
+
+
+class ImageUpload(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    chunks: AsyncIterator[bytes]
+    content_length: int | None = None
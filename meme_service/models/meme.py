@@ -1,12 +1,18 @@
 import uuid
+from typing import AsyncIterator
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
+from models.image import ImageUpload
+from models.redacted import RedactedModel
 
-class Meme(BaseModel):
+
+class Meme(RedactedModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     b64_data: str
     caption: str | None
+    # set on retrieved memes when image service reported the image etag
+    etag: str | None = None
 
     # def __eq__(self, other):
     #     return (self.id == other.id and
@@ -19,3 +25,33 @@ class DBMeme(BaseModel):
     id: str
     image_id: str
     caption: str | None
+
+
+class DBMemeBulkResult(BaseModel):
+    meme_id: str
+    # one of database service bulk statuses: created, updated, deleted, not_found, conflict, failed
+    status: str
+    error: str | None = None
+
+
+class MemeUpload(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    image: ImageUpload | None = None
+    caption: str | None = None
+
+
+class DBMemePage(BaseModel):
+    memes: list[DBMeme]
+    next_cursor: str | None = None
+
+
+class MemePage(BaseModel):
+    memes: list[Meme]
+    next_cursor: str | None = None
+
+
+class MemeStream(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    memes: AsyncIterator[Meme]
+    next_cursor: str | None = None
@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+
+
+BACKUP_FORMAT_VERSION = 1
+
+
+class BackupRecord(BaseModel):
+    meme_id: str
+    image_id: str
+    caption: str | None
+    size: int
+    sha256: str
+
+
+class BackupManifest(BaseModel):
+    format_version: int = BACKUP_FORMAT_VERSION
+    created_at: str
+    memes: int
+    total_bytes: int
+    # memes whose image was missing when the backup was made, they are not in it
+    skipped_meme_ids: list[str] = []
@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+
+from models.meme import DBMeme
+from models.redacted import RedactedModel
+
+
+class ArchiveImage(RedactedModel):
+    # path of the image inside the archive, with "/" separators
+    name: str
+    data: bytes
+    # set when the archive already has the meme record, a backup for example
+    meme: DBMeme | None = None
+
+
+class ImportReport(BaseModel):
+    imported: int = 0
+    skipped: int = 0
+    failed: int = 0
@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+
+# strings and bytes longer than this are cut in reprs
+REPR_MAX_LENGTH = 64
+
+
+class _Truncated:
+    def __init__(self, value: str | bytes):
+        self.value = value
+
+    def __repr__(self) -> str:
+        unit = "chars" if isinstance(self.value, str) else "bytes"
+        return f"{self.value[:REPR_MAX_LENGTH]!r}...({len(self.value)} {unit})"
+
+
+class RedactedModel(BaseModel):
+    """ Cuts long str and bytes fields in repr and str, so logging a model never writes out its payload """
+    def __repr_args__(self):
+        for name, value in super().__repr_args__():
+            if isinstance(value, (str, bytes)) and len(value) > REPR_MAX_LENGTH:
+                value = _Truncated(value)
+            yield name, value
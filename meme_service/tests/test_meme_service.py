@@ -1,41 +1,79 @@
+import asyncio
 import base64
+import io
+import json
+import logging
 import random
+import tarfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
+import httpx
 import pytest
+from prometheus_client import REGISTRY, CollectorRegistry
 
 from fastapi.testclient import TestClient
-from fastapi import status, APIRouter
+from fastapi import status, APIRouter, FastAPI, Request
 from fastapi.encoders import jsonable_encoder
-from fastapi.exceptions import HTTPException
+from fastapi.exceptions import HTTPException, RequestValidationError
 
+from internal.routers import metrics
 from internal.routers.meme import get_router
 from internal.routers.dto.meme import CreateMemeRequest, UpdateMemeRequest
 
 from internal.meme_service_interface import MemeServiceInterface
 from internal.meme_service.meme_service import MemeServiceV1
-from internal.image_service_client_interface import ImageServiceClientInterface
+from internal.async_meme_service_interface import AsyncMemeServiceInterface
+from internal.meme_service.async_meme_service import AsyncMemeServiceV1
 from internal.image_service_client.fake_image_service_client import FakeImageServiceClient
-from internal.db_service_client_interface import DatabaseServiceClientInterface
+from internal.async_image_service_client_interface import AsyncImageServiceClientInterface
+from internal.image_service_client.fake_async_image_service_client import FakeAsyncImageServiceClient
 from internal.db_service_client.fake_db_service_client import FakeDatabaseServiceClient
+from internal.async_db_service_client_interface import AsyncDatabaseServiceClientInterface
+from internal.db_service_client.fake_async_db_service_client import FakeAsyncDatabaseServiceClient
+from internal.db_service_client.async_db_service_client import AsyncDatabaseServiceClient
+from internal.image_service_client.async_image_service_client import AsyncImageServiceClient
+from internal.http_transport.http_transport import HTTPTransport, HTTPTransportSettings
+from internal.logging_setup.logging_setup import LogSamplingMiddleware, configure_logging
+from internal.metrics.metrics import MetricsMiddleware, StatsCollector
+from internal.image_cache.lru_image_cache import LRUImageCache
+from internal.meme_cache.ttl_meme_cache import TTLMemeCache
+from internal.tracing.file_span_exporter import FileSpanExporter
+from internal.tracing.tracing import TracingMiddleware, configure_tracing, shutdown_tracing
+from internal.errors.errors import (BackupError, DBServiceError, ImageNotFoundError, ImageNotModifiedError,
+                                   ImageServiceError, InvalidCursorError, MemeNotFoundError,
+                                   MemeNotModifiedError)
+from internal.meme_backup.backup_archive import read_backup
+from internal.meme_backup.meme_exporter import MemeExporter
+from internal.meme_import.archive import read_archive, read_captions
+from internal.meme_import.checkpoint import ImportCheckpoint
+from internal.meme_import.http_meme_import_target import HTTPMemeImportTarget
+from internal.meme_import.meme_importer import MemeImporter
+from internal.meme_import.meme_service_import_target import MemeServiceImportTarget
+from models.image import ImageRevision, ImageStream, ImageUpload
+from models.meme_import import ImportReport
+from models.meme import DBMeme, Meme
 
 
 @pytest.fixture(scope='function')
-def db_client() -> DatabaseServiceClientInterface:
-    client: DatabaseServiceClientInterface = FakeDatabaseServiceClient()
+def db_client() -> AsyncDatabaseServiceClientInterface:
+    client: AsyncDatabaseServiceClientInterface = FakeAsyncDatabaseServiceClient()
 
     yield client
 
 
 @pytest.fixture(scope='function')
-def image_client() -> ImageServiceClientInterface:
-    client: ImageServiceClientInterface = FakeImageServiceClient()
+def image_client() -> AsyncImageServiceClientInterface:
+    client: AsyncImageServiceClientInterface = FakeAsyncImageServiceClient()
 
     yield client
 
 
 @pytest.fixture(scope='function')
-def meme_service(db_client, image_client) -> MemeServiceInterface:
-    service: MemeServiceInterface = MemeServiceV1(
+def meme_service(db_client, image_client) -> AsyncMemeServiceInterface:
+    service: AsyncMemeServiceInterface = AsyncMemeServiceV1(
         db_service_client=db_client,
         image_service_client=image_client,
     )
@@ -43,6 +81,16 @@ def meme_service(db_client, image_client) -> MemeServiceInterface:
     yield service
 
 
+@pytest.fixture(scope='function')
+def sync_meme_service() -> MemeServiceInterface:
+    service: MemeServiceInterface = MemeServiceV1(
+        db_service_client=FakeDatabaseServiceClient(),
+        image_service_client=FakeImageServiceClient(),
+    )
+
+    yield service
+
+
 @pytest.fixture(scope='function')
 def router(meme_service) -> APIRouter:
     router = get_router(meme_service)
@@ -246,3 +294,1058 @@ class TestMemeService:
         assert retrieve_meme1_response.status_code == status.HTTP_200_OK
         assert retrieve_meme1_response.json()["b64_data"] == meme1_request.b64_data
         assert retrieve_meme1_response.json()["caption"] == meme1_request.caption
+
+    def test_sync_meme_service(self, sync_meme_service, create_meme_request_factory):
+        meme_request = create_meme_request_factory.get()
+        meme = meme_request.to_model()
+
+        sync_meme_service.create_meme(meme)
+
+        retrieved_meme = sync_meme_service.retrieve_meme(meme.id)
+        assert retrieved_meme.b64_data == meme_request.b64_data
+        assert retrieved_meme.caption == meme_request.caption
+
+        sync_meme_service.delete_meme(meme.id)
+        assert sync_meme_service.retrieve_memes(0, 3) == []
+
+    def test_concurrent_requests_overlap(self, b64_string_factory):
+        class SlowImageServiceClient(FakeAsyncImageServiceClient):
+            async def retrieve_image(self, image_id: str) -> str:
+                await asyncio.sleep(0.05)
+                return await super().retrieve_image(image_id)
+
+        slow_image_client = SlowImageServiceClient()
+        service = AsyncMemeServiceV1(
+            db_service_client=FakeAsyncDatabaseServiceClient(),
+            image_service_client=slow_image_client,
+        )
+
+        async def run() -> list[Meme]:
+            meme = Meme(b64_data=b64_string_factory.get(), caption=None)
+            await service.create_meme(meme)
+            return await asyncio.gather(
+                *(service.retrieve_meme(meme.id) for _ in range(200))
+            )
+
+        start = time.monotonic()
+        memes = asyncio.run(run())
+        elapsed = time.monotonic() - start
+
+        assert len(memes) == 200
+        # 200 sequential fetches would take 10 seconds
+        assert elapsed < 2
+
+    def test_http_transport_settings(self, monkeypatch):
+        monkeypatch.setenv("DB_SERVICE_MAX_CONNECTIONS", "7")
+        monkeypatch.setenv("DB_SERVICE_READ_TIMEOUT", "1.5")
+
+        settings = HTTPTransportSettings.from_env("DB_SERVICE")
+        assert settings.max_connections == 7
+        assert settings.read_timeout == 1.5
+        assert settings.keepalive_expiry == HTTPTransportSettings().keepalive_expiry
+
+        transport = HTTPTransport(settings)
+        transport.client()
+        transport.async_client()
+
+        stats = transport.stats()
+        assert stats.max_connections == 7
+        assert stats.open_connections == 0
+        assert stats.total_requests == 0
+
+    def test_http_transport_stats(self):
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Length", "2")
+                if self.path == "/close":
+                    self.send_header("Connection", "close")
+                self.end_headers()
+                self.wfile.write(b"ok")
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        transport = HTTPTransport(HTTPTransportSettings(max_keepalive_connections=2))
+        try:
+            # keep-alive connections are reused, and handed back idle
+            transport.client().get(url + "/")
+            transport.client().get(url + "/")
+            stats = transport.stats()
+            assert (stats.open_connections, stats.idle_connections, stats.total_requests) == (1, 1, 2)
+
+            # a held connection isn't idle, one the server closes isn't open
+            with transport.client().stream("GET", url + "/"):
+                assert transport.stats().idle_connections == 0
+            transport.client().get(url + "/close")
+            assert (transport.stats().open_connections, transport.stats().idle_connections) == (0, 0)
+
+            # counters stay exact with requests sent from many threads, idle connections beyond the limit are closed
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                list(executor.map(lambda _: transport.client().get(url + "/"), range(80)))
+            stats = transport.stats()
+            assert (stats.pending_requests, stats.total_requests) == (0, 84)
+            assert stats.open_connections == stats.idle_connections <= 2
+
+            async def get_concurrently():
+                await asyncio.gather(*(transport.async_client().get(url + "/") for _ in range(3)))
+                await transport.async_client().aclose()
+
+            asyncio.run(get_concurrently())
+            assert transport.stats().total_requests == 87
+        finally:
+            transport.client().close()
+            server.shutdown()
+
+    def test_retrieve_memes_bounded_fan_out(self, b64_string_factory):
+        class SlowImageServiceClient(FakeAsyncImageServiceClient):
+            in_flight = 0
+            max_in_flight = 0
+            batch_sizes: list[int] = []
+            missing_image_ids: list[str] = []
+
+            async def retrieve_images(self, image_ids: list[str]) -> dict[str, ImageRevision]:
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+                self.batch_sizes.append(len(image_ids))
+                # later batches resolve first, so ordering has to be restored
+                await asyncio.sleep(0.01 * (len(self.fake_storage) - list(self.fake_storage).index(image_ids[0])))
+                self.in_flight -= 1
+                images = await super().retrieve_images(image_ids)
+                return {
+                    image_id: image_revision
+                    for image_id, image_revision in images.items()
+                    if image_id not in self.missing_image_ids
+                }
+
+        slow_image_client = SlowImageServiceClient()
+        db_client = FakeAsyncDatabaseServiceClient()
+        service = AsyncMemeServiceV1(
+            db_service_client=db_client,
+            image_service_client=slow_image_client,
+            image_fetch_concurrency=4,
+            image_batch_size=2,
+        )
+
+        memes = [Meme(b64_data=b64_string_factory.get(), caption=None) for _ in range(23)]
+
+        async def create():
+            for meme in memes:
+                await service.create_meme(meme)
+
+        asyncio.run(create())
+
+        retrieved_memes = asyncio.run(service.retrieve_memes(0, 23))
+        assert [meme.b64_data for meme in retrieved_memes] == [meme.b64_data for meme in memes]
+        assert slow_image_client.max_in_flight == 4
+        assert slow_image_client.batch_sizes == [2] * 11 + [1]
+
+        slow_image_client.missing_image_ids = [db_client.fake_db[9].image_id, db_client.fake_db[3].image_id]
+        with pytest.raises(ImageNotFoundError) as e:
+            asyncio.run(service.retrieve_memes(0, 23))
+        assert db_client.fake_db[3].image_id in str(e.value)
+
+    def test_parallel_create_meme(self, b64_string_factory):
+        class FailingImageServiceClient(FakeAsyncImageServiceClient):
+            async def create_image(self, b64_data: str, image_id: str | None = None) -> str:
+                raise ImageServiceError("image service is down")
+
+        class FailingDatabaseServiceClient(FakeAsyncDatabaseServiceClient):
+            async def create_meme(self, meme: DBMeme):
+                raise DBServiceError("db service is down")
+
+        db_client = FakeAsyncDatabaseServiceClient()
+        image_client = FakeAsyncImageServiceClient()
+        service = AsyncMemeServiceV1(
+            db_service_client=db_client,
+            image_service_client=image_client,
+            parallel_create=True,
+        )
+
+        meme = Meme(b64_data=b64_string_factory.get(), caption="parallel")
+        asyncio.run(service.create_meme(meme))
+
+        retrieved_meme = asyncio.run(service.retrieve_meme(meme.id))
+        assert retrieved_meme.b64_data == meme.b64_data
+        assert retrieved_meme.caption == meme.caption
+
+        # image upload fails, the database record is removed
+        service.image_service_client = FailingImageServiceClient()
+        with pytest.raises(ImageServiceError):
+            asyncio.run(service.create_meme(Meme(b64_data=b64_string_factory.get(), caption=None)))
+        assert len(db_client.fake_db) == 1
+
+        # database insert fails, the uploaded image is removed
+        service.image_service_client = image_client
+        service.db_service_client = FailingDatabaseServiceClient()
+        with pytest.raises(DBServiceError):
+            asyncio.run(service.create_meme(Meme(b64_data=b64_string_factory.get(), caption=None)))
+        assert len(image_client.fake_storage) == 1
+
+    def test_lru_image_cache(self):
+        cache = LRUImageCache(max_bytes=10)
+
+        cache.put("a", "aaaa")
+        cache.put("b", "bbbb")
+        assert cache.get("a").b64_data == "aaaa"
+
+        # "b" is the least recently used one
+        cache.put("c", "cccc")
+        assert cache.get("b") is None
+        assert cache.get("a").b64_data == "aaaa"
+        assert cache.get("c").b64_data == "cccc"
+
+        # does not fit at all
+        cache.put("d", "d" * 11)
+        assert cache.get("d") is None
+
+        # fetched before an invalidation
+        version = cache.version()
+        cache.invalidate("a")
+        cache.put("a", "aaaa", version)
+        assert cache.get("a") is None
+
+        stats = cache.stats()
+        assert stats.hits == 3
+        assert stats.misses == 3
+        assert stats.evictions == 1
+        assert stats.entries == 1
+        assert stats.used_bytes == 4
+        assert stats.max_bytes == 10
+
+    def test_image_cache(self, b64_string_factory):
+        class CountingImageServiceClient(FakeAsyncImageServiceClient):
+            retrieved_image_ids: list[str]
+
+            def __init__(self):
+                super().__init__()
+                self.retrieved_image_ids = []
+
+            async def retrieve_image_revision(self, image_id: str, if_none_match: str | None = None) -> ImageRevision:
+                self.retrieved_image_ids.append(image_id)
+                return await super().retrieve_image_revision(image_id, if_none_match)
+
+            async def retrieve_images(self, image_ids: list[str]) -> dict[str, ImageRevision]:
+                self.retrieved_image_ids.extend(image_ids)
+                return await super().retrieve_images(image_ids)
+
+        db_client = FakeAsyncDatabaseServiceClient()
+        image_client = CountingImageServiceClient()
+        service = AsyncMemeServiceV1(
+            db_service_client=db_client,
+            image_service_client=image_client,
+            image_cache=LRUImageCache(max_bytes=1024 * 1024),
+        )
+
+        memes = [Meme(b64_data=b64_string_factory.get(), caption=None) for _ in range(3)]
+        for meme in memes:
+            asyncio.run(service.create_meme(meme))
+        image_ids = [db_meme.image_id for db_meme in db_client.fake_db]
+
+        asyncio.run(service.retrieve_meme(memes[0].id))
+        retrieved_memes = asyncio.run(service.retrieve_memes(0, 3))
+        assert [meme.b64_data for meme in retrieved_memes] == [meme.b64_data for meme in memes]
+        assert image_client.retrieved_image_ids == image_ids
+
+        image_client.retrieved_image_ids = []
+        asyncio.run(service.retrieve_memes(0, 3))
+        assert image_client.retrieved_image_ids == []
+
+        updated_b64_data = b64_string_factory.get()
+        asyncio.run(service.update_meme(memes[1].id, Meme(b64_data=updated_b64_data, caption=None)))
+        assert asyncio.run(service.retrieve_meme(memes[1].id)).b64_data == updated_b64_data
+        assert image_client.retrieved_image_ids == [image_ids[1]]
+
+        asyncio.run(service.delete_meme(memes[2].id))
+        assert service.image_cache.get(image_ids[2]) is None
+
+    def test_ttl_meme_cache(self, monkeypatch):
+        now = 1000.0
+        monkeypatch.setattr(time, "monotonic", lambda: now)
+        cache = TTLMemeCache(ttl=10, negative_ttl=1, max_entries=2)
+
+        db_meme = DBMeme(id="a", image_id="image_a", caption="a")
+        cache.put(db_meme)
+        cache.put_missing("b")
+        cached_meme = cache.get("a")
+        assert cached_meme == db_meme
+        cached_meme.caption = "changed"
+        assert cache.get("a").caption == "a"
+        with pytest.raises(MemeNotFoundError):
+            cache.get("b")
+
+        now += 2
+        assert cache.get("b") is None
+        assert cache.get("a") == db_meme
+
+        # "a" is the least recently used one
+        cache.put_missing("b")
+        cache.put(DBMeme(id="c", image_id="image_c", caption=None))
+        assert cache.get("a") is None
+
+        now += 10
+        assert cache.get("c") is None
+
+        stats = cache.stats()
+        assert stats.hits == 3
+        assert stats.negative_hits == 1
+        assert stats.misses == 3
+        assert stats.evictions == 1
+
+    def test_meme_cache(self, b64_string_factory):
+        class CountingDatabaseServiceClient(FakeAsyncDatabaseServiceClient):
+            retrieved_meme_ids: list[str]
+
+            def __init__(self):
+                super().__init__()
+                self.retrieved_meme_ids = []
+
+            async def retrieve_meme(self, meme_id: str) -> DBMeme:
+                self.retrieved_meme_ids.append(meme_id)
+                return await super().retrieve_meme(meme_id)
+
+        db_client = CountingDatabaseServiceClient()
+        service = AsyncMemeServiceV1(
+            db_service_client=db_client,
+            image_service_client=FakeAsyncImageServiceClient(),
+            meme_cache=TTLMemeCache(ttl=60, negative_ttl=60, max_entries=100),
+        )
+
+        meme = Meme(b64_data=b64_string_factory.get(), caption="cached")
+
+        # the negative entry is replaced on creation
+        with pytest.raises(MemeNotFoundError):
+            asyncio.run(service.retrieve_meme(meme.id))
+        with pytest.raises(MemeNotFoundError):
+            asyncio.run(service.retrieve_meme(meme.id))
+        assert db_client.retrieved_meme_ids == [meme.id]
+
+        asyncio.run(service.create_meme(meme))
+        assert asyncio.run(service.retrieve_meme(meme.id)).caption == "cached"
+
+        asyncio.run(service.update_meme(meme.id, Meme(b64_data="", caption="updated")))
+        assert asyncio.run(service.retrieve_meme(meme.id)).caption == "updated"
+        assert db_client.retrieved_meme_ids == [meme.id]
+
+        asyncio.run(service.delete_meme(meme.id))
+        with pytest.raises(MemeNotFoundError):
+            asyncio.run(service.retrieve_meme(meme.id))
+        assert db_client.retrieved_meme_ids == [meme.id, meme.id]
+
+    def test_retrieve_meme_image(self, client, create_meme_request_factory):
+        create_meme_request = create_meme_request_factory.get()
+        meme_id, = self.create_memes(client, [create_meme_request])
+
+        response = client.get(
+            self.ROUTE_PREFIX + f"/{meme_id}/image"
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.content == base64.b64decode(create_meme_request.b64_data)
+        assert response.headers["Content-Length"] == str(len(response.content))
+
+        with pytest.raises(HTTPException):
+            client.get(
+                self.ROUTE_PREFIX + "/missing/image"
+            )
+
+    def test_image_service_client_open_image(self):
+        png_data = b"\x89PNG\r\n\x1a\n" + bytes(range(256))
+
+        async def chunks():
+            yield png_data
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path == "/images/chunked/raw":
+                return httpx.Response(200, content=chunks(), headers={"Content-Type": "image/png"})
+            if request.url.path != "/images/present/raw":
+                return httpx.Response(404)
+            return httpx.Response(200, content=png_data, headers={"Content-Type": "image/png"})
+
+        image_client = AsyncImageServiceClient(
+            image_service_endpoint="http://images/images",
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        )
+
+        async def read_image(image_id: str) -> tuple[str, int, bytes]:
+            image_stream = await image_client.open_image(image_id)
+            data = b"".join([chunk async for chunk in image_stream.chunks])
+            return image_stream.content_type, image_stream.content_length, data
+
+        assert asyncio.run(read_image("present")) == ("image/png", len(png_data), png_data)
+        assert asyncio.run(read_image("chunked")) == ("image/png", None, png_data)
+        with pytest.raises(ImageNotFoundError):
+            asyncio.run(read_image("missing"))
+
+    def test_create_and_update_meme_from_upload(self, client, image_client):
+        image_data = bytes(range(256)) * 4
+
+        multipart_response = client.post(
+            self.ROUTE_PREFIX + "/",
+            files={"image": ("meme.gif", image_data, "image/gif")},
+            data={"caption": "multipart"},
+        )
+        assert multipart_response.status_code == status.HTTP_201_CREATED
+        multipart_meme_id = multipart_response.json()["meme_id"]
+
+        raw_response = client.post(
+            self.ROUTE_PREFIX + "/",
+            params={"caption": "raw"},
+            content=image_data[::-1],
+            headers={"Content-Type": "application/octet-stream"},
+        )
+        assert raw_response.status_code == status.HTTP_201_CREATED
+        raw_meme_id = raw_response.json()["meme_id"]
+
+        multipart_meme = client.get(self.ROUTE_PREFIX + f"/{multipart_meme_id}").json()
+        assert base64.b64decode(multipart_meme["b64_data"]) == image_data
+        assert multipart_meme["caption"] == "multipart"
+
+        raw_meme = client.get(self.ROUTE_PREFIX + f"/{raw_meme_id}").json()
+        assert base64.b64decode(raw_meme["b64_data"]) == image_data[::-1]
+        assert raw_meme["caption"] == "raw"
+
+        # caption only
+        response = client.put(
+            self.ROUTE_PREFIX + f"/{raw_meme_id}",
+            data={"caption": "updated"},
+            files={"unused": ("unused", b"", "text/plain")},
+        )
+        assert response.status_code == status.HTTP_200_OK
+        raw_meme = client.get(self.ROUTE_PREFIX + f"/{raw_meme_id}").json()
+        assert base64.b64decode(raw_meme["b64_data"]) == image_data[::-1]
+        assert raw_meme["caption"] == "updated"
+
+        response = client.put(
+            self.ROUTE_PREFIX + f"/{raw_meme_id}",
+            content=image_data,
+            headers={"Content-Type": "application/octet-stream"},
+        )
+        assert response.status_code == status.HTTP_200_OK
+        raw_meme = client.get(self.ROUTE_PREFIX + f"/{raw_meme_id}").json()
+        assert base64.b64decode(raw_meme["b64_data"]) == image_data
+        assert raw_meme["caption"] == "updated"
+        assert len(image_client.fake_storage) == 2
+
+        with pytest.raises(HTTPException):
+            client.post(
+                self.ROUTE_PREFIX + "/",
+                data={"caption": "no image"},
+                files={"unused": ("unused", b"", "text/plain")},
+            )
+        with pytest.raises(RequestValidationError):
+            client.post(
+                self.ROUTE_PREFIX + "/",
+                json={"caption": "no image"},
+            )
+
+    def test_retrieve_memes_cursor_paginated(self, client, create_meme_request_factory, sync_meme_service):
+        meme_requests = [create_meme_request_factory.get() for _ in range(5)]
+        self.create_memes(client, meme_requests)
+
+        retrieved_b64_data: list[str] = []
+        after = ""
+        while after is not None:
+            response = client.get(
+                self.ROUTE_PREFIX + "/",
+                params={"after": after, "limit": 2},
+            )
+            assert response.status_code == status.HTTP_200_OK
+            retrieved_b64_data.extend(meme["b64_data"] for meme in response.json()["memes"])
+            after = response.json()["next_cursor"]
+
+        assert retrieved_b64_data == [request.b64_data for request in meme_requests]
+
+        for request in meme_requests:
+            sync_meme_service.create_meme(request.to_model())
+        first_page = sync_meme_service.retrieve_memes_page("", 3)
+        second_page = sync_meme_service.retrieve_memes_page(first_page.next_cursor, 3)
+        assert [meme.b64_data for meme in first_page.memes + second_page.memes] == retrieved_b64_data
+        assert second_page.next_cursor is None
+
+    def test_db_service_client_retrieve_memes_page(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.params["after"] == "bad":
+                return httpx.Response(400, json={"detail": "Malformed cursor"})
+            return httpx.Response(200, json={
+                "memes": [{"meme_id": "meme", "image_id": "image", "caption": None}],
+                "next_cursor": "next",
+            })
+
+        db_client = AsyncDatabaseServiceClient(
+            db_service_endpoint="http://db/memes",
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        )
+
+        page = asyncio.run(db_client.retrieve_memes_page("", 1))
+        assert page.memes == [DBMeme(id="meme", image_id="image", caption=None)]
+        assert page.next_cursor == "next"
+        with pytest.raises(InvalidCursorError):
+            asyncio.run(db_client.retrieve_memes_page("bad", 1))
+
+    def test_stream_memes_ndjson(self, client, create_meme_request_factory):
+        meme_requests = [create_meme_request_factory.get() for _ in range(5)]
+        self.create_memes(client, meme_requests)
+
+        response = client.get(
+            self.ROUTE_PREFIX + "/",
+            params={"skip": 1, "limit": 10},
+            headers={"Accept": "application/x-ndjson"},
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["Content-Type"] == "application/x-ndjson"
+        lines = response.text.splitlines()
+        assert [json.loads(line)["b64_data"] for line in lines] == [r.b64_data for r in meme_requests[1:]]
+
+        response = client.get(
+            self.ROUTE_PREFIX + "/",
+            params={"after": "", "limit": 2},
+            headers={"Accept": "application/x-ndjson"},
+        )
+        assert len(response.text.splitlines()) == 2
+        assert "Next-Cursor" in response.headers
+
+    def test_stream_memes_bounded_window(self, b64_string_factory):
+        class CountingImageServiceClient(FakeAsyncImageServiceClient):
+            batches: int
+
+            def __init__(self):
+                super().__init__()
+                self.batches = 0
+
+            async def retrieve_images(self, image_ids: list[str]) -> dict[str, ImageRevision]:
+                self.batches += 1
+                return await super().retrieve_images(image_ids)
+
+        image_client = CountingImageServiceClient()
+        service = AsyncMemeServiceV1(
+            db_service_client=FakeAsyncDatabaseServiceClient(),
+            image_service_client=image_client,
+            image_fetch_concurrency=2,
+            image_batch_size=1,
+        )
+
+        async def read_first_meme() -> Meme:
+            for _ in range(10):
+                await service.create_meme(Meme(b64_data=b64_string_factory.get(), caption=None))
+
+            meme_stream = await service.stream_memes(0, 10)
+            first_meme = await anext(meme_stream.memes)
+            await meme_stream.memes.aclose()
+            return first_meme
+
+        asyncio.run(read_first_meme())
+        # two batches in flight, plus at most the one started after the first was consumed
+        assert image_client.batches <= 3
+
+    def test_conditional_retrieve_meme(self, client, create_meme_request_factory):
+        create_meme_request = create_meme_request_factory.get()
+        meme_id, = self.create_memes(client, [create_meme_request])
+
+        for route in (f"/{meme_id}", f"/{meme_id}/image"):
+            response = client.get(
+                self.ROUTE_PREFIX + route,
+            )
+            etag = response.headers["ETag"]
+
+            response = client.get(
+                self.ROUTE_PREFIX + route,
+                headers={"If-None-Match": etag},
+            )
+            assert response.status_code == status.HTTP_304_NOT_MODIFIED
+            assert response.headers["ETag"] == etag
+            assert response.content == b""
+
+        meme_etag = client.get(self.ROUTE_PREFIX + f"/{meme_id}").headers["ETag"]
+        client.put(
+            self.ROUTE_PREFIX + f"/{meme_id}",
+            json=jsonable_encoder(UpdateMemeRequest(b64_data=create_meme_request.b64_data, caption="changed")),
+        )
+        response = client.get(
+            self.ROUTE_PREFIX + f"/{meme_id}",
+            headers={"If-None-Match": meme_etag},
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["ETag"] != meme_etag
+
+        # the condition goes to image service, a matching image is never downloaded
+        class RecordingImageServiceClient(FakeAsyncImageServiceClient):
+            conditions: list[str | None]
+            downloads: int
+
+            def __init__(self):
+                super().__init__()
+                self.conditions = []
+                self.downloads = 0
+
+            async def retrieve_image_revision(self, image_id: str, if_none_match: str | None = None) -> ImageRevision:
+                self.conditions.append(if_none_match)
+                image_revision = await super().retrieve_image_revision(image_id, if_none_match)
+                self.downloads += 1
+                return image_revision
+
+        image_client = RecordingImageServiceClient()
+        service = AsyncMemeServiceV1(
+            db_service_client=FakeAsyncDatabaseServiceClient(),
+            image_service_client=image_client,
+        )
+        meme = Meme(b64_data=create_meme_request.b64_data, caption="caption")
+        asyncio.run(service.create_meme(meme))
+        meme_etag = asyncio.run(service.retrieve_meme(meme.id)).etag
+        image_etag = asyncio.run(
+            image_client.retrieve_image_revision(next(iter(image_client.fake_storage)))
+        ).etag
+        image_client.conditions = []
+        image_client.downloads = 0
+
+        with pytest.raises(MemeNotModifiedError) as e:
+            asyncio.run(service.retrieve_meme(meme.id, f'"outdated", {meme_etag}'))
+        assert e.value.etag == meme_etag
+        assert image_client.conditions == [image_etag]
+        assert image_client.downloads == 0
+
+    def test_image_cache_revalidation(self, monkeypatch, b64_string_factory):
+        now = 1000.0
+        monkeypatch.setattr(time, "monotonic", lambda: now)
+
+        class RecordingImageServiceClient(FakeAsyncImageServiceClient):
+            conditions: list[str | None]
+
+            def __init__(self):
+                super().__init__()
+                self.conditions = []
+
+            async def retrieve_image_revision(self, image_id: str, if_none_match: str | None = None) -> ImageRevision:
+                self.conditions.append(if_none_match)
+                return await super().retrieve_image_revision(image_id, if_none_match)
+
+        image_client = RecordingImageServiceClient()
+        service = AsyncMemeServiceV1(
+            db_service_client=FakeAsyncDatabaseServiceClient(),
+            image_service_client=image_client,
+            image_cache=LRUImageCache(max_bytes=1024 * 1024, revalidate_after=10),
+        )
+        meme = Meme(b64_data=b64_string_factory.get(), caption=None)
+        asyncio.run(service.create_meme(meme))
+
+        asyncio.run(service.retrieve_meme(meme.id))
+        asyncio.run(service.retrieve_meme(meme.id))
+        assert image_client.conditions == [None]
+        etag = asyncio.run(image_client.retrieve_image_revision(
+            next(iter(image_client.fake_storage)),
+        )).etag
+        image_client.conditions = []
+
+        # a stale entry is revalidated, not downloaded again, and is fresh after that
+        now += 11
+        assert asyncio.run(service.retrieve_meme(meme.id)).b64_data == meme.b64_data
+        assert asyncio.run(service.retrieve_meme(meme.id)).b64_data == meme.b64_data
+        assert image_client.conditions == [etag]
+
+        with pytest.raises(ImageNotModifiedError):
+            asyncio.run(image_client.retrieve_image_revision(next(iter(image_client.fake_storage)), etag))
+
+        # a changed image is downloaded on revalidation
+        image_id = next(iter(image_client.fake_storage))
+        updated_b64_data = b64_string_factory.get()
+        image_client.fake_storage[image_id] = updated_b64_data
+        now += 11
+        assert asyncio.run(service.retrieve_meme(meme.id)).b64_data == updated_b64_data
+
+        # images cached from a listing are revalidated too
+        listed_meme = Meme(b64_data=b64_string_factory.get(), caption=None)
+        asyncio.run(service.create_meme(listed_meme))
+        asyncio.run(service.retrieve_memes(0, 2))
+        listed_image_id = list(image_client.fake_storage)[1]
+        listed_etag = asyncio.run(image_client.retrieve_image_revision(listed_image_id)).etag
+        image_client.conditions = []
+        now += 11
+        assert asyncio.run(service.retrieve_meme(listed_meme.id)).b64_data == listed_meme.b64_data
+        assert image_client.conditions == [listed_etag]
+
+    def test_update_meme_without_prior_retrieve(self, b64_string_factory):
+        requests: list[tuple[str, str]] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append((request.method, request.url.path))
+            if request.method == "PUT" and request.url.path == "/memes/meme":
+                assert json.loads(request.content) == {"caption": "updated"}
+                return httpx.Response(200, json={"meme_id": "meme", "image_id": "image", "caption": "updated"})
+            return httpx.Response(404)
+
+        db_client = AsyncDatabaseServiceClient(
+            db_service_endpoint="http://db/memes",
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        )
+        image_client = FakeAsyncImageServiceClient()
+        image_client.fake_storage["image"] = b64_string_factory.get()
+        meme_cache = TTLMemeCache(ttl=10, negative_ttl=1, max_entries=10)
+        service = AsyncMemeServiceV1(
+            db_service_client=db_client,
+            image_service_client=image_client,
+            meme_cache=meme_cache,
+        )
+
+        updated_b64_data = b64_string_factory.get()
+        asyncio.run(service.update_meme("meme", Meme(b64_data=updated_b64_data, caption="updated")))
+        assert requests == [("PUT", "/memes/meme")]
+        assert image_client.fake_storage["image"] == updated_b64_data
+        assert meme_cache.get("meme") == DBMeme(id="meme", image_id="image", caption="updated")
+
+        with pytest.raises(MemeNotFoundError):
+            asyncio.run(service.update_meme("missing", Meme(b64_data="", caption="updated")))
+
+    def test_import_memes(self, tmp_path):
+        images = {f"memes/{i}.png": bytes([i]) * 100 for i in range(7)}
+        archive_path = tmp_path / "memes.tar.gz"
+        with tarfile.open(archive_path, "w:gz") as tar:
+            for name, data in images.items():
+                member = tarfile.TarInfo(name)
+                member.size = len(data)
+                tar.addfile(member, io.BytesIO(data))
+            notes = tarfile.TarInfo("memes/notes.txt")
+            tar.addfile(notes, io.BytesIO())
+        captions_path = tmp_path / "captions.csv"
+        captions_path.write_text("filename,caption\n0.png,zero\nmemes/1.png,one\n")
+
+        class InterruptedImageServiceClient(FakeAsyncImageServiceClient):
+            uploads_left: int | None = None
+
+            async def upload_image(self, image_id: str, image: ImageUpload):
+                if self.uploads_left == 0:
+                    raise ImageServiceError("interrupted")
+                if self.uploads_left is not None:
+                    self.uploads_left -= 1
+                await super().upload_image(image_id, image)
+
+        image_client = InterruptedImageServiceClient()
+        image_client.uploads_left = 4
+        db_client = FakeAsyncDatabaseServiceClient()
+        target = HTTPMemeImportTarget(image_service_client=image_client, db_service_client=db_client)
+
+        def run_import() -> ImportReport:
+            checkpoint = ImportCheckpoint(str(tmp_path / "memes.checkpoint"))
+            importer = MemeImporter(
+                target=target,
+                checkpoint=checkpoint,
+                captions=read_captions(str(captions_path)),
+                concurrency=2,
+                batch_size=3,
+            )
+            try:
+                return asyncio.run(importer.run(read_archive(str(archive_path))))
+            finally:
+                checkpoint.close()
+
+        report = run_import()
+        assert report == ImportReport(imported=4, skipped=0, failed=3)
+
+        image_client.uploads_left = None
+        report = run_import()
+        assert report == ImportReport(imported=3, skipped=4, failed=0)
+        assert len(db_client.fake_db) == 7
+        assert {db_meme.caption for db_meme in db_client.fake_db} == {"zero", "one", None}
+        assert sorted(base64.b64decode(b64_data) for b64_data in image_client.fake_storage.values()) == \
+               sorted(images.values())
+
+        report = run_import()
+        assert report == ImportReport(imported=0, skipped=7, failed=0)
+
+        # a meme stored by an interrupted run, but not checkpointed, is not stored twice
+        run_id = (tmp_path / "memes.checkpoint").read_text().splitlines()[0]
+        (tmp_path / "memes.checkpoint").write_text(f"{run_id}\nmemes/0.png\nmemes/1.p")
+        report = run_import()
+        assert report == ImportReport(imported=6, skipped=1, failed=0)
+        assert len(db_client.fake_db) == 7
+
+        # a record of the same id that points to another image was not stored by this import
+        stored_meme = db_client.fake_db[0]
+        other_meme = DBMeme(id=stored_meme.id, image_id="other", caption=stored_meme.caption)
+        assert asyncio.run(target.create_memes([stored_meme])) == [stored_meme.id]
+        assert asyncio.run(target.create_memes([other_meme])) == []
+
+    def test_import_memes_with_same_names(self, tmp_path):
+        db_client = FakeAsyncDatabaseServiceClient()
+        image_client = FakeAsyncImageServiceClient()
+        target = HTTPMemeImportTarget(image_service_client=image_client, db_service_client=db_client)
+
+        # two archives with an image of the same name are separate imports, neither overwrites the other
+        for archive_name, data in (("first", b"first cat"), ("second", b"second cat")):
+            archive_path = tmp_path / archive_name
+            archive_path.mkdir()
+            (archive_path / "cat.png").write_bytes(data)
+
+            checkpoint = ImportCheckpoint(str(tmp_path / f"{archive_name}.checkpoint"))
+            importer = MemeImporter(target=target, checkpoint=checkpoint)
+            report = asyncio.run(importer.run(read_archive(str(archive_path))))
+            checkpoint.close()
+            assert report == ImportReport(imported=1, skipped=0, failed=0)
+
+        assert len(db_client.fake_db) == 2
+        assert sorted(base64.b64decode(b64_data) for b64_data in image_client.fake_storage.values()) == \
+               [b"first cat", b"second cat"]
+
+    def test_import_memes_in_process(self, tmp_path):
+        archive_path = tmp_path / "memes"
+        (archive_path / "nested").mkdir(parents=True)
+        (archive_path / "a.jpg").write_bytes(b"a")
+        (archive_path / "nested" / "b.webp").write_bytes(b"b")
+
+        db_client = FakeDatabaseServiceClient()
+        image_client = FakeImageServiceClient()
+        target = MemeServiceImportTarget(
+            MemeServiceV1(db_service_client=db_client, image_service_client=image_client),
+        )
+
+        def run_import() -> ImportReport:
+            checkpoint = ImportCheckpoint(str(tmp_path / "memes.checkpoint"))
+            importer = MemeImporter(target=target, checkpoint=checkpoint, batch_size=1)
+            try:
+                return asyncio.run(importer.run(read_archive(str(archive_path))))
+            finally:
+                checkpoint.close()
+
+        report = run_import()
+        assert report == ImportReport(imported=2, skipped=0, failed=0)
+        assert set((tmp_path / "memes.checkpoint").read_text().splitlines()[1:]) == {"a.jpg", "nested/b.webp"}
+        assert sorted(image_client.fake_storage.values()) == [
+            base64.b64encode(b"a").decode(), base64.b64encode(b"b").decode(),
+        ]
+
+        # memes stored by an interrupted run, but not checkpointed, are counted from the insert's conflicts,
+        # their images are uploaded again under the same ids
+        run_id = (tmp_path / "memes.checkpoint").read_text().splitlines()[0]
+        (tmp_path / "memes.checkpoint").write_text(f"{run_id}\n")
+        report = run_import()
+        assert report == ImportReport(imported=2, skipped=0, failed=0)
+        assert len(image_client.fake_storage) == 2
+        assert len(db_client.fake_db) == 2
+
+        # a record of the same id that points to another image isn't counted as imported
+        db_client.fake_db[0] = db_client.fake_db[0].model_copy(update={"image_id": "other image"})
+        (tmp_path / "memes.checkpoint").write_text(f"{run_id}\n")
+        report = run_import()
+        assert report == ImportReport(imported=1, skipped=0, failed=1)
+
+    def test_backup_and_restore(self, tmp_path, b64_string_factory):
+        class WindowedImageServiceClient(FakeAsyncImageServiceClient):
+            open_images: int = 0
+            max_open_images: int = 0
+
+            async def open_image(self, image_id: str, if_none_match: str | None = None) -> ImageStream:
+                self.open_images += 1
+                self.max_open_images = max(self.max_open_images, self.open_images)
+                await asyncio.sleep(0)
+                image_stream = await super().open_image(image_id, if_none_match)
+                self.open_images -= 1
+                return image_stream
+
+        db_client = FakeAsyncDatabaseServiceClient()
+        image_client = WindowedImageServiceClient()
+        service = AsyncMemeServiceV1(db_service_client=db_client, image_service_client=image_client)
+        memes = [Meme(b64_data=b64_string_factory.get(), caption=f"meme {i}") for i in range(10)]
+        for meme in memes:
+            asyncio.run(service.create_meme(meme))
+
+        backup = io.BytesIO()
+        exporter = MemeExporter(db_service_client=db_client, image_service_client=image_client, concurrency=3)
+        manifest = asyncio.run(exporter.export(backup, compress=True))
+        assert manifest.memes == 10
+        assert image_client.max_open_images <= 3
+
+        restored_db_client = FakeAsyncDatabaseServiceClient()
+        restored_image_client = FakeAsyncImageServiceClient()
+        checkpoint = ImportCheckpoint(str(tmp_path / "restore.checkpoint"))
+        importer = MemeImporter(
+            target=HTTPMemeImportTarget(
+                image_service_client=restored_image_client,
+                db_service_client=restored_db_client,
+            ),
+            checkpoint=checkpoint,
+            batch_size=4,
+        )
+        report = asyncio.run(importer.run(read_backup(io.BytesIO(backup.getvalue()))))
+        checkpoint.close()
+        assert report == ImportReport(imported=10, skipped=0, failed=0)
+        assert sorted(restored_db_client.fake_db, key=lambda db_meme: db_meme.id) == \
+               sorted(db_client.fake_db, key=lambda db_meme: db_meme.id)
+        assert restored_image_client.fake_storage == image_client.fake_storage
+
+        # an image that doesn't match its checksum, and a backup cut short before its manifest
+        corrupted_backup = io.BytesIO()
+        with tarfile.open(fileobj=io.BytesIO(backup.getvalue()), mode="r:gz") as tar, \
+                tarfile.open(fileobj=corrupted_backup, mode="w") as corrupted_tar:
+            for member in tar:
+                data = tar.extractfile(member).read()
+                if member.name.startswith("images/"):
+                    data = data[::-1]
+                corrupted_tar.addfile(member, io.BytesIO(data))
+        with pytest.raises(BackupError):
+            list(read_backup(io.BytesIO(corrupted_backup.getvalue())))
+
+        truncated_backup = io.BytesIO()
+        with tarfile.open(fileobj=io.BytesIO(backup.getvalue()), mode="r:gz") as tar, \
+                tarfile.open(fileobj=truncated_backup, mode="w") as truncated_tar:
+            for member in tar:
+                if member.name != "manifest.json":
+                    truncated_tar.addfile(member, tar.extractfile(member))
+        with pytest.raises(BackupError):
+            list(read_backup(io.BytesIO(truncated_backup.getvalue())))
+
+        # a meme whose image is missing is left out, but listed in the manifest
+        missing_image_meme = db_client.fake_db[4]
+        del image_client.fake_storage[missing_image_meme.image_id]
+        manifest = asyncio.run(exporter.export(io.BytesIO()))
+        assert manifest.memes == 9
+        assert manifest.skipped_meme_ids == [missing_image_meme.id]
+
+    def test_db_service_client_export_memes(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            assert request.url.path == "/memes/export"
+            return httpx.Response(200, content=b"".join(
+                json.dumps({"meme_id": f"meme{i}", "image_id": f"image{i}", "caption": None}).encode() + b"\n"
+                for i in range(3)
+            ))
+
+        db_client = AsyncDatabaseServiceClient(
+            db_service_endpoint="http://db/memes",
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        )
+
+        async def export() -> list[DBMeme]:
+            return [db_meme async for db_meme in db_client.export_memes()]
+
+        assert asyncio.run(export()) == [DBMeme(id=f"meme{i}", image_id=f"image{i}", caption=None) for i in range(3)]
+
+    def test_logging_setup(self):
+        root_logger = logging.getLogger()
+        root_handlers, root_level = root_logger.handlers[:], root_logger.level
+
+        log_listener = configure_logging()
+        output = io.StringIO()
+        log_listener.handlers[0].setStream(output)
+        test_logger = logging.getLogger("test_logging_setup")
+        try:
+            payload = "A" * 5000
+            test_logger.info("Creating meme: %s", Meme(b64_data=payload, caption="caption"))
+
+            app = FastAPI()
+            app.add_middleware(LogSamplingMiddleware, sample_rate=0.0)
+
+            @app.get("/")
+            async def endpoint():
+                test_logger.info("sampled out")
+                test_logger.warning("always kept")
+
+            with TestClient(app) as client:
+                assert client.get("/").status_code == status.HTTP_200_OK
+        finally:
+            log_listener.stop()
+            for handler in root_logger.handlers[:]:
+                root_logger.removeHandler(handler)
+            for handler in root_handlers:
+                root_logger.addHandler(handler)
+            root_logger.setLevel(root_level)
+
+        # the test client logs its own requests too
+        lines = [line for line in output.getvalue().splitlines() if " - test_logging_setup - " in line]
+        assert len(lines) == 2
+        assert "(5000 chars)" in lines[0] and payload not in lines[0]
+        assert lines[1].endswith("WARNING - always kept")
+
+    def test_metrics(self):
+        app = FastAPI()
+        app.add_middleware(MetricsMiddleware)
+
+        @app.post("/items/{item_id}")
+        async def create_item(item_id: str, request: Request):
+            return {"item_id": item_id, "size": len(await request.body())}
+
+        app.include_router(metrics.get_router())
+
+        labels = {"method": "POST", "route": "/items/{item_id}", "status": "200"}
+        count_before = REGISTRY.get_sample_value("http_server_request_duration_seconds_count", labels) or 0
+        size_before = REGISTRY.get_sample_value(
+            "http_server_request_size_bytes_sum", {"method": "POST", "route": "/items/{item_id}"},
+        ) or 0
+
+        with TestClient(app) as client:
+            for item_id in ("1", "2"):
+                assert client.post(f"/items/{item_id}", content=b"x" * 1000).status_code == status.HTTP_200_OK
+
+            # ids are folded into the route template
+            assert REGISTRY.get_sample_value("http_server_request_duration_seconds_count", labels) == count_before + 2
+            assert REGISTRY.get_sample_value(
+                "http_server_request_size_bytes_sum", {"method": "POST", "route": "/items/{item_id}"},
+            ) == size_before + 2000
+            assert REGISTRY.get_sample_value("http_server_requests_in_flight", {"method": "POST"}) == 0
+
+            response = client.get("/metrics")
+            assert response.status_code == status.HTTP_200_OK
+            assert 'route="/items/{item_id}"' in response.text
+
+        # a refused connection is recorded as an error of the target
+        transport = HTTPTransport(HTTPTransportSettings(connect_timeout=1), target="unreachable")
+        with pytest.raises(httpx.ConnectError):
+            transport.client().get("http://127.0.0.1:1/")
+        assert REGISTRY.get_sample_value(
+            "http_client_request_duration_seconds_count", {"target": "unreachable", "method": "GET", "status": "error"},
+        ) == 1
+
+        registry = CollectorRegistry()
+        registry.register(StatsCollector("cache", "cache", {
+            "image": LRUImageCache(max_bytes=1024).stats,
+            "meme": TTLMemeCache(ttl=1, negative_ttl=1, max_entries=10).stats,
+        }))
+        assert registry.get_sample_value("cache_max_bytes", {"cache": "image"}) == 1024
+        assert registry.get_sample_value("cache_max_entries", {"cache": "meme"}) == 10
+        assert registry.get_sample_value("cache_hits", {"cache": "meme"}) == 0
+
+    def test_tracing(self, tmp_path):
+        tracer = configure_tracing("meme_service", FileSpanExporter(str(tmp_path / "traces.jsonl")), sample_rate=1.0)
+        transport = HTTPTransport(HTTPTransportSettings(connect_timeout=1), target="image_service")
+        app = FastAPI()
+        app.add_middleware(TracingMiddleware)
+
+        @app.get("/items/{item_id}")
+        def get_item(item_id: str):
+            try:
+                transport.client().get("http://127.0.0.1:1/")
+            except httpx.ConnectError as e:
+                return {"traceparent": e.request.headers["traceparent"]}
+
+        trace_id, parent_span_id = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+        try:
+            with TestClient(app) as client:
+                # the caller's trace is continued and passed on downstream
+                response = client.get("/items/1", headers={"traceparent": f"00-{trace_id}-{parent_span_id}-01"})
+                assert response.json()["traceparent"].startswith(f"00-{trace_id}-")
+                assert response.json()["traceparent"].endswith("-01")
+
+                # the caller's decision not to record is passed on too
+                response = client.get("/items/2", headers={"traceparent": f"00-{'1' * 32}-{parent_span_id}-00"})
+                assert response.json()["traceparent"].endswith("-00")
+
+                # new traces are sampled here
+                tracer.sample_rate = 0.0
+                response = client.get("/items/3", headers={"traceparent": "malformed"})
+                assert not response.json()["traceparent"].startswith(f"00-{trace_id}-")
+                assert response.json()["traceparent"].endswith("-00")
+        finally:
+            shutdown_tracing()
+
+        lines = (tmp_path / "traces.jsonl").read_text().splitlines()
+        spans = [span for line in lines for span in json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]]
+        assert len(spans) == 2
+        server_span = next(span for span in spans if span["kind"] == 2)
+        client_span = next(span for span in spans if span["kind"] == 3)
+        assert server_span["name"] == "GET /items/{item_id}"
+        assert server_span["traceId"] == client_span["traceId"] == trace_id
+        assert server_span["parentSpanId"] == parent_span_id
+        assert client_span["parentSpanId"] == server_span["spanId"]
+        assert client_span["name"] == "GET image_service"
+        assert client_span["status"]["code"] == 2
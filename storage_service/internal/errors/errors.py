@@ -8,3 +8,25 @@ class StorageServiceError(ServiceError):
 
 class KeyDoesNotExistError(StorageServiceError):
     pass
+
+
+class RangeNotSatisfiableError(StorageServiceError):
+    size: int | None
+
+    def __init__(self, size: int | None = None):
+        super().__init__(f"Range not satisfiable, object size: {size}")
+        self.size = size
+
+
+class NotModifiedError(ServiceError):
+    """ Raised when the stored data still matches an etag of If-None-Match """
+    etag: str
+
+    def __init__(self, etag: str):
+        super().__init__(f"Not modified, etag: {etag}")
+        self.etag = etag
+
+
+class PreconditionFailedError(ServiceError):
+    """ Raised when the stored data doesn't match If-Match """
+    pass
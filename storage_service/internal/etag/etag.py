@@ -0,0 +1,32 @@
+def _opaque_tag(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """ If-None-Match uses the weak comparison, so W/ prefixes are ignored """
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    return _opaque_tag(etag) in {_opaque_tag(tag) for tag in if_none_match.split(",")}
+
+
+def etag_matches_strong(if_match: str | None, etag: str) -> bool:
+    """ If-Match and If-Range use the strong comparison, weak tags never match """
+    if if_match is None:
+        return True
+    if if_match.strip() == "*":
+        return True
+
+    return etag in {tag.strip() for tag in if_match.split(",")}
+
+
+def single_tag(if_none_match: str) -> str | None:
+    """ The tag of a header that holds exactly one, without its W/ prefix, None for * and lists """
+    tags = if_none_match.split(",")
+    if len(tags) != 1 or tags[0].strip() == "*":
+        return None
+
+    return _opaque_tag(tags[0])
@@ -1,13 +1,42 @@
 import logging
+import re
+from tempfile import SpooledTemporaryFile
 
-from fastapi import APIRouter, status, HTTPException
+from fastapi import APIRouter, status, Header, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 
-from internal.errors.errors import KeyDoesNotExistError, StorageServiceError
+from internal.errors.errors import (KeyDoesNotExistError, NotModifiedError, PreconditionFailedError,
+                                   RangeNotSatisfiableError, StorageServiceError)
 from internal.routes.dto.data import CreateDataRequest, RetrieveDataResponse
 from internal.storage_service_interface import StorageServiceInterface
+from models.data import ByteRange, Data, DataStream
 
 logger = logging.getLogger(__name__)
 
+# uploads bigger than this are buffered on disk instead of in memory
+UPLOAD_SPOOL_MAX_SIZE = 1024 * 1024
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _parse_range(value: str | None) -> ByteRange | None:
+    """ Single byte ranges only, other ranges are ignored and the whole object is sent, as RFC 9110 allows """
+    if value is None:
+        return None
+    match = _RANGE_PATTERN.match(value.strip())
+    if match is None:
+        return None
+    start, end = match.groups()
+    if start == "" and end == "":
+        return None
+    if start != "" and end != "" and int(end) < int(start):
+        return None
+
+    return ByteRange(
+        start=int(start) if start != "" else None,
+        end=int(end) if end != "" else None,
+    )
+
 
 def get_router(s3_service: StorageServiceInterface) -> APIRouter:
     router = APIRouter(
@@ -17,60 +46,167 @@ def get_router(s3_service: StorageServiceInterface) -> APIRouter:
 
     @router.post("/", status_code=status.HTTP_201_CREATED)
     async def create_data(request: CreateDataRequest):
-        logger.info(f"Creating data, request: {request}")
+        logger.info("Creating data, request: %s", request)
 
         try:
             s3_service.create_data(request.key, request.b64_data)
         except StorageServiceError as e:
-            logger.error(f"Failed to create data for request: {request}, error: {e}")
+            logger.error("Failed to create data for request: %s, error: %s", request, e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=str(e)
             )
 
-        logger.info(f"Created data for request: {request}")
+        logger.info("Created data for request: %s", request)
+
+    def not_modified_response(e: NotModifiedError) -> Response:
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": e.etag},
+        )
 
-    @router.get("/{key}")
-    async def retrieve_data(key: str) -> RetrieveDataResponse:
-        logger.info(f"Retrieving data, key: {key}")
+    @router.get("/{key}", responses={status.HTTP_304_NOT_MODIFIED: {"description": "Not Modified"}})
+    async def retrieve_data(
+        key: str,
+        response: Response,
+        if_none_match: str | None = Header(default=None),
+    ) -> RetrieveDataResponse:
+        logger.info("Retrieving data, key: %s", key)
 
         try:
-            b64_data: str = s3_service.retrieve_data(key)
+            data: Data = s3_service.retrieve_data(key, if_none_match)
+        except NotModifiedError as e:
+            return not_modified_response(e)
         except KeyDoesNotExistError:
-            logger.error(f"Failed to retrieve key: {key}, does not exist")
+            logger.error("Failed to retrieve key: %s, does not exist", key)
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
             )
         except StorageServiceError as e:
-            logger.error(f"Failed to retrieve key: {key}, error: {e}")
+            logger.error("Failed to retrieve key: %s, error: %s", key, e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=str(e),
             )
 
-        logger.info(f"Retrieved data for key: {key}")
-        logger.debug(f"Retrieved data for key: {key}, data: {b64_data}")
+        logger.info("Retrieved data for key: %s", key)
+        logger.debug("Retrieved data for key: %s, data: %s", key, data.b64_data)
+
+        response.headers["ETag"] = data.etag
+
+        return RetrieveDataResponse(b64_data=data.b64_data)
+
+    @router.put(
+        "/{key}/raw",
+        openapi_extra={"requestBody": {"content": {"application/octet-stream": {}}, "required": True}},
+    )
+    async def upload_raw_data(key: str, request: Request):
+        logger.info("Uploading raw data, key: %s", key)
+
+        with SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MAX_SIZE) as data:
+            length = 0
+            async for chunk in request.stream():
+                data.write(chunk)
+                length += len(chunk)
+            data.seek(0)
+
+            try:
+                await run_in_threadpool(s3_service.upload_data, key, data, length)
+            except StorageServiceError as e:
+                logger.error("Failed to upload raw data for key: %s, error: %s", key, e)
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=str(e)
+                )
+
+        logger.info("Uploaded raw data for key: %s, length: %s", key, length)
+
+    @router.get(
+        "/{key}/raw",
+        response_class=StreamingResponse,
+        responses={
+            status.HTTP_200_OK: {"content": {"application/octet-stream": {}}},
+            status.HTTP_206_PARTIAL_CONTENT: {"content": {"application/octet-stream": {}}},
+            status.HTTP_304_NOT_MODIFIED: {"description": "Not Modified"},
+            status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE: {"description": "Range Not Satisfiable"},
+        },
+    )
+    async def retrieve_raw_data(
+        key: str,
+        if_none_match: str | None = Header(default=None),
+        range_header: str | None = Header(default=None, alias="Range"),
+        if_range: str | None = Header(default=None),
+    ) -> Response:
+        """ Streams the object in chunks, a single byte range of it with a Range header.
+        A missing key and the conditions are checked by the read itself, there is no lookup before it """
+        logger.info("Retrieving raw data, key: %s, range: %s", key, range_header)
+
+        byte_range = _parse_range(range_header)
+        try:
+            try:
+                # If-Range is sent as If-Match, so storage only serves the part if it is of the client's version
+                data_stream: DataStream = await run_in_threadpool(
+                    s3_service.open_data,
+                    key,
+                    byte_range,
+                    if_none_match,
+                    if_range if byte_range is not None else None,
+                )
+            except PreconditionFailedError:
+                # a part of a different version than the client has would corrupt its copy, it gets the whole object
+                data_stream = await run_in_threadpool(s3_service.open_data, key, None, if_none_match)
+        except NotModifiedError as e:
+            return not_modified_response(e)
+        except KeyDoesNotExistError:
+            logger.error("Failed to retrieve key: %s, does not exist", key)
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+            )
+        except RangeNotSatisfiableError as e:
+            raise HTTPException(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={"Content-Range": f"bytes */{e.size}"} if e.size is not None else None,
+            )
+        except StorageServiceError as e:
+            logger.error("Failed to retrieve key: %s, error: %s", key, e)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=str(e),
+            )
 
-        return RetrieveDataResponse(b64_data=b64_data)
+        headers = {
+            "Content-Length": str(data_stream.content_length),
+            "ETag": data_stream.etag,
+            "Accept-Ranges": "bytes",
+        }
+        if data_stream.content_range is not None:
+            headers["Content-Range"] = data_stream.content_range
+
+        return StreamingResponse(
+            data_stream.chunks,
+            status_code=status.HTTP_206_PARTIAL_CONTENT if data_stream.content_range is not None else status.HTTP_200_OK,
+            media_type=data_stream.content_type,
+            headers=headers,
+        )
 
     @router.delete("/{key}")
     async def delete_data(key: str):
-        logger.info(f"Deleting data, key: {key}")
+        logger.info("Deleting data, key: %s", key)
 
         try:
             s3_service.delete_data(key)
         except KeyDoesNotExistError:
-            logger.error(f"Failed to delete key: {key}, does not exist")
+            logger.error("Failed to delete key: %s, does not exist", key)
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
             )
         except StorageServiceError as e:
-            logger.error(f"Failed to delete key: {key}, error: {e}")
+            logger.error("Failed to delete key: %s, error: %s", key, e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=str(e)
             )
 
-        logger.info(f"Deleted data for key: {key}")
+        logger.info("Deleted data for key: %s", key)
 
     return router
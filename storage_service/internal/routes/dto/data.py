@@ -1,10 +1,10 @@
-from pydantic import BaseModel
+from models.redacted import RedactedModel
 
 
-class CreateDataRequest(BaseModel):
+class CreateDataRequest(RedactedModel):
     key: str
     b64_data: str
 
 
-class RetrieveDataResponse(BaseModel):
+class RetrieveDataResponse(RedactedModel):
     b64_data: str
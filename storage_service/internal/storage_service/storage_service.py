@@ -1,12 +1,34 @@
 import base64
 import logging
+from typing import BinaryIO
 
-from internal.errors.errors import KeyDoesNotExistError, StorageServiceError
+from internal.errors.errors import (KeyDoesNotExistError, NotModifiedError, PreconditionFailedError,
+                                   RangeNotSatisfiableError, StorageServiceError)
 from internal.storage_service_client_interface import StorageServiceClientInterface
 from internal.storage_service_interface import StorageServiceInterface
+from models.data import ByteRange, Data, DataStream
 
 logger = logging.getLogger(__name__)
 
+# leading bytes of the image formats memes are uploaded in
+_CONTENT_TYPE_SIGNATURES: list[tuple[bytes, str]] = [
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+]
+
+
+def _sniff_content_type(data: bytes) -> str:
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    for signature, content_type in _CONTENT_TYPE_SIGNATURES:
+        if data.startswith(signature):
+            return content_type
+
+    return "application/octet-stream"
+
 
 class StorageService(StorageServiceInterface):
     storage_service_client: StorageServiceClientInterface
@@ -15,8 +37,8 @@ class StorageService(StorageServiceInterface):
         self.storage_service_client = storage_service_client
 
     def create_data(self, key: str, b64_data: str):
-        logger.info(f'Creating data with key: {key}')
-        logger.debug(f'Creating data with key: {key}, B64 data: {b64_data}')
+        logger.info('Creating data with key: %s', key)
+        logger.debug('Creating data with key: %s, B64 data: %s', key, b64_data)
 
         data: bytes = base64.b64decode(b64_data)
 
@@ -24,42 +46,128 @@ class StorageService(StorageServiceInterface):
             self.storage_service_client.create_data(
                 key=key,
                 data=data,
+                content_type=_sniff_content_type(data),
+            )
+        except StorageServiceError as e:
+            logger.error("Failed to create data with key: %s, error: %s", key, e)
+            raise
+
+    def upload_data(self, key: str, data: BinaryIO, length: int):
+        logger.info('Uploading data with key: %s, length: %s', key, length)
+
+        content_type = _sniff_content_type(data.read(16))
+        data.seek(0)
+
+        try:
+            self.storage_service_client.upload_data(
+                key=key,
+                data=data,
+                length=length,
+                content_type=content_type,
+            )
+        except StorageServiceError as e:
+            logger.error("Failed to upload data with key: %s, error: %s", key, e)
+            raise
+
+        logger.info('Uploaded data with key: %s, content type: %s', key, content_type)
+
+    def retrieve_data(self, key: str, if_none_match: str | None = None) -> Data:
+        logger.info('Retrieving data, key: %s', key)
+
+        try:
+            stored_object = self.storage_service_client.retrieve_data(
+                key=key,
+                if_none_match=if_none_match,
             )
+        except NotModifiedError as e:
+            logger.info('Data for key: %s not modified, etag: %s', key, e.etag)
+            raise
+        except KeyDoesNotExistError:
+            logger.error('Failed to retrieve data for key: %s, key does not exist', key)
+            raise
         except StorageServiceError as e:
-            logger.error(f"Failed to create data with key: {key}, error: {e}")
+            logger.error('Failed to retrieve data for key: %s, error: %s', key, e)
             raise
 
-    def retrieve_data(self, key: str) -> str:
-        logger.info(f'Retrieving data, key: {key}')
+        b64_data = base64.b64encode(stored_object.data).decode('utf-8')
+
+        logger.info('Retrieved data with key: %s', key)
+        logger.debug('Retrieved data with key: %s, B64 data: %s', key, stored_object.data)
+
+        return Data(
+            b64_data=b64_data,
+            etag=stored_object.etag,
+        )
+
+    def retrieve_etag(self, key: str) -> str:
+        logger.info('Retrieving etag, key: %s', key)
 
         try:
-            data: bytes = self.storage_service_client.retrieve_data(
+            etag = self.storage_service_client.retrieve_etag(
                 key=key,
             )
         except KeyDoesNotExistError:
-            logger.error(f'Failed to retrieve data for key: {key}, key does not exist')
+            logger.error('Failed to retrieve etag for key: %s, key does not exist', key)
             raise
         except StorageServiceError as e:
-            logger.error(f'Failed to retrieve data for key: {key}, error: {e}')
+            logger.error('Failed to retrieve etag for key: %s, error: %s', key, e)
             raise
 
-        b64_data = base64.b64encode(data).decode('utf-8')
+        logger.info('Retrieved etag for key: %s: %s', key, etag)
+
+        return etag
+
+    def open_data(
+            self,
+            key: str,
+            byte_range: ByteRange | None = None,
+            if_none_match: str | None = None,
+            if_match: str | None = None,
+    ) -> DataStream:
+        logger.info('Opening data stream, key: %s, range: %s', key, byte_range)
+
+        try:
+            data_stream = self.storage_service_client.open_data(
+                key=key,
+                byte_range=byte_range,
+                if_none_match=if_none_match,
+                if_match=if_match,
+            )
+        except NotModifiedError as e:
+            logger.info('Data for key: %s not modified, etag: %s', key, e.etag)
+            raise
+        except PreconditionFailedError:
+            logger.info('Data for key: %s does not match: %s', key, if_match)
+            raise
+        except KeyDoesNotExistError:
+            logger.error('Failed to open data stream for key: %s, key does not exist', key)
+            raise
+        except RangeNotSatisfiableError:
+            logger.warning('Range: %s of key: %s is not satisfiable', byte_range, key)
+            raise
+        except StorageServiceError as e:
+            logger.error('Failed to open data stream for key: %s, error: %s', key, e)
+            raise
 
-        logger.info(f'Retrieved data with key: {key}')
-        logger.debug(f'Retrieved data with key: {key}, B64 data: {data}')
+        logger.info(
+            'Opened data stream with key: %s, content type: %s, content length: %s',
+            key,
+            data_stream.content_type,
+            data_stream.content_length
+        )
 
-        return b64_data
+        return data_stream
 
     def delete_data(self, key: str):
-        logger.info(f'Deleting data, key: {key}')
+        logger.info('Deleting data, key: %s', key)
 
         try:
             self.storage_service_client.delete_data(
                 key=key,
             )
         except KeyDoesNotExistError:
-            logger.error(f'Failed to delete data for key: {key}, key does not exist')
+            logger.error('Failed to delete data for key: %s, key does not exist', key)
             raise
         except StorageServiceError as e:
-            logger.error(f'Failed to delete data for key: {key}, error: {e}')
+            logger.error('Failed to delete data for key: %s, error: %s', key, e)
             raise
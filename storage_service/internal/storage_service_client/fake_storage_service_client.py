@@ -1,24 +1,77 @@
-from internal.errors.errors import KeyDoesNotExistError
+import hashlib
+from typing import BinaryIO
+
+from internal.errors.errors import (KeyDoesNotExistError, NotModifiedError, PreconditionFailedError,
+                                   RangeNotSatisfiableError)
+from internal.etag.etag import etag_matches, etag_matches_strong
 from internal.storage_service_client_interface import StorageServiceClientInterface
+from models.data import ByteRange, DataStream, StoredObject
 
 
 class FakeStorageServiceClient(StorageServiceClientInterface):
     fake_storage: dict[str, bytes]
+    fake_content_types: dict[str, str]
 
     def __init__(self):
         self.fake_storage = {}
+        self.fake_content_types = {}
 
-    def create_data(self, key: str, data: bytes):
+    def create_data(self, key: str, data: bytes, content_type: str = "application/octet-stream"):
         self.fake_storage[key] = data
+        self.fake_content_types[key] = content_type
+
+    def upload_data(self, key: str, data: BinaryIO, length: int, content_type: str = "application/octet-stream"):
+        self.create_data(key, data.read(length), content_type)
 
-    def retrieve_data(self, key: str) -> bytes:
+    def retrieve_data(self, key: str, if_none_match: str | None = None) -> StoredObject:
         if key in self.fake_storage.keys():
-            return self.fake_storage[key]
+            data = self.fake_storage[key]
+            etag = f'"{hashlib.md5(data).hexdigest()}"'
+            if etag_matches(if_none_match, etag):
+                raise NotModifiedError(etag)
+            return StoredObject(
+                data=data,
+                etag=etag,
+            )
         else:
             raise KeyDoesNotExistError()
 
+    def retrieve_etag(self, key: str) -> str:
+        return self.retrieve_data(key).etag
+
+    def open_data(
+            self,
+            key: str,
+            byte_range: ByteRange | None = None,
+            if_none_match: str | None = None,
+            if_match: str | None = None,
+    ) -> DataStream:
+        stored_object = self.retrieve_data(key)
+        if not etag_matches_strong(if_match, stored_object.etag):
+            raise PreconditionFailedError()
+        if etag_matches(if_none_match, stored_object.etag):
+            raise NotModifiedError(stored_object.etag)
+        data = stored_object.data
+        content_range = None
+        if byte_range is not None:
+            resolved = byte_range.resolve(len(data))
+            if resolved is None:
+                raise RangeNotSatisfiableError(len(data))
+            first, last = resolved
+            content_range = f"bytes {first}-{last}/{len(data)}"
+            data = data[first:last + 1]
+
+        return DataStream(
+            content_type=self.fake_content_types[key],
+            content_length=len(data),
+            etag=stored_object.etag,
+            chunks=iter([data]),
+            content_range=content_range,
+        )
+
     def delete_data(self, key: str):
         if key in self.fake_storage.keys():
             del self.fake_storage[key]
+            del self.fake_content_types[key]
         else:
             raise KeyDoesNotExistError()
@@ -0,0 +1,142 @@
+import base64
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+from internal.errors.errors import (KeyDoesNotExistError, NotModifiedError, PreconditionFailedError,
+                                   RangeNotSatisfiableError, StorageServiceError)
+from internal.etag.etag import etag_matches, etag_matches_strong
+from internal.storage_service_client_interface import StorageServiceClientInterface
+from models.data import ByteRange, DataStream, StoredObject
+
+
+STREAM_CHUNK_SIZE = 64 * 1024
+HEADER_SIZE = 512
+
+
+class FilesystemStorageServiceClient(StorageServiceClientInterface):
+    """ Objects as files under a root directory, for running the service without object storage.
+    Each file starts with a fixed size JSON header holding the content type and etag, followed by the data,
+    so an object is replaced with a single rename and readers never see a half written one """
+    root: Path
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        # keys are arbitrary strings, base64url turns each into a single safe file name
+        return self.root / base64.urlsafe_b64encode(key.encode()).decode()
+
+    def _write(self, key: str, chunks: Iterator[bytes], content_type: str):
+        fd, temp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as object_file:
+                # the etag is only known once all the data is written, its header space is reserved up front
+                object_file.seek(HEADER_SIZE)
+                digest = hashlib.md5()
+                for chunk in chunks:
+                    digest.update(chunk)
+                    object_file.write(chunk)
+
+                header = json.dumps({"content_type": content_type, "etag": f'"{digest.hexdigest()}"'}).encode()
+                if len(header) > HEADER_SIZE:
+                    raise StorageServiceError(f"Content type is too long: {content_type}")
+                object_file.seek(0)
+                object_file.write(header.ljust(HEADER_SIZE))
+            os.replace(temp_path, self._path(key))
+        except OSError as e:
+            os.remove(temp_path)
+            raise StorageServiceError(e)
+        except StorageServiceError:
+            os.remove(temp_path)
+            raise
+
+    def _open(self, key: str, if_none_match: str | None = None, if_match: str | None = None) -> tuple[BinaryIO, dict]:
+        """ Checks the conditions against the header, before any data is read """
+        try:
+            object_file = open(self._path(key), "rb")
+        except FileNotFoundError:
+            raise KeyDoesNotExistError()
+        except OSError as e:
+            raise StorageServiceError(e)
+        header = json.loads(object_file.read(HEADER_SIZE))
+        if not etag_matches_strong(if_match, header["etag"]):
+            object_file.close()
+            raise PreconditionFailedError()
+        if etag_matches(if_none_match, header["etag"]):
+            object_file.close()
+            raise NotModifiedError(header["etag"])
+
+        return object_file, header
+
+    def create_data(self, key: str, data: bytes, content_type: str = "application/octet-stream"):
+        self._write(key, iter([data]), content_type)
+
+    def upload_data(self, key: str, data: BinaryIO, length: int, content_type: str = "application/octet-stream"):
+        def read_chunks() -> Iterator[bytes]:
+            remaining = length
+            while remaining > 0 and (chunk := data.read(min(STREAM_CHUNK_SIZE, remaining))):
+                remaining -= len(chunk)
+                yield chunk
+
+        self._write(key, read_chunks(), content_type)
+
+    def retrieve_data(self, key: str, if_none_match: str | None = None) -> StoredObject:
+        object_file, header = self._open(key, if_none_match)
+        with object_file:
+            return StoredObject(
+                data=object_file.read(),
+                etag=header["etag"],
+            )
+
+    def retrieve_etag(self, key: str) -> str:
+        object_file, header = self._open(key)
+        object_file.close()
+        return header["etag"]
+
+    def open_data(
+            self,
+            key: str,
+            byte_range: ByteRange | None = None,
+            if_none_match: str | None = None,
+            if_match: str | None = None,
+    ) -> DataStream:
+        object_file, header = self._open(key, if_none_match, if_match)
+        size = os.fstat(object_file.fileno()).st_size - HEADER_SIZE
+        first, last = 0, size - 1
+        content_range = None
+        if byte_range is not None:
+            resolved = byte_range.resolve(size)
+            if resolved is None:
+                object_file.close()
+                raise RangeNotSatisfiableError(size)
+            first, last = resolved
+            content_range = f"bytes {first}-{last}/{size}"
+            object_file.seek(HEADER_SIZE + first)
+
+        def stream() -> Iterator[bytes]:
+            remaining = last - first + 1
+            with object_file:
+                while remaining > 0 and (chunk := object_file.read(min(STREAM_CHUNK_SIZE, remaining))):
+                    remaining -= len(chunk)
+                    yield chunk
+
+        return DataStream(
+            content_type=header["content_type"],
+            content_length=last - first + 1,
+            etag=header["etag"],
+            chunks=stream(),
+            content_range=content_range,
+        )
+
+    def delete_data(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            raise KeyDoesNotExistError()
+        except OSError as e:
+            raise StorageServiceError(e)
@@ -1,10 +1,22 @@
+from contextlib import contextmanager
+from xml.etree import ElementTree
 from io import BytesIO
+from typing import BinaryIO, Iterator
 
 import minio
 from minio import Minio
+from urllib3 import BaseHTTPResponse
 
-from internal.errors.errors import KeyDoesNotExistError, StorageServiceError
+from internal.errors.errors import (KeyDoesNotExistError, NotModifiedError, PreconditionFailedError,
+                                   RangeNotSatisfiableError, StorageServiceError)
+from internal.etag.etag import single_tag
+from internal.metrics.metrics import observe_s3_request
 from internal.storage_service_client_interface import StorageServiceClientInterface
+from internal.tracing.tracing import SpanKind, span
+from models.data import ByteRange, DataStream, StoredObject
+
+
+STREAM_CHUNK_SIZE = 64 * 1024
 
 
 class MinIOStorageServiceClient(StorageServiceClientInterface):
@@ -28,53 +40,169 @@ class MinIOStorageServiceClient(StorageServiceClientInterface):
 
         self.init_bucket()
 
+    @contextmanager
+    def _s3_call(self, operation: str) -> Iterator[None]:
+        """ Times the call for metrics and traces it as a child of the current request """
+        with observe_s3_request(operation), span(
+                f"s3 {operation}",
+                SpanKind.CLIENT,
+                attributes={"s3.operation": operation, "s3.bucket": self.bucket},
+        ):
+            yield
+
     def init_bucket(self):
-        if not self.client.bucket_exists(self.bucket):
-            self.client.make_bucket(self.bucket)
+        with self._s3_call("bucket_exists"):
+            bucket_exists = self.client.bucket_exists(self.bucket)
+        if not bucket_exists:
+            with self._s3_call("make_bucket"):
+                self.client.make_bucket(self.bucket)
 
-    def create_data(self, key: str, data: bytes):
+    def create_data(self, key: str, data: bytes, content_type: str = "application/octet-stream"):
         try:
-            self.client.put_object(
-                self.bucket,
-                key,
-                BytesIO(data),
-                len(data)
-            )
+            with self._s3_call("put_object"):
+                self.client.put_object(
+                    self.bucket,
+                    key,
+                    BytesIO(data),
+                    len(data),
+                    content_type=content_type,
+                )
         except minio.error.MinioException as e:
             raise StorageServiceError(e)
 
-    def retrieve_data(self, key: str) -> bytes:
-        if not self._object_exists(key):
-            raise KeyDoesNotExistError()
+    def upload_data(self, key: str, data: BinaryIO, length: int, content_type: str = "application/octet-stream"):
+        # minio reads the stream part by part, so at most one part is held in memory
         try:
-            response = self.client.get_object(
-                self.bucket,
-                key
-            )
-            return response.data
+            with self._s3_call("put_object"):
+                self.client.put_object(
+                    self.bucket,
+                    key,
+                    data,
+                    length,
+                    content_type=content_type,
+                )
+        except minio.error.MinioException as e:
+            raise StorageServiceError(e)
+
+    def _get_object(self, key: str, request_headers: dict[str, str]) -> BaseHTTPResponse:
+        """ get_object reports a missing key and checks the conditions in request_headers itself,
+        asking stat_object first would double the round trips """
+        try:
+            with self._s3_call("get_object"):
+                return self.client.get_object(
+                    self.bucket,
+                    key,
+                    request_headers=request_headers if len(request_headers) > 0 else None,
+                )
+        except minio.error.S3Error as e:
+            if e.code == "NoSuchKey":
+                raise KeyDoesNotExistError()
+            if e.code == "InvalidRange":
+                raise RangeNotSatisfiableError(self._object_size(key, e))
+            if e.code == "PreconditionFailed":
+                raise PreconditionFailedError()
+            raise StorageServiceError(e)
+        except minio.error.ServerError as e:
+            # a 304 has no body, minio reports it as a server error without its headers
+            if e.status_code == 304:
+                raise NotModifiedError(self._not_modified_etag(key, request_headers["If-None-Match"]))
+            raise StorageServiceError(e)
         except minio.error.MinioException as e:
             raise StorageServiceError(e)
+
+    def _object_size(self, key: str, error: minio.error.S3Error) -> int | None:
+        # S3 reports the size in the InvalidRange body, servers that leave it out cost a stat on this error path only
+        try:
+            size = ElementTree.fromstring(error.response.data).findtext("ActualObjectSize")
+        except (AttributeError, TypeError, ElementTree.ParseError):
+            size = None
+        if size is not None and size.isdigit():
+            return int(size)
+
+        try:
+            with self._s3_call("stat_object"):
+                return self.client.stat_object(self.bucket, key).size
+        except minio.error.MinioException:
+            return None
+
+    def _not_modified_etag(self, key: str, if_none_match: str) -> str:
+        # with a single tag asked for, the data matched that one, only * and lists need a look at the object
+        etag = single_tag(if_none_match)
+        return etag if etag is not None else self.retrieve_etag(key)
+
+    @staticmethod
+    def _conditions(if_none_match: str | None, if_match: str | None) -> dict[str, str]:
+        request_headers = {}
+        if if_none_match is not None:
+            request_headers["If-None-Match"] = if_none_match
+        if if_match is not None:
+            request_headers["If-Match"] = if_match
+        return request_headers
+
+    def retrieve_data(self, key: str, if_none_match: str | None = None) -> StoredObject:
+        response = self._get_object(key, self._conditions(if_none_match, None))
+        try:
+            return StoredObject(
+                data=response.data,
+                etag=response.headers["ETag"],
+            )
         finally:
             response.close()
             response.release_conn()
 
-    def _object_exists(self, key: str) -> bool:
+    def retrieve_etag(self, key: str) -> str:
+        # the object hash S3 records at write time, a HEAD request is enough to read it
         try:
-            _ = self.client.stat_object(
-                self.bucket,
-                key
-            )
-            return True
-        except minio.error.S3Error:
-            return False
+            with self._s3_call("stat_object"):
+                stat = self.client.stat_object(
+                    self.bucket,
+                    key
+                )
+        except minio.error.S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchObject"):
+                raise KeyDoesNotExistError()
+            raise StorageServiceError(e)
+        except minio.error.MinioException as e:
+            raise StorageServiceError(e)
+
+        return f'"{stat.etag}"'
+
+    def open_data(
+            self,
+            key: str,
+            byte_range: ByteRange | None = None,
+            if_none_match: str | None = None,
+            if_match: str | None = None,
+    ) -> DataStream:
+        # S3 serves the range itself, only the bytes asked for leave object storage
+        request_headers = self._conditions(if_none_match, if_match)
+        if byte_range is not None:
+            request_headers["Range"] = byte_range.header_value()
+        response = self._get_object(key, request_headers)
+
+        def stream() -> Iterator[bytes]:
+            try:
+                yield from response.stream(STREAM_CHUNK_SIZE)
+            finally:
+                response.close()
+                response.release_conn()
+
+        return DataStream(
+            content_type=response.headers.get("Content-Type", "application/octet-stream"),
+            content_length=int(response.headers["Content-Length"]),
+            etag=response.headers["ETag"],
+            chunks=stream(),
+            content_range=response.headers.get("Content-Range") if response.status == 206 else None,
+        )
 
     def delete_data(self, key: str):
-        if not self._object_exists(key):
-            raise KeyDoesNotExistError()
+        # S3 deletes of missing keys succeed, the stat is what tells the caller the key was never there
+        self.retrieve_etag(key)
         try:
-            self.client.remove_object(
-                self.bucket,
-                key,
-            )
+            with self._s3_call("remove_object"):
+                self.client.remove_object(
+                    self.bucket,
+                    key,
+                )
         except minio.error.MinioException as e:
             raise StorageServiceError(e)
@@ -1,13 +1,37 @@
 from abc import ABC, abstractmethod
+from typing import BinaryIO
+
+from models.data import ByteRange, DataStream, StoredObject
 
 
 class StorageServiceClientInterface(ABC):
     @abstractmethod
-    def create_data(self, key: str, data: bytes):
+    def create_data(self, key: str, data: bytes, content_type: str = "application/octet-stream"):
+        ...
+
+    @abstractmethod
+    def upload_data(self, key: str, data: BinaryIO, length: int, content_type: str = "application/octet-stream"):
+        ...
+
+    @abstractmethod
+    def retrieve_data(self, key: str, if_none_match: str | None = None) -> StoredObject:
+        """ Raises NotModifiedError instead of reading the data if it matches if_none_match """
+        ...
+
+    @abstractmethod
+    def retrieve_etag(self, key: str) -> str:
         ...
 
     @abstractmethod
-    def retrieve_data(self, key: str) -> bytes:
+    def open_data(
+            self,
+            key: str,
+            byte_range: ByteRange | None = None,
+            if_none_match: str | None = None,
+            if_match: str | None = None,
+    ) -> DataStream:
+        """ The conditions are checked by the read itself. Raises PreconditionFailedError if the data doesn't
+        match if_match, then NotModifiedError if it matches if_none_match """
         ...
 
     @abstractmethod
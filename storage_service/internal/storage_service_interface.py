@@ -1,4 +1,7 @@
 from abc import ABC, abstractmethod
+from typing import BinaryIO
+
+from models.data import ByteRange, Data, DataStream
 
 
 class StorageServiceInterface(ABC):
@@ -7,7 +10,25 @@ class StorageServiceInterface(ABC):
         ...
 
     @abstractmethod
-    def retrieve_data(self, key: str) -> str:
+    def upload_data(self, key: str, data: BinaryIO, length: int):
+        ...
+
+    @abstractmethod
+    def retrieve_data(self, key: str, if_none_match: str | None = None) -> Data:
+        ...
+
+    @abstractmethod
+    def retrieve_etag(self, key: str) -> str:
+        ...
+
+    @abstractmethod
+    def open_data(
+            self,
+            key: str,
+            byte_range: ByteRange | None = None,
+            if_none_match: str | None = None,
+            if_match: str | None = None,
+    ) -> DataStream:
         ...
 
     @abstractmethod
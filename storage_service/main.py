@@ -1,21 +1,26 @@
 import logging
 import os
 import shutil
+from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
 from fastapi import FastAPI
 
-from internal.routes import data
+from internal.logging_setup.logging_setup import LogSamplingMiddleware, configure_logging
+from internal.metrics.metrics import MetricsMiddleware
+from internal.routes import data, metrics
+from internal.span_exporter_interface import SpanExporterInterface
 from internal.storage_service.storage_service import StorageService
+from internal.storage_service_client.fake_storage_service_client import FakeStorageServiceClient
+from internal.storage_service_client.filesystem.filesystem_storage_service_client import FilesystemStorageServiceClient
 from internal.storage_service_client.minio.minio_storage_service_client import MinIOStorageServiceClient
 from internal.storage_service_client_interface import StorageServiceClientInterface
 from internal.storage_service_interface import StorageServiceInterface
+from internal.tracing.file_span_exporter import FileSpanExporter
+from internal.tracing.otlp_span_exporter import OTLPSpanExporter
+from internal.tracing.tracing import TracingMiddleware, configure_tracing, shutdown_tracing
 
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO,
-    force=True
-)
+log_listener = configure_logging()
 logger = logging.getLogger(__name__)
 
 if not os.path.isfile("./.env") and os.path.isfile("./.env.example"):
@@ -29,28 +34,64 @@ load_dotenv(
 logger.info("Loaded environment variables from .env file")
 
 log_level = os.getenv('LOG_LEVEL', 'INFO')
-logger.setLevel(log_level)
+logging.getLogger().setLevel(log_level)
+# share of requests whose INFO lines are logged, warnings and errors are always logged
+log_sample_rate = float(os.getenv('LOG_SAMPLE_RATE', '1.0'))
+
+# tracing is off unless an exporter is chosen, only TRACE_SAMPLE_RATE of the traces started here are recorded,
+# traces continued from an upstream traceparent follow the upstream's decision
+trace_exporter = os.getenv('TRACE_EXPORTER', 'none')
+span_exporter: SpanExporterInterface | None = None
+if trace_exporter == "file":
+    span_exporter = FileSpanExporter(os.getenv('TRACE_FILE', './traces.jsonl'))
+elif trace_exporter == "otlp":
+    span_exporter = OTLPSpanExporter(os.getenv('TRACE_OTLP_ENDPOINT', 'http://localhost:4318'))
+if span_exporter is not None:
+    configure_tracing("storage_service", span_exporter, float(os.getenv('TRACE_SAMPLE_RATE', '0.01')))
+    logger.info("Exporting traces to %s", trace_exporter)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    yield
+    shutdown_tracing()
+    log_listener.stop()
 
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(LogSamplingMiddleware, sample_rate=log_sample_rate)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
 logger.info("Initialized FastAPI app")
 
-assert "S3_ENDPOINT" in os.environ, "S3_ENDPOINT environment variable must be set"
-s3_endpoint = os.environ['S3_ENDPOINT']
-assert "S3_ACCESS_KEY" in os.environ, "S3_ACCESS_KEY environment variable must be set"
-s3_access_key = os.environ['S3_ACCESS_KEY']
-assert "S3_SECRET_KEY" in os.environ, "S3_SECRET_KEY environment variable must be set"
-s3_secret_key = os.environ['S3_SECRET_KEY']
-assert "S3_BUCKET" in os.environ, "S3_BUCKET environment variable must be set"
-s3_bucket = os.environ['S3_BUCKET']
-
-s3_client: StorageServiceClientInterface = MinIOStorageServiceClient(
-    s3_endpoint=s3_endpoint,
-    s3_access_key=s3_access_key,
-    s3_secret_key=s3_secret_key,
-    s3_bucket=s3_bucket
-)
-logger.info("Initialized S3 client")
+storage_backend = os.getenv('STORAGE_BACKEND', 'minio')
+assert storage_backend in ("minio", "filesystem", "memory"), f"Unknown STORAGE_BACKEND: {storage_backend}"
+
+s3_client: StorageServiceClientInterface
+if storage_backend == "minio":
+    assert "S3_ENDPOINT" in os.environ, "S3_ENDPOINT environment variable must be set"
+    s3_endpoint = os.environ['S3_ENDPOINT']
+    assert "S3_ACCESS_KEY" in os.environ, "S3_ACCESS_KEY environment variable must be set"
+    s3_access_key = os.environ['S3_ACCESS_KEY']
+    assert "S3_SECRET_KEY" in os.environ, "S3_SECRET_KEY environment variable must be set"
+    s3_secret_key = os.environ['S3_SECRET_KEY']
+    assert "S3_BUCKET" in os.environ, "S3_BUCKET environment variable must be set"
+    s3_bucket = os.environ['S3_BUCKET']
+
+    s3_client = MinIOStorageServiceClient(
+        s3_endpoint=s3_endpoint,
+        s3_access_key=s3_access_key,
+        s3_secret_key=s3_secret_key,
+        s3_bucket=s3_bucket
+    )
+elif storage_backend == "filesystem":
+    s3_client = FilesystemStorageServiceClient(
+        root=os.getenv('STORAGE_PATH', './data'),
+    )
+else:
+    # objects are lost on restart, for local runs and load tests
+    s3_client = FakeStorageServiceClient()
+logger.info("Initialized %s storage client", storage_backend)
 
 service: StorageServiceInterface = StorageService(
     storage_service_client=s3_client,
@@ -61,4 +102,5 @@ router = data.get_router(service)
 logger.info("Initialized data router")
 
 app.include_router(router)
+app.include_router(metrics.get_router())
 logger.info("Included data router, starting up..")
@@ -0,0 +1,47 @@
+from typing import Iterator
+
+from pydantic import BaseModel, ConfigDict
+
+from models.redacted import RedactedModel
+
+
+class ByteRange(BaseModel):
+    """ One range of an HTTP Range header, end inclusive. Without a start it is the last `end` bytes """
+    start: int | None
+    end: int | None
+
+    def header_value(self) -> str:
+        return f"bytes={'' if self.start is None else self.start}-{'' if self.end is None else self.end}"
+
+    def resolve(self, size: int) -> tuple[int, int] | None:
+        """ First and last byte of the range within an object of size, None if none of it is in the object """
+        if self.start is None:
+            if self.end == 0 or size == 0:
+                return None
+            return max(size - self.end, 0), size - 1
+        if self.start >= size:
+            return None
+        return self.start, size - 1 if self.end is None else min(self.end, size - 1)
+
+
+class DataStream(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    content_type: str
+    # of the part sent, when a range was asked for
+    content_length: int
+    # quoted, ready for the ETag header
+    etag: str
+    chunks: Iterator[bytes]
+    # ready for the Content-Range header, None when the whole object is sent
+    content_range: str | None = None
+
+
+class StoredObject(RedactedModel):
+    data: bytes
+    etag: str
+
+
+class Data(RedactedModel):
+    b64_data: str
+    etag: str
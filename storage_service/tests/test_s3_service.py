@@ -2,21 +2,33 @@ import base64
 import random
 
 import pytest
+from minio.error import S3Error, ServerError
+from prometheus_client import REGISTRY
 from fastapi import APIRouter, status, HTTPException
 from fastapi.encoders import jsonable_encoder
 from fastapi.testclient import TestClient
 
+from internal.errors.errors import NotModifiedError, PreconditionFailedError, RangeNotSatisfiableError
+from internal.metrics.metrics import observe_s3_request
+from internal.routes import metrics
 from internal.routes.data import get_router
 from internal.routes.dto.data import CreateDataRequest
 from internal.storage_service.storage_service import StorageService
 from internal.storage_service_client.fake_storage_service_client import FakeStorageServiceClient
+from internal.storage_service_client.filesystem.filesystem_storage_service_client import FilesystemStorageServiceClient
+from internal.storage_service_client.minio.minio_storage_service_client import MinIOStorageServiceClient
 from internal.storage_service_client_interface import StorageServiceClientInterface
 from internal.storage_service_interface import StorageServiceInterface
+from models.data import ByteRange
 
 
-@pytest.fixture(scope='function')
-def storage_service_client() -> StorageServiceClientInterface:
-    client: StorageServiceClientInterface = FakeStorageServiceClient()
+@pytest.fixture(scope='function', params=["fake", "filesystem"])
+def storage_service_client(request, tmp_path) -> StorageServiceClientInterface:
+    client: StorageServiceClientInterface
+    if request.param == "filesystem":
+        client = FilesystemStorageServiceClient(root=str(tmp_path / "data"))
+    else:
+        client = FakeStorageServiceClient()
 
     yield client
 
@@ -134,3 +146,231 @@ class TestS3Service:
         )
         assert retrieve_data2_response.status_code == status.HTTP_200_OK
         assert retrieve_data2_response.json()['b64_data'] == create_data2_request.b64_data
+
+    def test_raw_data_retrieval(self, client):
+        png_data = b"\x89PNG\r\n\x1a\n" + bytes(range(256))
+        create_data_request = CreateDataRequest(
+            key="raw-key",
+            b64_data=base64.b64encode(png_data).decode(),
+        )
+        self.create_data(client, [create_data_request])
+
+        response = client.get(
+            self.ROUTE_PREFIX + f"/{create_data_request.key}/raw"
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.content == png_data
+        assert response.headers["Content-Type"] == "image/png"
+        assert response.headers["Content-Length"] == str(len(png_data))
+
+        with pytest.raises(HTTPException):
+            client.get(
+                self.ROUTE_PREFIX + "/missing-key/raw"
+            )
+
+    def test_raw_data_range(self, client):
+        data = bytes(range(256)) * 4
+        create_data_request = CreateDataRequest(
+            key="range-key",
+            b64_data=base64.b64encode(data).decode(),
+        )
+        self.create_data(client, [create_data_request])
+        path = self.ROUTE_PREFIX + f"/{create_data_request.key}/raw"
+
+        for range_header, first, last in [
+            ("bytes=0-99", 0, 99),
+            ("bytes=1000-", 1000, 1023),
+            ("bytes=-24", 1000, 1023),
+            # past the end is cut to the object
+            ("bytes=1000-5000", 1000, 1023),
+        ]:
+            response = client.get(path, headers={"Range": range_header})
+            assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+            assert response.content == data[first:last + 1]
+            assert response.headers["Content-Range"] == f"bytes {first}-{last}/{len(data)}"
+            assert response.headers["Content-Length"] == str(last - first + 1)
+
+        # ranges it can't serve as one part are ignored
+        for range_header in ["bytes=0-1,5-6", "bytes=10-5", "items=0-1"]:
+            response = client.get(path, headers={"Range": range_header})
+            assert response.status_code == status.HTTP_200_OK
+            assert response.content == data
+            assert response.headers["Accept-Ranges"] == "bytes"
+
+        with pytest.raises(HTTPException) as e:
+            client.get(path, headers={"Range": "bytes=1024-"})
+        assert e.value.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+        assert e.value.headers["Content-Range"] == f"bytes */{len(data)}"
+
+        # a part is only sent if it belongs to the version the client has
+        etag = client.get(path).headers["ETag"]
+        response = client.get(path, headers={"Range": "bytes=0-9", "If-Range": etag})
+        assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+        response = client.get(path, headers={"Range": "bytes=0-9", "If-Range": '"outdated"'})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.content == data
+
+    def test_raw_data_upload(self, client):
+        gif_data = b"GIF89a" + bytes(range(256)) * 8
+
+        def chunks():
+            for i in range(0, len(gif_data), 100):
+                yield gif_data[i:i + 100]
+
+        response = client.put(
+            self.ROUTE_PREFIX + "/uploaded-key/raw",
+            content=chunks(),
+            headers={"Content-Type": "application/octet-stream"},
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        response = client.get(
+            self.ROUTE_PREFIX + "/uploaded-key/raw"
+        )
+        assert response.content == gif_data
+        assert response.headers["Content-Type"] == "image/gif"
+
+    def test_conditional_data_retrieval(self, client, create_data_request_factory):
+        create_data_request = create_data_request_factory.get()
+        create_data_request.key = "etag-key"
+        self.create_data(client, [create_data_request])
+
+        response = client.get(
+            self.ROUTE_PREFIX + f"/{create_data_request.key}"
+        )
+        etag = response.headers["ETag"]
+        assert etag.startswith('"') and etag.endswith('"')
+
+        for path in [f"/{create_data_request.key}", f"/{create_data_request.key}/raw"]:
+            not_modified_response = client.get(
+                self.ROUTE_PREFIX + path,
+                headers={"If-None-Match": f'"outdated", W/{etag}'},
+            )
+            assert not_modified_response.status_code == status.HTTP_304_NOT_MODIFIED
+            assert not_modified_response.headers["ETag"] == etag
+            assert not_modified_response.content == b""
+
+            modified_response = client.get(
+                self.ROUTE_PREFIX + path,
+                headers={"If-None-Match": '"outdated"'},
+            )
+            assert modified_response.status_code == status.HTTP_200_OK
+            assert modified_response.headers["ETag"] == etag
+
+        self.create_data(client, [CreateDataRequest(key=create_data_request.key, b64_data="AAAA")])
+        response = client.get(
+            self.ROUTE_PREFIX + f"/{create_data_request.key}",
+            headers={"If-None-Match": etag},
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["ETag"] != etag
+
+    def test_conditions_checked_by_the_read(self):
+        class NoStatStorageServiceClient(FakeStorageServiceClient):
+            def retrieve_etag(self, key: str) -> str:
+                raise AssertionError("conditional reads don't stat the object first")
+
+        data = bytes(range(256))
+        storage_client = NoStatStorageServiceClient()
+        storage_client.create_data("key", data)
+        etag = FakeStorageServiceClient.retrieve_etag(storage_client, "key")
+        path = self.ROUTE_PREFIX + "/key/raw"
+
+        with TestClient(get_router(StorageService(storage_service_client=storage_client))) as client:
+            for route in ["/key", "/key/raw"]:
+                response = client.get(self.ROUTE_PREFIX + route, headers={"If-None-Match": etag})
+                assert response.status_code == status.HTTP_304_NOT_MODIFIED
+                assert response.headers["ETag"] == etag
+
+            response = client.get(path, headers={"Range": "bytes=0-9", "If-Range": etag})
+            assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+            assert response.content == data[:10]
+            response = client.get(path, headers={"Range": "bytes=0-9", "If-Range": f"W/{etag}"})
+            assert response.status_code == status.HTTP_200_OK
+            assert response.content == data
+
+            # the whole object sent instead of an outdated part can still be not modified
+            response = client.get(path, headers={"Range": "bytes=0-9", "If-Range": '"outdated"', "If-None-Match": etag})
+            assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_minio_conditional_reads(self):
+        stored_etag = '"d41d8cd98f00b204e9800998ecf8427e"'
+        requests: list[dict[str, str] | None] = []
+
+        class ConditionalMinio:
+            stats = 0
+            # the InvalidRange body, some servers leave the size out
+            range_error_body = b"<Error><Code>InvalidRange</Code><ActualObjectSize>1024</ActualObjectSize></Error>"
+
+            def get_object(self, bucket_name: str, object_name: str, request_headers=None):
+                requests.append(request_headers)
+                headers = request_headers or {}
+                if headers.get("Range") == "bytes=2048-":
+                    raise S3Error("InvalidRange", "The requested range is not satisfiable", object_name, None, None,
+                                  type("Response", (), {"data": self.range_error_body})())
+                if "If-Match" in headers and headers["If-Match"] != stored_etag:
+                    raise S3Error("PreconditionFailed", "At least one of the pre-conditions failed", object_name,
+                                  None, None, None)
+                raise ServerError("server failed with HTTP status code 304", 304)
+
+            def stat_object(self, bucket_name: str, object_name: str):
+                self.stats += 1
+                return type("Stat", (), {"etag": stored_etag.strip('"'), "size": 1024})()
+
+        minio_client = ConditionalMinio()
+        storage_client = MinIOStorageServiceClient.__new__(MinIOStorageServiceClient)
+        storage_client.client = minio_client
+        storage_client.bucket = "bucket"
+
+        with pytest.raises(PreconditionFailedError):
+            storage_client.open_data("key", ByteRange(start=0, end=9), if_match='"outdated"')
+        assert requests[-1] == {"If-Match": '"outdated"', "Range": "bytes=0-9"}
+
+        # S3 drops the 304 headers, a single tag asked for is the stored one
+        with pytest.raises(NotModifiedError) as e:
+            storage_client.retrieve_data("key", if_none_match=f"W/{stored_etag}")
+        assert e.value.etag == stored_etag
+        assert requests[-1] == {"If-None-Match": f"W/{stored_etag}"}
+        assert minio_client.stats == 0
+
+        with pytest.raises(NotModifiedError) as e:
+            storage_client.open_data("key", if_none_match=f'"outdated", {stored_etag}')
+        assert e.value.etag == stored_etag
+        assert minio_client.stats == 1
+
+        # the size for the 416 Content-Range comes from the error, or from a stat if the error doesn't have it
+        with pytest.raises(RangeNotSatisfiableError) as e:
+            storage_client.open_data("key", ByteRange(start=2048, end=None))
+        assert e.value.size == 1024
+        assert minio_client.stats == 1
+        minio_client.range_error_body = b"<Error><Code>InvalidRange</Code></Error>"
+        with pytest.raises(RangeNotSatisfiableError) as e:
+            storage_client.open_data("key", ByteRange(start=2048, end=None))
+        assert e.value.size == 1024
+        assert minio_client.stats == 2
+
+    def test_s3_request_metrics(self):
+        ok_before = REGISTRY.get_sample_value(
+            "s3_request_duration_seconds_count", {"operation": "get_object", "outcome": "ok"},
+        ) or 0
+        error_before = REGISTRY.get_sample_value(
+            "s3_request_duration_seconds_count", {"operation": "get_object", "outcome": "error"},
+        ) or 0
+
+        with observe_s3_request("get_object"):
+            pass
+        with pytest.raises(RuntimeError):
+            with observe_s3_request("get_object"):
+                raise RuntimeError("connection reset")
+
+        assert REGISTRY.get_sample_value(
+            "s3_request_duration_seconds_count", {"operation": "get_object", "outcome": "ok"},
+        ) == ok_before + 1
+        assert REGISTRY.get_sample_value(
+            "s3_request_duration_seconds_count", {"operation": "get_object", "outcome": "error"},
+        ) == error_before + 1
+
+        with TestClient(metrics.get_router()) as client:
+            response = client.get("/metrics")
+        assert response.status_code == status.HTTP_200_OK
+        assert 's3_request_duration_seconds_count{operation="get_object",outcome="ok"}' in response.text